@@ -10,6 +10,9 @@ Endpoints:
     GET  /health          - Health check
     POST /run-pipeline    - Trigger pipeline manually
     GET  /cache-stats     - View profile cache stats
+    GET  /lock-stats      - View shared .tmp state lock contention
+    GET  /apify-governor  - View Apify runs in flight and today's spend
+    GET  /llm-stats       - View LLM call counts, retries and latency
 """
 
 import os
@@ -33,8 +36,16 @@ load_dotenv()
 from execution.competitor_post_pipeline import (
     run_full_pipeline,
     load_profile_cache,
-    PROFILE_CACHE_FILE
+    get_processed_ledger,
+    PROFILE_STORE_FILE,
+    PROCESSED_LEADS_FILE,
 )
+from execution.state_io import is_state_file, state_file_info
+# Same top-level modules the pipeline modules import, so the stats are shared
+from file_lock import get_lock_stats
+from kv_cache import get_kv_cache
+from apify_governor import get_apify_governor
+from llm_client import get_llm_stats
 
 
 # =============================================================================
@@ -142,16 +153,49 @@ async def get_status():
 
 @app.get("/cache-stats")
 async def cache_stats():
-    """Get profile cache statistics."""
+    """Get profile cache and .tmp state statistics (sizes only; nothing is decoded)."""
     cache = load_profile_cache()
+    tmp_dir = os.path.dirname(PROFILE_STORE_FILE)
+    state_files = [
+        state_file_info(entry.path)
+        for entry in (os.scandir(tmp_dir) if os.path.isdir(tmp_dir) else [])
+        if entry.is_file() and is_state_file(entry.name)
+    ]
     return {
         "total_cached_profiles": len(cache),
-        "cache_file": PROFILE_CACHE_FILE,
-        "cache_exists": os.path.exists(PROFILE_CACHE_FILE),
-        "cache_size_bytes": os.path.getsize(PROFILE_CACHE_FILE) if os.path.exists(PROFILE_CACHE_FILE) else 0
+        "cache_file": PROFILE_STORE_FILE,
+        "cache_exists": os.path.exists(PROFILE_STORE_FILE),
+        "cache_size_bytes": os.path.getsize(PROFILE_STORE_FILE) if os.path.exists(PROFILE_STORE_FILE) else 0,
+        "cache_usage": cache.usage(),
+        "processed_leads": state_file_info(PROCESSED_LEADS_FILE),
+        "processed_leads_bloom": get_processed_ledger().bloom_stats(),
+        "kv_cache": get_kv_cache().stats(),
+        "state_files": {
+            "count": len(state_files),
+            "compressed": sum(1 for f in state_files if f["compressed"]),
+            "total_size_bytes": sum(f["size_bytes"] for f in state_files),
+        },
     }
 
 
+@app.get("/lock-stats")
+async def lock_stats():
+    """Contention on shared .tmp state locks since this server started."""
+    return {"locks": get_lock_stats()}
+
+
+@app.get("/apify-governor")
+async def apify_governor_status():
+    """Apify runs in flight, today's spend and the limits shared by every pipeline."""
+    return get_apify_governor().status()
+
+
+@app.get("/llm-stats")
+async def llm_stats():
+    """LLM calls, retries and latency percentiles per host since this server started."""
+    return {"hosts": get_llm_stats()}
+
+
 @app.post("/run-pipeline")
 async def trigger_pipeline(
     request: PipelineRequest,
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Apify Governor - Account-wide admission control for Apify actor runs.
+
+Every pipeline (competitor posts, keyword monitor, gift leads, buying
+signals, lead scrapers, the Modal webhook) starts actor runs on the same
+Apify account. Left alone they overrun its concurrent-run and memory limits
+(runs fail to start) and nothing stops a runaway loop from spending the
+whole month's credit in a day. Every run is admitted here first:
+
+- Concurrency: at most max_concurrent_runs runs in flight, and their
+  declared memory must fit in max_memory_mb.
+- Rate: a token bucket refilled at runs_per_minute (bursts up to the same).
+- Spend: today's (UTC) spend plus the estimates of runs still in flight
+  must stay under daily_budget_usd.
+
+State lives in one JSON file in .tmp, read-modify-written under a FileLock,
+so API server runs, CLI runs and cron monitors share the same limits. A run
+that can't be admitted yet waits in line (polling) instead of failing; only
+a run that would push settled spend past the budget is refused with
+ApifyBudgetExceeded. Leases of crashed processes are dropped when their PID
+is gone or their lease expires. PIDs are only checked for leases taken on
+this host (same hostname and boot); another container's PIDs mean nothing
+here, so its leases are only dropped when they expire.
+
+Limits default to the constants below and can be overridden per machine
+with APIFY_MAX_CONCURRENT_RUNS, APIFY_MAX_MEMORY_MB, APIFY_RUNS_PER_MINUTE
+and APIFY_DAILY_BUDGET_USD; APIFY_GOVERNOR_STATE_FILE moves the state file
+(e.g. onto a volume shared by several containers).
+
+Usage:
+    from apify_governor import call_actor, get_apify_governor
+    run = call_actor(client, "apify/google-search-scraper", run_input, estimated_cost_usd=0.04)
+
+    governor = get_apify_governor()
+    lease = governor.acquire(PROFILE_SCRAPER_ACTOR, estimated_cost_usd=0.4)
+    ...  # start the run and wait for it
+    governor.release(lease, actual_cost_usd=run_cost_usd(run))
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from apify_runs import TERMINAL_STATUSES
+from file_lock import FileLock
+from run_metrics import record_actor_run
+
+_TMP_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".tmp"))
+GOVERNOR_STATE_FILE = os.path.join(_TMP_DIR, "apify_governor.json")
+
+# Account limits (Apify Starter plan: 32 GB of actor memory)
+DEFAULT_MAX_CONCURRENT_RUNS = 8
+DEFAULT_MAX_MEMORY_MB = 32768
+DEFAULT_RUNS_PER_MINUTE = 30
+DEFAULT_DAILY_BUDGET_USD = 25.0
+
+# Per-run defaults when a caller doesn't know better
+DEFAULT_RUN_MEMORY_MB = 1024
+DEFAULT_RUN_COST_USD = 0.05
+
+# A lease outlives its run by at most this long if the process never releases it
+DEFAULT_LEASE_SECONDS = 2 * 3600
+
+# How long a run waits in line before giving up
+DEFAULT_MAX_WAIT_SECONDS = 1800
+
+_POLL_INTERVAL = 1.0
+
+
+class ApifyBudgetExceeded(RuntimeError):
+    """Starting this run would exceed today's Apify budget."""
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _read_boot_id() -> str:
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+# Identifies this PID namespace: containers on one machine share a boot id
+# but not a hostname, and a reboot reuses the hostname but not the boot id
+HOST_ID = f"{socket.gethostname()}/{_read_boot_id()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        return True  # rely on lease expiry
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class ApifyGovernor:
+    """Token bucket + concurrency + daily spend ceiling, shared through a state file."""
+
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        max_concurrent_runs: int = DEFAULT_MAX_CONCURRENT_RUNS,
+        max_memory_mb: int = DEFAULT_MAX_MEMORY_MB,
+        runs_per_minute: float = DEFAULT_RUNS_PER_MINUTE,
+        daily_budget_usd: float = DEFAULT_DAILY_BUDGET_USD,
+    ):
+        self.state_path = state_path or GOVERNOR_STATE_FILE
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_memory_mb = max_memory_mb
+        self.runs_per_minute = runs_per_minute
+        self.daily_budget_usd = daily_budget_usd
+        self._lock = FileLock(self.state_path + ".lock", name="apify_governor")
+        # FileLock is not re-entrant, so threads of this process take turns here first
+        self._thread_lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # State file
+    # -------------------------------------------------------------------------
+
+    def _load(self, now: float) -> Dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+
+        state.setdefault("leases", {})
+        state.setdefault("tokens", float(self.runs_per_minute))
+        state.setdefault("refilled_at", now)
+
+        # New UTC day: spend starts over
+        if state.get("day") != _today():
+            state["day"] = _today()
+            state["spent_usd"] = 0.0
+            state["runs_today"] = 0
+            state["refused_today"] = 0
+
+        # Drop leases of runs whose process died or that were never released
+        for lease_id, lease in list(state["leases"].items()):
+            local = lease.get("host", HOST_ID) == HOST_ID
+            if lease["expires_at"] <= now or (local and not _pid_alive(lease["pid"])):
+                state["spent_usd"] += lease["estimated_cost_usd"]
+                del state["leases"][lease_id]
+
+        # Refill the bucket
+        capacity = float(self.runs_per_minute)
+        elapsed = max(0.0, now - state["refilled_at"])
+        state["tokens"] = min(capacity, state["tokens"] + elapsed * self.runs_per_minute / 60.0)
+        state["refilled_at"] = now
+        return state
+
+    def _save(self, state: Dict):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @contextmanager
+    def _state(self):
+        with self._thread_lock, self._lock:
+            state = self._load(time.time())
+            yield state
+            self._save(state)
+
+    # -------------------------------------------------------------------------
+    # Admission
+    # -------------------------------------------------------------------------
+
+    def _blocked_by(self, state: Dict, estimated_cost_usd: float, memory_mb: int) -> Optional[str]:
+        """Why a run can't start right now, or None if it can."""
+        leases = state["leases"].values()
+        reserved = sum(lease["estimated_cost_usd"] for lease in leases)
+        memory_in_use = sum(lease["memory_mb"] for lease in leases)
+
+        if state["spent_usd"] + estimated_cost_usd > self.daily_budget_usd:
+            raise ApifyBudgetExceeded(
+                f"Apify daily budget ${self.daily_budget_usd:.2f} reached "
+                f"(spent ${state['spent_usd']:.2f}, run needs ~${estimated_cost_usd:.2f})"
+            )
+        if state["spent_usd"] + reserved + estimated_cost_usd > self.daily_budget_usd:
+            return "budget reserved by runs in flight"
+        if len(state["leases"]) >= self.max_concurrent_runs:
+            return f"{len(state['leases'])} runs in flight"
+        # A run bigger than the whole account may still start on an idle account
+        if state["leases"] and memory_in_use + memory_mb > self.max_memory_mb:
+            return f"{memory_in_use} MB memory in use"
+        if state["tokens"] < 1:
+            return "rate limit"
+        return None
+
+    def acquire(
+        self,
+        actor_id: str,
+        estimated_cost_usd: float = DEFAULT_RUN_COST_USD,
+        memory_mb: int = DEFAULT_RUN_MEMORY_MB,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_wait_seconds: float = DEFAULT_MAX_WAIT_SECONDS,
+    ) -> str:
+        """
+        Wait for admission and reserve a run slot.
+
+        Args:
+            actor_id: Actor about to be started (for status/logging)
+            estimated_cost_usd: Expected cost, reserved against the budget
+            memory_mb: Memory the run is started with
+            lease_seconds: Drop the lease after this long if never released
+            max_wait_seconds: Give up waiting after this long
+
+        Returns:
+            Lease ID to pass to release()
+
+        Raises:
+            ApifyBudgetExceeded: today's spend leaves no room for this run
+            TimeoutError: not admitted within max_wait_seconds
+        """
+        start = time.monotonic()
+        announced = False
+        while True:
+            try:
+                with self._state() as state:
+                    reason = self._blocked_by(state, estimated_cost_usd, memory_mb)
+                    if reason is None:
+                        now = time.time()
+                        lease_id = uuid.uuid4().hex
+                        state["tokens"] -= 1
+                        state["runs_today"] += 1
+                        state["leases"][lease_id] = {
+                            "actor": actor_id,
+                            "host": HOST_ID,
+                            "pid": os.getpid(),
+                            "memory_mb": memory_mb,
+                            "estimated_cost_usd": estimated_cost_usd,
+                            "started_at": now,
+                            "expires_at": now + lease_seconds,
+                        }
+                        return lease_id
+            except ApifyBudgetExceeded:
+                with self._state() as state:
+                    state["refused_today"] += 1
+                raise
+
+            waited = time.monotonic() - start
+            if waited >= max_wait_seconds:
+                raise TimeoutError(f"Apify run for {actor_id} not admitted after {waited:.0f}s ({reason})")
+            if not announced:
+                print(f"Apify governor: {actor_id} queued ({reason})")
+                announced = True
+            time.sleep(_POLL_INTERVAL)
+
+    def release(self, lease_id: str, actual_cost_usd: Optional[float] = None):
+        """Free a run slot and settle its cost (the estimate if actual is unknown)."""
+        with self._state() as state:
+            lease = state["leases"].pop(lease_id, None)
+            if lease is not None:
+                cost = lease["estimated_cost_usd"] if actual_cost_usd is None else actual_cost_usd
+                state["spent_usd"] += cost
+
+    @contextmanager
+    def slot(
+        self,
+        actor_id: str,
+        estimated_cost_usd: float = DEFAULT_RUN_COST_USD,
+        memory_mb: int = DEFAULT_RUN_MEMORY_MB,
+        **kwargs,
+    ):
+        """Hold a run slot for the duration of the block."""
+        lease_id = self.acquire(actor_id, estimated_cost_usd, memory_mb, **kwargs)
+        try:
+            yield lease_id
+        finally:
+            self.release(lease_id)
+
+    def status(self) -> Dict:
+        """Current limits, spend and runs in flight (across all processes)."""
+        with self._state() as state:
+            leases = list(state["leases"].values())
+            return {
+                "day": state["day"],
+                "spent_usd": round(state["spent_usd"], 4),
+                "reserved_usd": round(sum(lease["estimated_cost_usd"] for lease in leases), 4),
+                "daily_budget_usd": self.daily_budget_usd,
+                "runs_today": state["runs_today"],
+                "refused_today": state["refused_today"],
+                "runs_in_flight": len(leases),
+                "max_concurrent_runs": self.max_concurrent_runs,
+                "memory_in_use_mb": sum(lease["memory_mb"] for lease in leases),
+                "max_memory_mb": self.max_memory_mb,
+                "tokens": round(state["tokens"], 2),
+                "in_flight_actors": sorted(lease["actor"] for lease in leases),
+            }
+
+
+# One governor per state file, shared by every caller in the process
+_governors: Dict[str, ApifyGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_apify_governor(state_path: Optional[str] = None) -> ApifyGovernor:
+    """Return the process-wide governor (limits from env vars or the defaults)."""
+    path = os.path.abspath(state_path or os.getenv("APIFY_GOVERNOR_STATE_FILE") or GOVERNOR_STATE_FILE)
+    with _governors_lock:
+        governor = _governors.get(path)
+        if governor is None:
+            governor = ApifyGovernor(
+                path,
+                max_concurrent_runs=int(os.getenv("APIFY_MAX_CONCURRENT_RUNS", DEFAULT_MAX_CONCURRENT_RUNS)),
+                max_memory_mb=int(os.getenv("APIFY_MAX_MEMORY_MB", DEFAULT_MAX_MEMORY_MB)),
+                runs_per_minute=float(os.getenv("APIFY_RUNS_PER_MINUTE", DEFAULT_RUNS_PER_MINUTE)),
+                daily_budget_usd=float(os.getenv("APIFY_DAILY_BUDGET_USD", DEFAULT_DAILY_BUDGET_USD)),
+            )
+            _governors[path] = governor
+        return governor
+
+
+def run_cost_usd(run: Optional[Dict]) -> Optional[float]:
+    """
+    A finished run's usageTotalUsd, or None (release() then settles at the estimate).
+
+    A run still going when its caller stopped waiting has only billed part of
+    what it will, so its partial usage is not taken as its cost.
+    """
+    if not run or run.get("status") not in TERMINAL_STATUSES or run.get("usageTotalUsd") is None:
+        return None
+    try:
+        return float(run["usageTotalUsd"])
+    except (TypeError, ValueError):
+        return None
+
+
+def call_actor(
+    client,
+    actor_id: str,
+    run_input: Dict,
+    estimated_cost_usd: float = DEFAULT_RUN_COST_USD,
+    memory_mb: Optional[int] = None,
+    **call_kwargs: Any,
+) -> Dict:
+    """
+    client.actor(actor_id).call(...) once the governor admits the run.
+
+    memory_mb is passed on to Apify when given; otherwise the actor keeps its
+    own default and DEFAULT_RUN_MEMORY_MB is counted against the account.
+    """
+    if memory_mb is not None:
+        call_kwargs["memory_mbytes"] = memory_mb
+    governor = get_apify_governor()
+    lease_id = governor.acquire(actor_id, estimated_cost_usd, memory_mb or DEFAULT_RUN_MEMORY_MB)
+    run = None
+    try:
+        started = time.monotonic()
+        run = client.actor(actor_id).call(run_input=run_input, **call_kwargs)
+    finally:
+        # Settle at what Apify actually billed when the run reports it
+        governor.release(lease_id, actual_cost_usd=run_cost_usd(run))
+    # Actual compute units / USD go to the current run's CostTracker
+    record_actor_run(actor_id, run, time.monotonic() - started)
+    return run
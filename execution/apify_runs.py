@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Apify Runs - Wait for actor runs to finish without fixed sleeps.
+
+Profile scrapes used to sleep a fixed 120s after starting a run and then poll
+every 30s, so a 5-profile run paid the same latency as a 500-profile run.
+
+wait_for_run() long-polls the run endpoint with ?waitForFinish=N: Apify holds
+the request open until the run ends or N seconds pass, so completion is seen
+as soon as it happens. N starts small and doubles up to Apify's 60s cap:
+small runs return within seconds, long runs cost about one request a minute.
+The overall deadline is sized to the batch (estimate_run_timeout).
+
+DatasetStream reads a run's dataset by offset while the run is still going,
+so callers can process the first profiles while the rest are scraped. Its
+long polls are capped lower (15s) so new items are picked up promptly.
+
+Large batches can be split across several concurrent runs (plan_shards)
+sized so each shard finishes in about a target wall-clock time;
+merge_streams() then yields pages from all of them as they arrive.
+
+Usage:
+    from apify_runs import wait_for_run, DatasetStream
+    run = wait_for_run(run_id, APIFY_API_TOKEN, expected_items=len(urls))
+    if run["status"] != "SUCCEEDED":
+        ...
+
+    stream = DatasetStream(run_id, dataset_id, APIFY_API_TOKEN, expected_items=len(urls))
+    for items in stream:
+        ...  # each page as soon as it is in the dataset
+    print(stream.run["status"])
+"""
+
+import math
+import time
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+APIFY_API_BASE = "https://api.apify.com/v2"
+
+# Apify caps waitForFinish at 60 seconds per request
+MAX_WAIT_FOR_FINISH = 60
+FIRST_WAIT_SECONDS = 2
+
+# Runs in these states will not change any more
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"}
+
+# Deadline = base + per-item allowance (profile scrapes run ~1-2s per profile)
+RUN_TIMEOUT_BASE_SECONDS = 300
+RUN_TIMEOUT_SECONDS_PER_ITEM = 5
+
+# Give up after this many poll errors in a row
+MAX_POLL_ERRORS = 5
+
+# Streaming reads: items per dataset page, and the long-poll cap between reads
+DATASET_PAGE_SIZE = 100
+STREAM_MAX_WAIT = 15
+
+# Extra HTTP timeout on top of the server-side wait
+_HTTP_TIMEOUT_MARGIN = 30
+
+
+def _get_run(run_id: str, token: str, wait_secs: int) -> Dict:
+    """One status request, held open by Apify for up to wait_secs."""
+    response = requests.get(
+        f"{APIFY_API_BASE}/actor-runs/{run_id}",
+        params={"token": token, "waitForFinish": wait_secs},
+        timeout=wait_secs + _HTTP_TIMEOUT_MARGIN,
+    )
+    response.raise_for_status()
+    return response.json()["data"]
+
+
+def _get_dataset_page(dataset_id: str, token: str, offset: int, limit: int) -> List[Dict]:
+    response = requests.get(
+        f"{APIFY_API_BASE}/datasets/{dataset_id}/items",
+        params={"token": token, "offset": offset, "limit": limit, "format": "json"},
+        headers={"Accept": "application/json"},
+        timeout=_HTTP_TIMEOUT_MARGIN,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def estimate_run_timeout(num_items: int) -> float:
+    """How long to wait for a run over num_items inputs before giving up."""
+    return RUN_TIMEOUT_BASE_SECONDS + RUN_TIMEOUT_SECONDS_PER_ITEM * max(0, num_items)
+
+
+def wait_for_run(
+    run_id: str,
+    token: str,
+    expected_items: int = 0,
+    timeout_seconds: Optional[float] = None,
+    first_wait: float = FIRST_WAIT_SECONDS,
+) -> Dict:
+    """
+    Block until an actor run reaches a terminal status or the deadline passes.
+
+    Args:
+        run_id: Apify run ID
+        token: Apify API token
+        expected_items: Number of inputs in the run (sizes the default deadline)
+        timeout_seconds: Overall deadline (default estimate_run_timeout(expected_items))
+        first_wait: waitForFinish of the first poll; doubled on each later poll
+
+    Returns:
+        Last run object seen. Its "status" is one of TERMINAL_STATUSES, or a
+        non-terminal status (or "UNKNOWN") if the deadline passed or polling
+        kept failing.
+    """
+    if timeout_seconds is None:
+        timeout_seconds = estimate_run_timeout(expected_items)
+
+    deadline = time.monotonic() + timeout_seconds
+    wait = first_wait
+    errors = 0
+    run = {"id": run_id, "status": "UNKNOWN"}
+
+    while True:
+        remaining = deadline - time.monotonic()
+        wait_secs = int(max(0, min(wait, remaining, MAX_WAIT_FOR_FINISH)))
+        polled_at = time.monotonic()
+
+        try:
+            run = _get_run(run_id, token, wait_secs)
+            errors = 0
+        except Exception as e:
+            errors += 1
+            print(f"Error polling run {run_id} ({errors}/{MAX_POLL_ERRORS}): {e}")
+            if errors >= MAX_POLL_ERRORS:
+                return run
+
+        status = run.get("status")
+        if status in TERMINAL_STATUSES:
+            print(f"Run {run_id} finished with status: {status} "
+                  f"({timeout_seconds - (deadline - time.monotonic()):.0f}s)")
+            return run
+        if time.monotonic() >= deadline:
+            print(f"Run {run_id} still {status} after {timeout_seconds:.0f}s, giving up")
+            return run
+
+        # An error, or a server/proxy that cut the long poll short: wait out
+        # the rest so the poll rate still backs off
+        elapsed = time.monotonic() - polled_at
+        if elapsed < wait_secs:
+            time.sleep(min(wait_secs - elapsed, max(0, deadline - time.monotonic())))
+
+        wait = min(wait * 2, MAX_WAIT_FOR_FINISH)
+        print(f"Status: {status}, waiting up to {wait:.0f}s...")
+
+
+class DatasetStream:
+    """
+    Iterate a run's dataset page by page while the run is still in progress.
+
+    Reads from the last offset whenever the run may have produced items,
+    long-polling the run in between. Stops once the run has reached a
+    terminal status (or the deadline passed) and the dataset is drained.
+    self.run holds the last run object seen; self.items_read counts items.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        dataset_id: str,
+        token: str,
+        expected_items: int = 0,
+        timeout_seconds: Optional[float] = None,
+        page_size: int = DATASET_PAGE_SIZE,
+    ):
+        self.run_id = run_id
+        self.dataset_id = dataset_id
+        self.token = token
+        self.page_size = page_size
+        self.timeout_seconds = (
+            estimate_run_timeout(expected_items) if timeout_seconds is None else timeout_seconds
+        )
+        self.run: Dict = {"id": run_id, "status": "UNKNOWN"}
+        self.items_read = 0
+
+    def __iter__(self) -> Iterator[List[Dict]]:
+        deadline = time.monotonic() + self.timeout_seconds
+        wait = FIRST_WAIT_SECONDS
+        errors = 0
+        done = False
+
+        while True:
+            try:
+                page = _get_dataset_page(self.dataset_id, self.token, self.items_read, self.page_size)
+                errors = 0
+            except Exception as e:
+                errors += 1
+                print(f"Error reading dataset {self.dataset_id} ({errors}/{MAX_POLL_ERRORS}): {e}")
+                if errors >= MAX_POLL_ERRORS:
+                    return
+                time.sleep(min(wait, STREAM_MAX_WAIT))
+                continue
+
+            if page:
+                self.items_read += len(page)
+                yield page
+                if len(page) == self.page_size:
+                    continue  # likely more already waiting
+            if done:
+                return
+
+            remaining = deadline - time.monotonic()
+            wait_secs = int(max(0, min(wait, remaining, STREAM_MAX_WAIT)))
+            try:
+                self.run = _get_run(self.run_id, self.token, wait_secs)
+            except Exception as e:
+                errors += 1
+                print(f"Error polling run {self.run_id} ({errors}/{MAX_POLL_ERRORS}): {e}")
+                if errors >= MAX_POLL_ERRORS:
+                    return
+                time.sleep(wait_secs)
+
+            status = self.run.get("status")
+            if status in TERMINAL_STATUSES:
+                print(f"Run {self.run_id} finished with status: {status}")
+                done = True  # one more read drains the dataset
+            elif time.monotonic() >= deadline:
+                print(f"Run {self.run_id} still {status} after {self.timeout_seconds:.0f}s, giving up")
+                done = True
+            wait = min(wait * 2, STREAM_MAX_WAIT)
+
+
+# =============================================================================
+# SHARDING
+# =============================================================================
+
+def plan_shards(items: List, target_seconds: float, seconds_per_item: float, max_shards: int) -> List[List]:
+    """
+    Split items into shards that should each finish in about target_seconds.
+
+    Args:
+        items: Inputs to split (e.g. profile URLs)
+        target_seconds: Desired wall-clock time per run
+        seconds_per_item: Observed time one run spends per input
+        max_shards: Upper bound on concurrent runs (shards grow past the
+            target once it is reached)
+
+    Returns:
+        List of evenly sized, non-empty shards (a single shard for small batches)
+    """
+    if not items:
+        return []
+    per_shard = max(1, int(target_seconds / seconds_per_item))
+    num_shards = min(max(1, max_shards), math.ceil(len(items) / per_shard))
+    size = math.ceil(len(items) / num_shards)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def merge_streams(streams: List[DatasetStream]) -> Iterator[List[Dict]]:
+    """Yield pages from several DatasetStreams in arrival order (one reader thread each)."""
+    if len(streams) == 1:
+        yield from streams[0]
+        return
+
+    pages: "queue.Queue[Optional[List[Dict]]]" = queue.Queue()
+
+    def read(stream: DatasetStream):
+        try:
+            for page in stream:
+                pages.put(page)
+        except Exception as e:
+            print(f"Error streaming run {stream.run_id}: {e}")
+        finally:
+            pages.put(None)  # this stream is done
+
+    for stream in streams:
+        threading.Thread(target=read, args=(stream,), daemon=True).start()
+
+    remaining = len(streams)
+    while remaining:
+        page = pages.get()
+        if page is None:
+            remaining -= 1
+        else:
+            yield page
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark concurrent ICP qualification against a local stand-in for DeepSeek.
+
+Starts a threaded HTTP server on localhost that answers chat-completion
+requests with one verdict per lead after a fixed latency, then qualifies
+the same leads:
+- sequentially, one request per lead (how qualify_leads_with_deepseek used
+  to work)
+- with the async qualifier at each in-flight limit (one lead per request,
+  so the gain is from concurrency alone)
+
+The verdict cache is disabled for every run so each one reaches the
+stand-in server (and no fake verdicts end up in .tmp/kv_cache.sqlite3).
+
+No API key or network access is needed.
+
+Usage:
+    python execution/benchmark_icp_qualifier.py
+    python execution/benchmark_icp_qualifier.py --leads 400 --latency 0.5 --in-flight 10 50 200
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from icp_batch import classify_leads_icp
+
+DEFAULT_IN_FLIGHT = [10, 50, 200]
+
+_LEAD_RE = re.compile(r"Lead: (.+)")
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_stand_in_server(latency: float) -> _StandInServer:
+    """DeepSeek-shaped chat completions endpoint on a free localhost port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][-1]["content"]
+            time.sleep(latency)
+            names = _LEAD_RE.findall(prompt)
+            verdicts = [{"id": i, "match": True, "confidence": "high", "reason": name}
+                        for i, name in enumerate(names, 1)]
+            data = json.dumps({"choices": [{"message": {"content": json.dumps({"verdicts": verdicts})}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = _StandInServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _summary(lead: dict) -> str:
+    return f"\nLead: {lead['fullName']}\nTitle: {lead['jobTitle']}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent ICP qualification")
+    parser.add_argument("--leads", type=int, default=200, help="Leads to qualify per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stand-in response time per request (seconds)")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=DEFAULT_IN_FLIGHT, help="In-flight limits to test")
+    parser.add_argument("--output", help="Optional JSON file for results")
+    args = parser.parse_args()
+
+    import requests
+
+    server = start_stand_in_server(args.latency)
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+    leads = [{"fullName": f"Person {i}", "jobTitle": "CEO"} for i in range(args.leads)]
+    session = requests.Session()
+
+    def sequential_check(lead, icp_criteria):
+        # One request per lead, as check_icp_match_deepseek does
+        response = session.post(api_url, json={"messages": [{"role": "user", "content": _summary(lead)}]}, timeout=30)
+        return json.loads(response.json()["choices"][0]["message"]["content"])["verdicts"][0]
+
+    results = []
+    print(f"{args.leads} leads, {args.latency * 1000:.0f} ms per request")
+    print(f"{'in flight':>10} {'seconds':>10} {'leads/s':>10} {'speedup':>10}")
+
+    start = time.perf_counter()
+    verdicts, _ = classify_leads_icp(leads, _summary, "system", None, "key", sequential_check,
+                                     batch_size=1, max_in_flight=1, api_url=api_url,
+                                     cache_ttl_days=0)
+    baseline = time.perf_counter() - start
+    assert all(v["match"] for v in verdicts)
+    results.append({"in_flight": 1, "seconds": baseline, "speedup": 1.0})
+    print(f"{1:>10} {baseline:>10.2f} {args.leads / baseline:>10.1f} {1.0:>9.1f}x")
+
+    for limit in args.in_flight:
+        start = time.perf_counter()
+        verdicts, stats = classify_leads_icp(leads, _summary, "system", None, "key", sequential_check,
+                                             batch_size=1, max_in_flight=limit, api_url=api_url,
+                                             cache_ttl_days=0)
+        elapsed = time.perf_counter() - start
+        assert [v["reason"] for v in verdicts] == [lead["fullName"] for lead in leads], "order not preserved"
+        assert stats["single"] == 0
+        results.append({"in_flight": limit, "seconds": elapsed, "speedup": baseline / elapsed})
+        print(f"{limit:>10} {elapsed:>10.2f} {args.leads / elapsed:>10.1f} {baseline / elapsed:>9.1f}x")
+
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
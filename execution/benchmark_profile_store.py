@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the keyed profile store at increasing cache sizes.
+
+Fills a scratch store to each size, then times random per-URL lookups and
+inserts. With an indexed store both should stay roughly flat as the cache
+grows; the old profile_cache.json cost grew linearly because every call
+loaded and rewrote the whole file.
+
+Each size is measured twice: unbounded, and with the entry/byte budgets
+get_shared_profile_cache() uses, so the per-put budget check is included.
+Past the entry budget the budgeted store evicts, so each row also reports
+how many profiles it actually held and what fraction of the timed gets hit.
+
+Usage:
+    python execution/benchmark_profile_store.py
+    python execution/benchmark_profile_store.py --sizes 1000 10000 100000 500000 --ops 2000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profile_store import ProfileStore, PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_MAX_BYTES
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 500_000]
+
+# Store configurations: (label, max_entries, max_bytes)
+CONFIGS = [
+    ("unbounded", None, None),
+    ("budgeted", PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_MAX_BYTES),
+]
+
+
+def _fake_profile(i: int) -> dict:
+    """Profile roughly the size of a normalized scraper result."""
+    return {
+        "fullName": f"Person {i}",
+        "firstName": "Person",
+        "lastName": str(i),
+        "headline": "Founder & CEO | Helping B2B companies scale outbound",
+        "linkedinUrl": f"https://www.linkedin.com/in/person-{i}",
+        "addressWithCountry": "Austin, Texas, United States",
+        "companyName": f"Company {i % 5000}",
+        "jobTitle": "CEO",
+        "about": "Building things. " * 20,
+        "experiences": [
+            {"title": "CEO", "companyName": f"Company {i % 5000}", "duration": "3 yrs"},
+            {"title": "VP Sales", "companyName": "Previous Co", "duration": "4 yrs"},
+        ],
+    }
+
+
+def _url(i: int) -> str:
+    return f"https://www.linkedin.com/in/person-{i}"
+
+
+def fill_store(store: ProfileStore, start: int, end: int, batch: int = 5000):
+    """Grow the store from start to end rows in large transactions."""
+    for lo in range(start, end, batch):
+        hi = min(lo + batch, end)
+        store.put_many({_url(i): _fake_profile(i) for i in range(lo, hi)})
+
+
+def time_ops(store: ProfileStore, size: int, ops: int) -> dict:
+    """Time random single-URL gets and single-URL puts against a store of `size` rows."""
+    keys = [_url(random.randrange(size)) for _ in range(ops)]
+
+    held = len(store)
+
+    hits = 0
+    start = time.perf_counter()
+    for key in keys:
+        if store.get(key) is not None:
+            hits += 1
+    get_us = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    for n in range(ops):
+        store.put(_url(size + 10_000_000 + n), _fake_profile(n))
+    put_us = (time.perf_counter() - start) / ops * 1e6
+
+    # Open cost: the old JSON cache paid a full deserialize here
+    start = time.perf_counter()
+    ProfileStore(store.path).close()
+    open_ms = (time.perf_counter() - start) * 1000
+
+    return {"size": size, "held": held, "hit_rate": hits / ops,
+            "get_us": get_us, "put_us": put_us, "open_ms": open_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark profile store lookup/insert cost vs cache size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Cache sizes to test")
+    parser.add_argument("--ops", type=int, default=1000, help="Gets and puts timed per size")
+    parser.add_argument("--output", help="Optional JSON file for results")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'config':>10} {'inserted':>10} {'held':>10} {'hit %':>7} "
+          f"{'get (us)':>10} {'put (us)':>10} {'open (ms)':>10}")
+    for label, max_entries, max_bytes in CONFIGS:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ProfileStore(
+                os.path.join(tmp, "bench.sqlite3"), max_entries=max_entries, max_bytes=max_bytes
+            )
+            filled = 0
+
+            for size in sorted(args.sizes):
+                fill_store(store, filled, size)
+                filled = size
+                row = {"config": label, **time_ops(store, size, args.ops)}
+                results.append(row)
+                print(
+                    f"{label:>10} {size:>10,} {row['held']:>10,} {row['hit_rate'] * 100:>6.1f}% "
+                    f"{row['get_us']:>10.1f} "
+                    f"{row['put_us']:>10.1f} {row['open_ms']:>10.1f}"
+                )
+
+            store.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bloom Filter - Memory-bounded "definitely not seen" pre-check for lead URLs.
+
+A fixed-size bit array sized from (capacity, false-positive rate). Membership
+answers are either "definitely not present" or "possibly present"; callers do
+an exact check only for the latter. Memory stays at roughly
+1.2 bytes per item at a 1% false-positive rate, whatever the URL lengths.
+
+Persisted as a one-line JSON header followed by the raw bit array, so it
+can be reloaded without rehashing the history.
+
+Usage:
+    from bloom_filter import BloomFilter
+    bloom = BloomFilter(capacity=1_000_000, fp_rate=0.01)
+    bloom.add("https://www.linkedin.com/in/janedoe")
+    "https://www.linkedin.com/in/janedoe" in bloom   # True
+    bloom.stats()  # {"memory_bytes": 1198132, "configured_fp_rate": 0.01, ...}
+"""
+
+import os
+import json
+import math
+import hashlib
+import tempfile
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a blake2b digest."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> bool:
+        """
+        Set the item's bits. Returns True if any bit was new.
+
+        Only such inserts are counted, so re-adding an item (e.g. replaying a
+        ledger with superseded lines) doesn't inflate count. An unseen item
+        whose bits were all set already (a false positive) isn't counted either.
+        """
+        new = False
+        for pos in self._positions(item):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def estimated_fp_rate(self) -> float:
+        """False-positive rate expected at the current fill level."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def stats(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "items": self.count,
+            "configured_fp_rate": self.fp_rate,
+            "estimated_fp_rate": round(self.estimated_fp_rate(), 6),
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "memory_bytes": len(self._bits),
+        }
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def save(self, path: str, meta: Optional[Dict] = None):
+        """Write header + bit array atomically. `meta` is stored alongside (e.g. sync offsets)."""
+        header = {
+            "capacity": self.capacity,
+            "fp_rate": self.fp_rate,
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "count": self.count,
+            "meta": meta or {},
+        }
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Unique temp name, so concurrent savers never replace each other's file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                f.write(self._bits)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BloomFilter", Dict]:
+        """Load a filter saved with save(). Returns (filter, meta)."""
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            bits = f.read()
+
+        bloom = cls(header["capacity"], header["fp_rate"])
+        if bloom.num_bits != header["num_bits"] or len(bits) != len(bloom._bits):
+            raise ValueError(f"Bloom filter file {path} does not match its header")
+        bloom.num_hashes = header["num_hashes"]
+        bloom.count = header["count"]
+        bloom._bits = bytearray(bits)
+        return bloom, header.get("meta", {})
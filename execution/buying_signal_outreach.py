@@ -19,7 +19,14 @@ from urllib.parse import unquote
 from dotenv import load_dotenv
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from prompts import get_linkedin_buying_signal_prompt
+from prompts import get_linkedin_buying_signal_prompt_parts, build_cached_messages, BUYING_SIGNAL_DM_SYSTEM_PROMPT
+from profile_store import get_shared_profile_cache, normalize_linkedin_url, PROFILE_CACHE_MAX_AGE_DAYS
+from state_io import write_records, append_records, iter_records
+from file_lock import FileLock
+from apify_runs import wait_for_run
+from apify_governor import ApifyBudgetExceeded, call_actor, get_apify_governor, run_cost_usd
+from llm_client import llm_post
+from llm_json import strip_code_fences
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -32,26 +39,57 @@ HEYREACH_API_KEY = os.getenv("HEYREACH_API_KEY")
 APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
 DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
 HEYREACH_API_BASE = "https://api.heyreach.io/api/public"
-POST_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", ".tmp", "post_cache.json")
-PROFILE_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", ".tmp", "profile_cache.json")
+POST_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", ".tmp", "post_cache.jsonl.gz")
+LEGACY_POST_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", ".tmp", "post_cache.json")
 PROFILE_SCRAPER_ACTOR = "dev_fusion~Linkedin-Profile-Scraper"
 
+# Apify budget estimates (USD per item), reserved with the governor
+POST_SCRAPE_COST_USD = 0.002
+PROFILE_SCRAPE_COST_USD = 0.004
+
 
 # --- Post cache ---
 
-def load_post_cache():
-    """Load cached post data from JSON file."""
-    if os.path.exists(POST_CACHE_PATH):
-        with open(POST_CACHE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+def _post_cache_lock():
+    """Cross-process lock for post cache writes (parallel runs append concurrently)."""
+    return FileLock(f"{POST_CACHE_PATH}.lock", name="post_cache")
+
+
+def _migrate_legacy_post_cache():
+    """One-time conversion of the pretty-printed post_cache.json to gzip JSONL."""
+    if os.path.exists(POST_CACHE_PATH) or not os.path.exists(LEGACY_POST_CACHE_PATH):
+        return
+    with _post_cache_lock():
+        if os.path.exists(POST_CACHE_PATH):
+            return
+        with open(LEGACY_POST_CACHE_PATH, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        write_records(POST_CACHE_PATH, ({"url": url, **post} for url, post in legacy.items()))
+    print(f"  Migrated {len(legacy)} cached posts to {POST_CACHE_PATH}")
+
+
+def load_post_cache(urls=None):
+    """Load cached post data (url -> post), streaming the compressed cache.
+
+    Args:
+        urls: Only keep these normalized URLs (None loads everything)
+    """
+    _migrate_legacy_post_cache()
+    if not os.path.exists(POST_CACHE_PATH):
+        return {}
+    wanted = set(urls) if urls is not None else None
+    cache = {}
+    for record in iter_records(POST_CACHE_PATH):
+        url = record.pop("url", None)
+        if url and (wanted is None or url in wanted):
+            cache[url] = record
+    return cache
 
 
-def save_post_cache(cache):
-    """Save post cache to JSON file."""
-    os.makedirs(os.path.dirname(POST_CACHE_PATH), exist_ok=True)
-    with open(POST_CACHE_PATH, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, indent=2, ensure_ascii=False)
+def save_post_cache(new_posts):
+    """Append newly scraped posts (url -> post) to the compressed cache."""
+    with _post_cache_lock():
+        append_records(POST_CACHE_PATH, ({"url": url, **post} for url, post in new_posts.items()))
 
 
 def normalize_post_url(url):
@@ -81,9 +119,13 @@ def scrape_posts_apify(urls):
 
     print(f"  Scraping {len(urls)} posts via Apify...")
 
-    run = client.actor('supreme_coder/linkedin-post').call(run_input={
-        'urls': urls
-    })
+    try:
+        run = call_actor(client, 'supreme_coder/linkedin-post', {
+            'urls': urls
+        }, estimated_cost_usd=len(urls) * POST_SCRAPE_COST_USD)
+    except (ApifyBudgetExceeded, TimeoutError) as e:
+        print(f"  Warning: {e}")
+        return {}
 
     if run.get('status') != 'SUCCEEDED':
         print(f"  Warning: Apify run status: {run.get('status')}")
@@ -111,7 +153,7 @@ def enrich_leads_with_post_data(leads):
 
     Only scrapes posts not already in cache. Same post shared by multiple leads = one scrape.
     """
-    cache = load_post_cache()
+    cache = load_post_cache(normalize_post_url(lead.get('post_url')) for lead in leads)
 
     # Collect unique post URLs that need scraping
     urls_to_scrape = []
@@ -131,8 +173,8 @@ def enrich_leads_with_post_data(leads):
     if urls_to_scrape:
         new_data = scrape_posts_apify(urls_to_scrape)
         cache.update(new_data)
-        save_post_cache(cache)
-        print(f"  Cache updated: {len(cache)} total posts")
+        save_post_cache(new_data)
+        print(f"  Cache updated: {len(new_data)} posts added")
 
     # Enrich leads
     for lead in leads:
@@ -149,45 +191,22 @@ def enrich_leads_with_post_data(leads):
 # --- Profile cache ---
 
 def load_profile_cache():
-    """Load cached LinkedIn profile data from JSON file."""
-    if os.path.exists(PROFILE_CACHE_PATH):
-        try:
-            with open(PROFILE_CACHE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-
-def save_profile_cache(cache):
-    """Save profile cache to JSON file."""
-    os.makedirs(os.path.dirname(PROFILE_CACHE_PATH), exist_ok=True)
-    with open(PROFILE_CACHE_PATH, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, indent=2, ensure_ascii=False)
-
-
-def normalize_linkedin_url(url):
-    """Normalize LinkedIn URL for cache key (strip query params, trailing slash, lowercase)."""
-    if not url:
-        return ""
-    return url.split("?")[0].rstrip("/").lower()
+    """Open the profile cache shared with the competitor/keyword/gift pipelines."""
+    return get_shared_profile_cache()
 
 
 # --- Profile scraping via Apify ---
 
-def scrape_profiles_apify(profile_urls, wait_seconds=120, poll_interval=30):
+def scrape_profiles_apify(profile_urls, timeout_seconds=None):
     """Scrape LinkedIn profiles via Apify dev_fusion~Linkedin-Profile-Scraper.
 
     Args:
         profile_urls: List of LinkedIn profile URLs
-        wait_seconds: Initial wait before polling
-        poll_interval: Seconds between status polls
+        timeout_seconds: Max wait for the run (default sized to the batch)
 
     Returns:
         List of profile dicts from Apify
     """
-    import time
-
     if not APIFY_API_TOKEN:
         print("  Warning: APIFY_API_TOKEN not set, skipping profile scraping")
         return []
@@ -197,34 +216,35 @@ def scrape_profiles_apify(profile_urls, wait_seconds=120, poll_interval=30):
     start_url = f"https://api.apify.com/v2/acts/{PROFILE_SCRAPER_ACTOR}/runs?token={APIFY_API_TOKEN}"
     payload = {"profileUrls": profile_urls}
 
+    # Hold an account-wide governor slot from start until the run ends
+    governor = get_apify_governor()
     try:
-        response = requests.post(start_url, json=payload)
-        response.raise_for_status()
-        run_data = response.json()["data"]
-        run_id = run_data["id"]
-        dataset_id = run_data["defaultDatasetId"]
-        print(f"  Run started: {run_id}")
-    except Exception as e:
+        lease = governor.acquire(PROFILE_SCRAPER_ACTOR,
+                                 estimated_cost_usd=len(profile_urls) * PROFILE_SCRAPE_COST_USD)
+    except (ApifyBudgetExceeded, TimeoutError) as e:
         print(f"  Error starting profile scraper: {e}")
         return []
 
-    print(f"  Waiting {wait_seconds}s for scraping...")
-    time.sleep(wait_seconds)
-
-    status_url = f"https://api.apify.com/v2/actor-runs/{run_id}?token={APIFY_API_TOKEN}"
-    while True:
+    run = None
+    try:
         try:
-            response = requests.get(status_url)
+            response = requests.post(start_url, json=payload)
             response.raise_for_status()
-            status = response.json()["data"]["status"]
-            if status in ["SUCCEEDED", "ABORTED"]:
-                print(f"  Scraper finished: {status}")
-                break
-            print(f"  Status: {status}, waiting {poll_interval}s...")
-            time.sleep(poll_interval)
+            run_data = response.json()["data"]
+            run_id = run_data["id"]
+            dataset_id = run_data["defaultDatasetId"]
+            print(f"  Run started: {run_id}")
         except Exception as e:
-            print(f"  Error polling status: {e}")
-            break
+            print(f"  Error starting profile scraper: {e}")
+            governor.release(lease, actual_cost_usd=0.0)
+            return []
+
+        run = wait_for_run(run_id, APIFY_API_TOKEN, expected_items=len(profile_urls),
+                           timeout_seconds=timeout_seconds)
+    finally:
+        governor.release(lease, actual_cost_usd=run_cost_usd(run))
+    if run.get("status") != "SUCCEEDED":
+        print(f"  Warning: scraper ended {run.get('status')}, fetching partial results")
 
     data_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={APIFY_API_TOKEN}"
     try:
@@ -241,36 +261,36 @@ def scrape_profiles_apify(profile_urls, wait_seconds=120, poll_interval=30):
 def enrich_leads_with_profile_data(leads):
     """Scrape LinkedIn profiles, cache results, enrich leads with headline/about/company info.
 
-    Only scrapes profiles not already in cache.
+    Only scrapes profiles not already in the shared cache (or stale there).
     """
     cache = load_profile_cache()
+    lead_keys = [normalize_linkedin_url(lead.get("linkedin_url")) for lead in leads if lead.get("linkedin_url")]
+    fresh, stale = cache.lookup(lead_keys, max_age_seconds=PROFILE_CACHE_MAX_AGE_DAYS * 86400)
+    profiles_by_key = {**stale, **fresh}
 
     urls_to_scrape = []
     for lead in leads:
         url = normalize_linkedin_url(lead.get("linkedin_url"))
-        if url and url not in cache:
+        if url and url not in fresh:
             urls_to_scrape.append(lead.get("linkedin_url"))
 
     urls_to_scrape = list(set(urls_to_scrape))
-    cached_count = sum(1 for l in leads if normalize_linkedin_url(l.get("linkedin_url")) in cache)
-    print(f"  Profiles in cache: {cached_count}")
+    print(f"  Profiles in cache: {len(fresh)} ({len(stale)} stale)")
     print(f"  Profiles to scrape: {len(urls_to_scrape)}")
 
     if urls_to_scrape:
-        new_profiles = scrape_profiles_apify(urls_to_scrape)
+        new_profiles = cache.put_scraped(scrape_profiles_apify(urls_to_scrape))
         for profile in new_profiles:
-            profile_url = profile.get("linkedinUrl") or profile.get("profileUrl") or ""
+            profile_url = profile.get("linkedinUrl") or ""
             if profile_url:
-                cache_key = normalize_linkedin_url(profile_url)
-                cache[cache_key] = profile
-        save_profile_cache(cache)
-        print(f"  Profile cache updated: {len(cache)} total")
+                profiles_by_key[normalize_linkedin_url(profile_url)] = profile
+        print(f"  Profile cache updated: {len(new_profiles)} profiles added")
 
     # Enrich leads with profile data
     for lead in leads:
         cache_key = normalize_linkedin_url(lead.get("linkedin_url"))
-        if cache_key and cache_key in cache:
-            profile = cache[cache_key]
+        if cache_key and cache_key in profiles_by_key:
+            profile = profiles_by_key[cache_key]
             lead["profile_headline"] = profile.get("headline", "")
             lead["profile_about"] = profile.get("about", "")
             lead["profile_company_name"] = profile.get("companyName", "")
@@ -420,7 +440,7 @@ def generate_buying_signal_message(lead):
     else:
         topic_for_prompt = "LinkedIn outreach and growth"
 
-    prompt = get_linkedin_buying_signal_prompt(
+    prompt_parts = get_linkedin_buying_signal_prompt_parts(
         first_name=lead.get("first_name", ""),
         company_name=lead.get("company", ""),
         title=lead.get("job_title", ""),
@@ -443,15 +463,12 @@ def generate_buying_signal_message(lead):
 
         payload = {
             "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are an expert at creating personalized LinkedIn DMs following strict template rules. You write as a founder, not a salesperson."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": build_cached_messages(BUYING_SIGNAL_DM_SYSTEM_PROMPT, prompt_parts),
             "max_tokens": 400,
             "temperature": 0.7
         }
 
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
 
         data = response.json()
@@ -460,7 +477,7 @@ def generate_buying_signal_message(lead):
         # Clean up
         if message.startswith('"') and message.endswith('"'):
             message = message[1:-1]
-        message = message.replace("```", "").strip()
+        message = strip_code_fences(message)
 
         return message
 
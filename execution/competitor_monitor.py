@@ -62,6 +62,8 @@ from competitor_post_pipeline import (
     filter_unprocessed_urls,
     add_to_processed_leads
 )
+from apify_governor import call_actor
+from engager_cache import REACTIONS_RUN_COST_USD
 
 
 # =============================================================================
@@ -127,7 +129,7 @@ def scrape_post_engagers(post_urls: List[str], page_number: int = 1, limit: int
         }
 
         try:
-            run = client.actor(POST_REACTIONS_ACTOR).call(run_input=run_input)
+            run = call_actor(client, POST_REACTIONS_ACTOR, run_input, estimated_cost_usd=REACTIONS_RUN_COST_USD)
 
             for item in client.dataset(run["defaultDatasetId"]).iterate_items():
                 all_engagers.append(item)
@@ -237,7 +239,7 @@ def run_competitor_monitor(
 
     # Step 5: Scrape LinkedIn profiles
     print("\n[5/8] Scraping LinkedIn profiles...")
-    profiles = scrape_linkedin_profiles(profile_urls, wait_seconds=120, poll_interval=30)
+    profiles = scrape_linkedin_profiles(profile_urls)
     results["profiles_scraped"] = len(profiles)
 
     if not profiles:
@@ -24,15 +24,45 @@ import os
 import sys
 import json
 import re
-import argparse
 import time
+import argparse
+import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Optional, Any
 from dotenv import load_dotenv
-from prompts import get_linkedin_5_line_prompt
-from personalize_and_upload import validate_and_fix_batch
+from prompts import get_linkedin_5_line_prompt_parts, build_cached_messages, LINKEDIN_DM_SYSTEM_PROMPT
+from personalize_and_upload import run_message_pipeline, print_validation_summary, print_sampling_report
+from validation_sampling import SequentialSampler
 from report_activity import report_from_pipeline_results
 from sync_prospects_to_db import sync_prospects
+from state_io import write_records, STATE_SUFFIX
+from profile_store import (
+    ProfileStore,
+    get_shared_profile_cache,
+    normalize_linkedin_url,
+    normalize_supreme_coder_profile,
+    SHARED_PROFILE_STORE_FILE,
+    LEGACY_PROFILE_CACHE_FILE,
+    PROFILE_CACHE_MAX_AGE_DAYS,
+)
+from lead_ledger import (
+    ProcessedLeadLedger,
+    get_shared_processed_ledger,
+    SHARED_PROCESSED_LEADS_FILE,
+    LEGACY_PROCESSED_LEADS_FILE,
+    SHARED_PROCESSED_LEADS_BLOOM_FILE,
+)
+from apify_runs import DatasetStream, merge_streams, plan_shards
+from search_cache import get_cached_search, cache_search_results, SEARCH_CACHE_TTL_HOURS
+from engager_cache import fetch_post_engagers, ENGAGER_CACHE_FRESH_HOURS
+from apify_governor import ApifyBudgetExceeded, call_actor, get_apify_governor, run_cost_usd
+from icp_batch import classify_leads_icp, ICP_BATCH_SIZE, ICP_MAX_IN_FLIGHT
+from run_metrics import (
+    activate_tracker, use_stage, get_active_tracker, submit_in_context, record_actor_run, DEFAULT_STAGE,
+)
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -51,6 +81,15 @@ GOOGLE_SEARCH_ACTOR = "nFJndFXA5zjCTuudP"  # apify/google-search-scraper
 POST_REACTIONS_ACTOR = "J9UfswnR3Kae4O6vm"  # apimaestro/linkedin-post-reactions
 PROFILE_SCRAPER_ACTOR = "supreme_coder~linkedin-profile-scraper"
 
+# Reactions actor runs in flight at once (Apify plans cap concurrent runs)
+ENGAGER_SCRAPE_CONCURRENCY = 5
+
+# Profile scrape sharding: split uncached URLs across concurrent runs so each
+# finishes in about PROFILE_SHARD_TARGET_SECONDS (one run averages ~1.5s/profile)
+PROFILE_SCRAPE_SECONDS_PER_PROFILE = 1.5
+PROFILE_SHARD_TARGET_SECONDS = 180
+PROFILE_SCRAPE_MAX_SHARDS = 4
+
 
 # =============================================================================
 # CONFIGURATION
@@ -66,8 +105,13 @@ def get_default_config() -> Dict[str, Any]:
         "results_per_page": 10,
         "allowed_countries": ["United States", "Canada", "USA", "America"],
         "heyreach_list_id": 480247,
-        "scrape_wait_seconds": 120,
-        "poll_interval_seconds": 30,
+        "profile_scrape_timeout_seconds": None,  # None = sized to the batch
+        "profile_cache_max_age_days": PROFILE_CACHE_MAX_AGE_DAYS,
+        "engager_concurrency": ENGAGER_SCRAPE_CONCURRENCY,
+        "profile_scrape_max_shards": PROFILE_SCRAPE_MAX_SHARDS,
+        "profile_shard_target_seconds": PROFILE_SHARD_TARGET_SECONDS,
+        "search_cache_ttl_hours": SEARCH_CACHE_TTL_HOURS,
+        "engager_cache_fresh_hours": ENGAGER_CACHE_FRESH_HOURS,
     }
 
 
@@ -85,16 +129,36 @@ APIFY_COSTS = {
 # DeepSeek pricing (USD per 1M tokens) - very cheap
 DEEPSEEK_COSTS = {
     "input_per_1m": 0.14,        # $0.14 per 1M input tokens
+    "cached_input_per_1m": 0.014,  # $0.014 per 1M input tokens served from the context cache
     "output_per_1m": 0.28,       # $0.28 per 1M output tokens
     "avg_icp_tokens": 400,       # ~400 tokens per ICP check (input+output)
     "avg_personalization_tokens": 800,  # ~800 tokens per personalization
 }
 
+_LLM_USAGE_KEYS = ("calls", "prompt_tokens", "cached_prompt_tokens", "uncached_prompt_tokens",
+                   "completion_tokens", "latency_seconds", "cost_usd")
+_ACTOR_USAGE_KEYS = ("runs", "compute_units", "cost_usd", "run_seconds", "latency_seconds")
+
 
 class CostTracker:
-    """Track costs across pipeline operations."""
+    """
+    Track costs across pipeline operations.
+
+    costs/counts hold the per-call estimates (APIFY_COSTS, DEEPSEEK_COSTS)
+    reported to speed_to_lead as before. Alongside them the tracker records
+    what was actually used, per stage:
+    - llm_usage: calls, prompt tokens (cached/uncached), completion tokens,
+      wall-clock latency and the cost those tokens come to
+    - actor_runs: runs, compute units, USD and run time from Apify's run objects
+    - stage_seconds: wall-clock time of each stage()
+
+    Measured usage arrives through run_metrics while the tracker is active
+    (with tracker.activate()), so each run gets its own tracker and
+    concurrent runs don't mix. All methods are thread-safe.
+    """
 
     def __init__(self):
+        self._lock = threading.Lock()
         self.costs = {
             "apify_google_search": 0.0,
             "apify_post_reactions": 0.0,
@@ -109,34 +173,128 @@ class CostTracker:
             "icp_checks": 0,
             "personalizations": 0,
         }
+        self.llm_usage: Dict[str, Dict[str, float]] = {}
+        self.actor_runs: Dict[str, Dict[str, float]] = {}
+        self.stage_seconds: Dict[str, float] = {}
+
+    # --- Estimates ---
 
     def add_google_search(self, num_results: int):
-        self.counts["google_results"] += num_results
-        self.costs["apify_google_search"] += num_results * APIFY_COSTS["google_search"]
+        with self._lock:
+            self.counts["google_results"] += num_results
+            self.costs["apify_google_search"] += num_results * APIFY_COSTS["google_search"]
 
     def add_post_reactions(self, num_posts: int):
-        self.counts["posts_scraped"] += num_posts
-        self.costs["apify_post_reactions"] += num_posts * APIFY_COSTS["post_reactions"]
+        with self._lock:
+            self.counts["posts_scraped"] += num_posts
+            self.costs["apify_post_reactions"] += num_posts * APIFY_COSTS["post_reactions"]
 
     def add_profile_scrape(self, num_profiles: int):
-        self.counts["profiles_scraped"] += num_profiles
-        self.costs["apify_profile_scraper"] += num_profiles * APIFY_COSTS["profile_scraper"]
+        with self._lock:
+            self.counts["profiles_scraped"] += num_profiles
+            self.costs["apify_profile_scraper"] += num_profiles * APIFY_COSTS["profile_scraper"]
 
     def add_icp_check(self, num_checks: int = 1):
-        self.counts["icp_checks"] += num_checks
         tokens = num_checks * DEEPSEEK_COSTS["avg_icp_tokens"]
         cost = (tokens / 1_000_000) * (DEEPSEEK_COSTS["input_per_1m"] + DEEPSEEK_COSTS["output_per_1m"]) / 2
-        self.costs["deepseek_icp"] += cost
+        with self._lock:
+            self.counts["icp_checks"] += num_checks
+            self.costs["deepseek_icp"] += cost
 
     def add_personalization(self, num_msgs: int = 1):
-        self.counts["personalizations"] += num_msgs
         tokens = num_msgs * DEEPSEEK_COSTS["avg_personalization_tokens"]
         cost = (tokens / 1_000_000) * (DEEPSEEK_COSTS["input_per_1m"] + DEEPSEEK_COSTS["output_per_1m"]) / 2
-        self.costs["deepseek_personalization"] += cost
+        with self._lock:
+            self.counts["personalizations"] += num_msgs
+            self.costs["deepseek_personalization"] += cost
 
     def get_total(self) -> float:
         return sum(self.costs.values())
 
+    # --- Measured usage ---
+
+    @contextmanager
+    def activate(self):
+        """Make this the tracker for LLM calls and actor runs made within the block."""
+        with activate_tracker(self):
+            yield self
+
+    @contextmanager
+    def stage(self, name: str):
+        """Attribute usage within the block to stage name and time it."""
+        started = time.perf_counter()
+        try:
+            with use_stage(name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + elapsed
+
+    def record_llm_call(self, usage: Dict[str, int], latency_seconds: float,
+                        stage: str = DEFAULT_STAGE, host: Optional[str] = None):
+        """Record one LLM call's token usage (llm_client.parse_usage format) and latency."""
+        cost = (
+            usage.get("uncached_prompt_tokens", 0) * DEEPSEEK_COSTS["input_per_1m"]
+            + usage.get("cached_prompt_tokens", 0) * DEEPSEEK_COSTS["cached_input_per_1m"]
+            + usage.get("completion_tokens", 0) * DEEPSEEK_COSTS["output_per_1m"]
+        ) / 1_000_000
+        with self._lock:
+            entry = self.llm_usage.setdefault(stage, dict.fromkeys(_LLM_USAGE_KEYS, 0))
+            entry["calls"] += 1
+            for key in ("prompt_tokens", "cached_prompt_tokens", "uncached_prompt_tokens", "completion_tokens"):
+                entry[key] += usage.get(key, 0)
+            entry["latency_seconds"] += latency_seconds
+            entry["cost_usd"] += cost
+
+    def record_actor_run(self, run: Dict, latency_seconds: Optional[float] = None,
+                         stage: str = DEFAULT_STAGE, actor_id: Optional[str] = None):
+        """Record one finished Apify run from its run object (usageTotalUsd, stats)."""
+        stats = run.get("stats") or {}
+        run_seconds = float(stats.get("runTimeSecs") or 0)
+        with self._lock:
+            entry = self.actor_runs.setdefault(stage, dict.fromkeys(_ACTOR_USAGE_KEYS, 0))
+            entry["runs"] += 1
+            entry["compute_units"] += float(stats.get("computeUnits") or 0)
+            entry["cost_usd"] += float(run.get("usageTotalUsd") or 0)
+            entry["run_seconds"] += run_seconds
+            entry["latency_seconds"] += latency_seconds if latency_seconds is not None else run_seconds
+
+    def get_measured_total(self) -> float:
+        """USD from recorded token usage and Apify run usage."""
+        with self._lock:
+            return (sum(e["cost_usd"] for e in self.llm_usage.values())
+                    + sum(e["cost_usd"] for e in self.actor_runs.values()))
+
+    def cost_per_lead(self, num_leads: int) -> Optional[float]:
+        """Measured cost (estimated if nothing was measured) per lead."""
+        if not num_leads:
+            return None
+        total = self.get_measured_total() or self.get_total()
+        return total / num_leads
+
+    def get_stage_report(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage wall-clock time, LLM usage and Apify usage."""
+        with self._lock:
+            stages = set(self.stage_seconds) | set(self.llm_usage) | set(self.actor_runs)
+            report = {}
+            for name in sorted(stages):
+                llm = self.llm_usage.get(name, dict.fromkeys(_LLM_USAGE_KEYS, 0))
+                actor = self.actor_runs.get(name, dict.fromkeys(_ACTOR_USAGE_KEYS, 0))
+                report[name] = {
+                    "wall_seconds": round(self.stage_seconds.get(name, 0.0), 2),
+                    "llm_calls": llm["calls"],
+                    "prompt_tokens": llm["prompt_tokens"],
+                    "cached_prompt_tokens": llm["cached_prompt_tokens"],
+                    "completion_tokens": llm["completion_tokens"],
+                    "llm_avg_latency_seconds": round(llm["latency_seconds"] / llm["calls"], 3) if llm["calls"] else None,
+                    "llm_cost_usd": round(llm["cost_usd"], 6),
+                    "actor_runs": actor["runs"],
+                    "compute_units": round(actor["compute_units"], 4),
+                    "apify_cost_usd": round(actor["cost_usd"], 6),
+                }
+            return report
+
     def get_summary(self) -> str:
         lines = [
             "COST BREAKDOWN",
@@ -150,13 +308,43 @@ class CostTracker:
             f"TOTAL:                  ${self.get_total():.4f}",
             "=" * 40,
         ]
+        report = self.get_stage_report()
+        if report:
+            lines += ["", "MEASURED USAGE BY STAGE", "=" * 40]
+            for name, stage in report.items():
+                cached = (f", {stage['cached_prompt_tokens'] / stage['prompt_tokens']:.0%} cached"
+                          if stage["prompt_tokens"] else "")
+                lines.append(f"{name}: {stage['wall_seconds']:.1f}s")
+                if stage["llm_calls"]:
+                    lines.append(f"  LLM:   {stage['llm_calls']} calls, {stage['prompt_tokens']:,} prompt tokens{cached}, "
+                                 f"{stage['completion_tokens']:,} completion, "
+                                 f"avg {stage['llm_avg_latency_seconds']:.2f}s, ${stage['llm_cost_usd']:.4f}")
+                if stage["actor_runs"]:
+                    lines.append(f"  Apify: {stage['actor_runs']} runs, {stage['compute_units']:.3f} CU, "
+                                 f"${stage['apify_cost_usd']:.4f}")
+            lines += ["-" * 40, f"MEASURED TOTAL:         ${self.get_measured_total():.4f}", "=" * 40]
         return "\n".join(lines)
 
 
-# Global cost tracker instance
+# Default tracker, used when no run has activated its own
 cost_tracker = CostTracker()
 
 
+def get_cost_tracker() -> CostTracker:
+    """The CostTracker of the run executing in this context (the default one otherwise)."""
+    tracker = get_active_tracker()
+    return tracker if isinstance(tracker, CostTracker) else cost_tracker
+
+
+def with_cost_tracker(func):
+    """Run each call of a pipeline entry point with its own active CostTracker."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with CostTracker().activate():
+            return func(*args, **kwargs)
+    return wrapper
+
+
 # =============================================================================
 # MODULE 1: GOOGLE SEARCH FOR LINKEDIN POSTS
 # =============================================================================
@@ -245,20 +433,31 @@ def search_google_linkedin_posts(
     keywords: str,
     days_back: int = 7,
     max_pages: int = 1,
-    results_per_page: int = 10
+    results_per_page: int = 10,
+    cache_ttl_hours: Optional[float] = SEARCH_CACHE_TTL_HOURS
 ) -> List[Dict]:
     """
     Search Google for LinkedIn posts using Apify.
 
+    The same query, date window and paging searched within cache_ttl_hours
+    (by any pipeline) is served from the local search cache.
+
     Args:
         keywords: Search keywords
         days_back: Days to look back
         max_pages: Maximum pages per query
         results_per_page: Results per page
+        cache_ttl_hours: Search cache TTL (0 or None to always search)
 
     Returns:
         List of search results
     """
+    query = build_google_search_query(keywords, days_back)
+    cached = get_cached_search(query, max_pages, results_per_page, cache_ttl_hours)
+    if cached is not None:
+        print(f"Search cache hit: {query} ({len(cached)} results)")
+        return cached
+
     if not APIFY_API_TOKEN:
         print("Error: APIFY_API_TOKEN not found in .env")
         return []
@@ -270,8 +469,6 @@ def search_google_linkedin_posts(
         print("Error: apify-client not installed. Run: pip install apify-client")
         return []
 
-    query = build_google_search_query(keywords, days_back)
-
     print(f"Searching Google for LinkedIn posts: {query}")
 
     run_input = {
@@ -282,14 +479,16 @@ def search_google_linkedin_posts(
     }
 
     try:
-        run = client.actor(GOOGLE_SEARCH_ACTOR).call(run_input=run_input)
+        run = call_actor(client, GOOGLE_SEARCH_ACTOR, run_input,
+                         estimated_cost_usd=max_pages * results_per_page * APIFY_COSTS["google_search"])
 
         results = []
         for item in client.dataset(run["defaultDatasetId"]).iterate_items():
             results.append(item)
 
         print(f"Found {len(results)} search results")
-        cost_tracker.add_google_search(len(results))
+        get_cost_tracker().add_google_search(len(results))
+        cache_search_results(query, max_pages, results_per_page, results, cache_ttl_hours)
         return results
 
     except Exception as e:
@@ -577,15 +776,28 @@ def prefilter_engagers_by_headline(engagers: List[Dict]) -> tuple[List[Dict], in
     return filtered, kept_count, rejected_count, non_english_count
 
 
-def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
+def scrape_post_engagers(
+    post_urls: List[str],
+    concurrency: int = ENGAGER_SCRAPE_CONCURRENCY,
+    cache_fresh_hours: Optional[float] = ENGAGER_CACHE_FRESH_HOURS,
+) -> List[Dict]:
     """
     Scrape engagers (reactions) from LinkedIn posts using Apify.
 
+    Posts go through the per-post engager cache (engager_cache.py): a post
+    scraped within cache_fresh_hours costs no run, and an older one only
+    pages through reactions added since its last scrape. Up to `concurrency`
+    posts are scraped at once. A failed post is logged and skipped without
+    affecting the others.
+
     Args:
         post_urls: List of LinkedIn post URLs
+        concurrency: Maximum number of actor runs in flight (1 = sequential)
+        cache_fresh_hours: Reuse a post's cached engagers without a run
+            for this long (0 = always check for new reactions)
 
     Returns:
-        List of engager dictionaries
+        List of engager dictionaries, grouped in the order of post_urls
     """
     if not APIFY_API_TOKEN:
         print("Error: APIFY_API_TOKEN not found in .env")
@@ -598,26 +810,46 @@ def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
         print("Error: apify-client not installed")
         return []
 
-    all_engagers = []
-
-    for url in post_urls:
-        print(f"Scraping engagers from: {url}")
-
-        run_input = {
-            "post_urls": [url]
-        }
+    if not post_urls:
+        return []
 
-        try:
-            run = client.actor(POST_REACTIONS_ACTOR).call(run_input=run_input)
+    workers = max(1, min(concurrency, len(post_urls)))
+    print(f"Scraping engagers from {len(post_urls)} posts ({workers} concurrent runs)")
 
-            for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-                all_engagers.append(item)
+    engagers_by_post: Dict[int, List[Dict]] = {}
+    failed = 0
+    cached = 0
 
-            cost_tracker.add_post_reactions(1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            # Runs are recorded on this pipeline run's tracker
+            submit_in_context(executor, fetch_post_engagers, client, POST_REACTIONS_ACTOR, url, cache_fresh_hours): i
+            for i, url in enumerate(post_urls)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            url = post_urls[i]
+            try:
+                engagers_by_post[i], runs = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error scraping post engagers for {url}: {e}")
+                continue
+            # Cost tracking stays on this thread
+            if runs:
+                get_cost_tracker().add_post_reactions(runs)
+            else:
+                cached += 1
+            print(f"  {url}: {len(engagers_by_post[i])} engagers ({runs} runs)")
 
-        except Exception as e:
-            print(f"Error scraping post engagers: {e}")
+    all_engagers = []
+    for i in sorted(engagers_by_post):
+        all_engagers.extend(engagers_by_post[i])
 
+    if cached:
+        print(f"Served {cached}/{len(post_urls)} posts from the engager cache")
+    if failed:
+        print(f"Failed to scrape {failed}/{len(post_urls)} posts")
     print(f"Found {len(all_engagers)} total engagers")
     return all_engagers
 
@@ -626,172 +858,81 @@ def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
 # MODULE 3: LINKEDIN PROFILE SCRAPER (with caching)
 # =============================================================================
 
-PROFILE_CACHE_FILE = ".tmp/profile_cache.json"
-
-
-def load_profile_cache() -> Dict[str, Dict]:
-    """Load cached profiles from disk."""
-    if os.path.exists(PROFILE_CACHE_FILE):
-        try:
-            with open(PROFILE_CACHE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+# One keyed SQLite store shared by every pipeline (competitor, keyword,
+# buying-signal, gift leads). The legacy JSON cache is imported into it
+# automatically the first time the store is opened.
+PROFILE_STORE_FILE = SHARED_PROFILE_STORE_FILE
+PROFILE_CACHE_FILE = LEGACY_PROFILE_CACHE_FILE
 
 
-def save_profile_cache(cache: Dict[str, Dict]):
-    """Save profile cache to disk."""
-    os.makedirs(".tmp", exist_ok=True)
-    with open(PROFILE_CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, indent=2, ensure_ascii=False)
-
-
-def normalize_linkedin_url(url: str) -> str:
-    """Normalize LinkedIn URL for cache key (strip trailing slash, query params)."""
-    url = url.split("?")[0].rstrip("/")
-    return url.lower()
-
-
-def _flatten_positions(positions: list) -> list:
-    """Flatten supreme_coder positions which may have nested position groups."""
-    flat = []
-    for pos in positions:
-        # Grouped format: {company: {...}, positions: [{title, ...}, ...]}
-        if "positions" in pos and isinstance(pos["positions"], list):
-            company = pos.get("company", {})
-            for sub in pos["positions"]:
-                merged = {**sub, "company": company}
-                flat.append(merged)
-        else:
-            flat.append(pos)
-    return flat
+def load_profile_cache() -> ProfileStore:
+    """
+    Open the profile cache.
 
+    Returns a dict-like ProfileStore: rows are read on demand, so opening a
+    large cache does not deserialize it.
+    """
+    return get_shared_profile_cache()
 
-def normalize_supreme_coder_profile(raw: dict) -> dict:
-    """Convert supreme_coder actor output to dev_fusion field format.
 
-    This normalization layer means all downstream consumers (ICP filter,
-    personalization, HeyReach upload, etc.) continue working unchanged.
+def save_profile_cache(cache: Dict[str, Dict]):
     """
-    # Flatten positions (handles both flat and grouped formats)
-    positions = _flatten_positions(raw.get("positions", []))
-
-    # Build experiences list
-    experiences = []
-    for pos in positions:
-        company_obj = pos.get("company") or {}
-        exp = {
-            "companyName": company_obj.get("name", ""),
-            "title": pos.get("title", ""),
-            "jobDescription": pos.get("description", ""),
-            "location": pos.get("locationName", ""),
-            "totalDuration": pos.get("totalDuration", ""),
-        }
-        tp = pos.get("timePeriod") or {}
-        if tp:
-            start = tp.get("startDate") or {}
-            month = start.get("month", "")
-            year = start.get("year", "")
-            exp["startedOn"] = f"{month}-{year}" if month and year else str(year)
-            exp["stillWorking"] = tp.get("endDate") is None
-        experiences.append(exp)
-
-    # Current position (first in flattened list)
-    current = positions[0] if positions else {}
-    current_company = (current.get("company") or {})
-
-    # Use top-level jobTitle if available, else derive from first position
-    job_title = raw.get("jobTitle") or current.get("title", "")
-
-    # Use top-level companyName if available, else derive from first position
-    company_name = raw.get("companyName") or current_company.get("name", "")
-
-    geo_location = raw.get("geoLocationName", "")
-    # addressWithoutCountry: strip last comma-separated segment (country)
-    if geo_location and "," in geo_location:
-        addr_without_country = geo_location.rsplit(",", 1)[0].strip()
-    else:
-        addr_without_country = geo_location
+    Save profiles to the cache.
 
-    return {
-        "linkedinUrl": raw.get("inputUrl", ""),
-        "firstName": raw.get("firstName", ""),
-        "lastName": raw.get("lastName", ""),
-        "fullName": f"{raw.get('firstName', '')} {raw.get('lastName', '')}".strip(),
-        "headline": raw.get("headline", ""),
-        "about": raw.get("summary", ""),
-        "jobTitle": job_title,
-        "companyName": company_name,
-        "companyIndustry": None,
-        "companySize": None,
-        "companyWebsite": None,
-        "companyLinkedin": raw.get("companyLinkedinUrl") or current_company.get("url", ""),
-        "addressCountryOnly": raw.get("geoCountryName", ""),
-        "addressWithCountry": geo_location,
-        "addressWithoutCountry": addr_without_country,
-        "connections": raw.get("connectionsCount", 0),
-        "followers": raw.get("followerCount", 0),
-        "experiences": experiences,
-        "experiencesCount": len(experiences),
-        "profilePic": raw.get("pictureUrl"),
-        "profilePicHighQuality": raw.get("pictureUrl"),
-        "linkedinId": raw.get("id", ""),
-        "publicIdentifier": raw.get("publicIdentifier", ""),
-        "isPremium": raw.get("premium", False),
-        "isVerified": raw.get("isVerified", False),
-        "isInfluencer": raw.get("influencer", False),
-        "isCreator": raw.get("creator", False),
-        "email": None,
-        "mobileNumber": None,
-        "educations": raw.get("educations", []),
-        "skills": raw.get("skills", []),
-        "languages": raw.get("languages", []),
-        "certifications": raw.get("certifications", []),
-    }
+    Writes to a ProfileStore are already persisted, so passing the store
+    itself is a no-op. A plain dict is upserted key by key.
+    """
+    store = load_profile_cache()
+    if cache is store:
+        return
+    store.put_many(cache)
 
 
 # =============================================================================
 # MODULE 3B: PROCESSED LEADS TRACKING (Duplicate Prevention)
 # =============================================================================
 
-PROCESSED_LEADS_FILE = ".tmp/processed_leads.json"
+# Append-only JSONL ledger in the repo-level .tmp, shared by every pipeline.
+# The legacy JSON tracking file is imported into it automatically the first
+# time the ledger is opened.
+PROCESSED_LEADS_FILE = SHARED_PROCESSED_LEADS_FILE
+PROCESSED_LEADS_LEGACY_FILE = LEGACY_PROCESSED_LEADS_FILE
+# Persisted Bloom filter: rejects never-seen URLs without loading the ledger
+PROCESSED_LEADS_BLOOM_FILE = SHARED_PROCESSED_LEADS_BLOOM_FILE
+
+
+def get_processed_ledger() -> ProcessedLeadLedger:
+    """Return the shared processed-leads ledger (indexed in memory on first use)."""
+    return get_shared_processed_ledger()
 
 
 def load_processed_leads() -> Dict[str, Dict]:
     """
-    Load processed leads tracking file.
+    Load processed leads tracking data.
 
     Returns:
         Dict mapping normalized LinkedIn URLs to tracking metadata.
     """
-    if os.path.exists(PROCESSED_LEADS_FILE):
-        try:
-            with open(PROCESSED_LEADS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+    return get_processed_ledger().as_dict()
 
 
 def save_processed_leads(tracked: Dict[str, Dict]):
-    """Save processed leads tracking file."""
-    os.makedirs(".tmp", exist_ok=True)
-    with open(PROCESSED_LEADS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tracked, f, indent=2, ensure_ascii=False)
+    """Record tracking entries (appended to the ledger, existing URLs superseded)."""
+    get_processed_ledger().add_many(tracked)
 
 
 def add_to_processed_leads(leads: List[Dict], source: str = "competitor_post", list_id: int = None):
     """
-    Add leads to the processed tracking file after successful upload.
+    Add leads to the processed tracking ledger after successful upload.
 
     Args:
         leads: List of lead dictionaries that were uploaded
         source: Source of leads (e.g., "competitor_post", "vayne")
         list_id: HeyReach list ID they were uploaded to
     """
-    tracked = load_processed_leads()
+    ledger = get_processed_ledger()
     timestamp = datetime.now().isoformat()
+    entries = {}
 
     for lead in leads:
         url = lead.get("linkedinUrl") or lead.get("linkedin_url") or lead.get("profileUrl") or ""
@@ -801,15 +942,15 @@ def add_to_processed_leads(leads: List[Dict], source: str = "competitor_post", l
         normalized = normalize_linkedin_url(url)
         name = lead.get("fullName") or lead.get("full_name") or ""
 
-        tracked[normalized] = {
+        entries[normalized] = {
             "name": name,
             "added": timestamp,
             "source": source,
             "list_id": list_id,
         }
 
-    save_processed_leads(tracked)
-    print(f"Updated tracking file: {len(tracked)} total processed leads")
+    ledger.add_many(entries)
+    print(f"Updated tracking file: {len(entries)} leads recorded")
 
 
 def filter_unprocessed_urls(urls: List[str]) -> tuple[List[str], int]:
@@ -822,17 +963,28 @@ def filter_unprocessed_urls(urls: List[str]) -> tuple[List[str], int]:
     Returns:
         Tuple of (unprocessed_urls, duplicate_count)
     """
-    tracked = load_processed_leads()
+    ledger = get_processed_ledger()
     unprocessed = []
     duplicates = []
 
+    normalized = {url: normalize_linkedin_url(url) for url in urls}
+    # Bloom says "definitely new" for most URLs; only maybe-hits are looked up in the ledger
+    maybe_seen = ledger.might_contain_many(normalized.values())
+    entries = ledger.get_many(maybe_seen) if maybe_seen else {}
+
     for url in urls:
-        normalized = normalize_linkedin_url(url)
-        if normalized in tracked:
-            duplicates.append((url, tracked[normalized].get("name", "Unknown")))
+        entry = entries.get(normalized[url])
+        if entry is not None:
+            duplicates.append((url, entry.get("name", "Unknown")))
         else:
             unprocessed.append(url)
 
+    bloom = ledger.bloom_stats()
+    if bloom:
+        print(f"Bloom pre-check: {bloom['items']} URLs tracked, "
+              f"{bloom['memory_bytes'] / 1024 / 1024:.1f} MB, "
+              f"FP rate {bloom['configured_fp_rate']:.2%} configured / {bloom['estimated_fp_rate']:.4%} current")
+
     if duplicates:
         print(f"\nDuplicate check: {len(urls)} -> {len(unprocessed)} URLs")
         print(f"  Removed {len(duplicates)} already-processed leads:")
@@ -848,124 +1000,178 @@ def filter_unprocessed_urls(urls: List[str]) -> tuple[List[str], int]:
     return unprocessed, len(duplicates)
 
 
-def scrape_linkedin_profiles(
+def _start_profile_scraper_run(urls: List[str]) -> Optional[Dict]:
+    """Start one profile scraper run. Returns the run object, or None if it failed to start."""
+    import requests
+
+    start_url = f"https://api.apify.com/v2/acts/{PROFILE_SCRAPER_ACTOR}/runs?token={APIFY_API_TOKEN}"
+    payload = {
+        "urls": [{"url": u} for u in urls]
+    }
+
+    try:
+        response = requests.post(start_url, json=payload)
+        response.raise_for_status()
+        run_data = response.json()["data"]
+        print(f"Run started: {run_data['id']} ({len(urls)} profiles)")
+        return run_data
+    except Exception as e:
+        print(f"Error starting profile scraper: {e}")
+        return None
+
+
+def iter_linkedin_profiles(
     profile_urls: List[str],
-    wait_seconds: int = 120,
-    poll_interval: int = 30
-) -> List[Dict]:
+    max_age_days: Optional[float] = None,
+    timeout_seconds: Optional[float] = None,
+    max_shards: int = PROFILE_SCRAPE_MAX_SHARDS,
+    shard_target_seconds: float = PROFILE_SHARD_TARGET_SECONDS,
+) -> Iterator[List[Dict]]:
     """
-    Scrape LinkedIn profiles using Apify (with caching to avoid re-scraping).
+    Scrape LinkedIn profiles using Apify, yielding them in batches as they arrive.
+
+    Fresh cached profiles come first, in one batch. New profiles are read from
+    the run's dataset while the actor is still running, normalized, cached and
+    yielded page by page, so callers can filter and qualify them while the
+    rest of the batch is scraped. Cached profiles older than max_age_days are
+    re-scraped; stale copies the refresh did not return come last.
+
+    Large batches are split across up to max_shards concurrent runs, each
+    sized to finish in about shard_target_seconds. A shard that fails to
+    start only loses its own profiles.
 
     Args:
         profile_urls: List of profile URLs to scrape
-        wait_seconds: Initial wait time for scraper
-        poll_interval: Polling interval to check completion
+        max_age_days: Cache max-age (default PROFILE_CACHE_MAX_AGE_DAYS)
+        timeout_seconds: Max wait per Apify run (default sized to the shard)
+        max_shards: Maximum concurrent actor runs (1 = a single run)
+        shard_target_seconds: Desired wall-clock time per run
 
-    Returns:
-        List of profile dictionaries
+    Yields:
+        Lists of profile dictionaries
     """
     if not APIFY_API_TOKEN:
         print("Error: APIFY_API_TOKEN not found in .env")
-        return []
+        return
 
-    import requests
+    if max_age_days is None:
+        max_age_days = PROFILE_CACHE_MAX_AGE_DAYS
 
-    # Load cache and check which profiles we already have
+    # Look up only the requested profiles in the keyed cache
     cache = load_profile_cache()
+    fresh, stale = cache.lookup(
+        (normalize_linkedin_url(url) for url in profile_urls),
+        max_age_seconds=max_age_days * 86400,
+    )
     cached_profiles = []
+    stale_profiles = {}
     urls_to_scrape = []
 
     for url in profile_urls:
         cache_key = normalize_linkedin_url(url)
-        if cache_key in cache:
-            cached_profiles.append(cache[cache_key])
+        if cache_key in fresh:
+            cached_profiles.append(fresh[cache_key])
         else:
+            if cache_key in stale:
+                stale_profiles[cache_key] = stale[cache_key]
             urls_to_scrape.append(url)
 
-    print(f"Profile cache: {len(cached_profiles)} cached, {len(urls_to_scrape)} to scrape")
+    print(f"Profile cache: {len(cached_profiles)} cached, {len(stale_profiles)} stale "
+          f"(>{max_age_days}d), {len(urls_to_scrape)} to scrape")
+
+    if cached_profiles:
+        yield cached_profiles
 
     if not urls_to_scrape:
         print("All profiles already cached, skipping Apify scrape")
-        return cached_profiles
-
-    print(f"Starting LinkedIn profile scraper for {len(urls_to_scrape)} NEW profiles...")
-
-    # Start the actor run
-    start_url = f"https://api.apify.com/v2/acts/{PROFILE_SCRAPER_ACTOR}/runs?token={APIFY_API_TOKEN}"
-
-    payload = {
-        "urls": [{"url": u} for u in urls_to_scrape]
-    }
-
-    try:
-        response = requests.post(start_url, json=payload)
-        response.raise_for_status()
-        run_data = response.json()["data"]
-        run_id = run_data["id"]
-        dataset_id = run_data["defaultDatasetId"]
-
-        print(f"Run started: {run_id}")
-
-    except Exception as e:
-        print(f"Error starting profile scraper: {e}")
-        return cached_profiles  # Return cached profiles even if scraper fails to start
-
-    # Wait for initial scraping
-    print(f"Waiting {wait_seconds}s for scraping...")
-    time.sleep(wait_seconds)
-
-    # Poll for completion
-    status_url = f"https://api.apify.com/v2/actor-runs/{run_id}?token={APIFY_API_TOKEN}"
-
-    while True:
+        return
+
+    # Split across concurrent runs so no single run's throughput (or one
+    # slow profile) holds up the whole batch
+    shards = plan_shards(urls_to_scrape, shard_target_seconds, PROFILE_SCRAPE_SECONDS_PER_PROFILE, max_shards)
+    print(f"Starting LinkedIn profile scraper for {len(urls_to_scrape)} NEW profiles "
+          f"({len(shards)} run{'s' if len(shards) != 1 else ''})...")
+
+    # Each run holds an account-wide governor slot until its stream is done
+    governor = get_apify_governor()
+    streams = []
+    leases = []
+    for shard in shards:
         try:
-            response = requests.get(status_url)
-            response.raise_for_status()
-            status = response.json()["data"]["status"]
-
-            if status in ["SUCCEEDED", "ABORTED"]:
-                print(f"Scraper finished with status: {status}")
-                break
-
-            print(f"Status: {status}, waiting {poll_interval}s...")
-            time.sleep(poll_interval)
-
-        except Exception as e:
-            print(f"Error polling status: {e}")
-            break
-
-    # Fetch results
-    data_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={APIFY_API_TOKEN}"
-
+            lease = governor.acquire(PROFILE_SCRAPER_ACTOR,
+                                     estimated_cost_usd=len(shard) * APIFY_COSTS["profile_scraper"])
+        except (ApifyBudgetExceeded, TimeoutError) as e:
+            print(f"Skipping {len(shard)} profiles: {e}")
+            continue
+        run_data = _start_profile_scraper_run(shard)
+        if not run_data:
+            governor.release(lease, actual_cost_usd=0.0)
+            continue
+        leases.append(lease)
+        # Read the dataset by offset while the run is going
+        streams.append(DatasetStream(run_data["id"], run_data["defaultDatasetId"], APIFY_API_TOKEN,
+                                     expected_items=len(shard), timeout_seconds=timeout_seconds))
+
+    refreshed = set()
+    items_read = 0
+    scrape_started = time.monotonic()
     try:
-        response = requests.get(data_url, headers={"Accept": "application/json"})
-        response.raise_for_status()
-        raw_profiles = response.json()
+        # Pages from every shard are cached and handed on as each arrives
+        for raw_profiles in merge_streams(streams):
+            get_cost_tracker().add_profile_scrape(len(raw_profiles))
+            items_read += len(raw_profiles)
+
+            # Normalize supreme_coder output to dev_fusion format and cache it
+            new_profiles = cache.put_scraped(raw_profiles)
+            refreshed.update(normalize_linkedin_url(p.get("linkedinUrl") or "") for p in new_profiles)
+            print(f"Retrieved {len(raw_profiles)} NEW profiles ({items_read}/{len(urls_to_scrape)})")
+            if new_profiles:
+                yield new_profiles
+    finally:
+        for lease, stream in zip(leases, streams):
+            governor.release(lease, actual_cost_usd=run_cost_usd(stream.run))
+        for stream in streams:
+            record_actor_run(PROFILE_SCRAPER_ACTOR, stream.run, time.monotonic() - scrape_started)
+
+    for stream in streams:
+        if stream.run.get("status") != "SUCCEEDED":
+            print(f"Warning: profile scraper run {stream.run_id} ended {stream.run.get('status')} "
+                  f"after {stream.items_read} profiles")
+
+    # Stale entries the refresh didn't return are still better than nothing
+    unrefreshed = [p for key, p in stale_profiles.items() if key not in refreshed]
+    if unrefreshed:
+        print(f"Using {len(unrefreshed)} stale cached profiles that failed to refresh")
+        yield unrefreshed
 
-        # Normalize supreme_coder output to dev_fusion format
-        new_profiles = [normalize_supreme_coder_profile(r) for r in raw_profiles]
 
-        print(f"Retrieved {len(new_profiles)} NEW profiles from Apify")
-        cost_tracker.add_profile_scrape(len(new_profiles))
-
-        # Add new profiles to cache
-        for profile in new_profiles:
-            profile_url = profile.get("linkedinUrl") or profile.get("profileUrl") or ""
-            if profile_url:
-                cache_key = normalize_linkedin_url(profile_url)
-                cache[cache_key] = profile
+def scrape_linkedin_profiles(
+    profile_urls: List[str],
+    max_age_days: Optional[float] = None,
+    timeout_seconds: Optional[float] = None,
+    max_shards: int = PROFILE_SCRAPE_MAX_SHARDS,
+) -> List[Dict]:
+    """
+    Scrape LinkedIn profiles using Apify (with caching to avoid re-scraping).
 
-        save_profile_cache(cache)
-        print(f"Profile cache updated: {len(cache)} total profiles cached")
+    Collects every batch from iter_linkedin_profiles. Cached profiles older
+    than max_age_days are re-scraped; if the refresh fails, the stale copy is
+    returned rather than dropping the lead.
 
-        # Combine cached + new profiles
-        all_profiles = cached_profiles + new_profiles
-        print(f"Returning {len(all_profiles)} total profiles ({len(cached_profiles)} cached + {len(new_profiles)} new)")
-        return all_profiles
+    Args:
+        profile_urls: List of profile URLs to scrape
+        max_age_days: Cache max-age (default PROFILE_CACHE_MAX_AGE_DAYS)
+        timeout_seconds: Max wait per Apify run (default sized to the shard)
+        max_shards: Maximum concurrent actor runs (1 = a single run)
 
-    except Exception as e:
-        print(f"Error fetching profile data: {e}")
-        return cached_profiles  # Return cached profiles even if new scrape fails
+    Returns:
+        List of profile dictionaries
+    """
+    all_profiles = []
+    for profiles in iter_linkedin_profiles(profile_urls, max_age_days, timeout_seconds, max_shards):
+        all_profiles.extend(profiles)
+    print(f"Returning {len(all_profiles)} total profiles")
+    return all_profiles
 
 
 # =============================================================================
@@ -1246,29 +1452,35 @@ def qualify_lead_icp(lead: Dict) -> Dict[str, Any]:
     }
 
 
-def check_icp_match_deepseek(lead: Dict, icp_criteria: Optional[str] = None) -> Dict[str, Any]:
-    """
-    Check if lead matches ICP using DeepSeek (same logic as personalize_and_upload.py).
-    Returns dict with 'match' (bool), 'confidence' (str), and 'reason' (str).
+# Default ICP: Sales Automation and Personal Branding agency
+ICP_SYSTEM_PROMPT = """Role: B2B Lead Qualification Filter.
 
-    Uses default ICP for Sales Automation and Personal Branding agency if not specified.
-    """
-    import requests
+Objective: Categorize LinkedIn profiles based on Authority and Industry fit for a Sales Automation and Personal Branding agency.
 
-    if not DEEPSEEK_API_KEY:
-        print("  Warning: DEEPSEEK_API_KEY not found, using local ICP rules")
-        local_result = qualify_lead_icp(lead)
-        return {
-            "match": local_result["qualified"],
-            "confidence": "local",
-            "reason": local_result["reason"]
-        }
+Rules for Authority (Strict):
+- Qualify: CEOs, Founders, Co-Founders, Managing Directors, Owners, Partners, VPs, and C-Suite executives.
+- Reject: Interns, Students, Junior staff, Administrative assistants (e.g., "Assessor administrativo"), and low-level individual contributors.
+
+Rules for B2B Industry (Lenient):
+- Qualify: High-ticket service industries (Agencies, SaaS, Consulting, Coaching, Tech).
+
+The "Benefit of Doubt" Rule: If you are unsure if a business is B2B or B2C, or unsure if the person is a top-level decision-maker, Qualify them (Set to true). Only reject if they are clearly non-decision makers or in non-business roles.
+
+Hard Rejections:
+- Leads from massive traditional Banking/Financial institutions (e.g., Santander, Getnet).
+- Physical labor or local retail roles (e.g., Driver, Technician, Cashier).
+
+You are an expert at evaluating sales leads. Always respond with valid JSON."""
+
+CUSTOM_ICP_SYSTEM_PROMPT = "You are an expert at evaluating sales leads against ICP criteria. Always respond with valid JSON."
 
-    # Build lead summary (handle both Vayne and Apify field names)
+
+def build_icp_lead_summary(lead: Dict) -> str:
+    """Lead summary for ICP prompts (handles both Vayne and Apify field names)."""
     headline = lead.get('headline', 'N/A')
     company_desc = (lead.get('company_description') or lead.get('about') or '')[:300]
 
-    lead_summary = f"""
+    return f"""
 Lead: {lead.get('fullName', lead.get('full_name', 'Unknown'))}
 Title: {lead.get('jobTitle', lead.get('job_title', lead.get('title', 'Unknown')))}
 Headline: {headline}
@@ -1278,26 +1490,30 @@ Location: {lead.get('addressWithCountry', lead.get('location', 'Unknown'))}
 Industry: {lead.get('companyIndustry', lead.get('industry', 'N/A'))}
 """
 
-    # Use custom ICP criteria if provided, otherwise use default
-    if not icp_criteria:
-        system_prompt = """Role: B2B Lead Qualification Filter.
-
-Objective: Categorize LinkedIn profiles based on Authority and Industry fit for a Sales Automation and Personal Branding agency.
 
-Rules for Authority (Strict):
-- Qualify: CEOs, Founders, Co-Founders, Managing Directors, Owners, Partners, VPs, and C-Suite executives.
-- Reject: Interns, Students, Junior staff, Administrative assistants (e.g., "Assessor administrativo"), and low-level individual contributors.
+def check_icp_match_deepseek(lead: Dict, icp_criteria: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Check if lead matches ICP using DeepSeek (same logic as personalize_and_upload.py).
+    Returns dict with 'match' (bool), 'confidence' (str), and 'reason' (str).
 
-Rules for B2B Industry (Lenient):
-- Qualify: High-ticket service industries (Agencies, SaaS, Consulting, Coaching, Tech).
+    Uses default ICP for Sales Automation and Personal Branding agency if not specified.
+    """
+    from llm_client import llm_post
 
-The "Benefit of Doubt" Rule: If you are unsure if a business is B2B or B2C, or unsure if the person is a top-level decision-maker, Qualify them (Set to true). Only reject if they are clearly non-decision makers or in non-business roles.
+    if not DEEPSEEK_API_KEY:
+        print("  Warning: DEEPSEEK_API_KEY not found, using local ICP rules")
+        local_result = qualify_lead_icp(lead)
+        return {
+            "match": local_result["qualified"],
+            "confidence": "local",
+            "reason": local_result["reason"]
+        }
 
-Hard Rejections:
-- Leads from massive traditional Banking/Financial institutions (e.g., Santander, Getnet).
-- Physical labor or local retail roles (e.g., Driver, Technician, Cashier).
+    lead_summary = build_icp_lead_summary(lead)
 
-You are an expert at evaluating sales leads. Always respond with valid JSON."""
+    # Use custom ICP criteria if provided, otherwise use default
+    if not icp_criteria:
+        system_prompt = ICP_SYSTEM_PROMPT
         user_prompt = f"""Evaluate this LinkedIn profile:
 
 {lead_summary}
@@ -1309,7 +1525,7 @@ Respond in JSON format:
   "reason": "Brief explanation (1 sentence)"
 }}"""
     else:
-        system_prompt = "You are an expert at evaluating sales leads against ICP criteria. Always respond with valid JSON."
+        system_prompt = CUSTOM_ICP_SYSTEM_PROMPT
         user_prompt = f"""You are verifying if a LinkedIn lead matches the Ideal Customer Profile (ICP).
 
 ICP Criteria: {icp_criteria}
@@ -1343,7 +1559,7 @@ Respond in JSON format:
             "response_format": {"type": "json_object"}
         }
 
-        response = requests.post(
+        response = llm_post(
             "https://api.deepseek.com/chat/completions",
             headers=headers,
             json=payload,
@@ -1367,25 +1583,42 @@ Respond in JSON format:
         }
 
 
-def qualify_leads_with_deepseek(leads: List[Dict], icp_criteria: Optional[str] = None) -> List[Dict]:
+def qualify_leads_with_deepseek(
+    leads: List[Dict],
+    icp_criteria: Optional[str] = None,
+    batch_size: int = ICP_BATCH_SIZE,
+    max_in_flight: int = ICP_MAX_IN_FLIGHT,
+) -> List[Dict]:
     """
     Qualify leads using DeepSeek API (same as personalize_and_upload.py).
 
+    Up to batch_size leads share one request (icp_batch.py); leads whose
+    batched verdict is missing or malformed are retried, then checked one by
+    one with check_icp_match_deepseek. Up to max_in_flight requests run
+    concurrently; verdicts keep the order of leads. Leads already checked
+    with the same fields and prompt reuse their cached verdict.
+
     Args:
         leads: List of lead dictionaries
         icp_criteria: Optional custom ICP criteria
+        batch_size: Leads per DeepSeek request (1 = one request per lead)
+        max_in_flight: Concurrent DeepSeek requests (1 = sequential)
 
     Returns:
         List of leads that pass ICP qualification with icp_* fields added
     """
     qualified_leads = []
 
-    for idx, lead in enumerate(leads):
-        lead_name = lead.get('fullName', lead.get('full_name', 'Unknown'))
+    system_prompt = CUSTOM_ICP_SYSTEM_PROMPT if icp_criteria else ICP_SYSTEM_PROMPT
+    verdicts, stats = classify_leads_icp(
+        leads, build_icp_lead_summary, system_prompt, icp_criteria,
+        DEEPSEEK_API_KEY, check_icp_match_deepseek,
+        batch_size=batch_size, max_in_flight=max_in_flight,
+    )
+    get_cost_tracker().add_icp_check(len(leads) - stats["cached"])
 
-        # Check ICP with DeepSeek
-        icp_result = check_icp_match_deepseek(lead, icp_criteria)
-        cost_tracker.add_icp_check(1)
+    for idx, (lead, icp_result) in enumerate(zip(leads, verdicts)):
+        lead_name = lead.get('fullName', lead.get('full_name', 'Unknown'))
 
         lead["icp_match"] = icp_result.get("match", True)
         lead["icp_confidence"] = icp_result.get("confidence", "unknown")
@@ -1397,6 +1630,11 @@ def qualify_leads_with_deepseek(leads: List[Dict], icp_criteria: Optional[str] =
         else:
             print(f"  [ICP-REJECT] #{idx+1}: {lead_name} - {icp_result.get('reason', '')}")
 
+    if stats["cached"]:
+        print(f"\nICP verdict cache: {stats['cached']}/{len(leads)} leads unchanged since their last check")
+    if stats["batched"]:
+        print(f"\nICP batching: {len(leads)} leads in {stats['requests']} requests "
+              f"({stats['requeued']} re-queued, {stats['single']} checked one by one)")
     print(f"\nICP qualification: {len(leads)} -> {len(qualified_leads)} leads")
     return qualified_leads
 
@@ -1501,7 +1739,7 @@ def generate_personalization_deepseek(lead: Dict) -> str:
     Returns:
         Personalized message string
     """
-    import requests
+    from llm_client import llm_post
 
     if not DEEPSEEK_API_KEY:
         print("  Warning: DEEPSEEK_API_KEY not found, using mock personalization")
@@ -1520,7 +1758,7 @@ def generate_personalization_deepseek(lead: Dict) -> str:
     location = extract_city_from_location(lead.get("addressWithCountry", lead.get("location", "")))
 
     # Get formatted prompt from centralized source (prompts.py)
-    prompt = get_linkedin_5_line_prompt(
+    prompt_parts = get_linkedin_5_line_prompt_parts(
         first_name=first_name,
         company_name=company,
         title=title,
@@ -1537,15 +1775,12 @@ def generate_personalization_deepseek(lead: Dict) -> str:
 
         payload = {
             "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are an expert at creating personalized LinkedIn DMs following strict template rules."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": build_cached_messages(LINKEDIN_DM_SYSTEM_PROMPT, prompt_parts),
             "max_tokens": 400,
             "temperature": 0.7
         }
 
-        response = requests.post(
+        response = llm_post(
             "https://api.deepseek.com/chat/completions",
             headers=headers,
             json=payload,
@@ -1560,7 +1795,7 @@ def generate_personalization_deepseek(lead: Dict) -> str:
             message = message[1:-1]
         message = message.replace("```", "").strip()
 
-        cost_tracker.add_personalization(1)
+        get_cost_tracker().add_personalization(1)
         return message
 
     except Exception as e:
@@ -1731,6 +1966,50 @@ def process_leads_pipeline(
     return qualify_leads_with_deepseek(location_filtered)
 
 
+def qualify_profile_batch(
+    profiles: List[Dict],
+    engagement_context: Dict[str, Dict],
+    keywords: str,
+    allowed_countries: List[str],
+    skip_icp: bool,
+    results: Dict[str, Any],
+) -> List[Dict]:
+    """
+    Run one batch of scraped profiles through enrichment, filters and ICP.
+
+    Adds the batch's counts to results (profiles_scraped, location_filtered,
+    complete_profiles).
+
+    Returns:
+        Leads from the batch that passed ICP qualification
+    """
+    results["profiles_scraped"] += len(profiles)
+
+    profiles = enrich_profiles_with_engagement(profiles, engagement_context)
+    # Also add source keyword for tracking
+    for profile in profiles:
+        profile["source_keyword"] = keywords
+
+    location_filtered = filter_by_location(profiles, allowed_countries)
+    results["location_filtered"] += len(location_filtered)
+
+    complete_profiles = filter_complete_profiles(location_filtered)
+    results["complete_profiles"] += len(complete_profiles)
+    if not complete_profiles:
+        return []
+
+    if skip_icp:
+        for lead in complete_profiles:
+            lead["icp_match"] = True
+            lead["icp_confidence"] = "skipped"
+            lead["icp_reason"] = "ICP check skipped"
+        return complete_profiles
+
+    with get_cost_tracker().stage("icp"):
+        return qualify_leads_with_deepseek(complete_profiles)
+
+
+@with_cost_tracker
 def run_full_pipeline(
     keywords: str = "ceos",
     days_back: int = 7,
@@ -1739,7 +2018,8 @@ def run_full_pipeline(
     heyreach_list_id: int = None,
     dry_run: bool = False,
     skip_icp: bool = False,
-    skip_validation: bool = False
+    skip_validation: bool = False,
+    adaptive_validation: bool = False
 ) -> Dict[str, Any]:
     """
     Run the full competitor post pipeline.
@@ -1752,6 +2032,7 @@ def run_full_pipeline(
         skip_icp: Skip ICP filtering (accept all location-filtered leads)
         heyreach_list_id: HeyReach list ID for upload
         dry_run: If True, don't upload to HeyReach
+        adaptive_validation: Judge only a sample of messages while the pass rate stays high
 
     Returns:
         Pipeline results dictionary
@@ -1760,6 +2041,7 @@ def run_full_pipeline(
         allowed_countries = ["United States", "Canada", "USA", "America"]
 
     config = get_default_config()
+    cost_tracker = get_cost_tracker()
 
     print("=" * 60)
     print("COMPETITOR POST PIPELINE")
@@ -1782,6 +2064,7 @@ def run_full_pipeline(
         "duplicates_removed": 0,
         "profiles_scraped": 0,
         "location_filtered": 0,
+        "complete_profiles": 0,
         "icp_qualified": 0,
         "personalized": 0,
         "validated": 0,
@@ -1790,7 +2073,10 @@ def run_full_pipeline(
 
     # Step 1: Search Google for LinkedIn posts
     print("\n[1/13] Searching Google for LinkedIn posts...")
-    search_results = search_google_linkedin_posts(keywords, days_back)
+    with cost_tracker.stage("google_search"):
+        search_results = search_google_linkedin_posts(
+            keywords, days_back, cache_ttl_hours=config["search_cache_ttl_hours"]
+        )
     results["posts_found"] = len(search_results)
 
     if not search_results:
@@ -1821,7 +2107,12 @@ def run_full_pipeline(
     # Step 3: Scrape post engagers
     print("\n[3/13] Scraping post engagers...")
     post_urls = [p.get("url", p.get("link", "")) for p in filtered_posts if p.get("url") or p.get("link")]
-    engagers = scrape_post_engagers(post_urls)
+    with cost_tracker.stage("post_engagers"):
+        engagers = scrape_post_engagers(
+            post_urls,
+            concurrency=config["engager_concurrency"],
+            cache_fresh_hours=config["engager_cache_fresh_hours"],
+        )
     results["engagers_found"] = len(engagers)
 
     if not engagers:
@@ -1859,75 +2150,66 @@ def run_full_pipeline(
         return results
     print(f"Proceeding with {len(profile_urls)} unprocessed URLs")
 
-    # Step 7: Scrape LinkedIn profiles
-    print("\n[7/13] Scraping LinkedIn profiles...")
-    profiles = scrape_linkedin_profiles(
-        profile_urls,
-        wait_seconds=config["scrape_wait_seconds"],
-        poll_interval=config["poll_interval_seconds"]
-    )
-    results["profiles_scraped"] = len(profiles)
-
-    if not profiles:
+    # Steps 7-10 run per batch as profiles arrive from Apify, so filtering
+    # and ICP checks overlap with the rest of the scrape
+    print("\n[7/13] Scraping LinkedIn profiles (steps 8-10 run on each batch as it arrives)...")
+    if skip_icp:
+        print("ICP qualification skipped (--skip_icp flag)")
+    qualified_leads = []
+    # ICP time is also counted in its own "icp" stage
+    with cost_tracker.stage("profiles"):
+        for profiles in iter_linkedin_profiles(
+            profile_urls,
+            max_age_days=config.get("profile_cache_max_age_days"),
+            timeout_seconds=config.get("profile_scrape_timeout_seconds"),
+            max_shards=config["profile_scrape_max_shards"],
+            shard_target_seconds=config["profile_shard_target_seconds"],
+        ):
+            qualified_leads.extend(
+                qualify_profile_batch(profiles, engagement_context, keywords, allowed_countries, skip_icp, results)
+            )
+
+    if not results["profiles_scraped"]:
         print("No profiles scraped. Exiting.")
         return results
-
-    # Enrich profiles with engagement context
-    print("Enriching profiles with engagement data...")
-    profiles = enrich_profiles_with_engagement(profiles, engagement_context)
-    # Also add source keyword for tracking
-    for profile in profiles:
-        profile["source_keyword"] = keywords
-
-    # Step 7: Filter by location
-    print("\n[8/13] Filtering by location...")
-    location_filtered = filter_by_location(profiles, allowed_countries)
-    results["location_filtered"] = len(location_filtered)
-
-    if not location_filtered:
+    if not results["location_filtered"]:
         print("No leads in target locations. Exiting.")
         return results
-
-    # Step 8: Filter incomplete profiles
-    print("\n[9/13] Filtering incomplete profiles...")
-    complete_profiles = filter_complete_profiles(location_filtered)
-    results["complete_profiles"] = len(complete_profiles)
-
-    if not complete_profiles:
+    if not results["complete_profiles"]:
         print("No leads with complete profiles. Exiting.")
         return results
 
-    # Step 9: ICP qualification
-    if skip_icp:
-        print("\n[10/13] Skipping ICP qualification (--skip_icp flag)...")
-        qualified_leads = complete_profiles
-        for lead in qualified_leads:
-            lead["icp_match"] = True
-            lead["icp_confidence"] = "skipped"
-            lead["icp_reason"] = "ICP check skipped"
-    else:
-        print("\n[10/13] Qualifying leads (ICP)...")
-        qualified_leads = qualify_leads_with_deepseek(complete_profiles)
-
     results["icp_qualified"] = len(qualified_leads)
 
     if not qualified_leads:
         print("No leads passed ICP qualification. Exiting.")
         return results
 
-    # Step 10: Generate personalization
+    # Steps 10-11: Generate personalization, validating (and fixing) each
+    # message as soon as it is generated
     print("\n[11/13] Generating personalized messages...")
-    for lead in qualified_leads:
-        lead["personalized_message"] = generate_personalization_deepseek(lead)
+    if skip_validation:
+        print("\n[12/13] Skipping validation (--skip_validation flag)...")
+    else:
+        print("\n[12/13] Validating personalized messages as they are generated...")
+    # LLM usage is split between the "personalization" and "validation" stages
+    sampler = SequentialSampler() if adaptive_validation and not skip_validation else None
+    with cost_tracker.stage("messages"):
+        message_stats = run_message_pipeline(
+            qualified_leads,
+            generate=generate_personalization_deepseek,
+            validate=not skip_validation,
+            sampler=sampler,
+        )
     results["personalized"] = len(qualified_leads)
 
-    # Step 11: Validate and fix flagged messages
     if not skip_validation:
-        print("\n[12/13] Validating personalized messages...")
-        qualified_leads = validate_and_fix_batch(qualified_leads)
+        print_validation_summary(message_stats, message_stats["validated"])
+        if sampler:
+            print_sampling_report(sampler)
+            results["validation_sampled_out"] = message_stats["sampled_out"]
         results["validated"] = len([l for l in qualified_leads if l.get("validation", {}).get("flag") == "PASS"])
     else:
-        print("\n[12/13] Skipping validation (--skip_validation flag)...")
         results["validated"] = results["personalized"]
 
     # Step 13: Upload to HeyReach
@@ -1963,11 +2245,8 @@ def run_full_pipeline(
 
     # Save intermediate results
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f".tmp/competitor_post_leads_{timestamp}.json"
-    os.makedirs(".tmp", exist_ok=True)
-
-    with open(output_file, "w") as f:
-        json.dump(qualified_leads, f, indent=2)
+    output_file = f".tmp/competitor_post_leads_{timestamp}{STATE_SUFFIX}"
+    write_records(output_file, qualified_leads)
 
     print(f"\nResults saved to: {output_file}")
 
@@ -1981,6 +2260,9 @@ def run_full_pipeline(
 
     # Cost breakdown
     print("\n" + cost_tracker.get_summary())
+    per_lead = cost_tracker.cost_per_lead(results["icp_qualified"])
+    if per_lead is not None:
+        print(f"Cost per qualified lead: ${per_lead:.4f}")
 
     # Report metrics to speed_to_lead
     print("\n[REPORTING] Sending metrics to speed_to_lead...")
@@ -2033,6 +2315,10 @@ def main():
         "--skip_validation", action="store_true",
         help="Skip validation and auto-fix step"
     )
+    parser.add_argument(
+        "--adaptive_validation", action="store_true",
+        help="Judge only a sample of messages while the pass rate stays high"
+    )
 
     args = parser.parse_args()
 
@@ -2044,7 +2330,8 @@ def main():
         heyreach_list_id=args.list_id,
         dry_run=args.dry_run,
         skip_icp=args.skip_icp,
-        skip_validation=args.skip_validation
+        skip_validation=args.skip_validation,
+        adaptive_validation=args.adaptive_validation
     )
 
     if results["icp_qualified"] > 0:
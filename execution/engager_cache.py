@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Engager Cache - Per-post reaction lists with incremental re-scrapes.
+
+The same viral post is found by several keywords and by several pipelines
+(keyword monitor, competitor pipeline), and every reactions actor run pays
+for the post's whole reaction list again. Each post's reactors are kept in
+the shared KV cache (kv_cache.py), keyed by the post URL without tracking
+params:
+
+    {"engagers": [...], "first_seen": {reactor: ts}, "scraped_at": ts}
+
+- Within ENGAGER_CACHE_FRESH_HOURS the cached list is returned as-is, with
+  no actor run at all.
+- After that, a re-scrape pages through the reactions newest-first and
+  stops at the first page that reaches an already-fetched reactor (the
+  watermark), so only newly added reactions are paid for.
+- A post never seen before is scraped in one run, exactly as before.
+
+Entries are kept for ENGAGER_CACHE_RETENTION_DAYS, after which the next
+scrape of the post starts over.
+
+Usage:
+    from engager_cache import fetch_post_engagers
+    engagers, runs = fetch_post_engagers(client, POST_REACTIONS_ACTOR, url)
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from kv_cache import get_kv_cache
+from apify_governor import call_actor
+
+ENGAGER_CACHE_NAMESPACE = "post_engagers"
+
+# Reuse a post's reactors without any actor run for this long
+ENGAGER_CACHE_FRESH_HOURS = 6
+
+# Keep watermarks long enough to cover a post's useful lifetime
+ENGAGER_CACHE_RETENTION_DAYS = 30
+
+# Reactions actor paging (page_number starts at 1, newest reactions first)
+REACTIONS_PAGE_SIZE = 100
+
+# Upper bound on pages fetched by one incremental re-scrape
+MAX_INCREMENTAL_PAGES = 10
+
+# Budget estimate per reactions run (APIFY_COSTS["post_reactions"] in the pipelines)
+REACTIONS_RUN_COST_USD = 0.008
+
+
+def normalize_post_url(url: str) -> str:
+    """Canonical cache key for a post URL (tracking params and trailing slash dropped)."""
+    return (url or "").split("?")[0].split("#")[0].rstrip("/").lower()
+
+
+def reactor_key(item: Dict) -> str:
+    """Stable identity of one reaction item (reactor profile URL, else name)."""
+    reactor = item.get("reactor") or {}
+    return (
+        reactor.get("profile_url")
+        or reactor.get("urn")
+        or reactor.get("name")
+        or ""
+    ).split("?")[0].rstrip("/").lower()
+
+
+def _run_reactions_actor(client, actor_id: str, run_input: Dict) -> List[Dict]:
+    run = call_actor(client, actor_id, run_input, estimated_cost_usd=REACTIONS_RUN_COST_USD)
+    return list(client.dataset(run["defaultDatasetId"]).iterate_items())
+
+
+def _fetch_new_reactions(client, actor_id: str, post_url: str, known: set) -> Tuple[List[Dict], int, bool]:
+    """
+    Page through a post's reactions until the watermark is reached.
+
+    Returns:
+        (new items, actor runs used, whether the pass completed)
+    """
+    new_items = []
+    runs = 0
+    for page in range(1, MAX_INCREMENTAL_PAGES + 1):
+        try:
+            items = _run_reactions_actor(client, actor_id, {
+                "post_urls": [post_url],
+                "page_number": page,
+                "limit": REACTIONS_PAGE_SIZE,
+            })
+        except Exception as e:
+            print(f"Warning: incremental reactions scrape failed on page {page} for {post_url}: {e}")
+            return new_items, runs, False
+        runs += 1
+
+        unseen = []
+        for item in items:
+            key = reactor_key(item)
+            if key and key not in known:
+                known.add(key)
+                unseen.append(item)
+        new_items.extend(unseen)
+
+        # A page holding any known reactor reached the watermark; a short
+        # page is the end of the list
+        if len(unseen) < len(items) or len(items) < REACTIONS_PAGE_SIZE:
+            break
+    return new_items, runs, True
+
+
+def fetch_post_engagers(
+    client,
+    actor_id: str,
+    post_url: str,
+    fresh_hours: Optional[float] = ENGAGER_CACHE_FRESH_HOURS,
+) -> Tuple[List[Dict], int]:
+    """
+    All known engagers of a post, fetching only what the cache is missing.
+
+    Args:
+        client: ApifyClient
+        actor_id: Reactions actor ID
+        post_url: LinkedIn post URL
+        fresh_hours: Serve the cached list without a run if scraped within
+            this many hours (0/None always checks for new reactions)
+
+    Returns:
+        (engager items, number of actor runs used)
+    """
+    key = normalize_post_url(post_url)
+    cache = get_kv_cache()
+    now = time.time()
+
+    try:
+        entry = cache.get(ENGAGER_CACHE_NAMESPACE, key)
+    except Exception as e:
+        print(f"Warning: engager cache unavailable: {e}")
+        entry = None
+
+    if entry and fresh_hours and now - entry.get("scraped_at", 0) < fresh_hours * 3600:
+        return entry["engagers"], 0
+
+    if entry:
+        engagers = entry["engagers"]
+        first_seen = entry.get("first_seen", {})
+        known = set(first_seen) | {reactor_key(item) for item in engagers}
+        new_items, runs, complete = _fetch_new_reactions(client, actor_id, post_url, known)
+        engagers = new_items + engagers
+        scraped_at = now if complete else entry.get("scraped_at", 0)
+    else:
+        engagers = _run_reactions_actor(client, actor_id, {"post_urls": [post_url]})
+        new_items, runs = engagers, 1
+        first_seen = {}
+        scraped_at = now
+
+    for item in new_items:
+        item_key = reactor_key(item)
+        if item_key:
+            first_seen.setdefault(item_key, now)
+
+    try:
+        cache.set(
+            ENGAGER_CACHE_NAMESPACE,
+            key,
+            {"engagers": engagers, "first_seen": first_seen, "scraped_at": scraped_at},
+            ttl_seconds=ENGAGER_CACHE_RETENTION_DAYS * 86400,
+        )
+    except Exception as e:
+        print(f"Warning: could not cache post engagers: {e}")
+
+    return engagers, runs
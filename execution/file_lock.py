@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File Lock - Cross-process locking for shared .tmp state, with contention stats.
+
+The API server's background runs, CLI runs and cron monitors can all write
+the same .tmp stores at once. Writers take an exclusive lock on a sidecar
+"<file>.lock" for the duration of their read-modify-write:
+- POSIX: fcntl.flock
+- Windows: msvcrt.locking
+
+Locks are per open file, so they also serialize threads in one process. They
+are not re-entrant: don't take the same lock twice in one call chain.
+
+Every acquisition is recorded per lock name (attempts, how many had to wait,
+total/max wait, timeouts, hold time); get_lock_stats() exposes the totals.
+
+Usage:
+    from file_lock import FileLock, get_lock_stats
+    with FileLock(".tmp/processed_leads.jsonl.lock", name="processed_leads"):
+        ...  # read-modify-write
+    print(get_lock_stats())
+"""
+
+import os
+import sys
+import time
+import threading
+from typing import Dict, Optional
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+DEFAULT_LOCK_TIMEOUT = 60.0
+_POLL_INTERVAL = 0.05
+
+
+# =============================================================================
+# CONTENTION STATS
+# =============================================================================
+
+_stats: Dict[str, Dict] = {}
+_stats_lock = threading.Lock()
+
+
+def _new_stats() -> Dict:
+    return {
+        "acquisitions": 0,
+        "contended": 0,
+        "timeouts": 0,
+        "total_wait_seconds": 0.0,
+        "max_wait_seconds": 0.0,
+        "total_held_seconds": 0.0,
+    }
+
+
+def record_lock_wait(name: str, wait_seconds: float, contended: bool, timed_out: bool = False):
+    """Record one lock acquisition (also used for SQLite write-lock waits)."""
+    with _stats_lock:
+        stats = _stats.setdefault(name, _new_stats())
+        if timed_out:
+            stats["timeouts"] += 1
+        else:
+            stats["acquisitions"] += 1
+        if contended:
+            stats["contended"] += 1
+        stats["total_wait_seconds"] += wait_seconds
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait_seconds)
+
+
+def record_lock_hold(name: str, held_seconds: float):
+    with _stats_lock:
+        _stats.setdefault(name, _new_stats())["total_held_seconds"] += held_seconds
+
+
+def get_lock_stats() -> Dict[str, Dict]:
+    """Per-lock contention totals for this process."""
+    with _stats_lock:
+        result = {}
+        for name, stats in _stats.items():
+            row = dict(stats)
+            attempts = row["acquisitions"] + row["timeouts"]
+            row["contention_rate"] = round(row["contended"] / attempts, 4) if attempts else 0.0
+            row["total_wait_seconds"] = round(row["total_wait_seconds"], 4)
+            row["max_wait_seconds"] = round(row["max_wait_seconds"], 4)
+            row["total_held_seconds"] = round(row["total_held_seconds"], 4)
+            result[name] = row
+        return result
+
+
+def reset_lock_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# =============================================================================
+# LOCK
+# =============================================================================
+
+class FileLock:
+    """Exclusive cross-process lock on a sidecar file."""
+
+    def __init__(self, lock_path: str, name: Optional[str] = None, timeout: float = DEFAULT_LOCK_TIMEOUT):
+        self.lock_path = lock_path
+        self.name = name or os.path.basename(lock_path)
+        self.timeout = timeout
+        self._fd = None
+        self._acquired_at = 0.0
+
+    def _try_lock(self) -> bool:
+        try:
+            if sys.platform == "win32":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        start = time.monotonic()
+        contended = False
+        while not self._try_lock():
+            contended = True
+            waited = time.monotonic() - start
+            if waited >= self.timeout:
+                os.close(self._fd)
+                self._fd = None
+                record_lock_wait(self.name, waited, contended=True, timed_out=True)
+                raise TimeoutError(f"Timed out after {waited:.1f}s waiting for lock {self.lock_path}")
+            time.sleep(_POLL_INTERVAL)
+
+        self._acquired_at = time.monotonic()
+        record_lock_wait(self.name, self._acquired_at - start, contended)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if sys.platform == "win32":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            record_lock_hold(self.name, time.monotonic() - self._acquired_at)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
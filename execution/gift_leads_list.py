@@ -36,6 +36,7 @@ import csv
 import argparse
 import time
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional, Any
 from dotenv import load_dotenv
 
@@ -55,6 +56,10 @@ GOOGLE_SEARCH_ACTOR = "nFJndFXA5zjCTuudP"
 POST_REACTIONS_ACTOR = "J9UfswnR3Kae4O6vm"
 PROFILE_SCRAPER_ACTOR = "supreme_coder~linkedin-profile-scraper"
 
+# Batched Google search: queries per actor run, and runs in flight at once
+GOOGLE_QUERIES_PER_RUN = 20
+GOOGLE_SEARCH_CONCURRENCY = 3
+
 # Import shared functions from competitor_post_pipeline
 from competitor_post_pipeline import (
     search_google_linkedin_posts,
@@ -75,26 +80,28 @@ from competitor_post_pipeline import (
     check_icp_match_deepseek,
     qualify_leads_with_deepseek,
     CostTracker,
+    get_cost_tracker,
+    with_cost_tracker,
     casualize_company_name,
     extract_city_from_location,
     APIFY_COSTS,
     DEEPSEEK_COSTS,
 )
 
+from search_cache import get_cached_search, cache_search_results, SEARCH_CACHE_TTL_HOURS
+from apify_governor import call_actor
+from run_metrics import submit_in_context
+from llm_json import parse_llm_json, parse_llm_list, request_missing_items
+
 from prompts import (
     get_prospect_research_prompt,
     get_gift_search_query_prompt,
     get_gift_signal_note_prompt,
+    get_gift_signal_note_prompt_parts,
+    build_cached_messages,
 )
 
 
-# =============================================================================
-# COST TRACKER (separate instance for gift pipeline)
-# =============================================================================
-
-cost_tracker = CostTracker()
-
-
 # =============================================================================
 # ACTIVITY SCORING HELPERS
 # =============================================================================
@@ -179,7 +186,12 @@ def extract_activity_fields(profile: Dict) -> Dict:
 # RAW GOOGLE SEARCH (for pre-formed queries)
 # =============================================================================
 
-def search_google_raw_query(raw_query: str, max_pages: int = 1, results_per_page: int = 10) -> List[Dict]:
+def search_google_raw_query(
+    raw_query: str,
+    max_pages: int = 1,
+    results_per_page: int = 10,
+    cache_ttl_hours: Optional[float] = SEARCH_CACHE_TTL_HOURS,
+) -> List[Dict]:
     """
     Search Google with a raw, pre-formed query string.
     Unlike search_google_linkedin_posts(), this does NOT wrap the query.
@@ -188,10 +200,16 @@ def search_google_raw_query(raw_query: str, max_pages: int = 1, results_per_page
         raw_query: Complete Google search query (already includes site:, after:, etc.)
         max_pages: Max pages per query
         results_per_page: Results per page
+        cache_ttl_hours: Search cache TTL (0 or None to always search)
 
     Returns:
         List of search results
     """
+    cached = get_cached_search(raw_query, max_pages, results_per_page, cache_ttl_hours)
+    if cached is not None:
+        print(f"  Search cache hit: {raw_query} ({len(cached)} results)")
+        return cached
+
     if not APIFY_API_TOKEN:
         print("Error: APIFY_API_TOKEN not found in .env")
         return []
@@ -213,16 +231,131 @@ def search_google_raw_query(raw_query: str, max_pages: int = 1, results_per_page
     }
 
     try:
-        run = client.actor(GOOGLE_SEARCH_ACTOR).call(run_input=run_input)
+        run = call_actor(client, GOOGLE_SEARCH_ACTOR, run_input,
+                         estimated_cost_usd=max_pages * results_per_page * APIFY_COSTS["google_search"])
         results = list(client.dataset(run["defaultDatasetId"]).iterate_items())
         print(f"  Found {len(results)} results")
-        cost_tracker.add_google_search(len(results))
+        get_cost_tracker().add_google_search(len(results))
+        cache_search_results(raw_query, max_pages, results_per_page, results, cache_ttl_hours)
         return results
     except Exception as e:
         print(f"  Error searching Google: {e}")
         return []
 
 
+def _run_google_search_batch(client, queries: List[str], max_pages: int, results_per_page: int) -> List[Dict]:
+    """One google-search actor run over several newline-separated queries."""
+    run_input = {
+        "queries": "\n".join(queries),
+        "maxPagesPerQuery": max_pages,
+        "resultsPerPage": results_per_page,
+        "mobileResults": False,
+    }
+    estimated_cost = len(queries) * max_pages * results_per_page * APIFY_COSTS["google_search"]
+    run = call_actor(client, GOOGLE_SEARCH_ACTOR, run_input, estimated_cost_usd=estimated_cost)
+    return list(client.dataset(run["defaultDatasetId"]).iterate_items())
+
+
+def _query_match_key(query: str) -> str:
+    """Key for matching a result's searchQuery.term to the query sent (case/whitespace-insensitive)."""
+    return " ".join((query or "").split()).casefold()
+
+
+def search_google_raw_queries(
+    raw_queries: List[str],
+    max_pages: int = 1,
+    results_per_page: int = 10,
+    queries_per_run: int = GOOGLE_QUERIES_PER_RUN,
+    concurrency: int = GOOGLE_SEARCH_CONCURRENCY,
+    cache_ttl_hours: Optional[float] = SEARCH_CACHE_TTL_HOURS,
+) -> Dict[str, List[Dict]]:
+    """
+    Search Google for many raw queries in a few batched actor runs.
+
+    The google-search actor accepts newline-separated queries and tags each
+    result page with searchQuery.term, so queries are submitted
+    queries_per_run at a time (up to `concurrency` runs in flight) and the
+    results are split back per query, matching terms case- and
+    whitespace-insensitively. A failed run only empties its own queries.
+    Queries found in the search cache are not submitted at all; an empty
+    result is not cached if its run returned results it couldn't attribute.
+
+    Args:
+        raw_queries: Complete Google search queries (see search_google_raw_query)
+        max_pages: Max pages per query
+        results_per_page: Results per page
+        queries_per_run: Queries submitted to one actor run
+        concurrency: Maximum actor runs in flight
+        cache_ttl_hours: Search cache TTL (0 or None to always search)
+
+    Returns:
+        Dict of query -> search results, in input order ([] for no results)
+    """
+    queries = list(dict.fromkeys(q.strip() for q in raw_queries if q.strip()))
+    results_by_query: Dict[str, List[Dict]] = {q: [] for q in queries}
+    to_search = []
+    for query in queries:
+        cached = get_cached_search(query, max_pages, results_per_page, cache_ttl_hours)
+        if cached is None:
+            to_search.append(query)
+        else:
+            results_by_query[query] = cached
+    if len(to_search) < len(queries):
+        print(f"  Search cache: {len(queries) - len(to_search)}/{len(queries)} queries served locally")
+    if not to_search:
+        return results_by_query
+
+    if not APIFY_API_TOKEN:
+        print("Error: APIFY_API_TOKEN not found in .env")
+        return results_by_query
+
+    try:
+        from apify_client import ApifyClient
+        client = ApifyClient(APIFY_API_TOKEN)
+    except ImportError:
+        print("Error: apify-client not installed. Run: pip install apify-client")
+        return results_by_query
+
+    batches = [to_search[i:i + queries_per_run] for i in range(0, len(to_search), queries_per_run)]
+    print(f"  Searching {len(to_search)} queries in {len(batches)} batched run(s)")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as executor:
+        futures = {
+            submit_in_context(executor, _run_google_search_batch, client, batch, max_pages, results_per_page): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"  Error searching Google ({len(batch)} queries): {e}")
+                continue
+
+            get_cost_tracker().add_google_search(len(items))
+            batch_queries = {_query_match_key(query): query for query in batch}
+            unattributed = 0
+            for item in items:
+                term = ((item.get("searchQuery") or {}).get("term") or "").strip()
+                query = batch_queries.get(_query_match_key(term))
+                if query is None and len(batch) == 1:
+                    query = batch[0]
+                if query is None:
+                    # Unrecognized terms are kept under the term the actor reported
+                    unattributed += 1
+                    results_by_query.setdefault(term, []).append(item)
+                else:
+                    results_by_query[query].append(item)
+            for query in batch:
+                if unattributed and not results_by_query[query]:
+                    # Its results may be among the unattributed ones; don't cache "no results"
+                    print(f"  Not caching empty results for '{query[:60]}' ({unattributed} results unattributed)")
+                    continue
+                cache_search_results(query, max_pages, results_per_page, results_by_query[query], cache_ttl_hours)
+
+    return results_by_query
+
+
 # =============================================================================
 # MODULE 1: PROSPECT PROFILE SCRAPING
 # =============================================================================
@@ -250,17 +383,11 @@ def scrape_prospect_profile(url: str) -> Optional[Dict]:
 
     print(f"Scraping prospect profile: {url}")
 
-    profiles = scrape_linkedin_profiles(
-        [url],
-        wait_seconds=60,
-        poll_interval=15,
-    )
+    profiles = scrape_linkedin_profiles([url])
 
     if profiles:
-        # Update cost tracker for this pipeline instance
-        cost_tracker.add_profile_scrape(1)
         profile = profiles[0]
-        # Cache is already updated by scrape_linkedin_profiles
+        # Cache and cost tracker are already updated by scrape_linkedin_profiles
         return profile
 
     print("Warning: Could not scrape prospect profile")
@@ -288,7 +415,7 @@ def research_prospect_business(
         Dict with icp_description, target_titles, target_industries,
         pain_points, buying_signals, search_angles
     """
-    import requests
+    from llm_client import llm_post
 
     name = profile.get("fullName", profile.get("firstName", "Unknown"))
     headline = profile.get("headline", "")
@@ -337,7 +464,7 @@ def research_prospect_business(
             "response_format": {"type": "json_object"},
         }
 
-        response = requests.post(
+        response = llm_post(
             "https://api.deepseek.com/chat/completions",
             headers=headers,
             json=payload,
@@ -345,8 +472,10 @@ def research_prospect_business(
         )
         response.raise_for_status()
 
-        result = json.loads(response.json()["choices"][0]["message"]["content"])
-        cost_tracker.add_icp_check(1)
+        result = parse_llm_json(response.json()["choices"][0]["message"]["content"])
+        if not isinstance(result, dict):
+            raise ValueError("no JSON object in research response")
+        get_cost_tracker().add_icp_check(1)
 
         # Validate required fields
         required = ["icp_description", "target_titles", "pain_points", "buying_signals"]
@@ -412,7 +541,7 @@ def generate_search_queries(research: Dict, days_back: int = 14,
     Returns:
         List of Google search query strings
     """
-    import requests
+    from llm_client import llm_post
 
     target_verticals = research.get("target_verticals", [])
     buyer_intent_phrases = research.get("buyer_intent_phrases", [])
@@ -449,7 +578,7 @@ def generate_search_queries(research: Dict, days_back: int = 14,
             "response_format": {"type": "json_object"},
         }
 
-        response = requests.post(
+        response = llm_post(
             "https://api.deepseek.com/chat/completions",
             headers=headers,
             json=payload,
@@ -458,22 +587,12 @@ def generate_search_queries(research: Dict, days_back: int = 14,
         response.raise_for_status()
 
         content = response.json()["choices"][0]["message"]["content"]
-        result = json.loads(content)
-        cost_tracker.add_icp_check(1)
-
-        # Handle both array and object with "queries" key
-        if isinstance(result, list):
-            queries = result
-        elif isinstance(result, dict) and "queries" in result:
-            queries = result["queries"]
-        else:
-            # Try to extract any list value
-            for v in result.values():
-                if isinstance(v, list):
-                    queries = v
-                    break
-            else:
-                queries = _fallback_search_queries(research, days_back)
+        get_cost_tracker().add_icp_check(1)
+
+        # Array or object with "queries" key; complete queries survive truncation
+        queries = [q for q in parse_llm_list(content, keys=("queries",)) if isinstance(q, str)]
+        if not queries:
+            queries = _fallback_search_queries(research, days_back)
 
         # Wrap each query with site: prefix and after: date suffix
         date_cutoff = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
@@ -540,7 +659,7 @@ def generate_signal_notes(leads: List[Dict], icp_description: str) -> List[Dict]
     Returns:
         Same leads list with 'signal_note' field added
     """
-    import requests
+    from llm_client import llm_post
 
     if not leads:
         return leads
@@ -555,53 +674,53 @@ def generate_signal_notes(leads: List[Dict], icp_description: str) -> List[Dict]
     batch_size = 10
     all_notes = {}
 
-    for i in range(0, len(leads), batch_size):
-        batch = leads[i:i + batch_size]
-        batch_prompt = get_gift_signal_note_prompt(icp_description, batch)
+    def request_notes(batch: List[Dict]) -> List[Dict]:
+        batch_parts = get_gift_signal_note_prompt_parts(icp_description, batch)
+        headers = {
+            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": "deepseek-chat",
+            "messages": build_cached_messages(
+                "You generate concise signal notes. Always respond with valid JSON.", batch_parts
+            ),
+            "max_tokens": 800,
+            "temperature": 0.4,
+            "response_format": {"type": "json_object"},
+        }
 
-        try:
-            headers = {
-                "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                "Content-Type": "application/json",
-            }
-            payload = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "system", "content": "You generate concise signal notes. Always respond with valid JSON."},
-                    {"role": "user", "content": batch_prompt},
-                ],
-                "max_tokens": 800,
-                "temperature": 0.4,
-                "response_format": {"type": "json_object"},
-            }
-
-            response = requests.post(
-                "https://api.deepseek.com/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30,
-            )
-            response.raise_for_status()
+        response = llm_post(
+            "https://api.deepseek.com/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=30,
+        )
+        response.raise_for_status()
+        get_cost_tracker().add_personalization(len(batch))
 
-            content = response.json()["choices"][0]["message"]["content"]
-            result = json.loads(content)
-            cost_tracker.add_personalization(len(batch))
+        # Array or object with "notes"/"leads" key; complete notes survive truncation
+        content = response.json()["choices"][0]["message"]["content"]
+        return [note for note in parse_llm_list(content, keys=("notes", "leads")) if isinstance(note, dict)]
 
-            # Handle both array and object with "notes"/"leads" key
-            notes_list = result if isinstance(result, list) else (
-                result.get("notes") or result.get("leads") or
-                next((v for v in result.values() if isinstance(v, list)), [])
-            )
+    def lead_key(lead: Dict) -> str:
+        return normalize_linkedin_url(lead.get("linkedinUrl") or lead.get("linkedin_url", ""))
 
-            for note in notes_list:
-                url = note.get("linkedin_url", "")
-                signal = note.get("signal_note", "")
-                if url and signal:
-                    # Truncate to 100 chars
-                    all_notes[normalize_linkedin_url(url)] = signal[:100]
+    def note_key(note: Dict) -> Optional[str]:
+        url = note.get("linkedin_url", "")
+        return normalize_linkedin_url(url) if url and note.get("signal_note") else None
 
-        except Exception as e:
-            print(f"Warning: Signal note batch error: {e}")
+    # A note can't be matched to a lead without a URL, so those get the fallback
+    # below instead of being re-requested on every attempt
+    keyed_leads = [lead for lead in leads if lead_key(lead)]
+
+    for i in range(0, len(keyed_leads), batch_size):
+        batch = keyed_leads[i:i + batch_size]
+        # Leads missing from a malformed or truncated reply are re-requested on their own
+        notes = request_missing_items(batch, request_notes, lead_key, note_key)
+        for key, note in notes.items():
+            # Truncate to 100 chars
+            all_notes[key] = note["signal_note"][:100]
 
     # Apply notes to leads
     for lead in leads:
@@ -924,6 +1043,7 @@ def _build_run_data(
 # MODULE 6: MAIN PIPELINE ORCHESTRATOR
 # =============================================================================
 
+@with_cost_tracker
 def run_gift_leads_pipeline(
     prospect_url: str,
     user_icp: Optional[str] = None,
@@ -961,6 +1081,7 @@ def run_gift_leads_pipeline(
         countries = ["United States", "Canada", "USA", "America"]
 
     start_time = time.time()
+    cost_tracker = get_cost_tracker()
 
     print("=" * 60)
     print("GIFT LEADS LIST PIPELINE")
@@ -1002,7 +1123,8 @@ def run_gift_leads_pipeline(
             print("Dry run: prospect profile not in cache. Provide cached data or run without --dry-run.")
             return results
     else:
-        prospect_profile = scrape_prospect_profile(prospect_url)
+        with cost_tracker.stage("prospect_profile"):
+            prospect_profile = scrape_prospect_profile(prospect_url)
 
     if not prospect_profile:
         print("Could not get prospect profile. Exiting.")
@@ -1037,7 +1159,8 @@ def run_gift_leads_pipeline(
         }
     else:
         print("\n[2/12] Researching prospect's business...")
-        research = research_prospect_business(prospect_profile, user_icp, user_pain_points)
+        with cost_tracker.stage("research"):
+            research = research_prospect_business(prospect_profile, user_icp, user_pain_points)
 
     icp_description = research.get("icp_description", "")
     results["icp_description"] = icp_description
@@ -1080,7 +1203,8 @@ def run_gift_leads_pipeline(
 
                 # Generate signal notes
                 print("\n[11/12] Generating signal notes...")
-                qualified = generate_signal_notes(qualified, icp_description)
+                with cost_tracker.stage("signal_notes"):
+                    qualified = generate_signal_notes(qualified, icp_description)
                 results["leads_with_notes"] = len(qualified)
 
                 # Export
@@ -1127,7 +1251,8 @@ def run_gift_leads_pipeline(
         print(f"  Loaded {len(queries)} queries from file")
     else:
         print("\n[3/12] Generating search queries...")
-        queries = generate_search_queries(research, days_back, prospect_profile=prospect_profile)
+        with cost_tracker.stage("search_queries"):
+            queries = generate_search_queries(research, days_back, prospect_profile=prospect_profile)
     results["queries_generated"] = len(queries)
 
     if not queries:
@@ -1137,13 +1262,18 @@ def run_gift_leads_pipeline(
     # ── Step 4: Search Google for LinkedIn posts ──
     print("\n[4/12] Searching Google for LinkedIn posts...")
     all_search_results = []
-    for i, query in enumerate(queries, 1):
-        print(f"  Query [{i}/{len(queries)}]: {query}")
-        if dry_run:
-            print("    (dry run: skipping API call)")
-            continue
-        query_results = search_google_raw_query(query, max_pages=1, results_per_page=10)
-        all_search_results.extend(query_results)
+    if dry_run:
+        for i, query in enumerate(queries, 1):
+            print(f"  Query [{i}/{len(queries)}]: {query}")
+        print("    (dry run: skipping API calls)")
+    else:
+        # All queries go out in a few batched runs instead of one run each
+        with cost_tracker.stage("google_search"):
+            results_by_query = search_google_raw_queries(queries, max_pages=1, results_per_page=10)
+        for i, query in enumerate(queries, 1):
+            print(f"  Query [{i}/{len(queries)}]: {len(results_by_query.get(query.strip(), []))} results - {query}")
+        for query_results in results_by_query.values():
+            all_search_results.extend(query_results)
 
     results["posts_found"] = len(all_search_results)
     print(f"  Total search results: {len(all_search_results)}")
@@ -1185,8 +1315,8 @@ def run_gift_leads_pipeline(
         print("  (dry run: skipping engager scraping)")
         engagers = []
     else:
-        engagers = scrape_post_engagers(post_urls)
-        cost_tracker.add_post_reactions(len(post_urls))
+        with cost_tracker.stage("post_engagers"):
+            engagers = scrape_post_engagers(post_urls)
 
     results["engagers_found"] = len(engagers)
 
@@ -1233,8 +1363,8 @@ def run_gift_leads_pipeline(
         location_filtered = filter_by_location(profiles, countries)
         complete = filter_complete_profiles(location_filtered)
         if complete:
-            qualified = qualify_leads_with_deepseek(complete, icp_criteria=icp_description)
-            cost_tracker.add_icp_check(len(complete))
+            with cost_tracker.stage("icp"):
+                qualified = qualify_leads_with_deepseek(complete, icp_criteria=icp_description)
         total_scraped = len(profiles)
         total_location_filtered = len(location_filtered)
         total_complete = len(complete)
@@ -1247,8 +1377,8 @@ def run_gift_leads_pipeline(
 
             print(f"\n  --- Batch {batch_idx + 1}/{num_batches} ({len(batch_urls)} profiles) ---")
 
-            profiles = scrape_linkedin_profiles(batch_urls, wait_seconds=120, poll_interval=30)
-            cost_tracker.add_profile_scrape(len(profiles))
+            with cost_tracker.stage("profiles"):
+                profiles = scrape_linkedin_profiles(batch_urls)
             total_scraped += len(profiles)
 
             profiles = enrich_profiles_with_engagement(profiles, engagement_context)
@@ -1259,8 +1389,8 @@ def run_gift_leads_pipeline(
             total_complete += len(complete)
 
             if complete:
-                batch_qualified = qualify_leads_with_deepseek(complete, icp_criteria=icp_description)
-                cost_tracker.add_icp_check(len(complete))
+                with cost_tracker.stage("icp"):
+                    batch_qualified = qualify_leads_with_deepseek(complete, icp_criteria=icp_description)
                 qualified.extend(batch_qualified)
                 print(f"  Batch result: {len(batch_qualified)} qualified ({len(qualified)} total)")
             else:
@@ -1303,7 +1433,8 @@ def run_gift_leads_pipeline(
 
     # ── Step 11: Generate signal notes ──
     print("\n[11/12] Generating signal notes...")
-    qualified = generate_signal_notes(qualified, icp_description)
+    with cost_tracker.stage("signal_notes"):
+        qualified = generate_signal_notes(qualified, icp_description)
     results["leads_with_notes"] = len(qualified)
 
     # ── Step 12: Export JSON + CSV ──
@@ -1343,6 +1474,9 @@ def run_gift_leads_pipeline(
         print(f"  {key}: {value}")
     print("=" * 60)
     print("\n" + cost_tracker.get_summary())
+    per_lead = cost_tracker.cost_per_lead(len(qualified))
+    if per_lead is not None:
+        print(f"Cost per delivered lead: ${per_lead:.4f}")
 
     # Post run record
     elapsed = time.time() - start_time
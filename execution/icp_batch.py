@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ICP Batch - Classify several leads against the ICP in one DeepSeek request.
+
+A per-lead ICP check resends the same long system prompt for every lead and
+costs one round trip each. Here up to ICP_BATCH_SIZE numbered lead summaries
+share one request, and the model answers with one verdict per lead:
+
+    {"verdicts": [{"id": 1, "match": true, "confidence": "high", "reason": "..."}, ...]}
+
+Each verdict is validated on its own. Leads whose verdict is missing or
+malformed (or whose whole request failed) are re-queued into the next
+round; only what is still unresolved after ICP_BATCH_MAX_ROUNDS goes
+through the caller's single-lead check, which keeps its own local-rules
+fallback. A single lead always uses the single-lead check.
+
+Requests are sent concurrently on one asyncio event loop (httpx), at most
+max_in_flight at a time, each attempt with its own deadline. They go
+through llm_client.llm_post_async, so throttled (429/5xx) or timed-out
+attempts are retried with the same backoff as the pooled client and token
+usage is recorded; a request that still fails counts as failed and its
+leads are re-queued. Verdicts always come back in lead order.
+max_in_flight=1 (or a missing httpx) sends them one at a time through the
+shared pooled client (llm_client.py), which applies the same retries.
+
+Verdicts are cached in the shared KV cache (kv_cache.py), keyed by a hash
+of the lead summary sent to the model plus a hash of the prompt (system
+prompt, criteria, answer format). A returning lead with unchanged fields
+costs no request, and editing the ICP prompt invalidates every cached
+verdict without any manual version bump.
+
+Usage:
+    from icp_batch import classify_leads_icp
+    verdicts, stats = classify_leads_icp(leads, summarize, system_prompt,
+                                         icp_criteria, api_key, check_icp_match_deepseek)
+"""
+
+import json
+import math
+import asyncio
+import hashlib
+import threading
+import contextvars
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kv_cache import get_kv_cache
+
+DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+
+# Leads per request: large enough to amortize the system prompt, small enough
+# that one bad answer doesn't cost much to redo
+ICP_BATCH_SIZE = 10
+
+# Batched attempts before the remaining leads go one by one
+ICP_BATCH_MAX_ROUNDS = 2
+
+# DeepSeek requests in flight at once, and how long each may take
+ICP_MAX_IN_FLIGHT = 20
+ICP_REQUEST_DEADLINE_SECONDS = 60
+
+# Verdicts are reused until the lead's fields or the prompt change, or this long
+ICP_VERDICT_NAMESPACE = "icp_verdicts"
+ICP_VERDICT_CACHE_TTL_DAYS = 90
+
+# Fallback verdicts that say nothing about the model's opinion
+_UNCACHED_CONFIDENCE = ("local", "error")
+
+# Output budget: per-verdict JSON plus the wrapper
+_TOKENS_PER_VERDICT = 60
+_TOKENS_OVERHEAD = 50
+
+_VERDICT_FORMAT = """Respond in JSON format, with exactly one verdict per lead, using the lead's number as "id":
+{
+  "verdicts": [
+    {"id": 1, "match": true/false, "confidence": "high" | "medium" | "low", "reason": "Brief explanation (1 sentence)"}
+  ]
+}"""
+
+
+def build_batch_prompt(summaries: List[str], icp_criteria: Optional[str] = None) -> str:
+    """User prompt for one batch of numbered lead summaries."""
+    leads_text = "\n".join(f"### Lead {i}\n{summary.strip()}\n" for i, summary in enumerate(summaries, 1))
+    if icp_criteria:
+        intro = (f"You are verifying if LinkedIn leads match the Ideal Customer Profile (ICP).\n\n"
+                 f"ICP Criteria: {icp_criteria}\n\n"
+                 f"Task: Determine if each of these {len(summaries)} leads matches the ICP.")
+    else:
+        intro = f"Evaluate each of these {len(summaries)} LinkedIn profiles."
+    return f"{intro}\n\n{leads_text}\n{_VERDICT_FORMAT}"
+
+
+def _parse_match(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return None
+
+
+def parse_batch_verdicts(text: str, count: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Extract the valid verdicts from a batch response.
+
+    Args:
+        text: Model output
+        count: Number of leads in the batch
+
+    Returns:
+        Dict of 0-based lead position -> {"match", "confidence", "reason"};
+        positions without a usable verdict are absent
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+
+    entries = data.get("verdicts") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}
+
+    verdicts = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            position = int(entry.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        match = _parse_match(entry.get("match"))
+        if not 0 <= position < count or match is None or position in verdicts:
+            continue
+        verdicts[position] = {
+            "match": match,
+            "confidence": str(entry.get("confidence") or "unknown"),
+            "reason": str(entry.get("reason") or ""),
+        }
+    return verdicts
+
+
+def _batch_payload(summaries: List[str], system_prompt: str, icp_criteria: Optional[str]) -> Dict:
+    return {
+        "model": "deepseek-chat",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": build_batch_prompt(summaries, icp_criteria)},
+        ],
+        "max_tokens": _TOKENS_OVERHEAD + _TOKENS_PER_VERDICT * len(summaries),
+        "temperature": 0.3,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def classify_icp_batch(
+    summaries: List[str],
+    system_prompt: str,
+    icp_criteria: Optional[str],
+    api_key: str,
+    api_url: str = DEEPSEEK_API_URL,
+    deadline_seconds: float = ICP_REQUEST_DEADLINE_SECONDS,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    One DeepSeek request for a batch of leads.
+
+    Returns:
+        Valid verdicts by 0-based position (empty if the request failed)
+    """
+    from llm_client import llm_post
+
+    try:
+        response = llm_post(
+            api_url,
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            json=_batch_payload(summaries, system_prompt, icp_criteria),
+            timeout=deadline_seconds,
+        )
+        response.raise_for_status()
+        text = response.json()["choices"][0]["message"]["content"]
+    except Exception as e:
+        print(f"  Warning: DeepSeek batch ICP error ({len(summaries)} leads): {e}")
+        return {}
+    return parse_batch_verdicts(text, len(summaries))
+
+
+async def _classify_icp_batch_async(
+    client,
+    semaphore: asyncio.Semaphore,
+    summaries: List[str],
+    system_prompt: str,
+    icp_criteria: Optional[str],
+    api_key: str,
+    api_url: str,
+    deadline_seconds: float,
+) -> Dict[int, Dict[str, Any]]:
+    """classify_icp_batch on a shared httpx.AsyncClient, within the in-flight limit."""
+    from llm_client import llm_post_async
+
+    async with semaphore:
+        try:
+            response = await llm_post_async(
+                client,
+                api_url,
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json=_batch_payload(summaries, system_prompt, icp_criteria),
+                timeout=deadline_seconds,
+            )
+            response.raise_for_status()
+            text = response.json()["choices"][0]["message"]["content"]
+        except asyncio.TimeoutError:
+            print(f"  Warning: DeepSeek batch ICP request missed its {deadline_seconds:.0f}s deadline "
+                  f"({len(summaries)} leads)")
+            return {}
+        except Exception as e:
+            print(f"  Warning: DeepSeek batch ICP error ({len(summaries)} leads): {e}")
+            return {}
+    return parse_batch_verdicts(text, len(summaries))
+
+
+def _chunks(pending: List[int], batch_size: int) -> List[List[int]]:
+    """Evenly sized chunks, so no lead ends up alone in a batch."""
+    size = math.ceil(len(pending) / math.ceil(len(pending) / batch_size))
+    return [pending[start:start + size] for start in range(0, len(pending), size)]
+
+
+async def classify_leads_icp_async(
+    leads: List[Dict],
+    summarize: Callable[[Dict], str],
+    system_prompt: str,
+    icp_criteria: Optional[str],
+    api_key: str,
+    single_check: Callable[[Dict, Optional[str]], Dict[str, Any]],
+    batch_size: int = ICP_BATCH_SIZE,
+    max_in_flight: int = ICP_MAX_IN_FLIGHT,
+    deadline_seconds: float = ICP_REQUEST_DEADLINE_SECONDS,
+    api_url: str = DEEPSEEK_API_URL,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Async classify_leads_icp: every request of a round is in flight at once
+    (up to max_in_flight), and single-lead fallbacks run on worker threads.
+    """
+    import httpx
+
+    verdicts: List[Optional[Dict[str, Any]]] = [None] * len(leads)
+    stats = {"requests": 0, "batched": 0, "requeued": 0, "single": 0}
+    semaphore = asyncio.Semaphore(max_in_flight)
+    summaries = [summarize(lead) for lead in leads]
+
+    pending = list(range(len(leads)))
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(limits=limits, timeout=deadline_seconds) as client:
+        rounds = 0
+        while len(pending) > 1 and rounds < ICP_BATCH_MAX_ROUNDS:
+            chunks = _chunks(pending, batch_size)
+            results = await asyncio.gather(*(
+                _classify_icp_batch_async(client, semaphore, [summaries[i] for i in chunk], system_prompt,
+                                          icp_criteria, api_key, api_url, deadline_seconds)
+                for chunk in chunks
+            ))
+            stats["requests"] += len(chunks)
+            failed = []
+            for chunk, got in zip(chunks, results):
+                for position, i in enumerate(chunk):
+                    if position in got:
+                        verdicts[i] = got[position]
+                        stats["batched"] += 1
+                    else:
+                        failed.append(i)
+            stats["requeued"] += len(failed)
+            pending = failed
+            rounds += 1
+
+    async def check_one(i: int):
+        async with semaphore:
+            verdicts[i] = await asyncio.to_thread(single_check, leads[i], icp_criteria)
+
+    await asyncio.gather(*(check_one(i) for i in pending))
+    stats["single"] += len(pending)
+    stats["requests"] += len(pending)
+    return verdicts, stats
+
+
+def _run_coroutine(coro):
+    """asyncio.run, or on a helper thread when called from inside an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def run():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    # Keep the caller's run tracker and stage on the helper thread
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(run,))
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def _classify_uncached(
+    leads: List[Dict],
+    summarize: Callable[[Dict], str],
+    system_prompt: str,
+    icp_criteria: Optional[str],
+    api_key: Optional[str],
+    single_check: Callable[[Dict, Optional[str]], Dict[str, Any]],
+    batch_size: int,
+    max_in_flight: int,
+    deadline_seconds: float,
+    api_url: str,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Verdicts from the LLM (async when possible, else sequential), in lead order."""
+    if api_key and len(leads) > 1 and max_in_flight > 1:
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            print("  Warning: httpx not installed, qualifying leads one request at a time")
+        else:
+            return _run_coroutine(classify_leads_icp_async(
+                leads, summarize, system_prompt, icp_criteria, api_key, single_check,
+                batch_size=batch_size, max_in_flight=max_in_flight,
+                deadline_seconds=deadline_seconds, api_url=api_url,
+            ))
+
+    verdicts: List[Optional[Dict[str, Any]]] = [None] * len(leads)
+    stats = {"requests": 0, "batched": 0, "requeued": 0, "single": 0}
+
+    pending = list(range(len(leads)))
+    if api_key and batch_size > 1:
+        summaries = [summarize(lead) for lead in leads]
+        rounds = 0
+        while len(pending) > 1 and rounds < ICP_BATCH_MAX_ROUNDS:
+            failed = []
+            for chunk in _chunks(pending, batch_size):
+                got = classify_icp_batch([summaries[i] for i in chunk], system_prompt, icp_criteria, api_key,
+                                         api_url=api_url, deadline_seconds=deadline_seconds)
+                stats["requests"] += 1
+                for position, i in enumerate(chunk):
+                    if position in got:
+                        verdicts[i] = got[position]
+                        stats["batched"] += 1
+                    else:
+                        failed.append(i)
+            stats["requeued"] += len(failed)
+            pending = failed
+            rounds += 1
+
+    for i in pending:
+        verdicts[i] = single_check(leads[i], icp_criteria)
+        stats["single"] += 1
+        if api_key:
+            stats["requests"] += 1
+
+    return verdicts, stats
+
+
+# =============================================================================
+# VERDICT CACHE
+# =============================================================================
+
+def icp_prompt_version(system_prompt: str, icp_criteria: Optional[str]) -> str:
+    """Short hash of everything about the ICP prompt that isn't the lead."""
+    text = "\0".join([system_prompt, icp_criteria or "", _VERDICT_FORMAT])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def icp_verdict_key(summary: str, prompt_version: str) -> str:
+    """Cache key: the lead fields actually sent to the model, under one prompt version."""
+    return prompt_version + ":" + hashlib.sha256(summary.strip().encode("utf-8")).hexdigest()
+
+
+def classify_leads_icp(
+    leads: List[Dict],
+    summarize: Callable[[Dict], str],
+    system_prompt: str,
+    icp_criteria: Optional[str],
+    api_key: Optional[str],
+    single_check: Callable[[Dict, Optional[str]], Dict[str, Any]],
+    batch_size: int = ICP_BATCH_SIZE,
+    max_in_flight: int = ICP_MAX_IN_FLIGHT,
+    deadline_seconds: float = ICP_REQUEST_DEADLINE_SECONDS,
+    api_url: str = DEEPSEEK_API_URL,
+    cache_ttl_days: Optional[float] = ICP_VERDICT_CACHE_TTL_DAYS,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    ICP verdicts for a list of leads, batching requests where possible.
+
+    Leads whose summary was already classified under the same prompt come
+    from the verdict cache without any request; only model verdicts are
+    cached (local-rule fallbacks and errors are not).
+
+    Args:
+        leads: Lead dictionaries
+        summarize: Builds one lead's summary text
+        system_prompt: ICP system prompt (sent once per batch)
+        icp_criteria: Optional custom ICP criteria
+        api_key: DeepSeek API key (None = single-lead checks only)
+        single_check: Per-lead check, called as single_check(lead, icp_criteria)
+        batch_size: Leads per request (1 = no batching)
+        max_in_flight: Concurrent requests (1 = one at a time)
+        deadline_seconds: Per-request deadline
+        api_url: Chat completions endpoint
+        cache_ttl_days: How long verdicts are reused (0/None = no cache)
+
+    Returns:
+        (verdicts in lead order, stats: requests/batched/requeued/single/cached)
+    """
+    verdicts: List[Optional[Dict[str, Any]]] = [None] * len(leads)
+    keys: List[str] = []
+    cache = None
+    if cache_ttl_days:
+        version = icp_prompt_version(system_prompt, icp_criteria)
+        keys = [icp_verdict_key(summarize(lead), version) for lead in leads]
+        try:
+            cache = get_kv_cache()
+            for i, key in enumerate(keys):
+                verdicts[i] = cache.get(ICP_VERDICT_NAMESPACE, key)
+        except Exception as e:
+            print(f"  Warning: ICP verdict cache unavailable: {e}")
+            cache = None
+
+    misses = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    fresh, stats = _classify_uncached(
+        [leads[i] for i in misses], summarize, system_prompt, icp_criteria, api_key, single_check,
+        batch_size, max_in_flight, deadline_seconds, api_url,
+    )
+    stats["cached"] = len(leads) - len(misses)
+
+    for i, verdict in zip(misses, fresh):
+        verdicts[i] = verdict
+        if cache is not None and verdict.get("confidence") not in _UNCACHED_CONFIDENCE:
+            try:
+                cache.set(ICP_VERDICT_NAMESPACE, keys[i], verdict, ttl_seconds=cache_ttl_days * 86400)
+            except Exception as e:
+                print(f"  Warning: could not cache ICP verdict: {e}")
+
+    return verdicts, stats
@@ -58,6 +58,8 @@ from keyword_engagement_monitor import (
     aggregate_profile_urls,
     deduplicate_profile_urls
 )
+from apify_governor import call_actor
+from engager_cache import REACTIONS_RUN_COST_USD
 
 
 # =============================================================================
@@ -119,7 +121,7 @@ def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
         }
 
         try:
-            run = client.actor(POST_REACTIONS_ACTOR).call(run_input=run_input)
+            run = call_actor(client, POST_REACTIONS_ACTOR, run_input, estimated_cost_usd=REACTIONS_RUN_COST_USD)
 
             for item in client.dataset(run["defaultDatasetId"]).iterate_items():
                 all_engagers.append(item)
@@ -217,7 +219,7 @@ def run_influencer_monitor(
 
     # Step 4: Scrape LinkedIn profiles
     print("\n[4/7] Scraping LinkedIn profiles...")
-    profiles = scrape_linkedin_profiles(profile_urls, wait_seconds=120, poll_interval=30)
+    profiles = scrape_linkedin_profiles(profile_urls)
     results["profiles_scraped"] = len(profiles)
 
     if not profiles:
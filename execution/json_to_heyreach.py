@@ -5,6 +5,8 @@ JSON to HeyReach - Manual review workflow for uploading approved leads.
 
 This tool reads leads from JSON files output by the signal monitors, uploads only
 leads marked as "approved": true, and updates the JSON with upload timestamps.
+JSON Lines output (.jsonl / .jsonl.gz, see state_io) is read and updated in
+the same format.
 
 Workflow:
 1. Signal monitor runs → outputs .tmp/{signal_name}_{timestamp}.json
@@ -22,6 +24,9 @@ Usage:
     
     # Upload multiple files
     python json_to_heyreach.py --input .tmp/*.json --list_id 480247
+
+    # Pipeline output in JSON Lines (unzip first to edit approvals by hand)
+    python json_to_heyreach.py --input .tmp/keyword_engagement_20260121_120000.jsonl --list_id 480247
 """
 
 import os
@@ -45,6 +50,7 @@ HEYREACH_API_KEY = os.getenv("HEYREACH_API_KEY")
 # Import upload function from keyword monitor
 sys.path.insert(0, os.path.dirname(__file__))
 from keyword_engagement_monitor import upload_to_heyreach
+from state_io import read_records, write_records
 
 
 def load_leads_from_json(json_file: str) -> List[Dict]:
@@ -52,17 +58,16 @@ def load_leads_from_json(json_file: str) -> List[Dict]:
     Load leads from JSON file.
     
     Args:
-        json_file: Path to JSON file
+        json_file: Path to JSON, .jsonl or .jsonl.gz file
         
     Returns:
         List of lead dictionaries
     """
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            leads = json.load(f)
+        leads = read_records(json_file)
         
-        if not isinstance(leads, list):
-            print(f"Error: Expected list in {json_file}, got {type(leads)}")
+        if not all(isinstance(lead, dict) for lead in leads):
+            print(f"Error: Expected a list of leads in {json_file}")
             return []
         
         return leads
@@ -103,8 +108,7 @@ def update_json_with_upload_status(json_file: str, uploaded_leads: List[Dict]):
     """
     try:
         # Load current data
-        with open(json_file, 'r', encoding='utf-8') as f:
-            all_leads = json.load(f)
+        all_leads = read_records(json_file)
         
         # Create a set of LinkedIn URLs that were uploaded
         uploaded_urls = {lead.get("linkedinUrl") for lead in uploaded_leads}
@@ -115,9 +119,12 @@ def update_json_with_upload_status(json_file: str, uploaded_leads: List[Dict]):
             if lead.get("linkedinUrl") in uploaded_urls:
                 lead["heyreach_uploaded_at"] = timestamp
         
-        # Save back to file
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(all_leads, f, indent=2)
+        # Save back to file, in the format it was read in
+        if json_file.endswith(".json"):
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(all_leads, f, indent=2)
+        else:
+            write_records(json_file, all_leads)
         
         print(f"Updated {json_file} with upload timestamps")
         
@@ -232,7 +239,7 @@ def main():
     )
     parser.add_argument(
         "--input", required=True,
-        help="Path to JSON file(s) - supports wildcards (e.g., .tmp/*.json)"
+        help="Path to JSON/JSONL file(s) - supports wildcards (e.g., .tmp/*.json, .tmp/*.jsonl.gz)"
     )
     parser.add_argument(
         "--list_id", type=int,
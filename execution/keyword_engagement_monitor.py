@@ -26,11 +26,17 @@ import sys
 import json
 import re
 import argparse
-import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 from dotenv import load_dotenv
-from prompts import get_linkedin_5_line_prompt
+from prompts import get_linkedin_5_line_prompt_parts, build_cached_messages, LINKEDIN_DM_SYSTEM_PROMPT
+from state_io import write_records, STATE_SUFFIX
+from profile_store import get_shared_profile_cache, normalize_linkedin_url, PROFILE_CACHE_MAX_AGE_DAYS
+from apify_runs import wait_for_run
+from search_cache import get_cached_search, cache_search_results, SEARCH_CACHE_TTL_HOURS
+from engager_cache import fetch_post_engagers, ENGAGER_CACHE_FRESH_HOURS
+from apify_governor import ApifyBudgetExceeded, call_actor, get_apify_governor, run_cost_usd
+from icp_batch import classify_leads_icp, ICP_BATCH_SIZE, ICP_MAX_IN_FLIGHT
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -64,8 +70,9 @@ def get_default_config() -> Dict[str, Any]:
         "results_per_page": 10,
         "allowed_countries": ["United States", "Canada", "USA", "America"],
         "heyreach_list_id": 480247,
-        "scrape_wait_seconds": 120,
-        "poll_interval_seconds": 30,
+        "profile_scrape_timeout_seconds": None,  # None = sized to the batch
+        "search_cache_ttl_hours": SEARCH_CACHE_TTL_HOURS,
+        "engager_cache_fresh_hours": ENGAGER_CACHE_FRESH_HOURS,
     }
 
 
@@ -243,20 +250,31 @@ def search_google_linkedin_posts(
     keywords: str,
     days_back: int = 7,
     max_pages: int = 1,
-    results_per_page: int = 10
+    results_per_page: int = 10,
+    cache_ttl_hours: Optional[float] = SEARCH_CACHE_TTL_HOURS
 ) -> List[Dict]:
     """
     Search Google for LinkedIn posts using Apify.
 
+    The same query, date window and paging searched within cache_ttl_hours
+    (by any pipeline) is served from the local search cache.
+
     Args:
         keywords: Search keywords
         days_back: Days to look back
         max_pages: Maximum pages per query
         results_per_page: Results per page
+        cache_ttl_hours: Search cache TTL (0 or None to always search)
 
     Returns:
         List of search results
     """
+    query = build_google_search_query(keywords, days_back)
+    cached = get_cached_search(query, max_pages, results_per_page, cache_ttl_hours)
+    if cached is not None:
+        print(f"Search cache hit: {query} ({len(cached)} results)")
+        return cached
+
     if not APIFY_API_TOKEN:
         print("Error: APIFY_API_TOKEN not found in .env")
         return []
@@ -268,8 +286,6 @@ def search_google_linkedin_posts(
         print("Error: apify-client not installed. Run: pip install apify-client")
         return []
 
-    query = build_google_search_query(keywords, days_back)
-
     print(f"Searching Google for LinkedIn posts: {query}")
 
     run_input = {
@@ -280,13 +296,15 @@ def search_google_linkedin_posts(
     }
 
     try:
-        run = client.actor(GOOGLE_SEARCH_ACTOR).call(run_input=run_input)
+        run = call_actor(client, GOOGLE_SEARCH_ACTOR, run_input,
+                         estimated_cost_usd=max_pages * results_per_page * APIFY_COSTS["google_search"])
 
         results = []
         for item in client.dataset(run["defaultDatasetId"]).iterate_items():
             results.append(item)
 
         print(f"Found {len(results)} search results")
+        cache_search_results(query, max_pages, results_per_page, results, cache_ttl_hours)
         return results
 
     except Exception as e:
@@ -341,12 +359,21 @@ def deduplicate_profile_urls(urls: List[str]) -> List[str]:
     return unique
 
 
-def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
+def scrape_post_engagers(
+    post_urls: List[str],
+    cache_fresh_hours: Optional[float] = ENGAGER_CACHE_FRESH_HOURS,
+) -> List[Dict]:
     """
     Scrape engagers (reactions) from LinkedIn posts using Apify.
 
+    Posts go through the per-post engager cache shared with the competitor
+    pipeline, so a post found again only pays for reactions added since it
+    was last scraped.
+
     Args:
         post_urls: List of LinkedIn post URLs
+        cache_fresh_hours: Reuse a post's cached engagers without a run
+            for this long (0 = always check for new reactions)
 
     Returns:
         List of engager dictionaries
@@ -367,15 +394,11 @@ def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
     for url in post_urls:
         print(f"Scraping engagers from: {url}")
 
-        run_input = {
-            "post_urls": [url]
-        }
-
         try:
-            run = client.actor(POST_REACTIONS_ACTOR).call(run_input=run_input)
-
-            for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-                all_engagers.append(item)
+            engagers, runs = fetch_post_engagers(client, POST_REACTIONS_ACTOR, url, cache_fresh_hours)
+            all_engagers.extend(engagers)
+            if not runs:
+                print(f"  {len(engagers)} engagers from cache")
 
         except Exception as e:
             print(f"Error scraping post engagers: {e}")
@@ -390,16 +413,17 @@ def scrape_post_engagers(post_urls: List[str]) -> List[Dict]:
 
 def scrape_linkedin_profiles(
     profile_urls: List[str],
-    wait_seconds: int = 120,
-    poll_interval: int = 30
+    timeout_seconds: Optional[float] = None
 ) -> List[Dict]:
     """
-    Scrape LinkedIn profiles using Apify.
+    Scrape LinkedIn profiles using Apify (through the shared profile cache).
+
+    Profiles already cached by any pipeline are reused; only missing or
+    stale ones are scraped. Stale copies are returned if the refresh fails.
 
     Args:
         profile_urls: List of profile URLs to scrape
-        wait_seconds: Initial wait time for scraper
-        poll_interval: Polling interval to check completion
+        timeout_seconds: Max wait for the Apify run (default sized to the batch)
 
     Returns:
         List of profile dictionaries
@@ -410,51 +434,63 @@ def scrape_linkedin_profiles(
 
     import requests
 
-    print(f"Starting LinkedIn profile scraper for {len(profile_urls)} profiles...")
+    cache = get_shared_profile_cache()
+    fresh, stale = cache.lookup(
+        (normalize_linkedin_url(url) for url in profile_urls),
+        max_age_seconds=PROFILE_CACHE_MAX_AGE_DAYS * 86400,
+    )
+    cached_profiles = [fresh[normalize_linkedin_url(url)] for url in profile_urls if normalize_linkedin_url(url) in fresh]
+    urls_to_scrape = [url for url in profile_urls if normalize_linkedin_url(url) not in fresh]
+    print(f"Profile cache: {len(cached_profiles)} cached, {len(urls_to_scrape)} to scrape")
+
+    # Returned when the refresh fails: stale data beats no data
+    fallback_profiles = cached_profiles + list(stale.values())
+
+    if not urls_to_scrape:
+        print("All profiles already cached, skipping Apify scrape")
+        return cached_profiles
+
+    print(f"Starting LinkedIn profile scraper for {len(urls_to_scrape)} profiles...")
 
     # Start the actor run
     start_url = f"https://api.apify.com/v2/acts/{PROFILE_SCRAPER_ACTOR}/runs?token={APIFY_API_TOKEN}"
 
     payload = {
-        "profileUrls": profile_urls
+        "profileUrls": urls_to_scrape
     }
 
+    # Hold an account-wide governor slot from start until the run ends
+    governor = get_apify_governor()
     try:
-        response = requests.post(start_url, json=payload)
-        response.raise_for_status()
-        run_data = response.json()["data"]
-        run_id = run_data["id"]
-        dataset_id = run_data["defaultDatasetId"]
-
-        print(f"Run started: {run_id}")
-
-    except Exception as e:
+        lease = governor.acquire(PROFILE_SCRAPER_ACTOR,
+                                 estimated_cost_usd=len(urls_to_scrape) * APIFY_COSTS["profile_scraper"])
+    except (ApifyBudgetExceeded, TimeoutError) as e:
         print(f"Error starting profile scraper: {e}")
-        return []
-
-    # Wait for initial scraping
-    print(f"Waiting {wait_seconds}s for scraping...")
-    time.sleep(wait_seconds)
-
-    # Poll for completion
-    status_url = f"https://api.apify.com/v2/actor-runs/{run_id}?token={APIFY_API_TOKEN}"
+        return fallback_profiles
 
-    while True:
+    run = None
+    try:
         try:
-            response = requests.get(status_url)
+            response = requests.post(start_url, json=payload)
             response.raise_for_status()
-            status = response.json()["data"]["status"]
-
-            if status in ["SUCCEEDED", "ABORTED"]:
-                print(f"Scraper finished with status: {status}")
-                break
+            run_data = response.json()["data"]
+            run_id = run_data["id"]
+            dataset_id = run_data["defaultDatasetId"]
 
-            print(f"Status: {status}, waiting {poll_interval}s...")
-            time.sleep(poll_interval)
+            print(f"Run started: {run_id}")
 
         except Exception as e:
-            print(f"Error polling status: {e}")
-            break
+            print(f"Error starting profile scraper: {e}")
+            governor.release(lease, actual_cost_usd=0.0)
+            return fallback_profiles
+
+        # Returns as soon as the run ends; partial results are still fetched
+        run = wait_for_run(run_id, APIFY_API_TOKEN, expected_items=len(urls_to_scrape),
+                           timeout_seconds=timeout_seconds)
+    finally:
+        governor.release(lease, actual_cost_usd=run_cost_usd(run))
+    if run.get("status") != "SUCCEEDED":
+        print(f"Warning: profile scraper ended {run.get('status')}, fetching partial results")
 
     # Fetch results
     data_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={APIFY_API_TOKEN}"
@@ -462,14 +498,16 @@ def scrape_linkedin_profiles(
     try:
         response = requests.get(data_url, headers={"Accept": "application/json"})
         response.raise_for_status()
-        profiles = response.json()
+        new_profiles = cache.put_scraped(response.json())
+        print(f"Retrieved {len(new_profiles)} profiles")
 
-        print(f"Retrieved {len(profiles)} profiles")
-        return profiles
+        refreshed = {normalize_linkedin_url(p.get("linkedinUrl") or "") for p in new_profiles}
+        unrefreshed = [p for key, p in stale.items() if key not in refreshed]
+        return cached_profiles + new_profiles + unrefreshed
 
     except Exception as e:
         print(f"Error fetching profile data: {e}")
-        return []
+        return fallback_profiles
 
 
 # =============================================================================
@@ -653,6 +691,40 @@ def qualify_lead_icp(lead: Dict) -> Dict[str, Any]:
     }
 
 
+# Default ICP: Sales Automation and Personal Branding agency
+ICP_SYSTEM_PROMPT = """Role: B2B Lead Qualification Filter.
+
+Objective: Categorize LinkedIn profiles based on Authority and Industry fit for a Sales Automation and Personal Branding agency.
+
+Rules for Authority (Strict):
+- Qualify: CEOs, Founders, Co-Founders, Managing Directors, Owners, Partners, VPs, and C-Suite executives.
+- Reject: Interns, Students, Junior staff, Administrative assistants (e.g., "Assessor administrativo"), and low-level individual contributors.
+
+Rules for B2B Industry (Lenient):
+- Qualify: High-ticket service industries (Agencies, SaaS, Consulting, Coaching, Tech).
+
+The "Benefit of Doubt" Rule: If you are unsure if a business is B2B or B2C, or unsure if the person is a top-level decision-maker, Qualify them (Set to true). Only reject if they are clearly non-decision makers or in non-business roles.
+
+Hard Rejections:
+- Leads from massive traditional Banking/Financial institutions (e.g., Santander, Getnet).
+- Physical labor or local retail roles (e.g., Driver, Technician, Cashier).
+
+You are an expert at evaluating sales leads. Always respond with valid JSON."""
+
+CUSTOM_ICP_SYSTEM_PROMPT = "You are an expert at evaluating sales leads against ICP criteria. Always respond with valid JSON."
+
+
+def build_icp_lead_summary(lead: Dict) -> str:
+    """Lead summary for ICP prompts (handles both Vayne and Apify field names)."""
+    return f"""
+Lead: {lead.get('fullName', lead.get('full_name', 'Unknown'))}
+Title: {lead.get('jobTitle', lead.get('job_title', lead.get('title', 'Unknown')))}
+Company: {lead.get('companyName', lead.get('company', lead.get('company_name', 'Unknown')))}
+Location: {lead.get('addressWithCountry', lead.get('location', 'Unknown'))}
+Industry: {lead.get('companyIndustry', lead.get('industry', 'N/A'))}
+"""
+
+
 def check_icp_match_deepseek(lead: Dict, icp_criteria: Optional[str] = None) -> Dict[str, Any]:
     """
     Check if lead matches ICP using DeepSeek (same logic as personalize_and_upload.py).
@@ -660,7 +732,7 @@ def check_icp_match_deepseek(lead: Dict, icp_criteria: Optional[str] = None) ->
 
     Uses default ICP for Sales Automation and Personal Branding agency if not specified.
     """
-    import requests
+    from llm_client import llm_post
 
     if not DEEPSEEK_API_KEY:
         print("  Warning: DEEPSEEK_API_KEY not found, using local ICP rules")
@@ -671,35 +743,11 @@ def check_icp_match_deepseek(lead: Dict, icp_criteria: Optional[str] = None) ->
             "reason": local_result["reason"]
         }
 
-    # Build lead summary (handle both Vayne and Apify field names)
-    lead_summary = f"""
-Lead: {lead.get('fullName', lead.get('full_name', 'Unknown'))}
-Title: {lead.get('jobTitle', lead.get('job_title', lead.get('title', 'Unknown')))}
-Company: {lead.get('companyName', lead.get('company', lead.get('company_name', 'Unknown')))}
-Location: {lead.get('addressWithCountry', lead.get('location', 'Unknown'))}
-Industry: {lead.get('companyIndustry', lead.get('industry', 'N/A'))}
-"""
+    lead_summary = build_icp_lead_summary(lead)
 
     # Use custom ICP criteria if provided, otherwise use default
     if not icp_criteria:
-        system_prompt = """Role: B2B Lead Qualification Filter.
-
-Objective: Categorize LinkedIn profiles based on Authority and Industry fit for a Sales Automation and Personal Branding agency.
-
-Rules for Authority (Strict):
-- Qualify: CEOs, Founders, Co-Founders, Managing Directors, Owners, Partners, VPs, and C-Suite executives.
-- Reject: Interns, Students, Junior staff, Administrative assistants (e.g., "Assessor administrativo"), and low-level individual contributors.
-
-Rules for B2B Industry (Lenient):
-- Qualify: High-ticket service industries (Agencies, SaaS, Consulting, Coaching, Tech).
-
-The "Benefit of Doubt" Rule: If you are unsure if a business is B2B or B2C, or unsure if the person is a top-level decision-maker, Qualify them (Set to true). Only reject if they are clearly non-decision makers or in non-business roles.
-
-Hard Rejections:
-- Leads from massive traditional Banking/Financial institutions (e.g., Santander, Getnet).
-- Physical labor or local retail roles (e.g., Driver, Technician, Cashier).
-
-You are an expert at evaluating sales leads. Always respond with valid JSON."""
+        system_prompt = ICP_SYSTEM_PROMPT
         user_prompt = f"""Evaluate this LinkedIn profile:
 
 {lead_summary}
@@ -711,7 +759,7 @@ Respond in JSON format:
   "reason": "Brief explanation (1 sentence)"
 }}"""
     else:
-        system_prompt = "You are an expert at evaluating sales leads against ICP criteria. Always respond with valid JSON."
+        system_prompt = CUSTOM_ICP_SYSTEM_PROMPT
         user_prompt = f"""You are verifying if a LinkedIn lead matches the Ideal Customer Profile (ICP).
 
 ICP Criteria: {icp_criteria}
@@ -745,7 +793,7 @@ Respond in JSON format:
             "response_format": {"type": "json_object"}
         }
 
-        response = requests.post(
+        response = llm_post(
             "https://api.deepseek.com/chat/completions",
             headers=headers,
             json=payload,
@@ -769,24 +817,41 @@ Respond in JSON format:
         }
 
 
-def qualify_leads_with_deepseek(leads: List[Dict], icp_criteria: Optional[str] = None) -> List[Dict]:
+def qualify_leads_with_deepseek(
+    leads: List[Dict],
+    icp_criteria: Optional[str] = None,
+    batch_size: int = ICP_BATCH_SIZE,
+    max_in_flight: int = ICP_MAX_IN_FLIGHT,
+) -> List[Dict]:
     """
     Qualify leads using DeepSeek API (same as personalize_and_upload.py).
 
+    Up to batch_size leads share one request (icp_batch.py); leads whose
+    batched verdict is missing or malformed are retried, then checked one by
+    one with check_icp_match_deepseek. Up to max_in_flight requests run
+    concurrently; verdicts keep the order of leads. Leads already checked
+    with the same fields and prompt reuse their cached verdict.
+
     Args:
         leads: List of lead dictionaries
         icp_criteria: Optional custom ICP criteria
+        batch_size: Leads per DeepSeek request (1 = one request per lead)
+        max_in_flight: Concurrent DeepSeek requests (1 = sequential)
 
     Returns:
         List of leads that pass ICP qualification with icp_* fields added
     """
     qualified_leads = []
 
-    for idx, lead in enumerate(leads):
-        lead_name = lead.get('fullName', lead.get('full_name', 'Unknown'))
+    system_prompt = CUSTOM_ICP_SYSTEM_PROMPT if icp_criteria else ICP_SYSTEM_PROMPT
+    verdicts, stats = classify_leads_icp(
+        leads, build_icp_lead_summary, system_prompt, icp_criteria,
+        DEEPSEEK_API_KEY, check_icp_match_deepseek,
+        batch_size=batch_size, max_in_flight=max_in_flight,
+    )
 
-        # Check ICP with DeepSeek
-        icp_result = check_icp_match_deepseek(lead, icp_criteria)
+    for idx, (lead, icp_result) in enumerate(zip(leads, verdicts)):
+        lead_name = lead.get('fullName', lead.get('full_name', 'Unknown'))
 
         lead["icp_match"] = icp_result.get("match", True)
         lead["icp_confidence"] = icp_result.get("confidence", "unknown")
@@ -798,6 +863,11 @@ def qualify_leads_with_deepseek(leads: List[Dict], icp_criteria: Optional[str] =
         else:
             print(f"  [ICP-REJECT] #{idx+1}: {lead_name} - {icp_result.get('reason', '')}")
 
+    if stats["cached"]:
+        print(f"\nICP verdict cache: {stats['cached']}/{len(leads)} leads unchanged since their last check")
+    if stats["batched"]:
+        print(f"\nICP batching: {len(leads)} leads in {stats['requests']} requests "
+              f"({stats['requeued']} re-queued, {stats['single']} checked one by one)")
     print(f"\nICP qualification: {len(leads)} -> {len(qualified_leads)} leads")
     return qualified_leads
 
@@ -902,7 +972,7 @@ def generate_personalization_deepseek(lead: Dict) -> str:
     Returns:
         Personalized message string
     """
-    import requests
+    from llm_client import llm_post
 
     if not DEEPSEEK_API_KEY:
         print("  Warning: DEEPSEEK_API_KEY not found, using mock personalization")
@@ -921,7 +991,7 @@ def generate_personalization_deepseek(lead: Dict) -> str:
     location = extract_city_from_location(lead.get("addressWithCountry", lead.get("location", "")))
 
     # Get formatted prompt from centralized source (prompts.py)
-    prompt = get_linkedin_5_line_prompt(
+    prompt_parts = get_linkedin_5_line_prompt_parts(
         first_name=first_name,
         company_name=company,
         title=title,
@@ -938,15 +1008,12 @@ def generate_personalization_deepseek(lead: Dict) -> str:
 
         payload = {
             "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are an expert at creating personalized LinkedIn DMs following strict template rules."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": build_cached_messages(LINKEDIN_DM_SYSTEM_PROMPT, prompt_parts),
             "max_tokens": 400,
             "temperature": 0.7
         }
 
-        response = requests.post(
+        response = llm_post(
             "https://api.deepseek.com/chat/completions",
             headers=headers,
             json=payload,
@@ -1185,7 +1252,9 @@ def run_full_pipeline(
 
     # Step 1: Search Google for LinkedIn posts
     print("\n[1/7] Searching Google for LinkedIn posts...")
-    search_results = search_google_linkedin_posts(keywords, days_back)
+    search_results = search_google_linkedin_posts(
+        keywords, days_back, cache_ttl_hours=config["search_cache_ttl_hours"]
+    )
     results["posts_found"] = len(search_results)
 
     if not search_results:
@@ -1216,7 +1285,7 @@ def run_full_pipeline(
     # Step 3: Scrape post engagers
     print("\n[3/7] Scraping post engagers...")
     post_urls = [p.get("url", p.get("link", "")) for p in filtered_posts if p.get("url") or p.get("link")]
-    engagers = scrape_post_engagers(post_urls)
+    engagers = scrape_post_engagers(post_urls, cache_fresh_hours=config["engager_cache_fresh_hours"])
     results["engagers_found"] = len(engagers)
 
     if not engagers:
@@ -1233,8 +1302,7 @@ def run_full_pipeline(
     print("\n[5/7] Scraping LinkedIn profiles...")
     profiles = scrape_linkedin_profiles(
         profile_urls,
-        wait_seconds=config["scrape_wait_seconds"],
-        poll_interval=config["poll_interval_seconds"]
+        timeout_seconds=config["profile_scrape_timeout_seconds"]
     )
     results["profiles_scraped"] = len(profiles)
 
@@ -1300,11 +1368,8 @@ def run_full_pipeline(
 
     # Save intermediate results with new naming convention
     timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f".tmp/keyword_engagement_{timestamp_file}.json"
-    os.makedirs(".tmp", exist_ok=True)
-
-    with open(output_file, "w") as f:
-        json.dump(qualified_leads, f, indent=2)
+    output_file = f".tmp/keyword_engagement_{timestamp_file}{STATE_SUFFIX}"
+    write_records(output_file, qualified_leads)
 
     print(f"\nResults saved to: {output_file}")
 
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KV Cache - Persistent key/value cache with per-entry TTL, shared across pipelines.
+
+Small, expensive-to-recompute results (Google search pages, per-post
+watermarks, ...) live in one SQLite file in .tmp, split by namespace:
+
+    entries(namespace, key, value JSON, created_at, expires_at)
+
+- get() returns None for missing or expired entries. Callers can also pass
+  max_age_seconds to apply a tighter freshness bound than the one the entry
+  was stored with.
+- set() upserts. Expired rows are purged opportunistically every
+  _PURGE_EVERY writes, so the file doesn't grow without bound.
+- The file is opened in WAL mode, so the API server, CLI runs and cron
+  monitors can read and write it concurrently.
+
+Usage:
+    from kv_cache import get_kv_cache
+    cache = get_kv_cache()
+    hit = cache.get("google_search", key)
+    if hit is None:
+        cache.set("google_search", key, results, ttl_seconds=6 * 3600)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+_TMP_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".tmp"))
+SHARED_KV_CACHE_FILE = os.path.join(_TMP_DIR, "kv_cache.sqlite3")
+
+# Expired rows are deleted once every this many writes
+_PURGE_EVERY = 500
+
+# How long a writer waits for another process's SQLite write lock
+_BUSY_TIMEOUT_SECONDS = 30
+
+
+class KVCache:
+    """SQLite-backed namespaced key/value cache with expiry."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "  namespace TEXT NOT NULL,"
+            "  key TEXT NOT NULL,"
+            "  value TEXT NOT NULL,"
+            "  created_at REAL NOT NULL,"
+            "  expires_at REAL,"
+            "  PRIMARY KEY (namespace, key)"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries (expires_at)")
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str, max_age_seconds: Optional[float] = None) -> Optional[Any]:
+        """
+        Look up a value.
+
+        Args:
+            namespace: Cache namespace (e.g. "google_search")
+            key: Entry key
+            max_age_seconds: Also treat entries older than this as missing
+
+        Returns:
+            The stored value, or None if missing, expired or too old
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            fresh = (
+                row is not None
+                and (row[2] is None or row[2] > now)
+                and (max_age_seconds is None or now - row[1] <= max_age_seconds)
+            )
+            if not fresh:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a JSON-serializable value; ttl_seconds=None keeps it until overwritten."""
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, data, now, expires_at),
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete every expired entry. Returns the number removed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Entry counts per namespace and this process's hit/miss totals."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(length(value)), 0) FROM entries GROUP BY namespace"
+            ).fetchall()
+            lookups = self._hits + self._misses
+            return {
+                "namespaces": {ns: {"entries": count, "bytes": size} for ns, count, size in rows},
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Open caches, one per path, shared by every caller in the process
+_caches: Dict[str, KVCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_kv_cache(path: Optional[str] = None) -> KVCache:
+    """Return the process-wide KVCache for a path (the shared .tmp cache by default)."""
+    path = path or SHARED_KV_CACHE_FILE
+    key = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = KVCache(path)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lead Ledger - Append-only record of leads already processed by the pipelines.
+
+Replaces the monolithic .tmp/processed_leads.json, which was reloaded in full
+for every membership check and rewritten in full for every insert.
+
+Format: one JSON record per line (JSONL), e.g.
+    {"url": "https://www.linkedin.com/in/janedoe", "name": "Jane Doe",
+     "added": "2026-02-03T09:58:46", "source": "competitor_post", "list_id": 480247}
+
+A later record for the same URL supersedes the earlier one. The ledger keeps
+an in-process hash index of url -> metadata:
+- Lookups hit the index (O(1)).
+- Inserts append one line per lead (O(1) amortized).
+- Appends made by other processes are picked up by reading from the last
+  known file offset, never by re-reading the whole file.
+- When superseded lines outnumber live ones, the file is compacted
+  (rewritten with one line per URL and atomically swapped in).
+
+Optionally a persisted Bloom filter (bloom_filter.py) sits next to the
+ledger. It answers "definitely not processed" in bounded memory, so a batch
+of fresh URLs can be filtered without building the exact index at all. The
+filter records the ledger offset it covers and tails new lines the same way
+the index does. It is rebuilt from the ledger if the file was compacted or
+replaced, and grown (capacity doubled) once it fills up. The filter is
+saved by writers only, under the ledger lock, and only once
+BLOOM_SAVE_INTERVAL records have been added since the last save; whoever
+loads it next tails the few lines it does not cover yet.
+
+Every snapshot (compaction or legacy import) starts with a header line
+{"generation": "<random id>"}. Readers compare it against the generation
+their offset belongs to, so a swapped-in file is never tailed from a stale
+offset (inode numbers are reused after os.replace and cannot tell files
+apart).
+
+The legacy processed_leads.json is imported once, when the ledger file does
+not exist yet.
+
+Writers (append, compaction, migration) hold a cross-process FileLock on
+"<ledger>.lock", so parallel pipeline processes never interleave partial
+batches or lose appends to a concurrent compaction. Readers need no lock:
+they only ever consume complete lines.
+
+The pipelines share one ledger in the repo-level .tmp (independent of the
+working directory) via get_shared_processed_ledger().
+
+Usage:
+    from lead_ledger import get_shared_processed_ledger
+    ledger = get_shared_processed_ledger()
+    if not ledger.might_contain(url) or url not in ledger:
+        ledger.add_many({url: {"name": "Jane Doe", "source": "competitor_post"}})
+"""
+
+import os
+import json
+import uuid
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from bloom_filter import BloomFilter
+from file_lock import FileLock
+
+# Compact once superseded lines exceed both of these
+COMPACT_MIN_DEAD_RECORDS = 1000
+COMPACT_DEAD_RATIO = 0.5
+
+# Bloom filter sizing (grown automatically when exceeded)
+BLOOM_DEFAULT_CAPACITY = 1_000_000
+BLOOM_DEFAULT_FP_RATE = 0.01
+# Records folded into the filter between saves of the filter file
+BLOOM_SAVE_INTERVAL = 1000
+
+_READ_CHUNK_BYTES = 1 << 20
+
+# Header key identifying one rewrite of the ledger file
+_GENERATION_KEY = "generation"
+
+# Shared ledger location (repo-level .tmp, independent of the working directory)
+_TMP_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".tmp"))
+SHARED_PROCESSED_LEADS_FILE = os.path.join(_TMP_DIR, "processed_leads.jsonl")
+LEGACY_PROCESSED_LEADS_FILE = os.path.join(_TMP_DIR, "processed_leads.json")
+SHARED_PROCESSED_LEADS_BLOOM_FILE = os.path.join(_TMP_DIR, "processed_leads.bloom")
+
+
+class ProcessedLeadLedger:
+    """Append-only JSONL ledger of processed lead URLs with an in-memory index."""
+
+    def __init__(
+        self,
+        path: str,
+        legacy_json_path: Optional[str] = None,
+        compact_min_dead: int = COMPACT_MIN_DEAD_RECORDS,
+        compact_ratio: float = COMPACT_DEAD_RATIO,
+        bloom_path: Optional[str] = None,
+        bloom_capacity: int = BLOOM_DEFAULT_CAPACITY,
+        bloom_fp_rate: float = BLOOM_DEFAULT_FP_RATE,
+    ):
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        self.compact_min_dead = compact_min_dead
+        self.compact_ratio = compact_ratio
+        self.bloom_path = bloom_path
+        self.bloom_capacity = bloom_capacity
+        self.bloom_fp_rate = bloom_fp_rate
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict] = {}
+        self._offset = 0          # bytes of the ledger already folded into the index
+        self._generation = None   # header generation of the file the offset refers to
+        self._total_records = 0   # lines read, including superseded ones
+        self._loaded = False      # exact index built (only on first exact lookup)
+        self._appended_since_check = 0
+        self._migrated = False
+
+        self._bloom: Optional[BloomFilter] = None
+        self._bloom_offset = 0
+        self._bloom_generation = None
+        self._bloom_unsaved = 0   # records added to the filter since it was saved
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def _file_lock(self) -> FileLock:
+        return FileLock(f"{self.path}.lock", name="processed_leads")
+
+    def _ensure_migrated(self):
+        if self._migrated:
+            return
+        if not os.path.exists(self.path) and self.legacy_json_path:
+            with self._file_lock():
+                # Another process may have migrated while we waited
+                if not os.path.exists(self.path):
+                    self._import_legacy_json(self.legacy_json_path)
+        self._migrated = True
+
+    def _ensure_loaded(self):
+        self._ensure_migrated()
+        self._loaded = True
+        self._catch_up()
+
+    def _import_legacy_json(self, legacy_path: str):
+        """Seed the ledger from the old processed_leads.json (one-time)."""
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Warning: could not import legacy processed leads {legacy_path}: {e}")
+            return
+        if not isinstance(legacy, dict) or not legacy:
+            return
+
+        self._write_snapshot(legacy)
+        print(f"Imported {len(legacy)} processed leads from {legacy_path}")
+
+    def _reset_index(self):
+        self._index = {}
+        self._offset = 0
+        self._total_records = 0
+
+    def _file_size(self) -> Optional[int]:
+        """Size of the ledger in bytes, or None if it does not exist."""
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return None
+
+    def _read_generation(self) -> Optional[str]:
+        """Generation id from the header line (None for files written by appends only)."""
+        try:
+            with open(self.path, "rb") as f:
+                first = f.readline()
+        except FileNotFoundError:
+            return None
+        try:
+            header = json.loads(first)
+        except ValueError:
+            return None
+        return header.get(_GENERATION_KEY) if isinstance(header, dict) else None
+
+    def _read_records(self, offset: int) -> Iterator[Tuple[str, Dict, int]]:
+        """
+        Stream complete records from `offset` onward, in bounded chunks.
+
+        Yields (url, metadata, offset just past the line); url is None for
+        blank or unreadable lines so callers still advance past them. A
+        trailing partial line (a concurrent writer mid-append) is left for
+        the next read.
+        """
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            pending = b""
+            while True:
+                chunk = f.read(_READ_CHUNK_BYTES)
+                if not chunk:
+                    return
+                pending += chunk
+                lines = pending.split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    offset += len(line) + 1
+                    try:
+                        record = json.loads(line) if line.strip() else {}
+                    except ValueError:
+                        record = {}
+                    url = record.pop("url", None) if isinstance(record, dict) else None
+                    yield url, record, offset
+
+    def _catch_up(self):
+        """Fold in any lines appended since the last read (by us or another process)."""
+        size = self._file_size()
+        if size is None:
+            self._reset_index()
+            self._generation = None
+            return
+        if size == self._offset:
+            return
+
+        generation = self._read_generation()
+        if generation != self._generation or size < self._offset:
+            # File was compacted or replaced underneath us: rebuild from scratch
+            self._reset_index()
+            self._generation = generation
+
+        for url, record, offset in self._read_records(self._offset):
+            if url:
+                self._index[url] = record
+                self._total_records += 1
+            self._offset = offset
+
+    # -------------------------------------------------------------------------
+    # Bloom pre-check
+    # -------------------------------------------------------------------------
+
+    def _new_bloom(self, capacity: int) -> BloomFilter:
+        self._bloom_offset = 0
+        return BloomFilter(capacity, self.bloom_fp_rate)
+
+    def _load_bloom(self):
+        if self.bloom_path and os.path.exists(self.bloom_path):
+            try:
+                self._bloom, meta = BloomFilter.load(self.bloom_path)
+                self._bloom_offset = meta.get("offset", 0)
+                self._bloom_generation = meta.get("generation")
+                return
+            except Exception as e:
+                print(f"Warning: rebuilding unreadable bloom filter {self.bloom_path}: {e}")
+        self._bloom = self._new_bloom(self.bloom_capacity)
+        self._bloom_generation = None
+
+    def _sync_bloom(self) -> bool:
+        """Add ledger lines the filter has not seen yet. Returns True if it changed."""
+        self._ensure_migrated()
+        if self._bloom is None:
+            self._load_bloom()
+
+        size = self._file_size()
+        if size is None or size == self._bloom_offset:
+            return False
+
+        changed = False
+        generation = self._read_generation()
+        if generation != self._bloom_generation or size < self._bloom_offset:
+            # Compacted or replaced: the filter no longer maps onto this file
+            self._bloom = self._new_bloom(max(self.bloom_capacity, self._bloom.capacity))
+            self._bloom_generation = generation
+            changed = True
+
+        for url, _, offset in self._read_records(self._bloom_offset):
+            if url:
+                self._bloom.add(url)
+                self._bloom_unsaved += 1
+            self._bloom_offset = offset
+            changed = True
+
+        if self._bloom.count > self._bloom.capacity:
+            # Over capacity the false-positive rate climbs; rebuild at double size
+            self._bloom = self._new_bloom(self._bloom.capacity * 2)
+            for url, _, offset in self._read_records(0):
+                if url:
+                    self._bloom.add(url)
+                    self._bloom_unsaved += 1
+                self._bloom_offset = offset
+
+        return changed
+
+    def _save_bloom(self, force: bool = False):
+        """Persist the filter (caller holds the ledger file lock)."""
+        if not self.bloom_path or self._bloom is None:
+            return
+        if not force and self._bloom_unsaved < BLOOM_SAVE_INTERVAL:
+            return
+        self._bloom.save(
+            self.bloom_path,
+            meta={"offset": self._bloom_offset, "generation": self._bloom_generation},
+        )
+        self._bloom_unsaved = 0
+
+    def might_contain(self, url: str) -> bool:
+        """
+        Bloom pre-check. False means the URL was definitely never recorded.
+
+        Without a bloom_path this falls back to the exact index. Reads never
+        save the filter; new ledger lines are only folded in memory.
+        """
+        with self._lock:
+            if not self.bloom_path:
+                return url in self
+            self._sync_bloom()
+            return url in self._bloom
+
+    def might_contain_many(self, urls: Iterable[str]) -> Set[str]:
+        """
+        Bloom pre-check for a batch: the URLs that might have been recorded.
+
+        The filter is synced with the ledger once for the whole batch rather
+        than once per URL.
+        """
+        with self._lock:
+            if not self.bloom_path:
+                self._ensure_loaded()
+                return {url for url in urls if url in self._index}
+            self._sync_bloom()
+            return {url for url in urls if url in self._bloom}
+
+    def bloom_stats(self) -> Dict:
+        """Configured false-positive rate, fill level and memory footprint of the filter."""
+        with self._lock:
+            if not self.bloom_path:
+                return {}
+            self._sync_bloom()
+            return self._bloom.stats()
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def get(self, url: str, default=None) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            return self._index.get(url, default)
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Records for the URLs that have one (e.g. a batch's Bloom maybe-hits).
+
+        Unless the exact index is already built, this streams the ledger once
+        and keeps only these URLs' latest records, so resolving a few maybe-hits
+        never loads the whole history into memory.
+        """
+        wanted = set(urls)
+        with self._lock:
+            if self._loaded:
+                self._catch_up()
+                return {url: self._index[url] for url in wanted if url in self._index}
+            self._ensure_migrated()
+            if not wanted or self._file_size() is None:
+                return {}
+            found = {}
+            for url, record, _ in self._read_records(0):
+                if url in wanted:
+                    found[url] = record
+            return found
+
+    def add_many(self, entries: Dict[str, Dict]):
+        """Append records for several URLs. Later records supersede earlier ones."""
+        if not entries:
+            return
+        lines = "".join(
+            json.dumps({"url": url, **meta}, ensure_ascii=False) + "\n"
+            for url, meta in entries.items()
+        )
+        with self._lock:
+            self._ensure_migrated()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._file_lock():
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                # Appending never needs the exact index; it is only built here
+                # every compact_min_dead appends, to decide whether to compact
+                self._appended_since_check += len(entries)
+                if self._loaded or self._appended_since_check >= self.compact_min_dead:
+                    self._appended_since_check = 0
+                    self._ensure_loaded()
+                    if self._should_compact():
+                        self._compact_locked()
+                if self.bloom_path:
+                    # Under the file lock, so saves never race another writer's
+                    self._sync_bloom()
+                    self._save_bloom()
+
+    def add(self, url: str, meta: Dict):
+        self.add_many({url: meta})
+
+    def as_dict(self) -> Dict[str, Dict]:
+        """Snapshot of the index as a plain dict (url -> metadata)."""
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._index)
+
+    def _should_compact(self) -> bool:
+        dead = self._total_records - len(self._index)
+        return dead >= self.compact_min_dead and dead > len(self._index) * self.compact_ratio
+
+    def compact(self):
+        """Rewrite the ledger with one line per live URL and swap it in atomically."""
+        with self._lock:
+            self._ensure_migrated()
+            with self._file_lock():
+                self._compact_locked()
+
+    def _compact_locked(self):
+        """Compaction body; caller holds both the thread lock and the file lock."""
+        # Fold in every append made before we took the lock, or it would be lost
+        self._ensure_loaded()
+        before = self._total_records
+        self._write_snapshot(self._index)
+        self._reset_index()
+        self._catch_up()
+        print(f"Compacted processed leads ledger: {before} -> {self._total_records} records")
+
+    def _write_snapshot(self, entries: Dict[str, Dict]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({_GENERATION_KEY: uuid.uuid4().hex}) + "\n")
+            for url, meta in entries.items():
+                f.write(json.dumps({"url": url, **meta}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def __contains__(self, url) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return url in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.as_dict())
+
+
+# Open ledgers, one per path, shared by every caller in the process
+_ledgers: Dict[str, ProcessedLeadLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_lead_ledger(
+    path: str,
+    legacy_json_path: Optional[str] = None,
+    bloom_path: Optional[str] = None,
+) -> ProcessedLeadLedger:
+    """Return the process-wide ledger for a path, opening it on first use."""
+    key = os.path.abspath(path)
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = ProcessedLeadLedger(path, legacy_json_path=legacy_json_path, bloom_path=bloom_path)
+            _ledgers[key] = ledger
+        return ledger
+
+
+def get_shared_processed_ledger() -> ProcessedLeadLedger:
+    """The processed-leads ledger every pipeline dedups against (one per process)."""
+    return get_lead_ledger(
+        SHARED_PROCESSED_LEADS_FILE,
+        legacy_json_path=LEGACY_PROCESSED_LEADS_FILE,
+        bloom_path=SHARED_PROCESSED_LEADS_BLOOM_FILE,
+    )
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Client - Shared pooled HTTP client for DeepSeek (and other chat APIs).
+
+Every pipeline used to call DeepSeek with a bare requests.post: a new TCP +
+TLS handshake per call, no retry (one 429 or 502 during a 300-lead run
+dropped that lead to the local fallback) and no record of how long calls
+took. llm_post is a drop-in replacement for requests.post that:
+
+- Reuses connections: one process-wide requests.Session whose adapter keeps
+  up to LLM_POOL_SIZE connections per host, shared by all threads.
+- Retries 429/5xx responses and connection errors/timeouts with jittered
+  exponential backoff (a random delay between half and all of
+  BACKOFF_BASE_SECONDS * 2**attempt, capped at BACKOFF_MAX_SECONDS). A
+  Retry-After header (seconds or HTTP date) is honoured instead, up to
+  RETRY_AFTER_MAX_SECONDS.
+- Times every call: per-host call, retry and failure counts and latency
+  percentiles over the last LATENCY_WINDOW calls, via get_llm_stats().
+- Reads the usage block of successful responses: prompt tokens split into
+  cached (served from the provider's prefix cache) and uncached, plus
+  completion tokens. Each call is also reported to run_metrics, which puts
+  it on the active pipeline run's CostTracker. Scripts without a tracker can
+  snapshot get_llm_usage() and print format_llm_usage(llm_usage_since(...)).
+
+After the last attempt the final response is returned as-is (so callers'
+raise_for_status() behaves as before), or the last connection error is
+raised.
+
+llm_post_async applies the same retry policy and accounting to requests
+sent on a caller's httpx.AsyncClient (the concurrent ICP qualifier).
+
+Usage:
+    from llm_client import llm_post
+    response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=30)
+    response.raise_for_status()
+
+    before = get_llm_usage()
+    ...  # run the pipeline
+    print(format_llm_usage(llm_usage_since(before)))
+"""
+
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import run_metrics
+
+# Connections kept open per host (matches the widest thread pools in the pipelines)
+LLM_POOL_SIZE = 20
+
+# Retry policy
+LLM_MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_AFTER_MAX_SECONDS = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Calls per host kept for latency percentiles
+LATENCY_WINDOW = 1000
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+_stats: Dict[str, Dict[str, Any]] = {}
+_stats_lock = threading.Lock()
+
+USAGE_FIELDS = ("prompt_tokens", "cached_prompt_tokens", "uncached_prompt_tokens", "completion_tokens")
+
+
+def get_llm_session() -> requests.Session:
+    """Process-wide pooled session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def backoff_delay(attempt: int) -> float:
+    """Jittered exponential delay before retry number attempt+1."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+
+    Args:
+        response: HTTP response
+
+    Returns:
+        Seconds to wait (capped at RETRY_AFTER_MAX_SECONDS), or None if absent/unparseable
+    """
+    value = (response.headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX_SECONDS)
+
+
+def parse_usage(usage: Any) -> Dict[str, int]:
+    """
+    Normalise a chat completion usage block.
+
+    DeepSeek reports prompt_cache_hit_tokens / prompt_cache_miss_tokens;
+    OpenAI reports prompt_tokens_details.cached_tokens.
+
+    Args:
+        usage: The response's "usage" object
+
+    Returns:
+        Dict with USAGE_FIELDS (all zero if usage is missing)
+    """
+    if not isinstance(usage, dict):
+        return dict.fromkeys(USAGE_FIELDS, 0)
+
+    prompt = int(usage.get("prompt_tokens") or 0)
+    if "prompt_cache_hit_tokens" in usage:
+        cached = int(usage.get("prompt_cache_hit_tokens") or 0)
+    else:
+        details = usage.get("prompt_tokens_details")
+        cached = int((details or {}).get("cached_tokens") or 0) if isinstance(details, dict) else 0
+    return {
+        "prompt_tokens": prompt,
+        "cached_prompt_tokens": cached,
+        "uncached_prompt_tokens": max(prompt - cached, 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+    }
+
+
+def _response_usage(response) -> Dict[str, int]:
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    return parse_usage(data.get("usage") if isinstance(data, dict) else None)
+
+
+def _record(host: str, elapsed: float, retries: int, failed: bool, usage: Optional[Dict[str, int]] = None):
+    usage = usage or dict.fromkeys(USAGE_FIELDS, 0)
+    with _stats_lock:
+        entry = _stats.setdefault(host, {
+            "calls": 0, "retries": 0, "failures": 0,
+            "latencies": deque(maxlen=LATENCY_WINDOW),
+            **dict.fromkeys(USAGE_FIELDS, 0),
+        })
+        entry["calls"] += 1
+        entry["retries"] += retries
+        entry["failures"] += int(failed)
+        entry["latencies"].append(elapsed)
+        for field, value in usage.items():
+            entry[field] += value
+    # ...and on the tracker of the run that made the call
+    run_metrics.record_llm_call(host, usage, elapsed)
+
+
+def _percentile(ordered, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def get_llm_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Per-host call counts and latency percentiles.
+
+    Returns:
+        Dict of host -> {calls, retries, failures, p50_ms, p95_ms, max_ms,
+        token counts, prompt_cache_hit_rate}; latencies cover the whole call
+        including retries and backoff
+    """
+    with _stats_lock:
+        snapshot = {host: (dict(entry), sorted(entry["latencies"])) for host, entry in _stats.items()}
+
+    stats = {}
+    for host, (entry, ordered) in snapshot.items():
+        stats[host] = {
+            "calls": entry["calls"],
+            "retries": entry["retries"],
+            "failures": entry["failures"],
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 1) if ordered else None,
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 1) if ordered else None,
+            "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+            **{field: entry[field] for field in USAGE_FIELDS},
+            "prompt_cache_hit_rate": _hit_rate(entry),
+        }
+    return stats
+
+
+def _hit_rate(usage: Dict[str, int]) -> Optional[float]:
+    if not usage["prompt_tokens"]:
+        return None
+    return round(usage["cached_prompt_tokens"] / usage["prompt_tokens"], 3)
+
+
+def get_llm_usage() -> Dict[str, int]:
+    """Calls and token counts summed over all hosts since the process started."""
+    with _stats_lock:
+        totals = {"calls": sum(entry["calls"] for entry in _stats.values())}
+        for field in USAGE_FIELDS:
+            totals[field] = sum(entry[field] for entry in _stats.values())
+    return totals
+
+
+def llm_usage_since(before: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Calls and tokens used since an earlier get_llm_usage() snapshot.
+
+    Args:
+        before: Snapshot taken at the start of the run
+
+    Returns:
+        Dict with calls, USAGE_FIELDS and prompt_cache_hit_rate (None if no prompt tokens)
+    """
+    now = get_llm_usage()
+    usage = {key: now[key] - before.get(key, 0) for key in now}
+    usage["prompt_cache_hit_rate"] = _hit_rate(usage)
+    return usage
+
+
+def format_llm_usage(usage: Dict[str, Any]) -> str:
+    """One-line summary of a run's LLM token usage and prefix cache hits."""
+    line = (f"LLM usage: {usage['calls']} calls, {usage['prompt_tokens']:,} prompt tokens "
+            f"({usage['cached_prompt_tokens']:,} cached / {usage['uncached_prompt_tokens']:,} uncached), "
+            f"{usage['completion_tokens']:,} completion tokens")
+    rate = usage.get("prompt_cache_hit_rate")
+    if rate is not None:
+        line += f" - prompt cache hit rate {rate:.0%}"
+    return line
+
+
+def reset_llm_stats():
+    """Forget recorded calls (tests, benchmarks)."""
+    with _stats_lock:
+        _stats.clear()
+
+
+def llm_post(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    json: Optional[Dict] = None,
+    timeout: float = 30,
+    max_retries: int = LLM_MAX_RETRIES,
+) -> requests.Response:
+    """
+    POST to an LLM API through the pooled session, retrying transient failures.
+
+    Args:
+        url: Endpoint URL
+        headers: Request headers (auth, content type)
+        json: JSON body
+        timeout: Per-attempt timeout in seconds
+        max_retries: Retries after the first attempt (0 = no retry)
+
+    Returns:
+        The last response (check it with raise_for_status as usual)
+
+    Raises:
+        requests.RequestException: If the last attempt failed to connect or timed out
+    """
+    session = get_llm_session()
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    attempt = 0
+
+    while True:
+        try:
+            response = session.post(url, headers=headers, json=json, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= max_retries:
+                _record(host, time.perf_counter() - start, attempt, failed=True)
+                raise
+            delay = backoff_delay(attempt)
+            print(f"  LLM request to {host} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                usage = _response_usage(response) if response.ok else None
+                _record(host, time.perf_counter() - start, attempt, failed=not response.ok, usage=usage)
+                return response
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            print(f"  LLM request to {host} returned {response.status_code}, retrying in {delay:.1f}s")
+
+        time.sleep(delay)
+        attempt += 1
+
+
+async def llm_post_async(
+    client,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    json: Optional[Dict] = None,
+    timeout: float = 30,
+    max_retries: int = LLM_MAX_RETRIES,
+):
+    """
+    llm_post for an httpx.AsyncClient: same retries, backoff and accounting.
+
+    Args:
+        client: Shared httpx.AsyncClient
+        url: Endpoint URL
+        headers: Request headers (auth, content type)
+        json: JSON body
+        timeout: Per-attempt deadline in seconds
+        max_retries: Retries after the first attempt (0 = no retry)
+
+    Returns:
+        The last httpx.Response (check it with raise_for_status as usual)
+
+    Raises:
+        httpx.TransportError, asyncio.TimeoutError: If the last attempt failed
+            to connect or missed its deadline
+    """
+    import httpx
+
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    attempt = 0
+
+    while True:
+        try:
+            response = await asyncio.wait_for(client.post(url, headers=headers, json=json), timeout=timeout)
+        except (httpx.TransportError, asyncio.TimeoutError) as e:
+            if attempt >= max_retries:
+                _record(host, time.perf_counter() - start, attempt, failed=True)
+                raise
+            delay = backoff_delay(attempt)
+            print(f"  LLM request to {host} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                usage = _response_usage(response) if response.is_success else None
+                _record(host, time.perf_counter() - start, attempt, failed=not response.is_success, usage=usage)
+                return response
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            print(f"  LLM request to {host} returned {response.status_code}, retrying in {delay:.1f}s")
+
+        await asyncio.sleep(delay)
+        attempt += 1
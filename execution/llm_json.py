@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM JSON - Tolerant parsing of JSON returned by chat models.
+
+Callers used to strip ``` fences by hand and json.loads the rest, so one
+stray sentence, a fence with a language tag, or an array cut off by
+max_tokens lost the whole response: the batch fell back or was requested
+again in full. This module:
+
+- parse_llm_json: the JSON value in the text, ignoring fences and any
+  prose around it.
+- parse_llm_list: the list a batch prompt asked for, whether it came bare
+  or wrapped in an object ({"notes": [...]}). If the output was truncated,
+  every complete item before the cut is still returned.
+- request_missing_items: runs a batch request, then re-requests only the
+  items that got no usable result (up to max_attempts requests in all).
+
+Usage:
+    from llm_json import parse_llm_list, request_missing_items
+
+    notes = parse_llm_list(content, keys=("notes", "leads"))
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+# Requests per batch: the first plus retries for the items still missing
+PARTIAL_RETRY_ATTEMPTS = 2
+
+_decoder = json.JSONDecoder()
+_FENCE_PATTERN = re.compile(r"```[a-zA-Z]*[ \t]*\n?")
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove markdown code fences (with or without a language tag)."""
+    return _FENCE_PATTERN.sub("", text or "").strip()
+
+
+def parse_llm_json(text: str) -> Optional[Any]:
+    """
+    Parse the JSON object or array in a model response.
+
+    Fences and prose before the first bracket or after the value are
+    ignored.
+
+    Args:
+        text: Raw message content
+
+    Returns:
+        The parsed value, or None if it is missing or incomplete
+    """
+    text = strip_code_fences(text)
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    match = re.search(r"[\[{]", text)
+    if not match:
+        return None
+    try:
+        value, _ = _decoder.raw_decode(text, match.start())
+    except ValueError:
+        return None
+    return value
+
+
+def extract_array_items(text: str) -> List[Any]:
+    """
+    Complete items of the first JSON array in text, even if it is truncated.
+
+    Args:
+        text: Raw message content
+
+    Returns:
+        Items decoded before the array ended or broke off
+    """
+    text = strip_code_fences(text)
+    start = text.find("[")
+    if start < 0:
+        return []
+
+    items = []
+    pos = start + 1
+    while pos < len(text):
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "]":
+            break
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except ValueError:
+            break
+        items.append(item)
+    return items
+
+
+def parse_llm_list(text: str, keys: Sequence[str] = ()) -> List[Any]:
+    """
+    The list of results a batch prompt asked for.
+
+    Args:
+        text: Raw message content
+        keys: Keys the list may be wrapped under, in order of preference
+            (otherwise the first list value of the object is used)
+
+    Returns:
+        List items (complete items only if the output was truncated)
+    """
+    value = parse_llm_json(text)
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for key in keys:
+            if isinstance(value.get(key), list):
+                return value[key]
+        return next((v for v in value.values() if isinstance(v, list)), [value])
+    # Truncated or malformed: salvage the items that did arrive
+    return extract_array_items(text)
+
+
+def request_missing_items(
+    items: List[Any],
+    request: Callable[[List[Any]], List[Any]],
+    item_key: Callable[[Any], Hashable],
+    result_key: Callable[[Any], Optional[Hashable]],
+    max_attempts: int = PARTIAL_RETRY_ATTEMPTS,
+) -> Dict[Hashable, Any]:
+    """
+    Request results for a batch, re-requesting only the items left without one.
+
+    Args:
+        items: Items to get results for
+        request: Sends one request for a list of items, returns parsed results
+        item_key: Key of an item
+        result_key: Key of the item a result belongs to (None = unusable)
+        max_attempts: Requests in total, including the first
+
+    Returns:
+        Dict of item key -> result, for the items that got one
+    """
+    wanted = {item_key(item) for item in items}
+    results: Dict[Hashable, Any] = {}
+    pending = list(items)
+
+    for attempt in range(max_attempts):
+        if not pending:
+            break
+        if attempt:
+            print(f"  Re-requesting {len(pending)} of {len(items)} items missing from the response")
+        try:
+            returned = request(pending)
+        except Exception as e:
+            print(f"  Warning: batch request failed: {e}")
+            returned = []
+
+        for result in returned:
+            key = result_key(result)
+            if key in wanted and key not in results:
+                results[key] = result
+        pending = [item for item in pending if item_key(item) not in results]
+
+    return results
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Message Rules - Local checks for 5-line LinkedIn DMs before the LLM judge.
+
+validate_single_message sends every message to DeepSeek with the full
+VALIDATION_PROMPT. Some failures don't need a model to spot: a message
+with the wrong number of lines, a greeting without the lead's first name,
+"Acme Solutions, LLC looks interesting", a phrase the template forbids or
+a message far over the usual length. check_message_rules catches those
+in microseconds, so they go straight to regeneration and the judge only
+sees messages that are at least well-formed.
+
+The rules only flag clear breaks of the template in prompts.py; anything
+that needs judgement (is the service right? is the authority line true?)
+is left to the judge.
+
+Usage:
+    from message_rules import check_message_rules
+
+    violations = check_message_rules(message, first_name="Sarah")
+    if violations:
+        ...  # regenerate with the violations as feedback
+"""
+
+import re
+from typing import List, Optional
+
+# Greeting, profile hook, business inquiry, authority statement (2 lines),
+# location hook - allow the authority statement to be joined or wrap once
+MIN_MESSAGE_LINES = 5
+MAX_MESSAGE_LINES = 7
+
+# Generated messages are ~400-550 characters (the location hook alone is ~170)
+MAX_MESSAGE_CHARS = 700
+
+# Legal suffixes the profile hook must drop ("Acme, Inc." -> "Acme")
+COMPANY_SUFFIX_PATTERN = re.compile(
+    r"(,|\b(inc|llc|ltd|corp|corporation|plc|limited|gmbh)\b\.?)", re.IGNORECASE
+)
+
+# Phrases the 5-line template forbids (compared case-insensitively)
+BANNED_PHRASES = [
+    "helps businesses",
+    "keeps things running smoothly",
+    "boosts adoption fast",
+    "improves efficiency",
+    "keeps listeners engaged",
+    "help manage leads efficiently",
+    "corporate comms",
+    "communications strategy",
+    "sounds interesting",
+    "greeting:",
+    "profile hook:",
+    "authority building hook:",
+    "location hook:",
+    "---",
+]
+
+
+def message_lines(message: str) -> List[str]:
+    """Non-blank lines of a message, stripped."""
+    return [line.strip() for line in (message or "").splitlines() if line.strip()]
+
+
+def check_message_rules(message: str, first_name: Optional[str] = None) -> List[str]:
+    """
+    Check a 5-line DM against the template rules that need no judgement.
+
+    Args:
+        message: Generated message
+        first_name: Lead's first name (greeting check skipped if unknown)
+
+    Returns:
+        List of violations (empty if the message passes)
+    """
+    lines = message_lines(message)
+    if not lines:
+        return ["Message is empty"]
+
+    violations = []
+
+    if not MIN_MESSAGE_LINES <= len(lines) <= MAX_MESSAGE_LINES:
+        violations.append(
+            f"Message has {len(lines)} lines; expected the 5-part template "
+            f"({MIN_MESSAGE_LINES}-{MAX_MESSAGE_LINES} non-blank lines)"
+        )
+
+    if len(message) > MAX_MESSAGE_CHARS:
+        violations.append(f"Message is {len(message)} characters; keep it under {MAX_MESSAGE_CHARS}")
+
+    greeting = lines[0]
+    if not greeting.lower().startswith("hey"):
+        violations.append(f'First line must be the greeting "Hey [FirstName]", got "{greeting[:40]}"')
+    elif first_name and first_name.strip().lower() not in greeting.lower():
+        violations.append(f'Greeting must use the first name "{first_name.strip()}"')
+
+    hook = next((line for line in lines if "looks interesting" in line.lower()), None)
+    if hook is None:
+        violations.append('Missing the profile hook "[CompanyName] looks interesting"')
+    elif "!" in hook:
+        violations.append("Profile hook must not use exclamation marks")
+    elif COMPANY_SUFFIX_PATTERN.search(hook.lower().split("looks interesting")[0]):
+        violations.append(f'Company name not casualized in "{hook}" (drop commas and LTD/Inc/LLC etc.)')
+
+    lowered = message.lower()
+    for phrase in BANNED_PHRASES:
+        if phrase in lowered:
+            violations.append(f'Uses banned phrase "{phrase}"')
+
+    return violations
@@ -80,6 +80,27 @@ def column_letter(n):
     return result
 
 
+def use_execution_modules():
+    """Make execution/ modules importable (/app/execution on Modal, this directory locally)."""
+    import sys
+    for path in ("/app/execution", os.path.dirname(os.path.abspath(__file__))):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def call_apify_actor(client, actor_id: str, run_input: dict, estimated_cost_usd: float = 0.05, **call_kwargs):
+    """
+    Run an Apify actor through the shared Apify governor (execution/apify_governor.py).
+
+    Set APIFY_GOVERNOR_STATE_FILE to a path on a Modal volume to share limits
+    across containers; otherwise they apply per container.
+    """
+    use_execution_modules()
+    # No ungoverned fallback: a missing module must fail the call, not skip the limits
+    from apify_governor import call_actor
+    return call_actor(client, actor_id, run_input, estimated_cost_usd=estimated_cost_usd, **call_kwargs)
+
+
 # ============================================================================
 # TOOL DEFINITIONS
 # ============================================================================
@@ -1376,7 +1397,8 @@ def hourly_lead_scraper():
     }
 
     try:
-        run = client.actor("compass/crawler-google-places").call(run_input=run_input)
+        run = call_apify_actor(client, "compass/crawler-google-places", run_input,
+                               estimated_cost_usd=max_results * 0.004)
 
         results = []
         for item in client.dataset(run["defaultDatasetId"]).iterate_items():
@@ -1443,6 +1465,8 @@ def scrape_leads_background(query: str, location: str, limit: int, sheet_id: str
     from google.oauth2.credentials import Credentials as UserCredentials
     from google.auth.transport.requests import Request
     import requests as http_requests
+    use_execution_modules()
+    from llm_json import parse_llm_list, request_missing_items
 
     try:
         # ===== STEP 1: Scrape with Apify =====
@@ -1462,7 +1486,8 @@ def scrape_leads_background(query: str, location: str, limit: int, sheet_id: str
             "language": "en",
         }
 
-        run = apify_client.actor("code_crafter/leads-finder").call(run_input=run_input)
+        run = call_apify_actor(apify_client, "code_crafter/leads-finder", run_input,
+                               estimated_cost_usd=limit * 0.0015)
 
         results = []
         for item in apify_client.dataset(run["defaultDatasetId"]).iterate_items():
@@ -1643,43 +1668,52 @@ def scrape_leads_background(query: str, location: str, limit: int, sheet_id: str
                 if not any(r["first_name"] or r["company_name"] or r["city"] for r in records):
                     continue
 
-                # Format as compact JSON
-                records_json = json.dumps([
-                    {"id": i+1, "first_name": r["first_name"], "company_name": r["company_name"], "city": r["city"]}
-                    for i, r in enumerate(records)
-                ])
+                def request_casual(batch_records):
+                    # Format as compact JSON
+                    records_json = json.dumps([
+                        {"id": r["id"], "first_name": r["first_name"], "company_name": r["company_name"], "city": r["city"]}
+                        for r in batch_records
+                    ])
 
-                prompt = f"""Convert to casual forms for cold emails. Return ONLY valid JSON array.
+                    prompt = f"""Convert to casual forms for cold emails. Return ONLY valid JSON array.
 
 Rules:
 - first_name: Common nicknames (William→Will, Jennifer→Jen), keep if no nickname
 - company_name: Remove "The", legal suffixes (LLC/Inc/Corp/Ltd), generic words (Realty/Real Estate/Group/Services). Use "you guys" if too generic
 - city: Local nicknames (San Francisco→SF, Philadelphia→Philly), keep if none
+- Keep each record's "id"
 
 Input: {records_json}
 
 Output JSON only (no markdown, no explanations):"""
 
-                try:
                     msg = claude_client.messages.create(
                         model="claude-3-5-haiku-20241022",
                         max_tokens=6000,
                         messages=[{"role": "user", "content": prompt}]
                     )
-                    response_text = msg.content[0].text.strip()
+                    # Complete records survive a truncated or fenced reply
+                    results_json = [r for r in parse_llm_list(msg.content[0].text) if isinstance(r, dict)]
+                    # Replies without ids are matched by position
+                    for result, record in zip(results_json, batch_records):
+                        result.setdefault("id", record["id"])
+                    return results_json
 
-                    # Remove markdown code blocks if present
-                    if response_text.startswith("```"):
-                        lines = response_text.split('\n')
-                        response_text = '\n'.join(lines[1:-1])
+                for i, record in enumerate(records):
+                    record["id"] = i + 1
 
-                    # Parse JSON response
-                    results_json = json.loads(response_text)
+                try:
+                    # Records missing from the reply are re-requested on their own
+                    casual_by_id = request_missing_items(
+                        records, request_casual,
+                        item_key=lambda r: r["id"],
+                        result_key=lambda r: int(r["id"]) if str(r.get("id", "")).isdigit() else None,
+                    )
 
                     # Update cells in batch
                     updates = []
-                    for i, result in enumerate(results_json):
-                        row_num = batch_start + i + 2  # +2 for header and 1-indexing
+                    for record_id, result in sorted(casual_by_id.items()):
+                        row_num = batch_start + record_id + 1  # ids are 1-based; +1 for header
 
                         if casual_first_col >= 0:
                             casual_first = result.get("casual_first_name", result.get("first_name", ""))
@@ -1699,7 +1733,7 @@ Output JSON only (no markdown, no explanations):"""
                     if updates:
                         worksheet.batch_update(updates)
 
-                    logger.info(f"Batch {batch_num}/{total_batches} complete")
+                    logger.info(f"Batch {batch_num}/{total_batches} complete ({len(casual_by_id)}/{len(records)} records)")
 
                 except Exception as e:
                     logger.warning(f"Casualization batch {batch_num} error: {e}")
@@ -1990,6 +2024,8 @@ def create_proposal_from_transcript(transcript: str = "sales", demo: bool = True
     from fastapi.responses import JSONResponse
     import anthropic
     import requests
+    use_execution_modules()
+    from llm_json import parse_llm_json
 
     transcript_map = {
         "kickoff": "/app/demo_kickoff_call_transcript.md",
@@ -2071,14 +2107,9 @@ Return ONLY the JSON, no markdown code blocks or explanations."""
             messages=[{"role": "user", "content": extraction_prompt}]
         )
 
-        response_text = msg.content[0].text.strip()
-
-        # Remove markdown code blocks if present
-        if response_text.startswith("```"):
-            lines = response_text.split('\n')
-            response_text = '\n'.join(lines[1:-1])
-
-        extracted_data = json.loads(response_text)
+        extracted_data = parse_llm_json(msg.content[0].text)
+        if not isinstance(extracted_data, dict):
+            raise ValueError("Could not parse proposal details from the model response")
 
         slack_notify(f"🧠 *Step 2/3: Info extracted*\nClient: {extracted_data['client']['company']}")
 
@@ -2202,7 +2233,8 @@ def scrape_youtube_with_apify(keywords: list, max_per_keyword: int, days_back: i
                 "maxResultStreams": 0,
             }
 
-            run = client.actor("streamers/youtube-scraper").call(run_input=run_input, timeout_secs=60)
+            run = call_apify_actor(client, "streamers/youtube-scraper", run_input,
+                                   estimated_cost_usd=max_per_keyword * 0.005, timeout_secs=60)
 
             count = 0
             for item in client.dataset(run["defaultDatasetId"]).iterate_items():
@@ -2255,7 +2287,8 @@ def fetch_youtube_transcript(video_id, apify_client):
     try:
         video_url = f"https://www.youtube.com/watch?v={video_id}"
         run_input = {"urls": [video_url]}
-        run = apify_client.actor("karamelo/youtube-transcripts").call(run_input=run_input, timeout_secs=120)
+        run = call_apify_actor(apify_client, "karamelo/youtube-transcripts", run_input,
+                               estimated_cost_usd=0.01, timeout_secs=120)
 
         dataset_items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
 
@@ -12,8 +12,18 @@ import argparse
 from dotenv import load_dotenv
 from openai import OpenAI
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from prompts import get_linkedin_5_line_prompt, LINKEDIN_5_LINE_DM_PROMPT
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+from prompts import (
+    get_linkedin_5_line_prompt, get_linkedin_5_line_prompt_parts, build_cached_messages,
+    LINKEDIN_5_LINE_DM_PROMPT, LINKEDIN_DM_SYSTEM_PROMPT,
+)
+from llm_client import llm_post
+from message_rules import check_message_rules
+from validation_sampling import SequentialSampler
+from run_metrics import submit_in_context, use_stage
+from state_io import read_records
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -31,6 +41,11 @@ DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
 # Placeholder headlines that indicate empty/incomplete profiles
 EMPTY_HEADLINE_INDICATORS = ["--", "n/a", "na", "-", ""]
 
+# Worker pools: personalize_leads streams generation, validation and
+# regeneration through one pool; validate_and_fix_batch uses a smaller one
+MESSAGE_PIPELINE_WORKERS = 10
+VALIDATION_WORKERS = 5
+
 
 def is_profile_complete(lead):
     """
@@ -181,7 +196,7 @@ Respond in JSON format:
             "response_format": {"type": "json_object"}
         }
 
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=30)
+        response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
 
         data = response.json()
@@ -208,9 +223,8 @@ def generate_personalization(lead):
         print("  ⚠️  Error: DEEPSEEK_API_KEY not found in .env")
         return None
 
-    # Extract first name
-    full_name = lead.get("full_name", lead.get("first_name", ""))
-    first_name = full_name.split()[0] if full_name else ""
+    # Same name the local greeting rule checks the message against
+    first_name = _first_name(lead)
 
     # Get location (extract city if full location)
     location = lead.get("location", "")
@@ -218,7 +232,7 @@ def generate_personalization(lead):
         location = location.split(",")[0].strip()
 
     # Get formatted prompt from central source (now includes headline + company description)
-    prompt = get_linkedin_5_line_prompt(
+    prompt_parts = get_linkedin_5_line_prompt_parts(
         first_name=first_name,
         company_name=lead.get("company", lead.get("company_name", "")),
         title=lead.get("job_title", lead.get("title", "")),
@@ -235,15 +249,12 @@ def generate_personalization(lead):
 
         payload = {
             "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are an expert at creating personalized LinkedIn DMs following strict template rules."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": build_cached_messages(LINKEDIN_DM_SYSTEM_PROMPT, prompt_parts),
             "max_tokens": 400,
             "temperature": 0.7
         }
 
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
 
         data = response.json()
@@ -314,9 +325,50 @@ NOW REGENERATE the message following the EXACT same template rules, but this tim
 {base_prompt}
 """
 
+RULES_CORRECTION_PROMPT = """You previously generated a LinkedIn DM that broke the template rules. Here's what went wrong:
+
+ORIGINAL MESSAGE:
+{original_message}
+
+RULE VIOLATIONS:
+{violations}
+
+NOW REGENERATE the message following the EXACT template rules below, fixing every violation.
+
+{base_prompt}
+"""
+
+
+def _first_name(lead: dict) -> str:
+    # Support both snake_case and camelCase; an explicit first name wins over the full name
+    first_name = lead.get("firstName") or lead.get("first_name")
+    if first_name:
+        return first_name
+    full_name = lead.get("full_name") or lead.get("fullName") or ""
+    return full_name.split()[0] if full_name else ""
+
+
+def check_lead_rules(lead: dict) -> Optional[dict]:
+    """Local template rules (message_rules) for a lead's message: a FAIL result, or None if it passes."""
+    first_name = _first_name(lead)
+    violations = check_message_rules(lead.get("personalized_message") or "", first_name)
+    if violations:
+        return {"flag": "FAIL", "reason": "; ".join(violations), "rule_violations": violations}
+    return None
+
 
 def validate_single_message(lead: dict) -> dict:
-    """Validate a single lead's personalized message using DeepSeek."""
+    """
+    Validate a single lead's personalized message.
+
+    Local template rules (message_rules) run first: a message that breaks
+    them is failed without calling DeepSeek, with the violations in
+    "rule_violations". Only well-formed messages go to the LLM judge.
+    """
+    rule_result = check_lead_rules(lead)
+    if rule_result:
+        return rule_result
+
     # Support both snake_case (from sheets) and camelCase (from Apify)
     prompt = VALIDATION_PROMPT.format(
         full_name=lead.get("full_name") or lead.get("fullName") or "",
@@ -341,7 +393,7 @@ def validate_single_message(lead: dict) -> dict:
             "temperature": 0.1,
             "max_tokens": 500
         }
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
 
         result_text = response.json()["choices"][0]["message"]["content"].strip()
@@ -360,10 +412,8 @@ def validate_single_message(lead: dict) -> dict:
 
 
 def regenerate_with_correction(lead: dict, validation_result: dict) -> str:
-    """Regenerate personalized message with correction feedback."""
-    # Extract first name (support both snake_case and camelCase)
-    full_name = lead.get("full_name") or lead.get("fullName") or lead.get("first_name") or lead.get("firstName") or ""
-    first_name = full_name.split()[0] if full_name else ""
+    """Regenerate personalized message with correction feedback (judge scores or rule violations)."""
+    first_name = _first_name(lead)
 
     # Get location (extract city if full location) - support camelCase
     location = lead.get("location") or lead.get("addressWithCountry") or lead.get("jobLocation") or ""
@@ -381,13 +431,20 @@ def regenerate_with_correction(lead: dict, validation_result: dict) -> str:
     )
 
     # Build correction prompt
-    correction_prompt = CORRECTION_PROMPT.format(
-        original_message=lead.get("personalized_message", ""),
-        inferred_service=validation_result.get("inferred_service", "unknown"),
-        actual_service=validation_result.get("actual_service", "unknown"),
-        reason=validation_result.get("reason", "inaccurate service/method"),
-        base_prompt=base_prompt
-    )
+    if validation_result.get("rule_violations"):
+        correction_prompt = RULES_CORRECTION_PROMPT.format(
+            original_message=lead.get("personalized_message", ""),
+            violations="\n".join(f"- {v}" for v in validation_result["rule_violations"]),
+            base_prompt=base_prompt
+        )
+    else:
+        correction_prompt = CORRECTION_PROMPT.format(
+            original_message=lead.get("personalized_message", ""),
+            inferred_service=validation_result.get("inferred_service", "unknown"),
+            actual_service=validation_result.get("actual_service", "unknown"),
+            reason=validation_result.get("reason", "inaccurate service/method"),
+            base_prompt=base_prompt
+        )
 
     try:
         headers = {
@@ -405,7 +462,7 @@ def regenerate_with_correction(lead: dict, validation_result: dict) -> str:
             "temperature": 0.5  # Lower temp for more accurate regeneration
         }
 
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
 
         data = response.json()
@@ -423,8 +480,213 @@ def regenerate_with_correction(lead: dict, validation_result: dict) -> str:
         return None
 
 
-def validate_and_fix_batch(leads: list, max_retries: int = 1) -> list:
-    """Validate all personalized messages and regenerate failures."""
+def print_validation_summary(stats: dict, total: int):
+    """Print initial validation counts and regeneration results of a message pipeline run."""
+    if not total:
+        return
+    print(f"\nInitial validation ({total} checked):")
+    print(f"  PASS:   {stats['pass']} ({100*stats['pass']/total:.1f}%)")
+    print(f"  REVIEW: {stats['review']} ({100*stats['review']/total:.1f}%)")
+    print(f"  FAIL:   {stats['fail']} ({100*stats['fail']/total:.1f}%)")
+    print(f"  ERROR:  {stats['error']}")
+    if stats["rule_failed"]:
+        print(f"  Failed local rules (no judge call): {stats['rule_failed']}")
+    if stats["sampled_out"]:
+        print(f"  Not judged (adaptive sampling): {stats['sampled_out']}")
+
+    if stats["flagged"]:
+        print(f"\nRegeneration results ({stats['flagged']} flagged):")
+        print(f"  Regenerated: {stats['regenerated']}")
+        print(f"  Fixed: {stats['fixed']}")
+        print(f"  Still flagged: {stats['still_flagged']}")
+
+
+def print_sampling_report(sampler: SequentialSampler):
+    """Print how much of the batch adaptive sampling sent to the judge."""
+    report = sampler.report()
+    print(f"\nAdaptive sampling: {report['mode']} - judged {report['judged']}, skipped {report['skipped']}")
+    if report["pass_rate"] is not None:
+        print(f"  Judge pass rate: {report['pass_rate']:.1%} (CI {report['ci_low']:.1%}-{report['ci_high']:.1%})")
+    if report["escalation_reason"]:
+        print(f"  Escalated: {report['escalation_reason']}")
+
+
+def run_message_pipeline(
+    leads: list,
+    generate: Optional[Callable[[dict], Optional[str]]] = None,
+    validate: bool = True,
+    max_regenerations: int = 1,
+    workers: int = MESSAGE_PIPELINE_WORKERS,
+    sampler: Optional[SequentialSampler] = None,
+) -> dict:
+    """
+    Stream leads through generate -> validate -> regenerate -> re-validate.
+
+    All steps share one bounded worker pool. Each lead moves on as soon as
+    its previous step finishes, so validation starts while other messages
+    are still being generated and a flagged message is regenerated while
+    the rest of the batch is still validating. Each lead gets at most
+    max_regenerations corrected attempts. The pipeline updates lead dicts
+    on the calling thread only, with the same fields validate_and_fix_batch has
+    always set (validation, original_message, validation_feedback,
+    regenerated, final_validation).
+
+    With a sampler, each message still gets the local rule check, but only
+    the ones the sampler picks go to the LLM judge; the others are left
+    without a "validation" field. If the sampler escalates, the skipped
+    messages are judged too.
+
+    Args:
+        leads: Lead dicts (updated in place)
+        generate: Returns a message for a lead, or None if it can't be
+            personalized. Without it, leads are validated as they are.
+        validate: Whether to validate (and regenerate) messages
+        max_regenerations: Corrected attempts per flagged lead
+        workers: Pool size shared by all steps
+        sampler: Judge only a sample of first validations (see
+            validation_sampling); None judges every message
+
+    Returns:
+        Dict of counts: generated, generation_failed, validated, pass,
+        review, fail, error, rule_failed (validations settled by the local
+        rules), sampled_out (not judged), flagged, regenerated, fixed,
+        still_flagged
+    """
+    stats = dict.fromkeys(("generated", "generation_failed", "validated", "pass", "review", "fail", "error",
+                           "rule_failed", "sampled_out", "flagged", "regenerated", "fixed", "still_flagged"), 0)
+    if not leads:
+        return stats
+
+    regenerations = {}  # id(lead) -> corrected attempts so far
+    pending = {}
+    sampled_out = []  # leads the sampler kept from the judge
+    awaiting_judge = deque()  # with a sampler: leads waiting for their first validation
+
+    def submit(step, lead, fn, *args):
+        stage = "personalization" if step == "generate" else "validation"
+        future = submit_in_context(executor, _run_in_stage, stage, fn, lead, *args)
+        pending[future] = (step, lead)
+
+    def first_validation(lead):
+        if sampler is None:
+            submit("validate", lead, validate_single_message)
+        else:
+            awaiting_judge.append(lead)
+            dispatch_sampled()
+
+    def dispatch_sampled():
+        # Decide only as many leads as there are free judge slots, so each
+        # decision sees nearly all verdicts so far
+        judging = sum(1 for step, _ in pending.values() if step == "validate")
+        while awaiting_judge and judging < workers:
+            lead = awaiting_judge.popleft()
+            # Rule failures never need the judge, so they don't use up the sample
+            rule_result = check_lead_rules(lead)
+            if rule_result:
+                after_validation(lead, rule_result)
+            elif sampler.should_validate():
+                submit("validate", lead, validate_single_message)
+                judging += 1
+            else:
+                sampled_out.append(lead)
+                stats["sampled_out"] += 1
+
+    def after_validation(lead, result):
+        flag = result.get("flag")
+        attempts = regenerations.get(id(lead), 0)
+        if attempts == 0:
+            lead["validation"] = result
+            stats["validated"] += 1
+            # Part of the initial validation counts; re-validations aren't reported there
+            if result.get("rule_violations"):
+                stats["rule_failed"] += 1
+            stats[flag.lower() if flag in ("PASS", "REVIEW", "FAIL") else "error"] += 1
+            judged = flag in ("PASS", "REVIEW", "FAIL") and not result.get("rule_violations")
+            if sampler is not None and judged and sampler.record(flag == "PASS"):
+                stats["sampled_out"] -= len(sampled_out)
+                for skipped in sampled_out:
+                    submit("validate", skipped, validate_single_message)
+                sampled_out.clear()
+        else:
+            lead["final_validation"] = result
+
+        if flag in ("FAIL", "REVIEW") and attempts < max_regenerations:
+            if attempts == 0:
+                stats["flagged"] += 1
+                lead["original_message"] = lead["personalized_message"]
+            lead["validation_feedback"] = result
+            print(f"  [REGEN] {_lead_name(lead)}: {(result.get('reason') or 'no reason')[:60]}...")
+            submit("regenerate", lead, regenerate_with_correction, result)
+        elif attempts:
+            if flag == "PASS":
+                print(f"    [FIXED] {_lead_name(lead)} now passes validation")
+                stats["fixed"] += 1
+            else:
+                print(f"    [STILL-{flag or 'UNKNOWN'}] {_lead_name(lead)}: {(result.get('reason') or '')[:50]}")
+                stats["still_flagged"] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for lead in leads:
+            if generate:
+                submit("generate", lead, generate)
+            elif validate and lead.get("personalized_message"):
+                first_validation(lead)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, lead = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  [ERROR] {step} failed for {_lead_name(lead)}: {e}")
+                    result = {"flag": "ERROR", "error": str(e)} if step == "validate" else None
+
+                if step == "generate":
+                    if not result:
+                        stats["generation_failed"] += 1
+                        continue
+                    lead["personalized_message"] = result
+                    stats["generated"] += 1
+                    if validate:
+                        first_validation(lead)
+                elif step == "validate":
+                    after_validation(lead, result)
+                else:
+                    regenerations[id(lead)] = regenerations.get(id(lead), 0) + 1
+                    if result:
+                        lead["personalized_message"] = result
+                        lead["regenerated"] = True
+                        stats["regenerated"] += 1
+                        submit("validate", lead, validate_single_message)
+                    elif regenerations[id(lead)] < max_regenerations:
+                        submit("regenerate", lead, regenerate_with_correction, lead["validation_feedback"])
+                    else:
+                        stats["still_flagged"] += 1
+
+            if awaiting_judge:
+                dispatch_sampled()
+
+    return stats
+
+
+def _run_in_stage(stage: str, fn: Callable, *args):
+    with use_stage(stage):
+        return fn(*args)
+
+
+def _lead_name(lead: dict) -> str:
+    return lead.get("full_name") or lead.get("fullName") or "Unknown"
+
+
+def validate_and_fix_batch(leads: list, max_retries: int = 1, workers: int = VALIDATION_WORKERS,
+                           adaptive: bool = False) -> list:
+    """
+    Validate personalized messages and regenerate failures as soon as they are flagged.
+
+    With adaptive=True the LLM judge only sees as many messages as the
+    observed pass rate calls for (validation_sampling.SequentialSampler).
+    """
     print(f"\n{'='*60}")
     print("VALIDATION STEP")
     print(f"{'='*60}")
@@ -432,108 +694,36 @@ def validate_and_fix_batch(leads: list, max_retries: int = 1) -> list:
     leads_to_validate = [l for l in leads if l.get("personalized_message")]
     print(f"Validating {len(leads_to_validate)} personalized messages...")
 
-    validation_results = {}
-
-    # Validate in parallel
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(validate_single_message, lead): lead for lead in leads_to_validate}
-
-        for future in as_completed(futures):
-            lead = futures[future]
-            result = future.result()
-            # Support both snake_case (from sheets) and camelCase (from Apify)
-            key = lead.get("linkedin_url") or lead.get("linkedinUrl") or lead.get("fullName") or lead.get("full_name")
-            validation_results[key] = result
-
-    # Count results
-    passes = sum(1 for r in validation_results.values() if r.get("flag") == "PASS")
-    reviews = sum(1 for r in validation_results.values() if r.get("flag") == "REVIEW")
-    fails = sum(1 for r in validation_results.values() if r.get("flag") == "FAIL")
-    errors = sum(1 for r in validation_results.values() if r.get("flag") == "ERROR")
-
-    print(f"\nInitial validation:")
-    print(f"  PASS:   {passes} ({100*passes/len(leads_to_validate):.1f}%)")
-    print(f"  REVIEW: {reviews} ({100*reviews/len(leads_to_validate):.1f}%)")
-    print(f"  FAIL:   {fails} ({100*fails/len(leads_to_validate):.1f}%)")
-    print(f"  ERROR:  {errors}")
-
-    # Regenerate FAIL and REVIEW leads
-    flagged_leads = []
-    for lead in leads_to_validate:
-        key = lead.get("linkedin_url") or lead.get("linkedinUrl") or lead.get("fullName") or lead.get("full_name")
-        result = validation_results.get(key, {})
-        if result.get("flag") in ["FAIL", "REVIEW"]:
-            flagged_leads.append((lead, result))
-
-    if flagged_leads:
-        print(f"\nRegenerating {len(flagged_leads)} flagged messages with correction feedback...")
-
-        regenerated = 0
-        still_failed = 0
-
-        for lead, validation_result in flagged_leads:
-            name = lead.get("full_name", "Unknown")
-            print(f"  [REGEN] {name}: {validation_result.get('reason', 'no reason')[:60]}...")
-
-            # Store original for comparison
-            lead["original_message"] = lead["personalized_message"]
-            lead["validation_feedback"] = validation_result
-
-            # Regenerate with correction
-            new_message = regenerate_with_correction(lead, validation_result)
-
-            if new_message:
-                lead["personalized_message"] = new_message
-                lead["regenerated"] = True
-                regenerated += 1
-
-                # Re-validate the new message
-                new_validation = validate_single_message(lead)
-                lead["final_validation"] = new_validation
-
-                if new_validation.get("flag") == "PASS":
-                    print(f"    [FIXED] Now passes validation")
-                else:
-                    print(f"    [STILL-{new_validation.get('flag', 'UNKNOWN')}] {new_validation.get('reason', '')[:50]}")
-                    still_failed += 1
-            else:
-                still_failed += 1
-
-        print(f"\nRegeneration results:")
-        print(f"  Fixed: {regenerated - still_failed}")
-        print(f"  Still flagged: {still_failed}")
-
-    # Store validation results on leads
-    for lead in leads:
-        key = lead.get("linkedin_url") or lead.get("linkedinUrl") or lead.get("fullName") or lead.get("full_name")
-        if key in validation_results:
-            lead["validation"] = validation_results[key]
+    sampler = SequentialSampler() if adaptive else None
+    stats = run_message_pipeline(leads_to_validate, max_regenerations=max_retries, workers=workers, sampler=sampler)
+    print_validation_summary(stats, stats["validated"])
+    if sampler:
+        print_sampling_report(sampler)
 
     return leads
 
 
-def personalize_leads(input_file, output_file, icp_criteria=None, skip_icp_check=False, skip_validation=False):
+def personalize_leads(input_file, output_file, icp_criteria=None, skip_icp_check=False, skip_validation=False,
+                      adaptive_validation=False):
     """Generate personalized messages for all leads, with optional ICP filtering and validation."""
-    # Load leads
-    with open(input_file, 'r', encoding='utf-8') as f:
-        leads = json.load(f)
+    # Load leads (plain JSON or a pipeline's .jsonl.gz output)
+    leads = read_records(input_file)
 
     print(f"\nFound {len(leads)} leads to process\n")
 
-    # Process leads in parallel
-    personalized_leads = []
-    success_count = 0
-    failed_count = 0
-    icp_rejected_count = 0
-    incomplete_count = 0
+    # Each lead is personalized, then validated (and regenerated if flagged)
+    # as soon as its message is ready; all steps share one worker pool
+    statuses = {}  # id(lead) -> success / failed / icp_rejected / incomplete / skipped
+    positions = {id(lead): idx for idx, lead in enumerate(leads)}
 
-    def process_lead(idx_and_lead):
-        idx, lead = idx_and_lead
+    def process_lead(lead):
+        idx = positions[id(lead)]
 
         # Skip if already has personalization
         if lead.get("personalized_message"):
             print(f"  [SKIP] #{idx+1}: Already personalized, skipping")
-            return lead, "skipped"
+            statuses[id(lead)] = "skipped"
+            return lead["personalized_message"]
 
         # Step 0: Profile completeness check (always run)
         completeness = is_profile_complete(lead)
@@ -542,7 +732,8 @@ def personalize_leads(input_file, output_file, icp_criteria=None, skip_icp_check
 
         if not completeness["complete"]:
             print(f"  [INCOMPLETE] #{idx+1}: {lead.get('full_name', lead.get('fullName', 'Unknown'))} - {completeness['reason']}")
-            return lead, "incomplete"
+            statuses[id(lead)] = "incomplete"
+            return None
 
         # Step 1: ICP Check (if not skipped)
         if not skip_icp_check:
@@ -553,38 +744,30 @@ def personalize_leads(input_file, output_file, icp_criteria=None, skip_icp_check
 
             if not icp_result.get("match", True):
                 print(f"  [ICP-REJECT] #{idx+1}: {lead.get('full_name', 'Unknown')} - {icp_result.get('reason', '')}")
-                return lead, "icp_rejected"
+                statuses[id(lead)] = "icp_rejected"
+                return None
 
         # Step 2: Generate personalization (only if ICP passed)
         personalized_line = generate_personalization(lead)
 
         if personalized_line:
             print(f"  [OK] #{idx+1}: {lead.get('full_name', 'Unknown')}")
-            lead["personalized_message"] = personalized_line
-            return lead, "success"
+            statuses[id(lead)] = "success"
         else:
             print(f"  [FAIL] #{idx+1}: Failed for {lead.get('full_name', 'Unknown')}")
-            return lead, "failed"
-
-    # Use ThreadPoolExecutor for parallel API calls
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(process_lead, (idx, lead)): idx for idx, lead in enumerate(leads)}
-
-        for future in as_completed(futures):
-            result, status = future.result()
-            personalized_leads.append(result)
+            statuses[id(lead)] = "failed"
+        return personalized_line
 
-            if status == "success":
-                success_count += 1
-            elif status == "failed":
-                failed_count += 1
-            elif status == "icp_rejected":
-                icp_rejected_count += 1
-            elif status == "incomplete":
-                incomplete_count += 1
+    # Step 3: Validate and fix flagged messages (streamed behind generation)
+    sampler = SequentialSampler() if adaptive_validation else None
+    stats = run_message_pipeline(leads, generate=process_lead, validate=not skip_validation, sampler=sampler)
+    personalized_leads = leads
 
-    # Sort back to original order
-    personalized_leads.sort(key=lambda x: leads.index(x))
+    counts = list(statuses.values())
+    success_count = counts.count("success")
+    failed_count = counts.count("failed")
+    icp_rejected_count = counts.count("icp_rejected")
+    incomplete_count = counts.count("incomplete")
 
     print(f"\n{'='*60}")
     print(f"PERSONALIZATION SUMMARY")
@@ -595,12 +778,12 @@ def personalize_leads(input_file, output_file, icp_criteria=None, skip_icp_check
         print(f"  [ICP-REJECT] Rejected by ICP: {icp_rejected_count}")
     print(f"  [OK] Personalized: {success_count}")
     print(f"  [FAIL] Failed: {failed_count}")
-    print(f"  [SKIP] Already done: {len(leads) - success_count - failed_count - icp_rejected_count - incomplete_count}")
-    print(f"{'='*60}")
-
-    # Step 3: Validate and fix flagged messages
+    print(f"  [SKIP] Already done: {counts.count('skipped')}")
     if not skip_validation:
-        personalized_leads = validate_and_fix_batch(personalized_leads)
+        print_validation_summary(stats, stats["validated"])
+        if sampler:
+            print_sampling_report(sampler)
+    print(f"{'='*60}")
 
     # Save to file
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -710,6 +893,8 @@ def main():
                        help="Skip personalization step (use existing output file)")
     parser.add_argument("--skip_validation", action="store_true",
                        help="Skip validation and auto-fix step")
+    parser.add_argument("--adaptive_validation", action="store_true",
+                       help="Judge only a sample of messages while the pass rate stays high")
     parser.add_argument("--skip_upload", action="store_true",
                        help="Skip HeyReach upload step")
 
@@ -744,12 +929,12 @@ def main():
             args.output,
             icp_criteria=args.icp_criteria,
             skip_icp_check=args.skip_icp_check,
-            skip_validation=args.skip_validation
+            skip_validation=args.skip_validation,
+            adaptive_validation=args.adaptive_validation
         )
     else:
         print("STEP 1: Skipping personalization (using existing file)...\n")
-        with open(args.output, 'r', encoding='utf-8') as f:
-            personalized_leads = json.load(f)
+        personalized_leads = read_records(args.output)
 
     # Step 2: Upload to HeyReach (unless skipped)
     if not args.skip_upload:
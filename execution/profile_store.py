@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profile Store - Keyed on-disk cache of scraped LinkedIn profiles.
+
+Replaces the monolithic .tmp/profile_cache.json. Profiles live in a SQLite
+table keyed by normalized LinkedIn URL, so a lookup or insert touches one row
+instead of deserializing (and re-serializing) the whole cache on every run.
+
+Every pipeline (competitor, keyword, buying-signal, gift leads) shares one
+store via get_shared_profile_cache(), and writes through normalize_profile(),
+so whichever actor scraped a profile (supreme_coder or dev_fusion), the
+cached row has the same dev_fusion-style shape and is a hit for all of them.
+Rows are tagged with PROFILE_SCHEMA_VERSION; rows written under an older
+version are reported as stale and re-scraped.
+
+Several processes (API server, CLI runs, cron monitors) can share one store:
+every write runs in a SQLite write transaction (BEGIN IMMEDIATE), and time
+spent waiting on another process's write lock is recorded in the file_lock
+contention stats.
+
+The store behaves like a dict (``key in store``, ``store[key]``,
+``store.get(key)``, ``store[key] = profile``), so existing callers that
+treated the JSON cache as a dict keep working unchanged.
+
+The legacy JSON cache is imported once, the first time a store is opened.
+
+Each row records when it was scraped (for max-age staleness checks via
+lookup()) and when it was last read. If max_entries / max_bytes are set, the
+least recently used rows are evicted after each write so the cache stays
+inside its disk budget. The entry count and byte total are kept in a
+one-row profile_usage table by triggers, so the budget check after a put
+reads one row instead of scanning the table. SQLite's page cache keeps
+memory bounded regardless of table size.
+
+Usage:
+    from profile_store import get_shared_profile_cache
+    store = get_shared_profile_cache()
+    profile = store.get("https://www.linkedin.com/in/johndoe")
+    store.put_scraped(raw_apify_items)  # normalize + upsert
+"""
+
+import os
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from file_lock import record_lock_wait
+
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK_SIZE = 500
+
+# Last-access times are buffered in memory and flushed in batches
+_TOUCH_FLUSH_SIZE = 1000
+
+# Eviction trims to this fraction of the budget so it doesn't run on every put
+_EVICT_LOW_WATER = 0.9
+
+# How long a writer waits for another process's SQLite write lock
+_BUSY_TIMEOUT_MS = 30_000
+
+# Bump when normalize_profile's output shape changes; older rows become stale
+PROFILE_SCHEMA_VERSION = 1
+
+# Shared cache location (repo-level .tmp, independent of the working directory)
+_TMP_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".tmp"))
+SHARED_PROFILE_STORE_FILE = os.path.join(_TMP_DIR, "profile_cache.sqlite3")
+LEGACY_PROFILE_CACHE_FILE = os.path.join(_TMP_DIR, "profile_cache.json")
+
+# Cached profiles older than this are re-scraped (job titles go stale)
+PROFILE_CACHE_MAX_AGE_DAYS = 30
+
+# Least recently used profiles are evicted beyond either budget
+PROFILE_CACHE_MAX_ENTRIES = 250_000
+PROFILE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+
+# =============================================================================
+# NORMALIZATION
+# =============================================================================
+
+def normalize_linkedin_url(url: str) -> str:
+    """Normalize LinkedIn URL for cache key (strip trailing slash, query params)."""
+    if not url:
+        return ""
+    url = url.split("?")[0].rstrip("/")
+    return url.lower()
+
+
+def _flatten_positions(positions: list) -> list:
+    """Flatten supreme_coder positions which may have nested position groups."""
+    flat = []
+    for pos in positions:
+        # Grouped format: {company: {...}, positions: [{title, ...}, ...]}
+        if "positions" in pos and isinstance(pos["positions"], list):
+            company = pos.get("company", {})
+            for sub in pos["positions"]:
+                merged = {**sub, "company": company}
+                flat.append(merged)
+        else:
+            flat.append(pos)
+    return flat
+
+
+def normalize_supreme_coder_profile(raw: dict) -> dict:
+    """Convert supreme_coder actor output to dev_fusion field format.
+
+    This normalization layer means all downstream consumers (ICP filter,
+    personalization, HeyReach upload, etc.) continue working unchanged.
+    """
+    # Flatten positions (handles both flat and grouped formats)
+    positions = _flatten_positions(raw.get("positions", []))
+
+    # Build experiences list
+    experiences = []
+    for pos in positions:
+        company_obj = pos.get("company") or {}
+        exp = {
+            "companyName": company_obj.get("name", ""),
+            "title": pos.get("title", ""),
+            "jobDescription": pos.get("description", ""),
+            "location": pos.get("locationName", ""),
+            "totalDuration": pos.get("totalDuration", ""),
+        }
+        tp = pos.get("timePeriod") or {}
+        if tp:
+            start = tp.get("startDate") or {}
+            month = start.get("month", "")
+            year = start.get("year", "")
+            exp["startedOn"] = f"{month}-{year}" if month and year else str(year)
+            exp["stillWorking"] = tp.get("endDate") is None
+        experiences.append(exp)
+
+    # Current position (first in flattened list)
+    current = positions[0] if positions else {}
+    current_company = (current.get("company") or {})
+
+    # Use top-level jobTitle if available, else derive from first position
+    job_title = raw.get("jobTitle") or current.get("title", "")
+
+    # Use top-level companyName if available, else derive from first position
+    company_name = raw.get("companyName") or current_company.get("name", "")
+
+    geo_location = raw.get("geoLocationName", "")
+    # addressWithoutCountry: strip last comma-separated segment (country)
+    if geo_location and "," in geo_location:
+        addr_without_country = geo_location.rsplit(",", 1)[0].strip()
+    else:
+        addr_without_country = geo_location
+
+    return {
+        "linkedinUrl": raw.get("inputUrl", ""),
+        "firstName": raw.get("firstName", ""),
+        "lastName": raw.get("lastName", ""),
+        "fullName": f"{raw.get('firstName', '')} {raw.get('lastName', '')}".strip(),
+        "headline": raw.get("headline", ""),
+        "about": raw.get("summary", ""),
+        "jobTitle": job_title,
+        "companyName": company_name,
+        "companyIndustry": None,
+        "companySize": None,
+        "companyWebsite": None,
+        "companyLinkedin": raw.get("companyLinkedinUrl") or current_company.get("url", ""),
+        "addressCountryOnly": raw.get("geoCountryName", ""),
+        "addressWithCountry": geo_location,
+        "addressWithoutCountry": addr_without_country,
+        "connections": raw.get("connectionsCount", 0),
+        "followers": raw.get("followerCount", 0),
+        "experiences": experiences,
+        "experiencesCount": len(experiences),
+        "profilePic": raw.get("pictureUrl"),
+        "profilePicHighQuality": raw.get("pictureUrl"),
+        "linkedinId": raw.get("id", ""),
+        "publicIdentifier": raw.get("publicIdentifier", ""),
+        "isPremium": raw.get("premium", False),
+        "isVerified": raw.get("isVerified", False),
+        "isInfluencer": raw.get("influencer", False),
+        "isCreator": raw.get("creator", False),
+        "email": None,
+        "mobileNumber": None,
+        "educations": raw.get("educations", []),
+        "skills": raw.get("skills", []),
+        "languages": raw.get("languages", []),
+        "certifications": raw.get("certifications", []),
+    }
+
+
+def _is_supreme_coder_profile(raw: dict) -> bool:
+    """supreme_coder items carry inputUrl/positions; dev_fusion items carry experiences."""
+    if "experiences" in raw or "fullName" in raw:
+        return False
+    return any(key in raw for key in ("inputUrl", "positions", "geoLocationName"))
+
+
+def normalize_profile(raw: dict) -> dict:
+    """
+    Normalize any profile scraper's output to the shared dev_fusion shape.
+
+    supreme_coder items go through normalize_supreme_coder_profile; dev_fusion
+    items are already in the target shape and only get a guaranteed
+    linkedinUrl/fullName.
+
+    Args:
+        raw: One dataset item from either profile scraper actor
+
+    Returns:
+        Profile dictionary in dev_fusion field format
+    """
+    if _is_supreme_coder_profile(raw):
+        return normalize_supreme_coder_profile(raw)
+
+    profile = dict(raw)
+    if not profile.get("linkedinUrl"):
+        profile["linkedinUrl"] = raw.get("profileUrl") or raw.get("url") or ""
+    if not profile.get("fullName"):
+        profile["fullName"] = f"{raw.get('firstName', '')} {raw.get('lastName', '')}".strip()
+    return profile
+
+
+def profile_cache_key(profile: dict) -> str:
+    """Cache key for a normalized profile ("" if it has no URL)."""
+    url = profile.get("linkedinUrl") or profile.get("profileUrl") or ""
+    return normalize_linkedin_url(url) if url else ""
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+
+class ProfileStore(MutableMapping):
+    """SQLite-backed profile cache with per-URL get and put."""
+
+    def __init__(
+        self,
+        path: str,
+        legacy_json_path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pending_touches: Dict[str, float] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Schema setup in one write transaction so concurrent openers don't race
+        self._begin_write()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "  url TEXT PRIMARY KEY,"
+            "  data TEXT NOT NULL,"
+            "  updated_at TEXT NOT NULL"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._migrate_columns()
+        self._create_usage_counters()
+        self._conn.commit()
+
+        if legacy_json_path:
+            self._import_legacy_json(legacy_json_path)
+
+    # -------------------------------------------------------------------------
+    # Migrations
+    # -------------------------------------------------------------------------
+
+    def _migrate_columns(self):
+        """Add scrape/access timestamps and row size to stores created before they existed."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(profiles)")}
+        if "scraped_at" not in columns:
+            self._conn.execute("ALTER TABLE profiles ADD COLUMN scraped_at REAL")
+            self._conn.execute(
+                "UPDATE profiles SET scraped_at = CAST(strftime('%s', substr(updated_at, 1, 19)) AS REAL)"
+            )
+        if "last_accessed" not in columns:
+            self._conn.execute("ALTER TABLE profiles ADD COLUMN last_accessed REAL")
+            self._conn.execute("UPDATE profiles SET last_accessed = scraped_at")
+        if "size" not in columns:
+            self._conn.execute("ALTER TABLE profiles ADD COLUMN size INTEGER")
+            self._conn.execute("UPDATE profiles SET size = length(data)")
+        if "schema_version" not in columns:
+            # Rows written before versioning were already dev_fusion-shaped (version 1)
+            self._conn.execute("ALTER TABLE profiles ADD COLUMN schema_version INTEGER")
+            self._conn.execute("UPDATE profiles SET schema_version = 1")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_profiles_last_accessed ON profiles (last_accessed)"
+        )
+
+    def _create_usage_counters(self):
+        """
+        Keep the entry count and byte total in profile_usage.
+
+        Triggers update the counters on every insert, delete and size change,
+        from any process. The counters are seeded with one full scan, the
+        first time a store is opened.
+        """
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profile_usage ("
+            "  id INTEGER PRIMARY KEY CHECK (id = 0),"
+            "  entries INTEGER NOT NULL,"
+            "  bytes INTEGER NOT NULL"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS profiles_usage_insert AFTER INSERT ON profiles BEGIN"
+            "  UPDATE profile_usage SET entries = entries + 1, bytes = bytes + COALESCE(new.size, 0);"
+            " END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS profiles_usage_delete AFTER DELETE ON profiles BEGIN"
+            "  UPDATE profile_usage SET entries = entries - 1, bytes = bytes - COALESCE(old.size, 0);"
+            " END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS profiles_usage_update AFTER UPDATE OF size ON profiles BEGIN"
+            "  UPDATE profile_usage SET bytes = bytes - COALESCE(old.size, 0) + COALESCE(new.size, 0);"
+            " END"
+        )
+        if not self._conn.execute("SELECT 1 FROM profile_usage").fetchone():
+            self._conn.execute(
+                "INSERT INTO profile_usage (id, entries, bytes) "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM profiles"
+            )
+
+    def _import_legacy_json(self, legacy_path: str):
+        """One-time import of the old monolithic profile_cache.json."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'legacy_imported'"
+            ).fetchone()
+        if row or not os.path.exists(legacy_path):
+            return
+
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Warning: could not import legacy profile cache {legacy_path}: {e}")
+            legacy = {}
+        if not isinstance(legacy, dict):
+            legacy = {}
+
+        # The JSON cache kept no per-entry timestamps; its mtime is the best bound
+        rows = self._build_rows(
+            {key: normalize_profile(profile) for key, profile in legacy.items()},
+            scraped_at=os.path.getmtime(legacy_path),
+        )
+        with self._lock:
+            self._begin_write()
+            # Re-check under the write lock: another process may have imported meanwhile
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'legacy_imported'"
+            ).fetchone()
+            if not done:
+                # Never overwrite rows written since (they are newer than the JSON)
+                self._upsert_rows(rows, replace=False)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                    (datetime.now().isoformat(),),
+                )
+            self._conn.commit()
+        if not done and rows:
+            print(f"Imported {len(rows)} profiles from legacy cache {legacy_path}")
+
+    # -------------------------------------------------------------------------
+    # Write transactions
+    # -------------------------------------------------------------------------
+
+    def _begin_write(self):
+        """
+        Open a write transaction (caller holds the thread lock).
+
+        SQLite allows one writer per database across processes. BEGIN IMMEDIATE
+        takes that lock up front; the wait (and whether another process held
+        it) is recorded under the "profile_store" lock stats.
+        """
+        start = time.monotonic()
+        contended = False
+        try:
+            self._conn.execute("PRAGMA busy_timeout = 0")
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                contended = True
+                self._conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+                self._conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            record_lock_wait("profile_store", time.monotonic() - start, contended=True, timed_out=True)
+            raise
+        finally:
+            self._conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        record_lock_wait("profile_store", time.monotonic() - start, contended)
+
+    def _build_rows(self, profiles: Dict[str, Dict], scraped_at: Optional[float] = None) -> List[tuple]:
+        now = time.time()
+        scraped_at = scraped_at if scraped_at is not None else now
+        updated_at = datetime.now().isoformat()
+        rows = []
+        for key, profile in profiles.items():
+            data = json.dumps(profile, ensure_ascii=False)
+            rows.append((key, data, updated_at, scraped_at, now, len(data), PROFILE_SCHEMA_VERSION))
+        return rows
+
+    def _upsert_rows(self, rows: List[tuple], replace: bool = True):
+        # An upsert rather than INSERT OR REPLACE: REPLACE deletes the old row
+        # without firing the delete trigger, which would skew profile_usage
+        conflict = (
+            "ON CONFLICT (url) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at, "
+            "scraped_at = excluded.scraped_at, last_accessed = excluded.last_accessed, "
+            "size = excluded.size, schema_version = excluded.schema_version"
+            if replace else "ON CONFLICT (url) DO NOTHING"
+        )
+        self._conn.executemany(
+            "INSERT INTO profiles "
+            "(url, data, updated_at, scraped_at, last_accessed, size, schema_version) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?) {conflict}",
+            rows,
+        )
+
+    # -------------------------------------------------------------------------
+    # Keyed access
+    # -------------------------------------------------------------------------
+
+    def _touch(self, keys: Iterable[str]):
+        """Record reads for LRU ordering (caller holds the lock)."""
+        now = time.time()
+        for key in keys:
+            self._pending_touches[key] = now
+        if len(self._pending_touches) >= _TOUCH_FLUSH_SIZE:
+            self._flush_touches()
+
+    def flush(self):
+        """Write buffered access times now (lookups and writes also do this)."""
+        with self._lock:
+            self._flush_touches()
+
+    def _flush_touches(self):
+        if not self._pending_touches:
+            return
+        self._begin_write()
+        self._write_touches()
+        self._conn.commit()
+
+    def _write_touches(self):
+        """Write buffered access times (caller holds the lock and a write transaction)."""
+        self._conn.executemany(
+            "UPDATE profiles SET last_accessed = ? WHERE url = ?",
+            [(ts, key) for key, ts in self._pending_touches.items()],
+        )
+        self._pending_touches.clear()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM profiles WHERE url = ?", (key,)
+            ).fetchone()
+            if row:
+                self._touch([key])
+        return json.loads(row[0]) if row else default
+
+    def _get_rows(self, keys: Iterable[str]) -> Dict[str, Tuple[str, Optional[float], Optional[int]]]:
+        """url -> (raw JSON, scraped_at, schema_version) for the keys that exist."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_CHUNK_SIZE):
+                chunk = keys[i:i + _SQL_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT url, data, scraped_at, schema_version FROM profiles WHERE url IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for url, data, scraped_at, schema_version in rows:
+                    found[url] = (data, scraped_at, schema_version)
+            # Batch reads write their access times at once, so LRU order holds
+            # even if the store is never closed
+            self._touch(found)
+            self._flush_touches()
+        return found
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Fetch several profiles in one pass. Missing keys are omitted."""
+        return {url: json.loads(row[0]) for url, row in self._get_rows(keys).items()}
+
+    def lookup(
+        self,
+        keys: Iterable[str],
+        max_age_seconds: Optional[float] = None,
+    ) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """
+        Fetch several profiles, split by staleness.
+
+        Rows written under an older PROFILE_SCHEMA_VERSION are always stale.
+
+        Args:
+            keys: Cache keys (normalized LinkedIn URLs)
+            max_age_seconds: Entries scraped longer ago than this are stale.
+                None means only schema staleness applies.
+
+        Returns:
+            Tuple of (fresh, stale) dicts. Missing keys are in neither.
+        """
+        cutoff = time.time() - max_age_seconds if max_age_seconds is not None else None
+        fresh, stale = {}, {}
+        for url, (data, scraped_at, schema_version) in self._get_rows(keys).items():
+            is_stale = schema_version != PROFILE_SCHEMA_VERSION or (
+                cutoff is not None and (scraped_at is None or scraped_at < cutoff)
+            )
+            (stale if is_stale else fresh)[url] = json.loads(data)
+        return fresh, stale
+
+    def put(self, key: str, profile: Dict):
+        self.put_many({key: profile})
+
+    def put_many(self, profiles: Dict[str, Dict], scraped_at: Optional[float] = None):
+        """
+        Insert or replace several profiles in a single transaction.
+
+        Args:
+            profiles: Cache key -> profile
+            scraped_at: Epoch seconds the profiles were scraped (default now)
+        """
+        if not profiles:
+            return
+        rows = self._build_rows(profiles, scraped_at=scraped_at)
+        with self._lock:
+            self._begin_write()
+            if self._pending_touches:
+                self._write_touches()
+            self._upsert_rows(rows)
+            evicted = self._evict_over_budget(self.max_entries, self.max_bytes)
+            self._conn.commit()
+        if evicted:
+            print(f"Profile cache: evicted {evicted} least recently used profiles")
+
+    def put_scraped(self, raw_profiles: List[Dict], scraped_at: Optional[float] = None) -> List[Dict]:
+        """
+        Normalize raw actor output and cache it.
+
+        Args:
+            raw_profiles: Dataset items from any profile scraper actor
+            scraped_at: Epoch seconds the profiles were scraped (default now)
+
+        Returns:
+            The normalized profiles, in input order (including any without a URL,
+            which are returned but not cached).
+        """
+        normalized = [normalize_profile(raw) for raw in raw_profiles]
+        entries = {}
+        for profile in normalized:
+            key = profile_cache_key(profile)
+            if key:
+                entries[key] = profile
+        self.put_many(entries, scraped_at=scraped_at)
+        return normalized
+
+    # -------------------------------------------------------------------------
+    # Size budget
+    # -------------------------------------------------------------------------
+
+    def usage(self) -> Dict[str, int]:
+        """Row count and total profile bytes currently stored."""
+        with self._lock:
+            count, total = self._usage()
+        return {"entries": count, "bytes": total}
+
+    def _usage(self) -> Tuple[int, int]:
+        return self._conn.execute(
+            "SELECT entries, bytes FROM profile_usage WHERE id = 0"
+        ).fetchone()
+
+    def evict(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> int:
+        """
+        Drop least-recently-used rows until the store is within budget.
+
+        Once over budget, trims to 90% of it so back-to-back writes don't each
+        trigger another eviction pass.
+
+        Args:
+            max_entries: Entry budget (defaults to the store's max_entries)
+            max_bytes: Profile data budget in bytes (defaults to max_bytes)
+
+        Returns:
+            Number of rows evicted.
+        """
+        max_entries = max_entries or self.max_entries
+        max_bytes = max_bytes or self.max_bytes
+        if not max_entries and not max_bytes:
+            return 0
+
+        with self._lock:
+            self._begin_write()
+            evicted = self._evict_over_budget(max_entries, max_bytes)
+            self._conn.commit()
+        if evicted:
+            print(f"Profile cache: evicted {evicted} least recently used profiles")
+        return evicted
+
+    def _evict_over_budget(self, max_entries: Optional[int], max_bytes: Optional[int]) -> int:
+        """Evict LRU rows if over budget (caller holds the lock and a write transaction)."""
+        if not max_entries and not max_bytes:
+            return 0
+        count, total = self._usage()
+        over_entries = max_entries and count > max_entries
+        over_bytes = max_bytes and total > max_bytes
+        if not over_entries and not over_bytes:
+            return 0
+
+        # Buffered reads count towards recency before choosing victims
+        self._write_touches()
+        target_entries = int(max_entries * _EVICT_LOW_WATER) if max_entries else count
+        target_bytes = int(max_bytes * _EVICT_LOW_WATER) if max_bytes else total
+
+        victims = []
+        cursor = self._conn.execute(
+            "SELECT url, size FROM profiles ORDER BY last_accessed ASC"
+        )
+        for url, size in cursor:
+            if count <= target_entries and total <= target_bytes:
+                break
+            victims.append((url,))
+            count -= 1
+            total -= size or 0
+        cursor.close()
+
+        self._conn.executemany("DELETE FROM profiles WHERE url = ?", victims)
+        return len(victims)
+
+    def update(self, other=(), **kwargs):
+        """dict.update that writes in one transaction instead of one per key."""
+        merged = dict(other, **kwargs)
+        self.put_many(merged)
+
+    def _iter_rows(self, columns: str) -> Iterator[tuple]:
+        """Page through the table by rowid so large caches are never fully loaded."""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid, {columns} FROM profiles WHERE rowid > ? "
+                    f"ORDER BY rowid LIMIT {_SQL_CHUNK_SIZE}",
+                    (last_rowid,),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[1:]
+            last_rowid = rows[-1][0]
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """Stream (url, profile) pairs without loading the whole table."""
+        for url, data in self._iter_rows("url, data"):
+            yield url, json.loads(data)
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.close()
+
+    # -------------------------------------------------------------------------
+    # MutableMapping interface
+    # -------------------------------------------------------------------------
+
+    def __getitem__(self, key: str) -> Dict:
+        profile = self.get(key)
+        if profile is None:
+            raise KeyError(key)
+        return profile
+
+    def __setitem__(self, key: str, profile: Dict):
+        self.put(key, profile)
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            self._begin_write()
+            cursor = self._conn.execute("DELETE FROM profiles WHERE url = ?", (key,))
+            self._conn.commit()
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM profiles WHERE url = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for (url,) in self._iter_rows("url"):
+            yield url
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+
+# Open stores, one per path, shared by every caller in the process
+_stores: Dict[str, ProfileStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_profile_store(
+    path: str,
+    legacy_json_path: Optional[str] = None,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> ProfileStore:
+    """Return the process-wide ProfileStore for a path, opening it on first use."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ProfileStore(
+                path,
+                legacy_json_path=legacy_json_path,
+                max_entries=max_entries,
+                max_bytes=max_bytes,
+            )
+            _stores[key] = store
+            # Shared stores are never closed; write single-key reads on exit
+            atexit.register(store.flush)
+        return store
+
+
+def get_shared_profile_cache() -> ProfileStore:
+    """The profile cache every pipeline reads and writes (one per process)."""
+    return get_profile_store(
+        SHARED_PROFILE_STORE_FILE,
+        legacy_json_path=LEGACY_PROFILE_CACHE_FILE,
+        max_entries=PROFILE_CACHE_MAX_ENTRIES,
+        max_bytes=PROFILE_CACHE_MAX_BYTES,
+    )
@@ -2,8 +2,50 @@
 """
 Central source of truth for all AI prompts used in the pipeline.
 All scripts should import from here to ensure consistency.
+
+Provider-side context caching (DeepSeek, OpenAI) reuses the longest
+byte-identical prefix of a request. Each per-lead prompt is therefore laid
+out as a static prefix (instructions, templates, examples - identical for
+every lead) followed by the variable lead block. The get_*_prompt_parts()
+functions return the two halves; build_cached_messages() assembles them
+behind a fixed system message so the cached prefix covers everything but
+the lead. The get_*_prompt() functions return the same text as one string.
 """
 
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+# System messages shared by every lead at the DM call sites (part of the cached prefix)
+LINKEDIN_DM_SYSTEM_PROMPT = "You are an expert at creating personalized LinkedIn DMs following strict template rules."
+BUYING_SIGNAL_DM_SYSTEM_PROMPT = LINKEDIN_DM_SYSTEM_PROMPT + " You write as a founder, not a salesperson."
+
+
+def _split_template(template: str, marker: str) -> Tuple[str, str]:
+    """Split a template into (static prefix, lead block) at marker."""
+    prefix, found, lead_block = template.partition(marker)
+    if not found:
+        raise ValueError(f"Prompt template has no {marker!r} section")
+    return prefix, found + lead_block
+
+
+def build_cached_messages(system_prompt: str, parts: Tuple[str, str]) -> List[Dict[str, str]]:
+    """
+    Chat messages that keep the static prefix byte-stable across leads.
+
+    Args:
+        system_prompt: Fixed system message (same for every lead at a call site)
+        parts: (static prefix, lead block) from a get_*_prompt_parts() function
+
+    Returns:
+        [system, user] messages; only the tail of the user message varies per lead
+    """
+    static_prefix, lead_block = parts
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": static_prefix + lead_block},
+    ]
+
 LINKEDIN_5_LINE_DM_PROMPT = """You create **5-line LinkedIn DMs** that feel personal and conversational — balancing business relevance with personal connection and strict template wording.
 
 ## TASK
@@ -250,6 +292,28 @@ Lead Information:
 Generate the complete 5-line LinkedIn DM now. Return ONLY the message (no explanation, no labels, no formatting)."""
 
 
+_LINKEDIN_5_LINE_PREFIX, _LINKEDIN_5_LINE_LEAD_BLOCK = _split_template(LINKEDIN_5_LINE_DM_PROMPT, "Lead Information:")
+# No lead fields in the prefix (format() raises KeyError if one slips in)
+_LINKEDIN_5_LINE_PREFIX = _LINKEDIN_5_LINE_PREFIX.format()
+
+
+def get_linkedin_5_line_prompt_parts(first_name, company_name, title, headline, company_description, location):
+    """
+    Get the LinkedIn 5-line DM prompt as (static prefix, lead block).
+
+    The prefix is the same string for every lead; see build_cached_messages().
+    """
+    lead_block = _LINKEDIN_5_LINE_LEAD_BLOCK.format(
+        first_name=first_name,
+        company_name=company_name,
+        title=title,
+        headline=headline or "(not available)",
+        company_description=company_description or "(not available)",
+        location=location
+    )
+    return _LINKEDIN_5_LINE_PREFIX, lead_block
+
+
 def get_linkedin_5_line_prompt(first_name, company_name, title, headline, company_description, location):
     """
     Get the LinkedIn 5-line DM prompt with lead info filled in.
@@ -265,14 +329,9 @@ def get_linkedin_5_line_prompt(first_name, company_name, title, headline, compan
     Returns:
         Formatted prompt string ready for LLM
     """
-    return LINKEDIN_5_LINE_DM_PROMPT.format(
-        first_name=first_name,
-        company_name=company_name,
-        title=title,
-        headline=headline or "(not available)",
-        company_description=company_description or "(not available)",
-        location=location
-    )
+    return "".join(get_linkedin_5_line_prompt_parts(
+        first_name, company_name, title, headline, company_description, location
+    ))
 
 
 LINKEDIN_BUYING_SIGNAL_DM_PROMPT = """You create LinkedIn DMs that reference a buying signal, then offer concrete value.
@@ -389,16 +448,47 @@ Rules:
 ● This replaces the post reference line when the signal is general activity, not a specific post"""
 
 
-def get_linkedin_buying_signal_prompt(first_name, company_name, title, industry, location,
-                                      post_author=None, post_topic=None, intent_keyword=None,
-                                      signal_type="post", skip_location=False,
-                                      headline=None, about=None, company_description=None):
+_BUYING_SIGNAL_PREFIX, _BUYING_SIGNAL_LEAD_BLOCK = _split_template(LINKEDIN_BUYING_SIGNAL_DM_PROMPT, "Lead Information:")
+
+
+@lru_cache(maxsize=None)
+def _buying_signal_prefix(signal_type: str, skip_location: bool) -> str:
+    """Static prefix for one message variant (four in total)."""
+    if skip_location:
+        location_task_line = ""
+        location_section = ""
+        output_line_labels = "Greeting → Signal reference → Niche question → Value offer"
+        no_location_reminder = "\nDo NOT include a location hook or any 5th line. End after the value offer."
+    else:
+        location_task_line = "5. **Location Hook** → (template, word-for-word — see below)"
+        location_section = """---
+
+# LOCATION HOOK TEMPLATE (LINE 5)
+
+Template (word-for-word, only replace [city/region]):
+See you're in [city/region]. Just been to Fort Lauderdale in the US - and I mean the airport lol Have so many connections now that I need to visit for real. I'm in Glasgow, Scotland"""
+        output_line_labels = "Greeting → Signal reference → Niche question → Value offer → Location Hook"
+        no_location_reminder = ""
+
+    return _BUYING_SIGNAL_PREFIX.format(
+        signal_instructions=_TOP5_SIGNAL_INSTRUCTIONS if signal_type == "top5" else _POST_SIGNAL_INSTRUCTIONS,
+        line_count=4 if skip_location else 5,
+        location_task_line=location_task_line,
+        location_section=location_section,
+        output_line_labels=output_line_labels,
+        no_location_reminder=no_location_reminder,
+    )
+
+
+def get_linkedin_buying_signal_prompt_parts(first_name, company_name, title, industry, location,
+                                            post_author=None, post_topic=None, intent_keyword=None,
+                                            signal_type="post", skip_location=False,
+                                            headline=None, about=None, company_description=None):
     """
-    Get the buying signal LinkedIn DM prompt with lead info filled in.
+    Get the buying signal LinkedIn DM prompt as (static prefix, lead block).
 
-    signal_type: "post" for specific post engagement, "top5" for top 5% activity signal
-    skip_location: if True, generates a 4-line message without the location hook
-    headline/about/company_description: enriched profile data for better niche inference
+    The prefix depends only on signal_type and skip_location, so every lead of
+    the same variant shares it; see build_cached_messages().
     """
     # Build profile context lines
     profile_lines = []
@@ -410,10 +500,9 @@ def get_linkedin_buying_signal_prompt(first_name, company_name, title, industry,
         profile_lines.append(f"- Company Description: {company_description[:500]}")
 
     if signal_type == "top5":
-        signal_instructions = _TOP5_SIGNAL_INSTRUCTIONS
         extra_lead_info = "\n".join(profile_lines)
     else:
-        signal_instructions = _POST_SIGNAL_INSTRUCTIONS
+        signal_type = "post"
         post_lines = [
             f"- Post Author: {post_author or '(unknown author)'}",
             f"- Post Topic: {post_topic or '(unknown topic)'}",
@@ -421,38 +510,35 @@ def get_linkedin_buying_signal_prompt(first_name, company_name, title, industry,
         ]
         extra_lead_info = "\n".join(post_lines + profile_lines)
 
-    if skip_location:
-        line_count = 4
-        location_task_line = ""
-        location_section = ""
-        output_line_labels = "Greeting → Signal reference → Niche question → Value offer"
-        no_location_reminder = "\nDo NOT include a location hook or any 5th line. End after the value offer."
-    else:
-        line_count = 5
-        location_task_line = "5. **Location Hook** → (template, word-for-word — see below)"
-        location_section = """---
-
-# LOCATION HOOK TEMPLATE (LINE 5)
-
-Template (word-for-word, only replace [city/region]):
-See you're in [city/region]. Just been to Fort Lauderdale in the US - and I mean the airport lol Have so many connections now that I need to visit for real. I'm in Glasgow, Scotland"""
-        output_line_labels = "Greeting → Signal reference → Niche question → Value offer → Location Hook"
-        no_location_reminder = ""
-
-    return LINKEDIN_BUYING_SIGNAL_DM_PROMPT.format(
+    lead_block = _BUYING_SIGNAL_LEAD_BLOCK.format(
         first_name=first_name,
         company_name=company_name,
         title=title,
         industry=industry or "(not available)",
         location=location,
-        signal_instructions=signal_instructions,
         extra_lead_info=extra_lead_info,
-        line_count=line_count,
-        location_task_line=location_task_line,
-        location_section=location_section,
-        output_line_labels=output_line_labels,
-        no_location_reminder=no_location_reminder,
+        line_count=4 if skip_location else 5,
     )
+    return _buying_signal_prefix(signal_type, bool(skip_location)), lead_block
+
+
+def get_linkedin_buying_signal_prompt(first_name, company_name, title, industry, location,
+                                      post_author=None, post_topic=None, intent_keyword=None,
+                                      signal_type="post", skip_location=False,
+                                      headline=None, about=None, company_description=None):
+    """
+    Get the buying signal LinkedIn DM prompt with lead info filled in.
+
+    signal_type: "post" for specific post engagement, "top5" for top 5% activity signal
+    skip_location: if True, generates a 4-line message without the location hook
+    headline/about/company_description: enriched profile data for better niche inference
+    """
+    return "".join(get_linkedin_buying_signal_prompt_parts(
+        first_name, company_name, title, industry, location,
+        post_author=post_author, post_topic=post_topic, intent_keyword=intent_keyword,
+        signal_type=signal_type, skip_location=skip_location,
+        headline=headline, about=about, company_description=company_description,
+    ))
 
 
 # =============================================================================
@@ -622,12 +708,6 @@ def get_gift_search_query_prompt(icp_description, pain_points, buying_signals,
 
 GIFT_SIGNAL_NOTE_PROMPT = """You generate concise signal notes explaining WHY a lead is relevant to a prospect's ICP.
 
-## Prospect's ICP
-{icp_description}
-
-## Leads to Annotate
-{leads_json}
-
 ## Task
 For each lead, generate a 1-line signal note (max 100 characters) that explains:
 - What engagement they showed (liked/commented on what topic)
@@ -647,11 +727,22 @@ Rules:
 - Use natural language, not marketing jargon
 - Start with the engagement action: "Liked post about...", "Commented on...", "Engaged with..."
 
+## Prospect's ICP
+{icp_description}
+
+## Leads to Annotate
+{leads_json}
+
 Respond ONLY with valid JSON."""
 
 
-def get_gift_signal_note_prompt(icp_description, leads):
-    """Get the signal note prompt with leads data filled in."""
+# Instructions first, then the prospect's ICP and the batch of leads
+_GIFT_SIGNAL_NOTE_PREFIX, _GIFT_SIGNAL_NOTE_LEAD_BLOCK = _split_template(GIFT_SIGNAL_NOTE_PROMPT, "## Prospect's ICP")
+_GIFT_SIGNAL_NOTE_PREFIX = _GIFT_SIGNAL_NOTE_PREFIX.format()
+
+
+def get_gift_signal_note_prompt_parts(icp_description, leads):
+    """Get the signal note prompt as (static prefix, ICP + leads block)."""
     import json
     leads_summary = []
     for lead in leads:
@@ -663,7 +754,13 @@ def get_gift_signal_note_prompt(icp_description, leads):
             "engagement_type": lead.get("engagement_type", "LIKE"),
             "source_post_url": lead.get("source_post_url", ""),
         })
-    return GIFT_SIGNAL_NOTE_PROMPT.format(
+    lead_block = _GIFT_SIGNAL_NOTE_LEAD_BLOCK.format(
         icp_description=icp_description,
         leads_json=json.dumps(leads_summary, indent=2),
     )
+    return _GIFT_SIGNAL_NOTE_PREFIX, lead_block
+
+
+def get_gift_signal_note_prompt(icp_description, leads):
+    """Get the signal note prompt with leads data filled in."""
+    return "".join(get_gift_signal_note_prompt_parts(icp_description, leads))
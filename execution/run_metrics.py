@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run Metrics - Route measured LLM and Apify usage to the current run's tracker.
+
+llm_client reports every LLM call (tokens, cached tokens, latency) and
+apify_governor every actor run (compute units, USD, run time) here. Each
+report lands on the tracker active in the calling context - usually the
+CostTracker of the pipeline run that made the call - tagged with the
+current stage. Context variables keep concurrent runs (API server
+background tasks, threads) apart; with no active tracker a report is
+dropped.
+
+Worker threads start with an empty context, so pool work that should count
+towards the run is submitted with submit_in_context().
+
+Usage:
+    from run_metrics import activate_tracker, use_stage, submit_in_context
+
+    with activate_tracker(tracker):
+        with use_stage("icp"):
+            ...  # LLM calls here are recorded on tracker under "icp"
+"""
+
+import contextvars
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_STAGE = "other"
+
+_active_tracker: contextvars.ContextVar = contextvars.ContextVar("run_metrics_tracker", default=None)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("run_metrics_stage", default=DEFAULT_STAGE)
+
+
+def get_active_tracker() -> Optional[Any]:
+    """Tracker of the run executing in this context, if any."""
+    return _active_tracker.get()
+
+
+def current_stage() -> str:
+    """Stage name LLM calls and actor runs are attributed to."""
+    return _current_stage.get()
+
+
+@contextmanager
+def activate_tracker(tracker: Any):
+    """Record usage reported within the block on tracker."""
+    token = _active_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _active_tracker.reset(token)
+
+
+@contextmanager
+def use_stage(name: str):
+    """Attribute usage reported within the block to stage name."""
+    token = _current_stage.set(name)
+    try:
+        yield name
+    finally:
+        _current_stage.reset(token)
+
+
+def submit_in_context(executor: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """executor.submit() that runs fn with the caller's tracker and stage."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def record_llm_call(host: str, usage: Dict[str, int], latency_seconds: float):
+    """Report one LLM call (usage as returned by llm_client.parse_usage)."""
+    tracker = _active_tracker.get()
+    if tracker is not None:
+        tracker.record_llm_call(usage, latency_seconds, stage=current_stage(), host=host)
+
+
+def record_actor_run(actor_id: str, run: Dict, latency_seconds: Optional[float] = None):
+    """Report one finished Apify actor run (the run object Apify returned)."""
+    tracker = _active_tracker.get()
+    if tracker is not None and isinstance(run, dict):
+        tracker.record_actor_run(run, latency_seconds, stage=current_stage(), actor_id=actor_id)
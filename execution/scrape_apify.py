@@ -10,10 +10,14 @@ import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 from apify_client import ApifyClient
+from apify_governor import call_actor
 
 # Load environment variables
 load_dotenv()
 
+# Apify budget estimate per lead (USD), reserved with the governor
+LEADS_FINDER_COST_PER_LEAD = 0.0015
+
 def scrape_leads(query, location, max_items, job_titles=None, company_keywords=None, require_email=True):
     """
     Run the Apify actor to scrape leads.
@@ -45,7 +49,8 @@ def scrape_leads(query, location, max_items, job_titles=None, company_keywords=N
     
     try:
         # Run the actor and wait for it to finish
-        run = client.actor("code_crafter/leads-finder").call(run_input=run_input)
+        run = call_actor(client, "code_crafter/leads-finder", run_input,
+                         estimated_cost_usd=int(max_items) * LEADS_FINDER_COST_PER_LEAD)
     except Exception as e:
         print(f"Error running actor: {e}") # Print to stdout
         return None
@@ -14,10 +14,14 @@ from apify_client import ApifyClient
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import hashlib
 import time
+from apify_governor import call_actor
 
 # Load environment variables
 load_dotenv()
 
+# Apify budget estimate per lead (USD), reserved with the governor
+LEADS_FINDER_COST_PER_LEAD = 0.0015
+
 # Geographic partitions (cost-neutral strategy)
 # Each region map is mutually exclusive to avoid duplicate charges
 
@@ -159,7 +163,8 @@ def scrape_partition(partition_id, query, locations, max_items, company_keywords
 
     try:
         # Run the actor and wait for it to finish
-        run = client.actor("code_crafter/leads-finder").call(run_input=run_input)
+        run = call_actor(client, "code_crafter/leads-finder", run_input,
+                         estimated_cost_usd=int(max_items) * LEADS_FINDER_COST_PER_LEAD)
     except Exception as e:
         elapsed = time.time() - start_time
         print(f"[Partition {partition_id}] Error running actor: {e}")
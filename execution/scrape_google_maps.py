@@ -14,11 +14,15 @@ import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 from apify_client import ApifyClient
+from apify_governor import call_actor
 
 load_dotenv()
 
 ACTOR_ID = "compass/crawler-google-places"
 
+# Apify budget estimate per place (USD), reserved with the governor
+COST_PER_PLACE = 0.004
+
 
 def scrape_google_maps(
     search_query: str,
@@ -61,7 +65,7 @@ def scrape_google_maps(
     print(f"Starting Google Maps scrape: '{full_search}' (limit: {max_results})...")
 
     try:
-        run = client.actor(ACTOR_ID).call(run_input=run_input)
+        run = call_actor(client, ACTOR_ID, run_input, estimated_cost_usd=max_results * COST_PER_PLACE)
     except Exception as e:
         print(f"Error running Apify actor: {e}", file=sys.stderr)
         return []
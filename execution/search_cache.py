@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Search Cache - Reuse Google search actor results across pipelines and reruns.
+
+Every Google search is a paid Apify actor run. Monitors rerun the same
+keyword and date window many times a day, and a retry after a downstream
+failure repeats the exact same searches. Results are cached in the shared
+KV cache (kv_cache.py), keyed by:
+- the query, normalized (case and whitespace)
+- its date filter (after:YYYY-MM-DD)
+- the page count and results per page
+
+An entry is served for SEARCH_CACHE_TTL_HOURS unless a caller asks for a
+shorter TTL; a TTL of 0 (or None) bypasses the cache entirely. Failed
+searches are never cached.
+
+Usage:
+    from search_cache import get_cached_search, cache_search_results
+    results = get_cached_search(query, max_pages, results_per_page)
+    if results is None:
+        results = run_actor(...)
+        cache_search_results(query, max_pages, results_per_page, results)
+"""
+
+import re
+import json
+from typing import Dict, List, Optional
+
+from kv_cache import get_kv_cache
+
+SEARCH_CACHE_NAMESPACE = "google_search"
+
+# Google results for a date window barely move within a few hours
+SEARCH_CACHE_TTL_HOURS = 6
+
+_DATE_FILTER_RE = re.compile(r"\bafter:(\S+)", re.IGNORECASE)
+
+
+def search_cache_key(query: str, max_pages: int, results_per_page: int) -> str:
+    """Stable cache key for one search (normalized query + date filter + paging)."""
+    date_filter = _DATE_FILTER_RE.search(query)
+    normalized = " ".join(_DATE_FILTER_RE.sub("", query).lower().split())
+    return json.dumps({
+        "query": normalized,
+        "after": date_filter.group(1) if date_filter else None,
+        "pages": max_pages,
+        "per_page": results_per_page,
+    }, sort_keys=True)
+
+
+def get_cached_search(
+    query: str,
+    max_pages: int,
+    results_per_page: int,
+    ttl_hours: Optional[float] = SEARCH_CACHE_TTL_HOURS,
+) -> Optional[List[Dict]]:
+    """Cached results for a search, or None on a miss (or when ttl_hours is 0/None)."""
+    if not ttl_hours:
+        return None
+    try:
+        return get_kv_cache().get(
+            SEARCH_CACHE_NAMESPACE,
+            search_cache_key(query, max_pages, results_per_page),
+            max_age_seconds=ttl_hours * 3600,
+        )
+    except Exception as e:
+        print(f"Warning: search cache unavailable: {e}")
+        return None
+
+
+def cache_search_results(
+    query: str,
+    max_pages: int,
+    results_per_page: int,
+    results: List[Dict],
+    ttl_hours: Optional[float] = SEARCH_CACHE_TTL_HOURS,
+):
+    """Store the results of a successful search."""
+    if not ttl_hours:
+        return
+    try:
+        get_kv_cache().set(
+            SEARCH_CACHE_NAMESPACE,
+            search_cache_key(query, max_pages, results_per_page),
+            results,
+            ttl_seconds=ttl_hours * 3600,
+        )
+    except Exception as e:
+        print(f"Warning: could not cache search results: {e}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+State IO - Compressed, streamable storage for .tmp state files.
+
+Pipeline artifacts (per-run lead outputs, the post cache) are written as
+gzip-compressed JSON Lines (one record per line) instead of pretty-printed
+JSON. Readers stream them record by record, so opening a large file never
+holds the whole decoded structure in memory.
+
+Legacy .json files (a top-level list) are still readable: arrays are decoded
+incrementally, element by element, rather than with one json.load.
+
+Appends to a .jsonl.gz file add a new gzip member (concatenated members are
+valid gzip and read back as one stream), so caches can grow without a
+rewrite.
+
+Usage:
+    from state_io import write_records, iter_records
+    write_records(".tmp/competitor_post_leads_20260101_120000.jsonl.gz", leads)
+    for lead in iter_records(".tmp/competitor_post_leads_20260101_120000.jsonl.gz"):
+        ...
+"""
+
+import os
+import gzip
+import json
+from typing import Dict, Iterable, Iterator, List
+
+# Default extension for new state files
+STATE_SUFFIX = ".jsonl.gz"
+
+# Extensions readers understand (newest format first)
+STATE_EXTENSIONS = (".jsonl.gz", ".jsonl", ".json")
+
+_READ_CHUNK_CHARS = 1 << 16
+
+
+def _open_text(path: str, mode: str, compressed: bool = None):
+    if compressed is None:
+        compressed = path.endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+# =============================================================================
+# WRITING
+# =============================================================================
+
+def write_records(path: str, records: Iterable[Dict]) -> int:
+    """
+    Write records as JSON Lines (gzip if the path ends in .gz), atomically.
+
+    Args:
+        path: Destination file
+        records: Any iterable of JSON-serializable dicts (may be a generator)
+
+    Returns:
+        Number of records written
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with _open_text(tmp_path, "w", compressed=path.endswith(".gz")) as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def append_records(path: str, records: Iterable[Dict]) -> int:
+    """Append records to a JSON Lines file (a new gzip member for .gz). Returns count."""
+    lines = [json.dumps(record, ensure_ascii=False) + "\n" for record in records]
+    if not lines:
+        return 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _open_text(path, "a") as f:
+        f.write("".join(lines))
+    return len(lines)
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def _iter_json_array(f) -> Iterator:
+    """Decode a top-level JSON array element by element from a text stream."""
+    decoder = json.JSONDecoder()
+    buf = f.read(_READ_CHUNK_CHARS).lstrip()
+    if not buf.startswith("["):
+        # Not an array: fall back to a whole-document decode
+        rest = f.read()
+        yield json.loads(buf + rest)
+        return
+    buf = buf[1:]
+    eof = False
+
+    while True:
+        buf = buf.lstrip().lstrip(",").lstrip()
+        if buf.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buf)
+            # A scalar ending exactly at the buffer edge may be truncated ("12" of "123")
+            complete = eof or end < len(buf)
+        except ValueError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = f.read(_READ_CHUNK_CHARS)
+            eof = not chunk
+            buf += chunk
+            continue
+        yield item
+        buf = buf[end:]
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """
+    Stream records from a state file.
+
+    Handles .jsonl.gz / .jsonl (one record per line) and legacy .json
+    (top-level array decoded incrementally; a top-level object is yielded
+    as a single record).
+    """
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _iter_json_array(f)
+        return
+
+    with _open_text(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted append
+                continue
+
+
+def read_records(path: str) -> List[Dict]:
+    """Load every record from a state file into a list (for small files)."""
+    return list(iter_records(path))
+
+
+def is_state_file(filename: str) -> bool:
+    return filename.endswith(STATE_EXTENSIONS)
+
+
+def state_file_info(path: str) -> Dict:
+    """On-disk size and format of a state file (never decodes it)."""
+    exists = os.path.exists(path)
+    return {
+        "path": path,
+        "exists": exists,
+        "size_bytes": os.path.getsize(path) if exists else 0,
+        "compressed": path.endswith(".gz"),
+    }
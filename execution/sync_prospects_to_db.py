@@ -18,12 +18,11 @@ Environment:
 """
 
 import argparse
-import json
 import os
-import glob
 import requests
 from datetime import datetime
 from dotenv import load_dotenv
+from state_io import iter_records, is_state_file
 
 load_dotenv()
 
@@ -58,23 +57,18 @@ def infer_source_type(filename: str) -> str:
     return "other"
 
 
-def load_prospects_from_file(filepath: str) -> list:
-    """Load prospects from a JSON file."""
-    with open(filepath, encoding='utf-8') as f:
-        data = json.load(f)
-
-    if not isinstance(data, list):
-        return []
-
-    prospects = []
-    for p in data:
+def iter_prospects_from_file(filepath: str):
+    """Stream prospects from a state file (.json list, .jsonl or .jsonl.gz)."""
+    for p in iter_records(filepath):
+        if not isinstance(p, dict):
+            continue
         linkedin_url = normalize_linkedin_url(
             p.get("linkedinUrl") or p.get("linkedin_url") or p.get("profileUrl") or ""
         )
         if not linkedin_url:
             continue
 
-        prospects.append({
+        yield {
             "linkedin_url": linkedin_url,
             "full_name": p.get("fullName") or p.get("full_name"),
             "first_name": p.get("firstName") or p.get("first_name"),
@@ -100,9 +94,12 @@ def load_prospects_from_file(filepath: str) -> list:
             "follower_count": p.get("followersCount") or p.get("follower_count"),
             "is_creator": p.get("isCreator") or p.get("is_creator"),
             "activity_score": p.get("activity_score"),
-        })
+        }
 
-    return prospects
+
+def load_prospects_from_file(filepath: str) -> list:
+    """Load prospects from a JSON/JSONL state file."""
+    return list(iter_prospects_from_file(filepath))
 
 
 def sync_prospects(prospects: list, source_type: str, source_keyword: str = None, heyreach_list_id: int = None) -> dict:
@@ -127,65 +124,85 @@ def sync_prospects(prospects: list, source_type: str, source_keyword: str = None
         return {"status": "error", "message": str(e)}
 
 
+def _send_backfill_batch(batch: list, batch_num: int) -> dict:
+    """POST one batch to the backfill endpoint. Returns the API result (or {} on error)."""
+    url = f"{SPEED_TO_LEAD_API_URL}/api/prospects/backfill"
+    payload = {"prospects": batch}
+
+    try:
+        response = requests.post(url, json=payload, timeout=120)
+        response.raise_for_status()
+        result = response.json()
+        print(f"  Batch {batch_num}: created={result.get('created', 0)}, skipped={result.get('skipped', 0)}")
+        return result
+    except Exception as e:
+        print(f"  Error sending batch {batch_num}: {e}")
+        return {}
+
+
 def backfill_all(tmp_dir: str = ".tmp") -> dict:
-    """Backfill all prospects from .tmp directory."""
-    all_prospects = []
-    seen_urls = set()
+    """
+    Backfill all prospects from .tmp directory.
 
-    json_files = glob.glob(f"{tmp_dir}/*.json")
-    print(f"Found {len(json_files)} JSON files in {tmp_dir}")
+    Files are streamed record by record and sent in batches as they fill,
+    so only the current batch (plus the set of seen URLs) is held in memory.
+    """
+    seen_urls = set()
+    batch = []
+    batch_size = 100
+    batch_num = 0
+    total_prospects = 0
+    total_created = 0
+    total_skipped = 0
 
-    for filepath in json_files:
+    state_files = sorted(
+        os.path.join(tmp_dir, name) for name in os.listdir(tmp_dir) if is_state_file(name)
+    ) if os.path.isdir(tmp_dir) else []
+    print(f"Found {len(state_files)} state files in {tmp_dir}")
+
+    def flush():
+        nonlocal batch, batch_num, total_created, total_skipped
+        if not batch:
+            return
+        batch_num += 1
+        result = _send_backfill_batch(batch, batch_num)
+        total_created += result.get("created", 0)
+        total_skipped += result.get("skipped", 0)
+        batch = []
+
+    for filepath in state_files:
         filename = os.path.basename(filepath)
 
         # Skip non-prospect files
-        if any(skip in filename for skip in ["validation", "cache", "heyreach_campaigns", "sample"]):
+        if any(skip in filename for skip in ["validation", "cache", "heyreach_campaigns", "sample", "processed_leads"]):
             continue
 
         try:
-            prospects = load_prospects_from_file(filepath)
             source_type = infer_source_type(filename)
 
             added = 0
-            for p in prospects:
+            for p in iter_prospects_from_file(filepath):
                 if p["linkedin_url"] not in seen_urls:
                     p["source_type"] = source_type
-                    all_prospects.append(p)
+                    batch.append(p)
                     seen_urls.add(p["linkedin_url"])
                     added += 1
+                    if len(batch) >= batch_size:
+                        flush()
 
+            total_prospects += added
             if added > 0:
                 print(f"  {filename}: {added} new prospects (source: {source_type})")
 
         except Exception as e:
             print(f"  Error reading {filename}: {e}")
 
-    print(f"\nTotal unique prospects: {len(all_prospects)}")
+    flush()
+    print(f"\nTotal unique prospects: {total_prospects}")
 
-    if not all_prospects:
+    if not total_prospects:
         return {"status": "ok", "message": "No prospects to backfill"}
 
-    # Send to API in batches
-    batch_size = 100
-    total_created = 0
-    total_skipped = 0
-
-    for i in range(0, len(all_prospects), batch_size):
-        batch = all_prospects[i:i + batch_size]
-
-        url = f"{SPEED_TO_LEAD_API_URL}/api/prospects/backfill"
-        payload = {"prospects": batch}
-
-        try:
-            response = requests.post(url, json=payload, timeout=120)
-            response.raise_for_status()
-            result = response.json()
-            total_created += result.get("created", 0)
-            total_skipped += result.get("skipped", 0)
-            print(f"  Batch {i // batch_size + 1}: created={result.get('created', 0)}, skipped={result.get('skipped', 0)}")
-        except Exception as e:
-            print(f"  Error sending batch {i // batch_size + 1}: {e}")
-
     return {
         "status": "ok",
         "total_created": total_created,
@@ -196,7 +213,7 @@ def backfill_all(tmp_dir: str = ".tmp") -> dict:
 def main():
     parser = argparse.ArgumentParser(description="Sync prospects to speed_to_lead database")
     parser.add_argument("--backfill", action="store_true", help="Backfill all prospects from .tmp/")
-    parser.add_argument("--file", help="Sync specific JSON file")
+    parser.add_argument("--file", help="Sync specific JSON/JSONL(.gz) file")
     parser.add_argument("--source", default="other", help="Source type (competitor_post, cold_outreach, etc.)")
     parser.add_argument("--keyword", help="Source keyword (e.g., 'ceo')")
     parser.add_argument("--list_id", type=int, help="HeyReach list ID")
@@ -4,12 +4,14 @@ Upload leads from JSON file to HeyReach list.
 Handles both camelCase and snake_case field names.
 """
 
-import json
 import os
 import sys
 import requests
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from state_io import read_records
+
 load_dotenv()
 
 HEYREACH_API_KEY = os.getenv("HEYREACH_API_KEY")
@@ -116,9 +118,8 @@ def main():
     json_file = sys.argv[1]
     list_id = int(sys.argv[2])
 
-    # Load leads
-    with open(json_file, 'r', encoding='utf-8') as f:
-        leads = json.load(f)
+    # Load leads (plain JSON or a pipeline's .jsonl.gz output)
+    leads = read_records(json_file)
 
     print(f"Loaded {len(leads)} leads from {json_file}")
 
@@ -8,9 +8,11 @@ import os
 import sys
 import json
 import argparse
-import requests
+from llm_client import llm_post
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from validation_sampling import SequentialSampler, sample_validate
+from state_io import read_records
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -99,7 +101,7 @@ def validate_single(lead: dict, model: str) -> dict:
             "temperature": 0.1,
             "max_tokens": 500
         }
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = llm_post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
 
         result_text = response.json()["choices"][0]["message"]["content"].strip()
@@ -132,16 +134,22 @@ def validate_single(lead: dict, model: str) -> dict:
         }
 
 
-def validate_batch(input_file: str, output_file: str = None, sample_size: int = None, model: str = "deepseek-chat"):
-    """Validate a batch of personalized messages."""
+def validate_batch(input_file: str, output_file: str = None, sample_size: int = None, model: str = "deepseek-chat",
+                   adaptive: bool = False):
+    """
+    Validate a batch of personalized messages.
+
+    sample_size validates a fixed random sample. adaptive validates a
+    sequential sample instead: few messages while the pass rate is stably
+    high, all of them once failures cluster (see validation_sampling).
+    """
 
     if not DEEPSEEK_API_KEY:
         print("ERROR: DEEPSEEK_API_KEY not found in .env")
         sys.exit(1)
 
-    # Load leads
-    with open(input_file, 'r', encoding='utf-8') as f:
-        leads = json.load(f)
+    # Load leads (plain JSON or a pipeline's .jsonl.gz output)
+    leads = read_records(input_file)
 
     # Filter to only leads with personalized_message
     leads_with_messages = [l for l in leads if l.get("personalized_message")]
@@ -150,29 +158,44 @@ def validate_batch(input_file: str, output_file: str = None, sample_size: int =
         import random
         leads_with_messages = random.sample(leads_with_messages, sample_size)
 
-    print(f"Validating {len(leads_with_messages)} messages using {model}...")
-
     results = []
 
-    # Process with threading for speed
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(validate_single, lead, model): lead for lead in leads_with_messages}
-
-        for i, future in enumerate(as_completed(futures), 1):
-            result = future.result()
-            results.append(result)
-
-            flag = result.get("flag", "ERROR")
-            name = result.get("full_name", "Unknown")
-
-            if flag == "FAIL":
-                print(f"  [{i}/{len(leads_with_messages)}] FAIL: {name} - {result.get('reason', 'no reason')}")
-            elif flag == "REVIEW":
-                print(f"  [{i}/{len(leads_with_messages)}] REVIEW: {name} - {result.get('reason', 'no reason')}")
-            elif flag == "ERROR":
-                print(f"  [{i}/{len(leads_with_messages)}] ERROR: {name} - {result.get('error', 'unknown error')}")
-            else:
-                print(f"  [{i}/{len(leads_with_messages)}] PASS: {name}")
+    def report(result):
+        results.append(result)
+        i = len(results)
+
+        flag = result.get("flag", "ERROR")
+        name = result.get("full_name", "Unknown")
+
+        if flag == "FAIL":
+            print(f"  [{i}/{len(leads_with_messages)}] FAIL: {name} - {result.get('reason', 'no reason')}")
+        elif flag == "REVIEW":
+            print(f"  [{i}/{len(leads_with_messages)}] REVIEW: {name} - {result.get('reason', 'no reason')}")
+        elif flag == "ERROR":
+            print(f"  [{i}/{len(leads_with_messages)}] ERROR: {name} - {result.get('error', 'unknown error')}")
+        else:
+            print(f"  [{i}/{len(leads_with_messages)}] PASS: {name}")
+
+    sampler = None
+    if adaptive:
+        print(f"Adaptively validating up to {len(leads_with_messages)} messages using {model}...")
+        sampler = SequentialSampler()
+        sample_validate(
+            leads_with_messages,
+            lambda lead: validate_single(lead, model),
+            lambda result: None if result.get("flag") == "ERROR" else result.get("flag") == "PASS",
+            sampler,
+            on_result=lambda lead, result: report(result),
+        )
+    else:
+        print(f"Validating {len(leads_with_messages)} messages using {model}...")
+
+        # Process with threading for speed
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = {executor.submit(validate_single, lead, model): lead for lead in leads_with_messages}
+
+            for future in as_completed(futures):
+                report(future.result())
 
     # Summary stats
     passes = len([r for r in results if r.get("flag") == "PASS"])
@@ -188,6 +211,10 @@ def validate_batch(input_file: str, output_file: str = None, sample_size: int =
     print(f"  REVIEW: {reviews} ({100*reviews/len(results):.1f}%)")
     print(f"  FAIL:   {fails} ({100*fails/len(results):.1f}%)")
     print(f"  ERROR:  {errors} ({100*errors/len(results):.1f}%)")
+    if sampler:
+        sampling = sampler.report()
+        print(f"Adaptive sampling: {sampling['mode']} - skipped {sampling['skipped']} of {len(leads_with_messages)}, "
+              f"pass rate CI {sampling['ci_low']:.1%}-{sampling['ci_high']:.1%}")
 
     # Show fails and reviews
     if fails > 0:
@@ -228,6 +255,7 @@ def validate_batch(input_file: str, output_file: str = None, sample_size: int =
                 "error": errors,
                 "pass_rate": f"{100*passes/len(results):.1f}%"
             },
+            "sampling": sampler.report() if sampler else None,
             "results": results
         }, f, indent=2)
 
@@ -241,8 +269,10 @@ if __name__ == "__main__":
     parser.add_argument("input_file", help="JSON file with personalized messages")
     parser.add_argument("--output", "-o", help="Output file for validation results")
     parser.add_argument("--sample", "-s", type=int, help="Validate only N random samples")
+    parser.add_argument("--adaptive", "-a", action="store_true",
+                        help="Validate a sequential sample sized by the observed pass rate")
     parser.add_argument("--model", "-m", default="deepseek-chat", help="Model to use for validation (default: deepseek-chat)")
 
     args = parser.parse_args()
 
-    validate_batch(args.input_file, args.output, args.sample, args.model)
+    validate_batch(args.input_file, args.output, args.sample, args.model, adaptive=args.adaptive)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validation Sampling - Scale LLM-judge calls with observed message quality.
+
+Validating every personalized message costs one DeepSeek judge call per
+lead, even on batches where nearly everything passes. SequentialSampler
+estimates the batch's judge pass rate as results come in, with a Wilson
+score interval, and decides whether the next message needs judging:
+
+- full: every message is judged until the lower bound of the pass rate
+  reaches target_pass_rate (small batches never leave this mode).
+- sampling: the pass rate is stably high, so only audit_rate of the
+  remaining messages are judged. Audit results keep updating the interval;
+  if the lower bound drops below target, it's back to full.
+- escalated: failures cluster (cluster_failures of the last cluster_window
+  judged messages failed) or the upper bound falls below target. Every
+  message is judged from then on, including the ones skipped earlier.
+
+Only judge verdicts feed the sampler: errors and messages failed by the
+local rules (message_rules) are not evidence about the judge pass rate.
+
+Usage:
+    from validation_sampling import SequentialSampler, sample_validate
+
+    sampler = SequentialSampler()
+    results = sample_validate(leads, validate_single_message,
+                              lambda r: r.get("flag") == "PASS" if r.get("flag") != "ERROR" else None,
+                              sampler)
+    print(sampler.report())
+"""
+
+import math
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Sampling policy
+SAMPLING_TARGET_PASS_RATE = 0.85
+SAMPLING_AUDIT_RATE = 0.2
+SAMPLING_Z = 1.645  # one-sided 95% bound
+SAMPLING_CLUSTER_WINDOW = 10
+SAMPLING_CLUSTER_FAILURES = 3
+
+
+def wilson_interval(passes: int, samples: int, z: float = SAMPLING_Z) -> Tuple[float, float]:
+    """
+    Wilson score interval for a pass rate.
+
+    Args:
+        passes: Passing samples
+        samples: Samples judged
+        z: Normal quantile for the confidence level
+
+    Returns:
+        (low, high); (0.0, 1.0) with no samples
+    """
+    if samples <= 0:
+        return 0.0, 1.0
+    p = passes / samples
+    denominator = 1 + z * z / samples
+    centre = p + z * z / (2 * samples)
+    margin = z * math.sqrt(p * (1 - p) / samples + z * z / (4 * samples * samples))
+    return max(0.0, (centre - margin) / denominator), min(1.0, (centre + margin) / denominator)
+
+
+class SequentialSampler:
+    """Decide which messages the judge sees, from the pass rate observed so far."""
+
+    def __init__(
+        self,
+        target_pass_rate: float = SAMPLING_TARGET_PASS_RATE,
+        audit_rate: float = SAMPLING_AUDIT_RATE,
+        z: float = SAMPLING_Z,
+        cluster_window: int = SAMPLING_CLUSTER_WINDOW,
+        cluster_failures: int = SAMPLING_CLUSTER_FAILURES,
+        seed: Optional[int] = None,
+    ):
+        self.target_pass_rate = target_pass_rate
+        self.audit_rate = audit_rate
+        self.z = z
+        self.cluster_failures = cluster_failures
+        self.samples = 0
+        self.passes = 0
+        self.skipped = 0
+        self.escalation_reason: Optional[str] = None
+        self._recent = deque(maxlen=cluster_window)
+        self._rng = random.Random(seed)
+
+    def interval(self) -> Tuple[float, float]:
+        """Wilson interval of the judge pass rate so far."""
+        return wilson_interval(self.passes, self.samples, self.z)
+
+    @property
+    def mode(self) -> str:
+        """"full", "sampling" or "escalated"."""
+        if self.escalation_reason:
+            return "escalated"
+        return "sampling" if self.interval()[0] >= self.target_pass_rate else "full"
+
+    def should_validate(self) -> bool:
+        """Whether the next message should be judged (counts skips)."""
+        if self.mode != "sampling" or self._rng.random() < self.audit_rate:
+            return True
+        self.skipped += 1
+        return False
+
+    def record(self, passed: bool) -> bool:
+        """
+        Record one judge verdict.
+
+        Args:
+            passed: Whether the message passed
+
+        Returns:
+            True if this verdict escalated to full validation (skipped
+            messages should now be judged)
+        """
+        self.samples += 1
+        self.passes += int(passed)
+        self._recent.append(passed)
+        if self.escalation_reason:
+            return False
+
+        failures = self._recent.count(False)
+        if failures >= self.cluster_failures:
+            self.escalation_reason = f"{failures} of the last {len(self._recent)} judged messages failed"
+        elif self.interval()[1] < self.target_pass_rate:
+            self.escalation_reason = f"pass rate below {self.target_pass_rate:.0%}"
+        else:
+            return False
+        print(f"  [SAMPLING] Escalating to full validation: {self.escalation_reason}")
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        """Mode, counts and pass-rate interval, for summaries and result files."""
+        low, high = self.interval()
+        return {
+            "mode": self.mode,
+            "judged": self.samples,
+            "passes": self.passes,
+            "skipped": self.skipped,
+            "pass_rate": round(self.passes / self.samples, 3) if self.samples else None,
+            "ci_low": round(low, 3),
+            "ci_high": round(high, 3),
+            "escalation_reason": self.escalation_reason,
+        }
+
+
+def sample_validate(
+    items: List[Any],
+    validate: Callable[[Any], Any],
+    is_pass: Callable[[Any], Optional[bool]],
+    sampler: SequentialSampler,
+    workers: int = 5,
+    on_result: Optional[Callable[[Any, Any], None]] = None,
+) -> Dict[int, Any]:
+    """
+    Validate a random sample of items, as large as the sampler asks for.
+
+    Items are judged in random order (drawn from the sampler's RNG, so a
+    seeded sampler reproduces the run) with at most `workers` in flight, so
+    each decision sees nearly all earlier verdicts. Items skipped before an
+    escalation are judged after it. A validate call that raises gets the
+    verdict {"flag": "ERROR", "error": ...}, which is not recorded by the
+    sampler, and the rest of the batch carries on.
+
+    Args:
+        items: Items to validate
+        validate: Judges one item (runs in the pool)
+        is_pass: Verdict -> True/False, or None if it says nothing about
+            quality (errors)
+        sampler: Sampling policy and state
+        workers: Concurrent judge calls
+        on_result: Called as on_result(item, verdict) for each verdict
+
+    Returns:
+        Dict of item index -> verdict, for the items that were judged
+    """
+    order = list(range(len(items)))
+    sampler._rng.shuffle(order)
+    queue = deque(order)
+    skipped: List[int] = []
+    results: Dict[int, Any] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        while queue or pending:
+            while queue and len(pending) < workers:
+                idx = queue.popleft()
+                if sampler.should_validate():
+                    pending[executor.submit(validate, items[idx])] = idx
+                else:
+                    skipped.append(idx)
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = pending.pop(future)
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    print(f"  [ERROR] Validation failed: {e}")
+                    results[idx] = {"flag": "ERROR", "error": str(e)}
+                    if on_result:
+                        on_result(items[idx], results[idx])
+                    continue
+                if on_result:
+                    on_result(items[idx], results[idx])
+                passed = is_pass(results[idx])
+                if passed is not None and sampler.record(passed):
+                    queue.extend(skipped)
+                    sampler.skipped -= len(skipped)
+                    skipped.clear()
+
+    return results
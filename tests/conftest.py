@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared pytest fixtures.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_kv_cache(tmp_path, monkeypatch):
+    """Point the shared KV cache (search results, watermarks, ...) at a per-test file."""
+    import kv_cache
+
+    monkeypatch.setattr(kv_cache, "SHARED_KV_CACHE_FILE", str(tmp_path / "kv_cache.sqlite3"))
+    yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_apify_governor(tmp_path, monkeypatch):
+    """Give each test its own Apify governor state file."""
+    import apify_governor
+
+    monkeypatch.delenv("APIFY_GOVERNOR_STATE_FILE", raising=False)
+    monkeypatch.setattr(apify_governor, "GOVERNOR_STATE_FILE", str(tmp_path / "apify_governor.json"))
+    yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_profile_store(tmp_path, monkeypatch):
+    """Point the shared profile cache at a per-test SQLite file, with a fresh singleton."""
+    import profile_store
+
+    monkeypatch.setattr(profile_store, "SHARED_PROFILE_STORE_FILE", str(tmp_path / "profile_cache.sqlite3"))
+    monkeypatch.setattr(profile_store, "LEGACY_PROFILE_CACHE_FILE", str(tmp_path / "profile_cache.json"))
+    monkeypatch.setattr(profile_store, "_stores", {})
+    yield
+    for store in profile_store._stores.values():
+        store.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_lead_ledger(tmp_path, monkeypatch):
+    """Point the shared processed-leads ledger and its Bloom filter at per-test files."""
+    import lead_ledger
+
+    monkeypatch.setattr(lead_ledger, "SHARED_PROCESSED_LEADS_FILE", str(tmp_path / "processed_leads.jsonl"))
+    monkeypatch.setattr(lead_ledger, "LEGACY_PROCESSED_LEADS_FILE", str(tmp_path / "processed_leads.json"))
+    monkeypatch.setattr(lead_ledger, "SHARED_PROCESSED_LEADS_BLOOM_FILE", str(tmp_path / "processed_leads.bloom"))
+    monkeypatch.setattr(lead_ledger, "_ledgers", {})
+    yield
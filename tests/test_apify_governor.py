@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared Apify concurrency and spend governor.
+
+Run tests: pytest tests/test_apify_governor.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+from unittest.mock import MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+def make_governor(tmp_path, **limits):
+    from apify_governor import ApifyGovernor
+
+    settings = {"max_concurrent_runs": 2, "max_memory_mb": 4096, "runs_per_minute": 100, "daily_budget_usd": 1.0}
+    settings.update(limits)
+    return ApifyGovernor(str(tmp_path / "governor.json"), **settings)
+
+
+class TestAdmission:
+    """Runs are admitted within concurrency, memory, rate and budget limits."""
+
+    def test_concurrency_limit_queues_extra_runs(self, tmp_path):
+        governor = make_governor(tmp_path)
+        first = governor.acquire("actor", estimated_cost_usd=0.1)
+        governor.acquire("actor", estimated_cost_usd=0.1)
+
+        with pytest.raises(TimeoutError):
+            governor.acquire("actor", estimated_cost_usd=0.1, max_wait_seconds=0)
+
+        governor.release(first)
+        governor.acquire("actor", estimated_cost_usd=0.1, max_wait_seconds=0)
+
+    def test_limits_are_shared_through_the_state_file(self, tmp_path):
+        # Two instances on one file stand in for two processes
+        one = make_governor(tmp_path, max_concurrent_runs=1)
+        other = make_governor(tmp_path, max_concurrent_runs=1)
+        one.acquire("actor")
+
+        with pytest.raises(TimeoutError):
+            other.acquire("actor", max_wait_seconds=0)
+
+    def test_memory_limit(self, tmp_path):
+        governor = make_governor(tmp_path, max_concurrent_runs=10)
+        governor.acquire("actor", memory_mb=4096)
+
+        with pytest.raises(TimeoutError):
+            governor.acquire("actor", memory_mb=1024, max_wait_seconds=0)
+
+    def test_token_bucket_limits_start_rate(self, tmp_path):
+        governor = make_governor(tmp_path, runs_per_minute=2)
+        for _ in range(2):
+            governor.release(governor.acquire("actor", estimated_cost_usd=0.0))
+
+        with pytest.raises(TimeoutError):
+            governor.acquire("actor", estimated_cost_usd=0.0, max_wait_seconds=0)
+
+    def test_budget_is_a_hard_ceiling(self, tmp_path):
+        from apify_governor import ApifyBudgetExceeded
+
+        governor = make_governor(tmp_path)
+        lease = governor.acquire("actor", estimated_cost_usd=0.5)
+        governor.release(lease, actual_cost_usd=0.9)
+
+        with pytest.raises(ApifyBudgetExceeded):
+            governor.acquire("actor", estimated_cost_usd=0.2)
+
+        status = governor.status()
+        assert status["spent_usd"] == 0.9
+        assert status["refused_today"] == 1
+
+    def test_runs_in_flight_reserve_budget(self, tmp_path):
+        governor = make_governor(tmp_path, max_concurrent_runs=10)
+        governor.acquire("actor", estimated_cost_usd=0.8)
+
+        # Might fit once the running job settles for less, so it waits
+        with pytest.raises(TimeoutError):
+            governor.acquire("actor", estimated_cost_usd=0.3, max_wait_seconds=0)
+
+
+class TestLeases:
+    """Slots of crashed processes are reclaimed."""
+
+    def test_dead_process_lease_is_dropped(self, tmp_path):
+        import subprocess
+
+        governor = make_governor(tmp_path, max_concurrent_runs=1)
+        lease = governor.acquire("actor", estimated_cost_usd=0.1)
+
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        with open(governor.state_path) as f:
+            state = json.load(f)
+        state["leases"][lease]["pid"] = finished.pid
+        with open(governor.state_path, "w") as f:
+            json.dump(state, f)
+
+        governor.acquire("actor", max_wait_seconds=0)
+        # The abandoned run's estimate is counted as spent
+        assert governor.status()["spent_usd"] == 0.1
+
+    def test_other_host_lease_is_kept_until_expiry(self, tmp_path):
+        import subprocess
+
+        governor = make_governor(tmp_path, max_concurrent_runs=1)
+        lease = governor.acquire("actor", estimated_cost_usd=0.1)
+
+        # A run leased by another container: its PID isn't in our namespace
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        with open(governor.state_path) as f:
+            state = json.load(f)
+        state["leases"][lease].update(pid=finished.pid, host="other-container/boot")
+        with open(governor.state_path, "w") as f:
+            json.dump(state, f)
+
+        with pytest.raises(TimeoutError):
+            governor.acquire("actor", max_wait_seconds=0)
+        assert governor.status()["runs_in_flight"] == 1
+
+        state["leases"][lease]["expires_at"] = 0
+        with open(governor.state_path, "w") as f:
+            json.dump(state, f)
+        governor.acquire("actor", max_wait_seconds=0)
+
+    def test_slot_releases_on_error(self, tmp_path):
+        governor = make_governor(tmp_path, max_concurrent_runs=1)
+
+        with pytest.raises(RuntimeError):
+            with governor.slot("actor", estimated_cost_usd=0.1):
+                raise RuntimeError("run failed")
+
+        assert governor.status()["runs_in_flight"] == 0
+
+
+class TestCallActor:
+    """call_actor admits the run before starting it."""
+
+    def test_wraps_client_call(self):
+        from apify_governor import call_actor, get_apify_governor
+
+        client = MagicMock()
+        client.actor.return_value.call.return_value = {"defaultDatasetId": "ds1"}
+
+        run = call_actor(client, "actor", {"q": 1}, estimated_cost_usd=0.02)
+
+        assert run == {"defaultDatasetId": "ds1"}
+        client.actor.return_value.call.assert_called_once_with(run_input={"q": 1})
+        status = get_apify_governor().status()
+        assert status["runs_today"] == 1
+        assert status["runs_in_flight"] == 0
+        assert status["spent_usd"] == 0.02
+
+    def test_settles_actual_run_cost(self):
+        from apify_governor import call_actor, get_apify_governor
+
+        client = MagicMock()
+        client.actor.return_value.call.return_value = {"defaultDatasetId": "ds1", "status": "SUCCEEDED", "usageTotalUsd": 0.35}
+
+        call_actor(client, "actor", {"q": 1}, estimated_cost_usd=0.02)
+
+        # Spend tracks what Apify billed, not the estimate
+        assert get_apify_governor().status()["spent_usd"] == 0.35
+
+    def test_failed_call_settles_estimate(self):
+        from apify_governor import call_actor, get_apify_governor
+
+        client = MagicMock()
+        client.actor.return_value.call.side_effect = RuntimeError("actor failed")
+
+        with pytest.raises(RuntimeError):
+            call_actor(client, "actor", {"q": 1}, estimated_cost_usd=0.02)
+
+        status = get_apify_governor().status()
+        assert status["runs_in_flight"] == 0
+        assert status["spent_usd"] == 0.02
+
+    def test_unfinished_run_settles_estimate(self):
+        from apify_governor import run_cost_usd
+
+        # The caller stopped waiting; the run keeps billing past this figure
+        assert run_cost_usd({"status": "RUNNING", "usageTotalUsd": 0.01}) is None
+        assert run_cost_usd({"status": "FAILED", "usageTotalUsd": 0.01}) == 0.01
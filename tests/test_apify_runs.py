@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for adaptive Apify run completion detection.
+
+Run tests: pytest tests/test_apify_runs.py -v
+"""
+
+import pytest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+def run_response(status):
+    response = MagicMock()
+    response.json.return_value = {"data": {"id": "run1", "status": status}}
+    return response
+
+
+class TestWaitForRun:
+    """Long-polls until a terminal status instead of sleeping a fixed time."""
+
+    def test_returns_as_soon_as_run_succeeds(self):
+        from apify_runs import wait_for_run
+
+        responses = [run_response("RUNNING"), run_response("RUNNING"), run_response("SUCCEEDED")]
+        with patch("apify_runs.requests.get", side_effect=responses) as mock_get, \
+                patch("apify_runs.time.sleep"):
+            run = wait_for_run("run1", "token", expected_items=5)
+
+        assert run["status"] == "SUCCEEDED"
+        waits = [call.kwargs["params"]["waitForFinish"] for call in mock_get.call_args_list]
+        assert waits == [2, 4, 8]
+
+    def test_long_poll_wait_is_capped(self):
+        from apify_runs import wait_for_run, MAX_WAIT_FOR_FINISH
+
+        responses = [run_response("RUNNING")] * 8 + [run_response("SUCCEEDED")]
+        with patch("apify_runs.requests.get", side_effect=responses) as mock_get, \
+                patch("apify_runs.time.sleep"):
+            wait_for_run("run1", "token", timeout_seconds=10_000)
+
+        waits = [call.kwargs["params"]["waitForFinish"] for call in mock_get.call_args_list]
+        assert max(waits) == MAX_WAIT_FOR_FINISH
+
+    @pytest.mark.parametrize("status", ["FAILED", "TIMED-OUT", "ABORTED"])
+    def test_failed_runs_are_terminal(self, status):
+        from apify_runs import wait_for_run
+
+        with patch("apify_runs.requests.get", return_value=run_response(status)) as mock_get:
+            run = wait_for_run("run1", "token")
+
+        assert run["status"] == status
+        assert mock_get.call_count == 1
+
+    def test_gives_up_after_repeated_errors(self):
+        from apify_runs import wait_for_run, MAX_POLL_ERRORS
+
+        with patch("apify_runs.requests.get", side_effect=ConnectionError("down")) as mock_get, \
+                patch("apify_runs.time.sleep"):
+            run = wait_for_run("run1", "token")
+
+        assert run["status"] == "UNKNOWN"
+        assert mock_get.call_count == MAX_POLL_ERRORS
+
+    def test_deadline_returns_last_status(self):
+        from apify_runs import wait_for_run
+
+        with patch("apify_runs.requests.get", return_value=run_response("RUNNING")):
+            run = wait_for_run("run1", "token", timeout_seconds=0)
+
+        assert run["status"] == "RUNNING"
+
+    def test_timeout_scales_with_batch_size(self):
+        from apify_runs import estimate_run_timeout
+
+        assert estimate_run_timeout(500) > estimate_run_timeout(5)
+
+
+def fake_apify(pages, statuses):
+    """requests.get stand-in: dataset reads pop pages, run polls pop statuses."""
+    pages, statuses = list(pages), list(statuses)
+    calls = []
+
+    def get(url, params=None, **kwargs):
+        response = MagicMock()
+        if "/datasets/" in url:
+            calls.append(("items", params["offset"]))
+            response.json.return_value = pages.pop(0) if pages else []
+        else:
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            calls.append(("run", status))
+            response.json.return_value = {"data": {"id": "run1", "status": status}}
+        return response
+
+    return get, calls
+
+
+class TestDatasetStream:
+    """Dataset pages are yielded while the run is still going."""
+
+    def test_yields_pages_before_run_finishes(self):
+        from apify_runs import DatasetStream
+
+        get, calls = fake_apify(
+            pages=[[{"n": 1}, {"n": 2}], [], [{"n": 3}], [{"n": 4}]],
+            statuses=["RUNNING", "RUNNING", "SUCCEEDED"],
+        )
+        with patch("apify_runs.requests.get", side_effect=get):
+            stream = DatasetStream("run1", "ds1", "token", page_size=10)
+            pages = list(stream)
+
+        assert pages == [[{"n": 1}, {"n": 2}], [{"n": 3}], [{"n": 4}]]
+        # The first page was read before any status poll
+        assert calls[0] == ("items", 0)
+        # Offsets advance past what was already read
+        assert [offset for kind, offset in calls if kind == "items"] == [0, 2, 2, 3]
+        assert stream.run["status"] == "SUCCEEDED"
+        assert stream.items_read == 4
+
+    def test_full_page_is_followed_by_immediate_read(self):
+        from apify_runs import DatasetStream
+
+        get, calls = fake_apify(
+            pages=[[{"n": 1}, {"n": 2}], [{"n": 3}]],
+            statuses=["SUCCEEDED"],
+        )
+        with patch("apify_runs.requests.get", side_effect=get):
+            pages = list(DatasetStream("run1", "ds1", "token", page_size=2))
+
+        assert pages == [[{"n": 1}, {"n": 2}], [{"n": 3}]]
+        assert calls[:2] == [("items", 0), ("items", 2)]
+
+    def test_drains_dataset_after_failed_run(self):
+        from apify_runs import DatasetStream
+
+        get, _ = fake_apify(pages=[[], [{"n": 1}]], statuses=["FAILED"])
+        with patch("apify_runs.requests.get", side_effect=get):
+            stream = DatasetStream("run1", "ds1", "token")
+            pages = list(stream)
+
+        assert pages == [[{"n": 1}]]
+        assert stream.run["status"] == "FAILED"
+
+
+class TestSharding:
+    """Batches split into runs sized to a target time; pages merged as they arrive."""
+
+    def test_small_batch_is_one_shard(self):
+        from apify_runs import plan_shards
+
+        assert plan_shards(list(range(50)), target_seconds=180, seconds_per_item=1.5, max_shards=4) == [list(range(50))]
+
+    def test_shards_follow_target_time(self):
+        from apify_runs import plan_shards
+
+        shards = plan_shards(list(range(300)), target_seconds=180, seconds_per_item=1.5, max_shards=4)
+
+        assert len(shards) == 3
+        assert sum(shards, []) == list(range(300))
+
+    def test_shard_count_is_capped(self):
+        from apify_runs import plan_shards
+
+        shards = plan_shards(list(range(1000)), target_seconds=180, seconds_per_item=1.5, max_shards=4)
+
+        assert len(shards) == 4
+        assert max(len(s) for s in shards) == 250
+
+    def test_merge_streams_yields_every_page(self):
+        import time
+        from apify_runs import merge_streams
+
+        class FakeStream:
+            def __init__(self, name, delay):
+                self.name, self.delay, self.run_id = name, delay, name
+
+            def __iter__(self):
+                for i in range(3):
+                    time.sleep(self.delay)
+                    yield [f"{self.name}{i}"]
+
+        pages = list(merge_streams([FakeStream("slow", 0.03), FakeStream("fast", 0.001)]))
+
+        assert sorted(p[0] for p in pages) == ["fast0", "fast1", "fast2", "slow0", "slow1", "slow2"]
+        # The fast run is not held up behind the slow one
+        assert pages[0] == ["fast0"]
@@ -277,6 +277,118 @@ class TestPostEngagersScraper:
             "https://www.linkedin.com/in/user3"
         }
 
+    def test_concurrent_scrape_keeps_post_order_and_isolates_errors(self):
+        """Test runs overlap, results follow post order, and one failed post is skipped."""
+        import threading
+        import time
+        import competitor_post_pipeline as cpp
+
+        post_urls = [f"https://www.linkedin.com/posts/post{i}" for i in range(4)]
+        in_flight = {"now": 0, "max": 0}
+        counter_lock = threading.Lock()
+
+        def call(run_input):
+            url = run_input["post_urls"][0]
+            with counter_lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            # Earlier posts finish last
+            time.sleep(0.05 * (4 - post_urls.index(url)))
+            with counter_lock:
+                in_flight["now"] -= 1
+            if url.endswith("post2"):
+                raise RuntimeError("actor run failed")
+            return {"defaultDatasetId": url}
+
+        client = MagicMock()
+        client.actor.return_value.call.side_effect = call
+        client.dataset.side_effect = lambda dataset_id: MagicMock(
+            iterate_items=lambda: iter([{"post": dataset_id}])
+        )
+
+        with patch.object(cpp, "APIFY_API_TOKEN", "test-token"), \
+                patch("apify_client.ApifyClient", return_value=client):
+            engagers = cpp.scrape_post_engagers(post_urls, concurrency=3)
+
+        assert [e["post"] for e in engagers] == [post_urls[0], post_urls[1], post_urls[3]]
+        assert in_flight["max"] == 3
+
+
+class TestStreamingProfileScrape:
+    """Profiles are handed downstream page by page while the run is going."""
+
+    def test_yields_cached_then_each_dataset_page(self, tmp_path):
+        import competitor_post_pipeline as cpp
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put("https://www.linkedin.com/in/cached", {"fullName": "Cached Lead"})
+
+        class FakeStream:
+            def __init__(self, *args, **kwargs):
+                self.run = {"status": "SUCCEEDED"}
+                self.items_read = 0
+
+            def __iter__(self):
+                for name in ("first", "second"):
+                    self.items_read += 1
+                    yield [{"inputUrl": f"https://www.linkedin.com/in/{name}", "firstName": name, "positions": []}]
+
+        started = MagicMock()
+        started.json.return_value = {"data": {"id": "run1", "defaultDatasetId": "ds1"}}
+
+        with patch.object(cpp, "APIFY_API_TOKEN", "test-token"), \
+                patch.object(cpp, "load_profile_cache", return_value=store), \
+                patch.object(cpp, "DatasetStream", FakeStream), \
+                patch("requests.post", return_value=started):
+            batches = list(cpp.iter_linkedin_profiles([
+                "https://www.linkedin.com/in/cached",
+                "https://www.linkedin.com/in/first",
+                "https://www.linkedin.com/in/second",
+            ]))
+
+        assert [[p.get("fullName") or p["firstName"] for p in batch] for batch in batches] == [
+            ["Cached Lead"], ["first"], ["second"],
+        ]
+        assert "https://www.linkedin.com/in/second" in store
+
+    def test_shards_across_runs_and_isolates_start_failure(self, tmp_path):
+        import competitor_post_pipeline as cpp
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        urls = [f"https://www.linkedin.com/in/user{i}" for i in range(6)]
+        shard_inputs = {}
+
+        def start(shard):
+            if "user4" in shard[0]:
+                return None  # this shard's run failed to start
+            shard_inputs[shard[0]] = shard
+            return {"id": shard[0], "defaultDatasetId": shard[0]}
+
+        class FakeStream:
+            def __init__(self, run_id, dataset_id, token, **kwargs):
+                self.run_id = run_id
+                self.run = {"status": "SUCCEEDED"}
+                self.items_read = 0
+
+            def __iter__(self):
+                for url in shard_inputs[self.run_id]:
+                    self.items_read += 1
+                    yield [{"inputUrl": url, "firstName": url.rsplit("/", 1)[-1], "positions": []}]
+
+        with patch.object(cpp, "APIFY_API_TOKEN", "test-token"), \
+                patch.object(cpp, "load_profile_cache", return_value=store), \
+                patch.object(cpp, "_start_profile_scraper_run", side_effect=start), \
+                patch.object(cpp, "DatasetStream", FakeStream):
+            # 1.5s per profile and a 3s target: two profiles per run
+            batches = list(cpp.iter_linkedin_profiles(urls, max_shards=3, shard_target_seconds=3))
+
+        assert sorted(shard_inputs.values()) == [urls[0:2], urls[2:4]]
+        scraped = sorted(p["firstName"] for batch in batches for p in batch)
+        assert scraped == ["user0", "user1", "user2", "user3"]
+        assert "https://www.linkedin.com/in/user3" in store
+
 
 # =============================================================================
 # MODULE 3: LOCATION FILTER
@@ -911,6 +1023,98 @@ class TestSupremeCoderNormalization:
         assert completeness["complete"] is True
 
 
+# =============================================================================
+# MODULE 9: COST TRACKING
+# =============================================================================
+
+def deepseek_completion(prompt_tokens=1000, cached=800, completion=100):
+    response = MagicMock()
+    response.status_code = 200
+    response.ok = True
+    response.json.return_value = {
+        "choices": [{"message": {"content": "ok"}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion,
+                  "prompt_cache_hit_tokens": cached, "prompt_cache_miss_tokens": prompt_tokens - cached},
+    }
+    return response
+
+
+class TestCostTracker:
+    """Measured token, Apify and latency accounting, scoped per run."""
+
+    def test_llm_usage_lands_on_active_tracker_by_stage(self):
+        from competitor_post_pipeline import CostTracker
+        from llm_client import llm_post
+
+        tracker = CostTracker()
+        with patch("requests.Session.post", return_value=deepseek_completion()):
+            with tracker.activate(), tracker.stage("icp"):
+                llm_post("https://api.deepseek.com/chat/completions", json={})
+                llm_post("https://api.deepseek.com/chat/completions", json={})
+            # Outside the run: not recorded
+            llm_post("https://api.deepseek.com/chat/completions", json={})
+
+        icp = tracker.get_stage_report()["icp"]
+        assert icp["llm_calls"] == 2
+        assert icp["prompt_tokens"] == 2000
+        assert icp["cached_prompt_tokens"] == 1600
+        assert icp["completion_tokens"] == 200
+        # 400 uncached at $0.14/M + 1600 cached at $0.014/M + 200 out at $0.28/M
+        assert tracker.llm_usage["icp"]["cost_usd"] == pytest.approx((400 * 0.14 + 1600 * 0.014 + 200 * 0.28) / 1e6)
+        assert tracker.stage_seconds["icp"] >= 0
+
+    def test_actor_run_usage_from_call_actor(self):
+        from competitor_post_pipeline import CostTracker
+        from apify_governor import call_actor
+
+        client = MagicMock()
+        client.actor.return_value.call.return_value = {
+            "defaultDatasetId": "ds1", "usageTotalUsd": 0.031,
+            "stats": {"computeUnits": 0.12, "runTimeSecs": 42},
+        }
+        tracker = CostTracker()
+        with tracker.activate(), tracker.stage("google_search"):
+            call_actor(client, "apify/google-search-scraper", {}, estimated_cost_usd=0.04)
+
+        stage = tracker.get_stage_report()["google_search"]
+        assert stage["actor_runs"] == 1
+        assert stage["compute_units"] == 0.12
+        assert tracker.get_measured_total() == pytest.approx(0.031)
+        assert tracker.cost_per_lead(2) == pytest.approx(0.0155)
+
+    def test_concurrent_runs_keep_separate_trackers(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from competitor_post_pipeline import CostTracker, get_cost_tracker, cost_tracker
+        from run_metrics import submit_in_context
+
+        def run(n):
+            tracker = CostTracker()
+            with tracker.activate():
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    # Workers see the run's tracker only when submitted in context
+                    for _ in range(n):
+                        submit_in_context(pool, lambda: get_cost_tracker().add_icp_check(1))
+            return tracker
+
+        before = cost_tracker.counts["icp_checks"]
+        with ThreadPoolExecutor(max_workers=2) as runs:
+            first, second = runs.map(run, [50, 30])
+
+        assert first.counts["icp_checks"] == 50
+        assert second.counts["icp_checks"] == 30
+        assert cost_tracker.counts["icp_checks"] == before
+
+    def test_estimates_and_summary_unchanged_without_measurements(self):
+        from competitor_post_pipeline import CostTracker
+
+        tracker = CostTracker()
+        tracker.add_profile_scrape(10)
+
+        assert tracker.get_total() == pytest.approx(0.04)
+        assert "MEASURED" not in tracker.get_summary()
+        assert tracker.cost_per_lead(4) == pytest.approx(0.01)
+
+
 # =============================================================================
 # RUN CONFIGURATION
 # =============================================================================
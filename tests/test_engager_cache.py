@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the per-post engager cache.
+
+Run tests: pytest tests/test_engager_cache.py -v
+"""
+
+import pytest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+POST_URL = "https://www.linkedin.com/posts/someone_activity-123?utm_source=share"
+
+
+def reaction(n):
+    return {"reactor": {"profile_url": f"https://www.linkedin.com/in/person{n}", "name": f"Person {n}"}}
+
+
+def fake_client(responses):
+    """ApifyClient stand-in: each actor call returns the next list of items."""
+    responses = list(responses)
+    client = MagicMock()
+    run_inputs = []
+
+    def call(run_input):
+        run_inputs.append(run_input)
+        return {"defaultDatasetId": f"ds{len(run_inputs)}"}
+
+    client.actor.return_value.call.side_effect = call
+    client.dataset.side_effect = lambda ds: MagicMock(iterate_items=MagicMock(return_value=responses.pop(0)))
+    return client, run_inputs
+
+
+class TestFetchPostEngagers:
+    """Known posts only pay for reactions added since the last scrape."""
+
+    def test_first_scrape_is_one_plain_run(self):
+        from engager_cache import fetch_post_engagers
+
+        client, run_inputs = fake_client([[reaction(1), reaction(2)]])
+        engagers, runs = fetch_post_engagers(client, "actor", POST_URL)
+
+        assert engagers == [reaction(1), reaction(2)]
+        assert runs == 1
+        assert run_inputs == [{"post_urls": [POST_URL]}]
+
+    def test_fresh_entry_needs_no_run(self):
+        from engager_cache import fetch_post_engagers
+
+        client, _ = fake_client([[reaction(1)]])
+        fetch_post_engagers(client, "actor", POST_URL)
+
+        # Same post found through another keyword, tracking params differ
+        other, run_inputs = fake_client([])
+        engagers, runs = fetch_post_engagers(other, "actor", POST_URL.split("?")[0] + "/")
+
+        assert engagers == [reaction(1)]
+        assert runs == 0
+        assert run_inputs == []
+
+    def test_rescrape_stops_at_watermark(self):
+        from engager_cache import fetch_post_engagers
+
+        client, _ = fake_client([[reaction(1), reaction(2)]])
+        fetch_post_engagers(client, "actor", POST_URL)
+
+        with patch("engager_cache.REACTIONS_PAGE_SIZE", 2):
+            full_page = [reaction(4), reaction(3)]
+            reached = [reaction(5), reaction(1)]
+            client, run_inputs = fake_client([full_page, reached])
+            engagers, runs = fetch_post_engagers(client, "actor", POST_URL, fresh_hours=0)
+
+        assert runs == 2
+        assert [r["page_number"] for r in run_inputs] == [1, 2]
+        assert engagers == [reaction(4), reaction(3), reaction(5), reaction(1), reaction(2)]
+
+    def test_failed_rescrape_keeps_cached_engagers(self):
+        from engager_cache import fetch_post_engagers, get_kv_cache, ENGAGER_CACHE_NAMESPACE, normalize_post_url
+
+        client, _ = fake_client([[reaction(1)]])
+        fetch_post_engagers(client, "actor", POST_URL)
+        scraped_at = get_kv_cache().get(ENGAGER_CACHE_NAMESPACE, normalize_post_url(POST_URL))["scraped_at"]
+
+        broken = MagicMock()
+        broken.actor.return_value.call.side_effect = RuntimeError("actor down")
+        engagers, runs = fetch_post_engagers(broken, "actor", POST_URL, fresh_hours=0)
+
+        assert engagers == [reaction(1)]
+        assert runs == 0
+        # Still due for a re-scrape next time
+        entry = get_kv_cache().get(ENGAGER_CACHE_NAMESPACE, normalize_post_url(POST_URL))
+        assert entry["scraped_at"] == scraped_at
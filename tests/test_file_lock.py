@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for cross-process locking of shared .tmp state.
+
+Run tests: pytest tests/test_file_lock.py -v
+"""
+
+import pytest
+import os
+import sys
+import time
+import threading
+import subprocess
+
+# Add execution directory to path
+EXECUTION_DIR = os.path.join(os.path.dirname(__file__), '..', 'execution')
+sys.path.insert(0, EXECUTION_DIR)
+
+
+class TestFileLock:
+    """Exclusive access and contention stats."""
+
+    def test_second_holder_waits_and_is_counted(self, tmp_path):
+        from file_lock import FileLock, get_lock_stats, reset_lock_stats
+
+        reset_lock_stats()
+        lock_path = str(tmp_path / "state.lock")
+        held = threading.Event()
+
+        def hold():
+            with FileLock(lock_path, name="test_lock"):
+                held.set()
+                time.sleep(0.2)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait()
+
+        start = time.monotonic()
+        with FileLock(lock_path, name="test_lock"):
+            waited = time.monotonic() - start
+        holder.join()
+
+        stats = get_lock_stats()["test_lock"]
+        assert waited >= 0.1
+        assert stats["acquisitions"] == 2
+        assert stats["contended"] == 1
+        assert stats["max_wait_seconds"] >= 0.1
+
+    def test_timeout_raises(self, tmp_path):
+        from file_lock import FileLock, get_lock_stats, reset_lock_stats
+
+        reset_lock_stats()
+        lock_path = str(tmp_path / "state.lock")
+        with FileLock(lock_path, name="busy"):
+            with pytest.raises(TimeoutError):
+                FileLock(lock_path, name="busy", timeout=0.1).acquire()
+
+        assert get_lock_stats()["busy"]["timeouts"] == 1
+
+
+class TestConcurrentWriters:
+    """Parallel processes appending to the shared ledger lose nothing."""
+
+    def test_parallel_processes_append_to_ledger(self, tmp_path):
+        ledger_path = str(tmp_path / "processed.jsonl")
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from lead_ledger import ProcessedLeadLedger;"
+            "ledger = ProcessedLeadLedger(sys.argv[2], compact_min_dead=20, compact_ratio=0.1);"
+            "[ledger.add(f'https://www.linkedin.com/in/{sys.argv[3]}-{i % 40}', {'n': i}) for i in range(80)]"
+        )
+        procs = [
+            subprocess.Popen([sys.executable, "-c", script, EXECUTION_DIR, ledger_path, f"w{n}"])
+            for n in range(4)
+        ]
+        assert all(p.wait(timeout=60) == 0 for p in procs)
+
+        from lead_ledger import ProcessedLeadLedger
+        ledger = ProcessedLeadLedger(ledger_path)
+        assert len(ledger) == 160
+        assert ledger.get("https://www.linkedin.com/in/w0-39")["n"] == 79
+
+    def test_profile_store_write_waits_recorded(self, tmp_path):
+        from file_lock import get_lock_stats, reset_lock_stats
+        from profile_store import ProfileStore
+
+        reset_lock_stats()
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put("https://www.linkedin.com/in/janedoe", {"fullName": "Jane Doe"})
+
+        assert get_lock_stats()["profile_store"]["acquisitions"] >= 2
@@ -285,6 +285,61 @@ class TestSearchQueryGeneration:
         # 2 intent + 3 verticals = 5 max
         assert 1 <= len(queries) <= 5
 
+    def test_batched_search_splits_results_per_query(self):
+        """Test queries share actor runs and results map back by searchQuery.term."""
+        import gift_leads_list
+
+        queries = [f'site:linkedin.com/posts "topic {i}"' for i in range(5)]
+        run_inputs = []
+
+        def call(run_input):
+            run_inputs.append(run_input["queries"].split("\n"))
+            if queries[4] in run_inputs[-1]:
+                raise RuntimeError("actor run failed")
+            return {"defaultDatasetId": run_input["queries"]}
+
+        client = MagicMock()
+        client.actor.return_value.call.side_effect = call
+        client.dataset.side_effect = lambda dataset_id: MagicMock(iterate_items=lambda: iter([
+            {"searchQuery": {"term": q}, "organicResults": [{"url": q}]}
+            for q in dataset_id.split("\n")
+        ]))
+
+        with patch.object(gift_leads_list, "APIFY_API_TOKEN", "test-token"), \
+                patch("apify_client.ApifyClient", return_value=client):
+            results = gift_leads_list.search_google_raw_queries(queries, queries_per_run=2)
+
+        assert sorted(len(batch) for batch in run_inputs) == [1, 2, 2]
+        assert list(results) == queries
+        assert results[queries[0]][0]["organicResults"] == [{"url": queries[0]}]
+        assert results[queries[4]] == []
+
+    def test_batched_search_matches_reported_terms_loosely(self):
+        """Terms differing in case/whitespace still map back; unattributed results aren't cached as empty."""
+        import gift_leads_list
+        from search_cache import get_cached_search
+
+        queries = ['site:linkedin.com/posts "Topic A"', 'site:linkedin.com/posts "Topic B"',
+                   'site:linkedin.com/posts "Topic C"']
+        items = [
+            {"searchQuery": {"term": '  site:linkedin.com/posts   "topic a" '}, "organicResults": [{"url": "a"}]},
+            {"searchQuery": {"term": 'site:linkedin.com/posts Topic B'}, "organicResults": [{"url": "b"}]},
+        ]
+        client = MagicMock()
+        client.actor.return_value.call.return_value = {"defaultDatasetId": "ds"}
+        client.dataset.return_value.iterate_items.side_effect = lambda: iter(items)
+
+        with patch.object(gift_leads_list, "APIFY_API_TOKEN", "test-token"), \
+                patch("apify_client.ApifyClient", return_value=client):
+            results = gift_leads_list.search_google_raw_queries(queries, queries_per_run=3)
+
+        assert results[queries[0]][0]["organicResults"] == [{"url": "a"}]
+        assert get_cached_search(queries[0], 1, 10) == results[queries[0]]
+        # "Topic B" came back unquoted: not attributable, so neither B nor C is cached as "no results"
+        assert results[queries[1]] == [] and results[queries[2]] == []
+        assert get_cached_search(queries[1], 1, 10) is None
+        assert get_cached_search(queries[2], 1, 10) is None
+
 
 # =============================================================================
 # MODULE 4: SIGNAL NOTE GENERATION
@@ -344,6 +399,54 @@ class TestSignalNoteGeneration:
         result = generate_signal_notes([], "some ICP")
         assert result == []
 
+    @patch('gift_leads_list.DEEPSEEK_API_KEY', 'test-key')
+    def test_truncated_reply_re_requests_only_missing_leads(self, sample_qualified_leads):
+        """Test notes that survived truncation are kept and only missing leads are retried."""
+        import json
+        from gift_leads_list import generate_signal_notes
+
+        def reply(content):
+            response = MagicMock()
+            response.json.return_value = {"choices": [{"message": {"content": content}}]}
+            return response
+
+        first_url, second_url = (lead["linkedinUrl"] for lead in sample_qualified_leads[:2])
+        full = json.dumps({"notes": [
+            {"linkedin_url": first_url, "signal_note": "Liked a post on outbound"},
+            {"linkedin_url": second_url, "signal_note": "Commented on hiring SDRs"},
+        ]})
+        truncated = full[:full.index("Commented")]
+        retry = json.dumps({"notes": [{"linkedin_url": second_url, "signal_note": "Commented on hiring SDRs"}]})
+
+        leads = sample_qualified_leads[:2]
+        with patch('llm_client.llm_post', side_effect=[reply(truncated), reply(retry)]) as mock_post:
+            generate_signal_notes(leads, "B2B SaaS founders")
+
+        assert mock_post.call_count == 2
+        retry_prompt = mock_post.call_args_list[1].kwargs["json"]["messages"][1]["content"]
+        assert "bobwilson" in retry_prompt and "janesmith" not in retry_prompt
+        assert [lead["signal_note"] for lead in leads] == ["Liked a post on outbound", "Commented on hiring SDRs"]
+
+    @patch('gift_leads_list.DEEPSEEK_API_KEY', 'test-key')
+    def test_lead_without_url_is_not_re_requested(self, sample_qualified_leads):
+        """Test a lead no note can be matched to gets the fallback without extra requests."""
+        import json
+        from gift_leads_list import generate_signal_notes
+
+        response = MagicMock()
+        url = sample_qualified_leads[0]["linkedinUrl"]
+        response.json.return_value = {"choices": [{"message": {"content": json.dumps(
+            {"notes": [{"linkedin_url": url, "signal_note": "Liked a post on outbound"}]})}}]}
+
+        no_url = {"fullName": "No Url", "jobTitle": "CEO", "companyName": "NoCo"}
+        leads = [sample_qualified_leads[0], no_url]
+        with patch('llm_client.llm_post', return_value=response) as mock_post:
+            generate_signal_notes(leads, "B2B SaaS founders")
+
+        assert mock_post.call_count == 1
+        assert leads[0]["signal_note"] == "Liked a post on outbound"
+        assert "NoCo" in no_url["signal_note"]
+
 
 # =============================================================================
 # MODULE 5: OUTPUT FORMATTING
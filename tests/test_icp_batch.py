@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for batched ICP classification.
+
+Run tests: pytest tests/test_icp_batch.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+from unittest.mock import patch, MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+def deepseek_response(verdicts):
+    response = MagicMock()
+    response.json.return_value = {"choices": [{"message": {"content": json.dumps({"verdicts": verdicts})}}]}
+    return response
+
+
+def verdict(i, match=True):
+    return {"id": i, "match": match, "confidence": "high", "reason": f"lead {i}"}
+
+
+def leads(n):
+    return [{"fullName": f"Lead {i}"} for i in range(n)]
+
+
+class TestParseBatchVerdicts:
+    """Each verdict is validated on its own."""
+
+    def test_keeps_valid_and_drops_bad_entries(self):
+        from icp_batch import parse_batch_verdicts
+
+        text = json.dumps({"verdicts": [
+            verdict(1),
+            {"id": 2, "match": "maybe"},       # unusable match
+            {"id": 9, "match": True},          # out of range
+            {"id": "3", "match": "false"},     # tolerated types
+            verdict(1, match=False),           # duplicate id
+        ]})
+
+        parsed = parse_batch_verdicts(text, 3)
+
+        assert set(parsed) == {0, 2}
+        assert parsed[0]["match"] is True
+        assert parsed[2]["match"] is False
+
+    def test_unparseable_output_is_empty(self):
+        from icp_batch import parse_batch_verdicts
+
+        assert parse_batch_verdicts("not json", 3) == {}
+        assert parse_batch_verdicts(json.dumps({"verdicts": "nope"}), 3) == {}
+
+
+class TestClassifyLeadsIcp:
+    """K leads per request; only failed leads are re-queued."""
+
+    def test_one_request_per_batch(self):
+        from icp_batch import classify_leads_icp
+
+        single = MagicMock()
+        responses = [deepseek_response([verdict(i) for i in range(1, 6)])] * 2
+        with patch("requests.Session.post", side_effect=responses) as mock_post:
+            verdicts, stats = classify_leads_icp(leads(10), str, "system", None, "key", single,
+                                                 batch_size=5, max_in_flight=1)
+
+        assert mock_post.call_count == 2
+        assert stats["requests"] == 2
+        assert all(v["match"] for v in verdicts)
+        single.assert_not_called()
+        # Leads are numbered within each batch
+        prompt = mock_post.call_args.kwargs["json"]["messages"][1]["content"]
+        assert "### Lead 5" in prompt
+
+    def test_partial_failure_requeues_only_missing_leads(self):
+        from icp_batch import classify_leads_icp
+
+        single = MagicMock()
+        # Leads 3 and 5 get no usable verdict the first time
+        first = deepseek_response([verdict(1), verdict(2, match=False), {"id": 3, "match": None}, verdict(4)])
+        retry = deepseek_response([verdict(1, match=False), verdict(2)])
+        with patch("requests.Session.post", side_effect=[first, retry]) as mock_post:
+            verdicts, stats = classify_leads_icp(leads(5), lambda lead: lead["fullName"], "system", None, "key",
+                                                 single, batch_size=5, max_in_flight=1)
+
+        retry_prompt = mock_post.call_args_list[1].kwargs["json"]["messages"][1]["content"]
+        assert "Lead 2" in retry_prompt and "Lead 4" in retry_prompt
+        assert "Lead 0" not in retry_prompt and "Lead 3" not in retry_prompt
+        assert [v["match"] for v in verdicts] == [True, False, False, True, True]
+        assert stats == {"requests": 2, "batched": 5, "requeued": 2, "single": 0, "cached": 0}
+        single.assert_not_called()
+
+    def test_unresolved_leads_fall_back_to_single_check(self):
+        from icp_batch import classify_leads_icp
+
+        single = MagicMock(return_value={"match": True, "confidence": "local", "reason": "fallback"})
+        with patch("requests.Session.post", side_effect=ConnectionError("down")):
+            verdicts, stats = classify_leads_icp(leads(3), str, "system", "B2B founders", "key", single,
+                                                 max_in_flight=1)
+
+        assert single.call_count == 3
+        single.assert_called_with(leads(3)[2], "B2B founders")
+        assert stats["single"] == 3
+        assert all(v["reason"] == "fallback" for v in verdicts)
+
+    def test_single_lead_uses_single_check(self):
+        from icp_batch import classify_leads_icp
+
+        single = MagicMock(return_value={"match": False, "confidence": "high", "reason": "no"})
+        with patch("requests.Session.post") as mock_post:
+            verdicts, _ = classify_leads_icp(leads(1), str, "system", None, "key", single)
+
+        mock_post.assert_not_called()
+        assert verdicts == [{"match": False, "confidence": "high", "reason": "no"}]
+
+
+def stand_in_transport(delay_for, state):
+    """httpx transport that answers every lead in a batch after delay_for(first lead name)."""
+    import asyncio
+    import re
+    import httpx
+
+    async def handler(request):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        names = re.findall(r"### Lead \d+\n(Lead \d+)", prompt)
+        await asyncio.sleep(delay_for(names[0]))
+        state["in_flight"] -= 1
+        verdicts = [{"id": i, "match": int(name.split()[1]) % 2 == 0, "confidence": "high", "reason": name}
+                    for i, name in enumerate(names, 1)]
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps({"verdicts": verdicts})}}]})
+
+    return httpx.MockTransport(handler)
+
+
+class TestAsyncQualifier:
+    """Requests run concurrently within the in-flight limit; results keep lead order."""
+
+    def run(self, n, delay_for, **kwargs):
+        import httpx
+        from icp_batch import classify_leads_icp
+
+        state = {"in_flight": 0, "max_in_flight": 0}
+        transport = stand_in_transport(delay_for, state)
+        real_client = httpx.AsyncClient
+        single = MagicMock(return_value={"match": None, "confidence": "local", "reason": "fallback"})
+        with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+            verdicts, stats = classify_leads_icp(leads(n), lambda lead: lead["fullName"], "system", None,
+                                                 "key", single, **kwargs)
+        return verdicts, stats, state, single
+
+    def test_results_keep_lead_order(self):
+        # Later leads answer first
+        verdicts, stats, _, _ = self.run(8, lambda name: 0.05 - int(name.split()[1]) * 0.005,
+                                         batch_size=2, max_in_flight=4)
+
+        assert [v["reason"] for v in verdicts] == [f"Lead {i}" for i in range(8)]
+        assert [v["match"] for v in verdicts] == [i % 2 == 0 for i in range(8)]
+        assert stats["requests"] == 4
+
+    def test_in_flight_limit(self):
+        _, _, state, _ = self.run(20, lambda name: 0.02, batch_size=1, max_in_flight=3)
+
+        assert state["max_in_flight"] == 3
+
+    def test_missed_deadline_is_requeued(self):
+        # Lead 0's batch always misses its deadline (every retry too); the others answer at once
+        with patch("llm_client.backoff_delay", return_value=0.0):
+            verdicts, stats, _, single = self.run(
+                4, lambda name: 1.0 if name == "Lead 0" else 0.0,
+                batch_size=2, max_in_flight=4, deadline_seconds=0.1,
+            )
+
+        assert [v["reason"] for v in verdicts] == ["fallback", "fallback", "Lead 2", "Lead 3"]
+        # Leads 0 and 1 were retried once in a batch, then checked one by one
+        assert stats["requeued"] == 4
+        assert single.call_count == 2
+
+    def test_throttled_requests_are_retried_and_usage_recorded(self):
+        import httpx
+        from icp_batch import classify_leads_icp
+        from llm_client import get_llm_stats, reset_llm_stats
+
+        calls = []
+
+        async def handler(request):
+            calls.append(1)
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"})
+            verdicts = [verdict(1), verdict(2)]
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": json.dumps({"verdicts": verdicts})}}],
+                "usage": {"prompt_tokens": 100, "prompt_cache_hit_tokens": 80, "completion_tokens": 20},
+            })
+
+        reset_llm_stats()
+        real_client = httpx.AsyncClient
+        single = MagicMock()
+        with patch("httpx.AsyncClient", lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw)):
+            verdicts, stats = classify_leads_icp(leads(2), lambda lead: lead["fullName"], "system", None,
+                                                 "key", single, max_in_flight=4, cache_ttl_days=0)
+
+        # The 429 was retried instead of dropping both leads to the single check
+        assert [v["reason"] for v in verdicts] == ["lead 1", "lead 2"]
+        single.assert_not_called()
+        host = get_llm_stats()["api.deepseek.com"]
+        assert host["calls"] == 1
+        assert host["retries"] == 1
+        assert host["cached_prompt_tokens"] == 80
+
+
+class TestVerdictCache:
+    """Unchanged leads under an unchanged prompt skip the LLM."""
+
+    def classify(self, lead_list, system_prompt="system", single=None):
+        from icp_batch import classify_leads_icp
+
+        single = single or MagicMock(return_value={"match": True, "confidence": "high", "reason": "single"})
+        summarize = lambda lead: f"Lead: {lead['fullName']}\nTitle: {lead.get('jobTitle', '')}"
+        responses = [deepseek_response([verdict(i) for i in range(1, 11)]) for _ in range(5)]
+        with patch("requests.Session.post", side_effect=responses) as mock_post:
+            verdicts, stats = classify_leads_icp(lead_list, summarize, system_prompt, None, "key", single,
+                                                 max_in_flight=1)
+        return verdicts, stats, mock_post
+
+    def test_repeat_leads_skip_the_llm(self):
+        self.classify(leads(4))
+        verdicts, stats, mock_post = self.classify(leads(4))
+
+        mock_post.assert_not_called()
+        assert stats["cached"] == 4
+        assert all(v["match"] for v in verdicts)
+
+    def test_changed_profile_is_reclassified(self):
+        self.classify(leads(3))
+        changed = leads(3)
+        changed[1]["jobTitle"] = "Intern"
+
+        _, stats, mock_post = self.classify(changed)
+
+        # Only the changed lead is left, so it goes through the single check
+        assert stats["cached"] == 2
+        assert stats["single"] == 1
+
+    def test_prompt_change_invalidates_verdicts(self):
+        self.classify(leads(3))
+        _, stats, mock_post = self.classify(leads(3), system_prompt="stricter system")
+
+        assert stats["cached"] == 0
+        assert mock_post.call_count == 1
+
+    def test_local_fallbacks_are_not_cached(self):
+        local = MagicMock(return_value={"match": True, "confidence": "local", "reason": "rules"})
+        self.classify(leads(1), single=local)
+        self.classify(leads(1), single=local)
+
+        assert local.call_count == 2
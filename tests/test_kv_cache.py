@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the persistent KV cache and the Google search cache built on it.
+
+Run tests: pytest tests/test_kv_cache.py -v
+"""
+
+import pytest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+class TestKVCache:
+    """Namespaced get/set with expiry."""
+
+    def test_set_get_and_namespaces(self, tmp_path):
+        from kv_cache import KVCache
+
+        cache = KVCache(str(tmp_path / "kv.sqlite3"))
+        cache.set("a", "key", {"n": 1})
+
+        assert cache.get("a", "key") == {"n": 1}
+        assert cache.get("b", "key") is None
+
+    def test_expired_entry_is_a_miss(self, tmp_path):
+        from kv_cache import KVCache
+
+        cache = KVCache(str(tmp_path / "kv.sqlite3"))
+        cache.set("a", "key", [1, 2], ttl_seconds=-1)
+
+        assert cache.get("a", "key") is None
+        assert cache.purge_expired() == 1
+
+    def test_max_age_tightens_ttl(self, tmp_path):
+        import time
+        from kv_cache import KVCache
+
+        cache = KVCache(str(tmp_path / "kv.sqlite3"))
+        cache.set("a", "key", "v", ttl_seconds=3600)
+
+        with patch("kv_cache.time.time", return_value=time.time() + 120):
+            assert cache.get("a", "key", max_age_seconds=60) is None
+            assert cache.get("a", "key", max_age_seconds=600) == "v"
+
+    def test_persists_across_reopen(self, tmp_path):
+        from kv_cache import KVCache
+
+        path = str(tmp_path / "kv.sqlite3")
+        KVCache(path).set("a", "key", "v")
+
+        reopened = KVCache(path)
+        assert reopened.get("a", "key") == "v"
+        assert reopened.stats()["namespaces"]["a"]["entries"] == 1
+
+
+class TestSearchCache:
+    """Google searches are served locally within the TTL."""
+
+    def test_key_normalizes_query_and_keeps_filters(self):
+        from search_cache import search_cache_key
+
+        base = search_cache_key('site:linkedin.com/posts "CEOs" after:2026-01-01', 1, 10)
+
+        assert search_cache_key('site:linkedin.com/posts  "ceos"   after:2026-01-01', 1, 10) == base
+        assert search_cache_key('site:linkedin.com/posts "ceos" after:2026-01-02', 1, 10) != base
+        assert search_cache_key('site:linkedin.com/posts "ceos" after:2026-01-01', 2, 10) != base
+
+    def test_repeated_search_skips_actor(self):
+        import competitor_post_pipeline as cpp
+
+        client = MagicMock()
+        client.actor.return_value.call.return_value = {"defaultDatasetId": "ds"}
+        client.dataset.return_value.iterate_items.side_effect = lambda: iter([{"url": "post"}])
+
+        with patch.object(cpp, "APIFY_API_TOKEN", "test-token"), \
+                patch("apify_client.ApifyClient", return_value=client):
+            first = cpp.search_google_linkedin_posts("ceos", days_back=7)
+            second = cpp.search_google_linkedin_posts("ceos", days_back=7)
+            uncached = cpp.search_google_linkedin_posts("ceos", days_back=7, cache_ttl_hours=0)
+
+        assert first == second == uncached == [{"url": "post"}]
+        assert client.actor.return_value.call.call_count == 2
+
+    def test_failed_search_is_not_cached(self):
+        import competitor_post_pipeline as cpp
+
+        client = MagicMock()
+        client.actor.return_value.call.side_effect = RuntimeError("actor down")
+
+        with patch.object(cpp, "APIFY_API_TOKEN", "test-token"), \
+                patch("apify_client.ApifyClient", return_value=client):
+            cpp.search_google_linkedin_posts("ceos")
+            cpp.search_google_linkedin_posts("ceos")
+
+        assert client.actor.return_value.call.call_count == 2
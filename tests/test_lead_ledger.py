@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the append-only processed-leads ledger.
+
+Run tests: pytest tests/test_lead_ledger.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+URL_A = "https://www.linkedin.com/in/janedoe"
+URL_B = "https://www.linkedin.com/in/johnsmith"
+
+
+class TestProcessedLeadLedger:
+    """Membership, appends and cross-process catch-up."""
+
+    def test_add_and_lookup(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        ledger = ProcessedLeadLedger(str(tmp_path / "processed.jsonl"))
+        assert URL_A not in ledger
+
+        ledger.add_many({URL_A: {"name": "Jane Doe", "source": "competitor_post"}})
+
+        assert URL_A in ledger
+        assert ledger.get(URL_A)["name"] == "Jane Doe"
+        assert len(ledger) == 1
+
+    def test_inserts_append_instead_of_rewriting(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = tmp_path / "processed.jsonl"
+        ledger = ProcessedLeadLedger(str(path))
+        ledger.add(URL_A, {"name": "Jane Doe"})
+        ledger.add(URL_B, {"name": "John Smith"})
+
+        lines = path.read_text().splitlines()
+        assert [json.loads(line)["url"] for line in lines] == [URL_A, URL_B]
+
+    def test_later_record_supersedes_earlier(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        ledger = ProcessedLeadLedger(str(tmp_path / "processed.jsonl"))
+        ledger.add(URL_A, {"name": "Jane Doe", "list_id": 1})
+        ledger.add(URL_A, {"name": "Jane Doe", "list_id": 2})
+
+        assert len(ledger) == 1
+        assert ledger.get(URL_A)["list_id"] == 2
+
+    def test_picks_up_appends_from_other_process(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = str(tmp_path / "processed.jsonl")
+        ours = ProcessedLeadLedger(path)
+        ours.add(URL_A, {"name": "Jane Doe"})
+
+        theirs = ProcessedLeadLedger(path)
+        theirs.add(URL_B, {"name": "John Smith"})
+
+        assert URL_B in ours
+        assert len(ours) == 2
+
+    def test_ignores_partial_trailing_line(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = tmp_path / "processed.jsonl"
+        path.write_text(json.dumps({"url": URL_A, "name": "Jane"}) + "\n" + '{"url": "https://www.linkedin.com/in/half')
+
+        ledger = ProcessedLeadLedger(str(path))
+        assert len(ledger) == 1
+        assert URL_A in ledger
+
+
+class TestCompaction:
+    """Superseded records are dropped once they outnumber live ones."""
+
+    def test_compacts_when_dead_records_dominate(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = tmp_path / "processed.jsonl"
+        ledger = ProcessedLeadLedger(str(path), compact_min_dead=5, compact_ratio=0.5)
+        for i in range(10):
+            ledger.add(URL_A, {"name": "Jane Doe", "list_id": i})
+
+        assert len(path.read_text().splitlines()) < 10
+        assert ledger.get(URL_A)["list_id"] == 9
+
+    def test_other_process_sees_compacted_file(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = str(tmp_path / "processed.jsonl")
+        reader = ProcessedLeadLedger(path)
+        writer = ProcessedLeadLedger(path)
+        writer.add(URL_B, {"name": "John Smith"})
+        assert URL_B in reader
+
+        for i in range(3):
+            writer.add(URL_A, {"name": "Jane Doe", "list_id": i})
+        writer.compact()
+
+        assert len(reader) == 2
+        assert reader.get(URL_A)["list_id"] == 2
+
+
+class TestBloomPreCheck:
+    """The persisted Bloom filter tracks the ledger without building the index."""
+
+    def test_might_contain_without_loading_index(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        ledger = ProcessedLeadLedger(str(tmp_path / "processed.jsonl"), bloom_path=str(tmp_path / "p.bloom"))
+        ledger.add(URL_A, {"name": "Jane Doe"})
+
+        assert ledger.might_contain(URL_A)
+        assert not ledger.might_contain(URL_B)
+        assert ledger._index == {}
+
+    def test_bloom_catches_up_with_other_process(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path, bloom = str(tmp_path / "processed.jsonl"), str(tmp_path / "p.bloom")
+        ours = ProcessedLeadLedger(path, bloom_path=bloom)
+        ours.add(URL_A, {"name": "Jane Doe"})
+        assert not ours.might_contain(URL_B)
+
+        ProcessedLeadLedger(path, bloom_path=bloom).add(URL_B, {"name": "John Smith"})
+        assert ours.might_contain(URL_B)
+
+    def test_bloom_rebuilt_after_compaction(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path, bloom = str(tmp_path / "processed.jsonl"), str(tmp_path / "p.bloom")
+        ledger = ProcessedLeadLedger(path, bloom_path=bloom)
+        ledger.add(URL_A, {"name": "Jane Doe"})
+        ledger.add(URL_A, {"name": "Jane Doe"})
+        ledger.compact()
+
+        reopened = ProcessedLeadLedger(path, bloom_path=bloom)
+        assert reopened.might_contain(URL_A)
+        assert reopened.bloom_stats()["items"] == 1
+
+    def test_reads_never_save_the_filter(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path, bloom = str(tmp_path / "processed.jsonl"), str(tmp_path / "p.bloom")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"url": "%s", "name": "Jane Doe"}\n' % URL_A)
+
+        ledger = ProcessedLeadLedger(path, bloom_path=bloom)
+        assert ledger.might_contain(URL_A)
+        assert not os.path.exists(bloom)
+
+    def test_saves_are_batched(self, tmp_path, monkeypatch):
+        import lead_ledger
+        from lead_ledger import ProcessedLeadLedger
+
+        monkeypatch.setattr(lead_ledger, "BLOOM_SAVE_INTERVAL", 3)
+        path, bloom = str(tmp_path / "processed.jsonl"), str(tmp_path / "p.bloom")
+        ledger = ProcessedLeadLedger(path, bloom_path=bloom)
+        ledger.add_many({URL_A: {}, URL_B: {}})
+        assert not os.path.exists(bloom)
+
+        ledger.add("https://www.linkedin.com/in/third", {})
+        assert os.path.exists(bloom)
+        # A new reader tails lines past the saved offset
+        ledger.add("https://www.linkedin.com/in/fourth", {})
+        assert ProcessedLeadLedger(path, bloom_path=bloom).might_contain("https://www.linkedin.com/in/fourth")
+
+    def test_replayed_lines_are_not_counted_twice(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = str(tmp_path / "processed.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(3):
+                f.write('{"url": "%s", "list_id": %d}\n' % (URL_A, i))
+
+        ledger = ProcessedLeadLedger(path, bloom_path=str(tmp_path / "p.bloom"))
+        assert ledger.bloom_stats()["items"] == 1
+
+    def test_batch_pre_check_syncs_once(self, tmp_path, monkeypatch):
+        from lead_ledger import ProcessedLeadLedger
+
+        ledger = ProcessedLeadLedger(str(tmp_path / "processed.jsonl"), bloom_path=str(tmp_path / "p.bloom"))
+        ledger.add(URL_A, {"name": "Jane Doe"})
+        syncs = []
+        original = ledger._sync_bloom
+        monkeypatch.setattr(ledger, "_sync_bloom", lambda: syncs.append(1) or original())
+
+        urls = [URL_A, URL_B] + [f"https://www.linkedin.com/in/new{i}" for i in range(50)]
+        assert ledger.might_contain_many(urls) == {URL_A}
+        assert len(syncs) == 1
+        assert ledger.get_many([URL_A, URL_B]) == {URL_A: {"name": "Jane Doe"}}
+
+    def test_get_many_does_not_build_the_index(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        path = str(tmp_path / "processed.jsonl")
+        writer = ProcessedLeadLedger(path)
+        writer.add_many({f"https://www.linkedin.com/in/user{i}": {"list_id": 0} for i in range(100)})
+        writer.add(URL_A, {"list_id": 1})
+        writer.add(URL_A, {"list_id": 2})
+
+        reader = ProcessedLeadLedger(path, bloom_path=str(tmp_path / "p.bloom"))
+        assert reader.get_many([URL_A, URL_B]) == {URL_A: {"list_id": 2}}
+        assert reader._index == {}
+
+
+class TestBloomFilter:
+    """Sizing, false-positive rate and persistence."""
+
+    def test_no_false_negatives_and_bounded_fp_rate(self):
+        from bloom_filter import BloomFilter
+
+        bloom = BloomFilter(capacity=10_000, fp_rate=0.01)
+        bloom.update(f"https://www.linkedin.com/in/user{i}" for i in range(10_000))
+
+        assert all(f"https://www.linkedin.com/in/user{i}" in bloom for i in range(10_000))
+        false_positives = sum(f"https://www.linkedin.com/in/other{i}" in bloom for i in range(10_000))
+        assert false_positives / 10_000 < 0.02
+
+    def test_stats_report_rate_and_memory(self):
+        from bloom_filter import BloomFilter
+
+        stats = BloomFilter(capacity=1_000_000, fp_rate=0.01).stats()
+
+        assert stats["configured_fp_rate"] == 0.01
+        assert 1_100_000 < stats["memory_bytes"] < 1_300_000
+        assert stats["num_hashes"] == 7
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        from bloom_filter import BloomFilter
+
+        bloom = BloomFilter(capacity=100, fp_rate=0.01)
+        assert bloom.add(URL_A)
+        assert not bloom.add(URL_A)
+        bloom.save(str(tmp_path / "b.bloom"), meta={"offset": 42})
+
+        loaded, meta = BloomFilter.load(str(tmp_path / "b.bloom"))
+        assert URL_A in loaded
+        assert loaded.count == 1
+        assert meta == {"offset": 42}
+
+    def test_concurrent_saves_do_not_collide(self, tmp_path):
+        import threading
+        from bloom_filter import BloomFilter
+
+        path = str(tmp_path / "b.bloom")
+        errors = []
+
+        def save_repeatedly():
+            bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+            try:
+                for _ in range(50):
+                    bloom.save(path)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert os.listdir(tmp_path) == ["b.bloom"]
+
+
+class TestLegacyImport:
+    """The old processed_leads.json seeds the ledger once."""
+
+    def test_imports_legacy_json(self, tmp_path):
+        from lead_ledger import ProcessedLeadLedger
+
+        legacy = tmp_path / "processed_leads.json"
+        legacy.write_text(json.dumps({URL_A: {"name": "Jane Doe", "source": "vayne"}}))
+
+        ledger = ProcessedLeadLedger(str(tmp_path / "processed.jsonl"), legacy_json_path=str(legacy))
+
+        assert ledger.get(URL_A)["source"] == "vayne"
+        assert (tmp_path / "processed.jsonl").exists()
+
+
+class TestPipelineTracking:
+    """competitor_post_pipeline dedup goes through the ledger."""
+
+    def test_add_then_filter(self, tmp_path):
+        import competitor_post_pipeline as cpp
+        import lead_ledger
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(lead_ledger, "SHARED_PROCESSED_LEADS_FILE", str(tmp_path / "processed.jsonl"))
+            mp.setattr(lead_ledger, "LEGACY_PROCESSED_LEADS_FILE", str(tmp_path / "missing.json"))
+            mp.setattr(lead_ledger, "SHARED_PROCESSED_LEADS_BLOOM_FILE", str(tmp_path / "processed.bloom"))
+
+            cpp.add_to_processed_leads([{"linkedinUrl": URL_A + "/", "fullName": "Jane Doe"}])
+            unprocessed, dup_count = cpp.filter_unprocessed_urls([URL_A, URL_B])
+
+        assert unprocessed == [URL_B]
+        assert dup_count == 1
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared pooled LLM client.
+
+Run tests: pytest tests/test_llm_client.py -v
+"""
+
+import pytest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+URL = "https://api.deepseek.com/v1/chat/completions"
+
+
+def response(status, headers=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.ok = status < 400
+    resp.headers = headers or {}
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    from llm_client import reset_llm_stats
+    reset_llm_stats()
+    yield
+    reset_llm_stats()
+
+
+class TestRetries:
+    """Transient failures are retried with backoff; others are returned at once."""
+
+    def test_retries_throttled_then_succeeds(self):
+        from llm_client import llm_post
+
+        with patch("requests.Session.post", side_effect=[response(429), response(503), response(200)]) as mock_post, \
+                patch("llm_client.time.sleep") as mock_sleep:
+            result = llm_post(URL, json={"q": 1})
+
+        assert result.status_code == 200
+        assert mock_post.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    def test_client_error_is_not_retried(self):
+        from llm_client import llm_post
+
+        with patch("requests.Session.post", return_value=response(401)) as mock_post, \
+                patch("llm_client.time.sleep") as mock_sleep:
+            result = llm_post(URL, json={})
+
+        assert result.status_code == 401
+        assert mock_post.call_count == 1
+        mock_sleep.assert_not_called()
+
+    def test_gives_up_after_max_retries(self):
+        from llm_client import llm_post
+
+        with patch("requests.Session.post", return_value=response(502)) as mock_post, \
+                patch("llm_client.time.sleep"):
+            result = llm_post(URL, json={}, max_retries=2)
+
+        # The last response is handed back for raise_for_status
+        assert result.status_code == 502
+        assert mock_post.call_count == 3
+
+    def test_connection_errors_are_retried_then_raised(self):
+        import requests
+        from llm_client import llm_post
+
+        with patch("requests.Session.post", side_effect=requests.ConnectionError("reset")) as mock_post, \
+                patch("llm_client.time.sleep"):
+            with pytest.raises(requests.ConnectionError):
+                llm_post(URL, json={}, max_retries=1)
+
+        assert mock_post.call_count == 2
+
+    def test_retry_after_is_honoured(self):
+        from llm_client import llm_post
+
+        with patch("requests.Session.post", side_effect=[response(429, {"Retry-After": "7"}), response(200)]), \
+                patch("llm_client.time.sleep") as mock_sleep:
+            llm_post(URL, json={})
+
+        mock_sleep.assert_called_once_with(7.0)
+
+
+class TestBackoff:
+    """Delays grow exponentially, with jitter, up to the cap."""
+
+    def test_jittered_exponential(self):
+        from llm_client import backoff_delay, BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS
+
+        for attempt in range(4):
+            ceiling = BACKOFF_BASE_SECONDS * 2 ** attempt
+            assert ceiling / 2 <= backoff_delay(attempt) <= ceiling
+        assert backoff_delay(20) <= BACKOFF_MAX_SECONDS
+
+    def test_retry_after_http_date_and_cap(self):
+        from llm_client import retry_after_seconds, RETRY_AFTER_MAX_SECONDS
+
+        assert retry_after_seconds(response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+        assert retry_after_seconds(response(429, {"Retry-After": "3600"})) == RETRY_AFTER_MAX_SECONDS
+        assert retry_after_seconds(response(429, {"Retry-After": "soon"})) is None
+        assert retry_after_seconds(response(429)) is None
+
+
+class TestPoolingAndStats:
+    """One session per process; every call is timed."""
+
+    def test_session_is_shared(self):
+        from llm_client import get_llm_session
+
+        assert get_llm_session() is get_llm_session()
+
+    def test_calls_are_recorded_per_host(self):
+        from llm_client import llm_post, get_llm_stats
+
+        with patch("requests.Session.post", side_effect=[response(500), response(200), response(400)]), \
+                patch("llm_client.time.sleep"):
+            llm_post(URL, json={})
+            llm_post(URL, json={})
+
+        stats = get_llm_stats()["api.deepseek.com"]
+        assert stats["calls"] == 2
+        assert stats["retries"] == 1
+        assert stats["failures"] == 1
+        assert stats["p50_ms"] is not None and stats["max_ms"] >= stats["p50_ms"]
+
+
+def completion(usage):
+    resp = response(200)
+    resp.json.return_value = {"choices": [{"message": {"content": "hi"}}], "usage": usage}
+    return resp
+
+
+class TestUsage:
+    """Prompt tokens are split into provider-cached and uncached."""
+
+    def test_deepseek_and_openai_usage_blocks(self):
+        from llm_client import parse_usage
+
+        deepseek = parse_usage({"prompt_tokens": 1000, "completion_tokens": 50,
+                                "prompt_cache_hit_tokens": 896, "prompt_cache_miss_tokens": 104})
+        openai = parse_usage({"prompt_tokens": 1000, "completion_tokens": 50,
+                              "prompt_tokens_details": {"cached_tokens": 768}})
+
+        assert deepseek == {"prompt_tokens": 1000, "cached_prompt_tokens": 896,
+                            "uncached_prompt_tokens": 104, "completion_tokens": 50}
+        assert openai["cached_prompt_tokens"] == 768
+        assert openai["uncached_prompt_tokens"] == 232
+        assert parse_usage(None)["prompt_tokens"] == 0
+
+    def test_usage_since_snapshot(self):
+        from llm_client import llm_post, get_llm_usage, llm_usage_since, format_llm_usage
+
+        with patch("requests.Session.post", return_value=completion(
+                {"prompt_tokens": 1000, "completion_tokens": 50, "prompt_cache_hit_tokens": 0})):
+            llm_post(URL, json={})
+        before = get_llm_usage()
+        with patch("requests.Session.post", return_value=completion(
+                {"prompt_tokens": 1000, "completion_tokens": 50, "prompt_cache_hit_tokens": 900})):
+            llm_post(URL, json={})
+            llm_post(URL, json={})
+
+        usage = llm_usage_since(before)
+
+        assert usage["calls"] == 2
+        assert usage["cached_prompt_tokens"] == 1800
+        assert usage["uncached_prompt_tokens"] == 200
+        assert usage["prompt_cache_hit_rate"] == 0.9
+        assert "90%" in format_llm_usage(usage)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for tolerant LLM JSON parsing and partial retries.
+
+Run tests: pytest tests/test_llm_json.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+def note(i):
+    return {"linkedin_url": f"https://linkedin.com/in/lead{i}", "signal_note": f"Note {i}"}
+
+
+class TestParseLlmJson:
+    """Fences and surrounding prose are ignored."""
+
+    def test_fenced_with_language_tag(self):
+        from llm_json import parse_llm_json
+
+        assert parse_llm_json('```json\n{"a": 1}\n```') == {"a": 1}
+
+    def test_prose_around_value(self):
+        from llm_json import parse_llm_json
+
+        assert parse_llm_json('Here you go:\n[1, 2]\nHope that helps!') == [1, 2]
+
+    def test_incomplete_value_is_none(self):
+        from llm_json import parse_llm_json
+
+        assert parse_llm_json('{"client": {"company": "Ac') is None
+        assert parse_llm_json("no json here") is None
+
+
+class TestParseLlmList:
+    """Complete items are recovered from truncated or wrapped arrays."""
+
+    def test_wrapped_list(self):
+        from llm_json import parse_llm_list
+
+        text = json.dumps({"notes": [note(1), note(2)]})
+
+        assert parse_llm_list(text, keys=("notes",)) == [note(1), note(2)]
+
+    def test_truncated_wrapped_array_keeps_complete_items(self):
+        from llm_json import parse_llm_list
+
+        full = json.dumps({"notes": [note(1), note(2), note(3)]})
+        truncated = full[:full.index("Note 3")]
+
+        assert parse_llm_list(truncated, keys=("notes",)) == [note(1), note(2)]
+
+    def test_truncated_fenced_string_array(self):
+        from llm_json import parse_llm_list
+
+        text = '```json\n["query one", "query two", "query th'
+
+        assert parse_llm_list(text) == ["query one", "query two"]
+
+    def test_single_object(self):
+        from llm_json import parse_llm_list
+
+        assert parse_llm_list(json.dumps(note(1))) == [note(1)]
+        assert parse_llm_list("nothing") == []
+
+
+class TestRequestMissingItems:
+    """Only the items without a usable result are requested again."""
+
+    def test_re_requests_only_missing_items(self):
+        from llm_json import request_missing_items
+
+        calls = []
+
+        def request(batch):
+            calls.append(list(batch))
+            # First reply is cut off after two notes
+            return [note(i) for i in batch][:2]
+
+        results = request_missing_items([1, 2, 3], request, item_key=lambda i: f"https://linkedin.com/in/lead{i}",
+                                        result_key=lambda n: n["linkedin_url"])
+
+        assert calls == [[1, 2, 3], [3]]
+        assert set(results) == {f"https://linkedin.com/in/lead{i}" for i in (1, 2, 3)}
+
+    def test_gives_up_after_max_attempts(self):
+        from llm_json import request_missing_items
+
+        calls = []
+
+        def request(batch):
+            calls.append(list(batch))
+            raise ValueError("bad gateway")
+
+        results = request_missing_items([1, 2], request, item_key=str, result_key=str, max_attempts=2)
+
+        assert results == {}
+        assert len(calls) == 2
+
+    def test_ignores_results_for_unknown_items(self):
+        from llm_json import request_missing_items
+
+        results = request_missing_items([1], lambda batch: [5, 1], item_key=int, result_key=int)
+
+        assert results == {1: 1}
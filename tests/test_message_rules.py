@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the local 5-line DM rules.
+
+Run tests: pytest tests/test_message_rules.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+GOOD_MESSAGE = """Hey Sarah
+
+Acme looks interesting
+
+You guys do outbound right? Do that w LinkedIn + email? Or what
+
+Outbound is a tough nut to crack.
+Really comes down to precise targeting + personalisation to book clients at a high level.
+
+See you're in Austin. Just been to Fort Lauderdale in the US - and I mean the airport lol Have so many connections now that I need to visit for real. I'm in Glasgow, Scotland"""
+
+
+class TestCheckMessageRules:
+    """Clear template breaks are caught; well-formed messages pass."""
+
+    def test_well_formed_message_passes(self):
+        from message_rules import check_message_rules
+
+        assert check_message_rules(GOOD_MESSAGE, first_name="Sarah") == []
+        assert check_message_rules(GOOD_MESSAGE) == []
+
+    def test_wrong_line_count(self):
+        from message_rules import check_message_rules
+
+        violations = check_message_rules("Hey Sarah\n\nAcme looks interesting")
+
+        assert any("2 lines" in v for v in violations)
+
+    def test_greeting_must_use_first_name(self):
+        from message_rules import check_message_rules
+
+        assert any("Sarah" in v for v in check_message_rules(GOOD_MESSAGE.replace("Hey Sarah", "Hey Sam"), "Sarah"))
+        assert any("greeting" in v for v in check_message_rules(GOOD_MESSAGE.replace("Hey Sarah", "Hi Sarah"), "Sarah"))
+
+    def test_company_must_be_casualized(self):
+        from message_rules import check_message_rules
+
+        for hook in ("Acme Solutions, LLC looks interesting", "Acme Ltd looks interesting", "Acme Inc. looks interesting"):
+            violations = check_message_rules(GOOD_MESSAGE.replace("Acme looks interesting", hook))
+            assert any("casualized" in v for v in violations), hook
+        # "Ltd" inside a word is fine
+        assert check_message_rules(GOOD_MESSAGE.replace("Acme", "Ltdesign")) == []
+
+    def test_banned_phrases_and_length(self):
+        from message_rules import check_message_rules, MAX_MESSAGE_CHARS
+
+        fluffy = GOOD_MESSAGE.replace("Really comes down to", "It helps businesses with")
+        assert check_message_rules(fluffy) == ['Uses banned phrase "helps businesses"']
+
+        long_message = GOOD_MESSAGE.replace("Austin", "Austin " + "x" * MAX_MESSAGE_CHARS)
+        assert any("characters" in v for v in check_message_rules(long_message))
+
+    def test_empty_message(self):
+        from message_rules import check_message_rules
+
+        assert check_message_rules("") == ["Message is empty"]
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the streaming personalize -> validate -> regenerate pipeline.
+
+Run tests: pytest tests/test_personalize_and_upload.py -v
+"""
+
+import pytest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+def leads(n):
+    return [{"fullName": f"Lead {i}"} for i in range(n)]
+
+
+def judge(flags):
+    """Stand-in validator: flags[message] -> flag (PASS if not listed)."""
+    def validate(lead):
+        flag = flags.get(lead["personalized_message"], "PASS")
+        return {"flag": flag, "reason": f"{flag} for {lead['personalized_message']}"}
+    return validate
+
+
+class TestRunMessagePipeline:
+    """Messages are validated as generated; flagged ones are regenerated within budget."""
+
+    def run(self, lead_list, validate, regenerate=None, **kwargs):
+        from personalize_and_upload import run_message_pipeline
+
+        regenerate = regenerate or (lambda lead, result: lead["personalized_message"] + " v2")
+        with patch("personalize_and_upload.validate_single_message", side_effect=validate), \
+                patch("personalize_and_upload.regenerate_with_correction", side_effect=regenerate) as mock_regen:
+            stats = run_message_pipeline(lead_list, **kwargs)
+        return stats, mock_regen
+
+    def test_flagged_message_is_regenerated_and_revalidated(self):
+        lead_list = leads(3)
+        stats, _ = self.run(lead_list, judge({"msg Lead 1": "FAIL"}),
+                            generate=lambda lead: f"msg {lead['fullName']}")
+
+        fixed = lead_list[1]
+        assert fixed["personalized_message"] == "msg Lead 1 v2"
+        assert fixed["original_message"] == "msg Lead 1"
+        assert fixed["regenerated"] is True
+        assert fixed["validation"]["flag"] == "FAIL"
+        assert fixed["validation_feedback"]["flag"] == "FAIL"
+        assert fixed["final_validation"]["flag"] == "PASS"
+        assert "regenerated" not in lead_list[0]
+        assert stats["generated"] == 3
+        assert stats["validated"] == 3
+        assert (stats["pass"], stats["fail"], stats["flagged"], stats["fixed"]) == (2, 1, 1, 1)
+
+    def test_attempt_budget_per_lead(self):
+        lead_list = leads(1)
+        always_fail = lambda lead: {"flag": "REVIEW", "reason": "still off"}
+        stats, mock_regen = self.run(lead_list, always_fail, generate=lambda lead: "msg",
+                                     max_regenerations=2)
+
+        assert mock_regen.call_count == 2
+        assert lead_list[0]["personalized_message"] == "msg v2 v2"
+        assert lead_list[0]["original_message"] == "msg"
+        assert lead_list[0]["final_validation"]["flag"] == "REVIEW"
+        assert stats["still_flagged"] == 1
+
+    def test_errors_and_failed_generation_are_not_regenerated(self):
+        lead_list = leads(2)
+        generate = lambda lead: None if lead["fullName"] == "Lead 0" else "msg"
+        stats, mock_regen = self.run(lead_list, lambda lead: {"flag": "ERROR", "error": "timeout"},
+                                     generate=generate)
+
+        mock_regen.assert_not_called()
+        assert "validation" not in lead_list[0]
+        assert lead_list[1]["validation"]["flag"] == "ERROR"
+        assert (stats["generation_failed"], stats["error"]) == (1, 1)
+
+    def test_validation_starts_before_generation_finishes(self):
+        lead_list = leads(4)
+        first_validated = threading.Event()
+
+        def generate(lead):
+            # The last lead waits until an earlier message has been validated
+            if lead["fullName"] == "Lead 3":
+                assert first_validated.wait(timeout=5)
+            return f"msg {lead['fullName']}"
+
+        def validate(lead):
+            first_validated.set()
+            return {"flag": "PASS"}
+
+        stats, _ = self.run(lead_list, validate, generate=generate, workers=2)
+
+        assert stats["validated"] == 4
+
+    def test_pool_is_bounded(self):
+        state = {"in_flight": 0, "max": 0}
+        lock = threading.Lock()
+
+        def busy(result):
+            def step(lead, *args):
+                with lock:
+                    state["in_flight"] += 1
+                    state["max"] = max(state["max"], state["in_flight"])
+                time.sleep(0.01)
+                with lock:
+                    state["in_flight"] -= 1
+                return result(lead)
+            return step
+
+        self.run(leads(12), busy(judge({"msg": "FAIL"})), regenerate=busy(lambda lead: "fixed"),
+                 generate=busy(lambda lead: "msg"), workers=3)
+
+        assert state["max"] <= 3
+
+
+class TestValidateAndFixBatch:
+    """Existing messages are validated; leads without one are left alone."""
+
+    def test_only_leads_with_messages_are_validated(self):
+        from personalize_and_upload import validate_and_fix_batch
+
+        lead_list = [{"fullName": "A", "personalized_message": "bad"}, {"fullName": "B"}]
+        with patch("personalize_and_upload.validate_single_message", side_effect=judge({"bad": "FAIL"})), \
+                patch("personalize_and_upload.regenerate_with_correction", return_value="good"):
+            result = validate_and_fix_batch(lead_list)
+
+        assert result is lead_list
+        assert lead_list[0]["personalized_message"] == "good"
+        assert lead_list[0]["final_validation"]["flag"] == "PASS"
+        assert "validation" not in lead_list[1]
+
+    def test_zero_retries_only_validates(self):
+        from personalize_and_upload import validate_and_fix_batch
+
+        lead_list = [{"fullName": "A", "personalized_message": "bad"}]
+        with patch("personalize_and_upload.validate_single_message", side_effect=judge({"bad": "FAIL"})), \
+                patch("personalize_and_upload.regenerate_with_correction") as mock_regen:
+            validate_and_fix_batch(lead_list, max_retries=0)
+
+        mock_regen.assert_not_called()
+        assert lead_list[0]["validation"]["flag"] == "FAIL"
+
+
+class TestRulePrecheck:
+    """Messages that break the template are failed locally, without the judge."""
+
+    def test_rule_failure_skips_the_judge(self):
+        from personalize_and_upload import validate_single_message
+
+        lead = {"fullName": "Sarah Lee", "personalized_message": "Hey Sarah\n\nAcme, Inc. looks interesting!"}
+        with patch("personalize_and_upload.llm_post") as mock_post:
+            result = validate_single_message(lead)
+
+        mock_post.assert_not_called()
+        assert result["flag"] == "FAIL"
+        assert result["rule_violations"]
+
+    def test_well_formed_message_goes_to_the_judge(self):
+        from unittest.mock import MagicMock
+        from personalize_and_upload import validate_single_message
+        from test_message_rules import GOOD_MESSAGE
+
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": '{"flag": "PASS", "avg_score": 4.7}'}}]}
+        lead = {"firstName": "Sarah", "fullName": "Sarah Lee", "personalized_message": GOOD_MESSAGE}
+        with patch("personalize_and_upload.llm_post", return_value=response) as mock_post:
+            result = validate_single_message(lead)
+
+        mock_post.assert_called_once()
+        assert result["flag"] == "PASS"
+
+    def test_rule_violations_are_fed_back_on_regeneration(self):
+        from unittest.mock import MagicMock
+        from personalize_and_upload import regenerate_with_correction
+
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "new message"}}]}
+        lead = {"fullName": "Sarah Lee", "personalized_message": "Hey Sam"}
+        with patch("personalize_and_upload.llm_post", return_value=response) as mock_post:
+            regenerate_with_correction(lead, {"flag": "FAIL", "rule_violations": ['Greeting must use the first name "Sarah"']})
+
+        prompt = mock_post.call_args.kwargs["json"]["messages"][1]["content"]
+        assert "RULE VIOLATIONS" in prompt
+        assert 'Greeting must use the first name "Sarah"' in prompt
+
+    def test_generation_uses_the_name_the_rule_checks(self):
+        from unittest.mock import MagicMock
+        from personalize_and_upload import generate_personalization
+
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "Hey Sarah"}}]}
+        # Apify-shaped lead: camelCase fields only
+        lead = {"firstName": "Sarah", "fullName": "Sarah Lee", "companyName": "Acme"}
+        with patch("personalize_and_upload.DEEPSEEK_API_KEY", "key"), \
+                patch("personalize_and_upload.get_linkedin_5_line_prompt_parts", return_value=("", "")) as parts, \
+                patch("personalize_and_upload.build_cached_messages", return_value=[]), \
+                patch("personalize_and_upload.llm_post", return_value=response):
+            generate_personalization(lead)
+
+        assert parts.call_args.kwargs["first_name"] == "Sarah"
+
+
+class TestAdaptiveValidation:
+    """With a sampler, only part of a clean batch reaches the judge."""
+
+    def test_clean_batch_is_sampled(self):
+        from personalize_and_upload import run_message_pipeline
+        from validation_sampling import SequentialSampler
+        from test_message_rules import GOOD_MESSAGE
+
+        lead_list = [{"fullName": f"Sarah {i}", "personalized_message": GOOD_MESSAGE} for i in range(200)]
+        with patch("personalize_and_upload.validate_single_message", return_value={"flag": "PASS"}) as judge:
+            stats = run_message_pipeline(lead_list, sampler=SequentialSampler(seed=5), workers=4)
+
+        assert judge.call_count == stats["validated"] < 120
+        assert stats["sampled_out"] == 200 - judge.call_count
+        assert sum("validation" in lead for lead in lead_list) == judge.call_count
+
+    def test_rule_failures_are_always_caught(self):
+        from personalize_and_upload import run_message_pipeline
+        from validation_sampling import SequentialSampler
+        from test_message_rules import GOOD_MESSAGE
+
+        lead_list = [{"fullName": f"Sarah {i}", "personalized_message": GOOD_MESSAGE} for i in range(200)]
+        lead_list[150]["personalized_message"] = "Hey Sarah"
+        with patch("personalize_and_upload.validate_single_message", return_value={"flag": "PASS"}), \
+                patch("personalize_and_upload.regenerate_with_correction", return_value=None):
+            stats = run_message_pipeline(lead_list, sampler=SequentialSampler(seed=5), workers=4)
+
+        assert lead_list[150]["validation"]["rule_violations"]
+        assert stats["rule_failed"] == 1
+
+    def test_rule_failed_counts_initial_validation_only(self):
+        from personalize_and_upload import run_message_pipeline
+
+        # Every regeneration breaks the template again
+        lead_list = [{"fullName": "Sarah Lee", "personalized_message": "Hey Sam"}]
+        with patch("personalize_and_upload.regenerate_with_correction", return_value="Hey Sam"):
+            stats = run_message_pipeline(lead_list, max_regenerations=2)
+
+        assert stats["flagged"] == 1
+        assert stats["rule_failed"] == stats["fail"] == 1
+
+
+class TestPipelineHandOff:
+    """personalize_leads reads the pipelines' gzip JSONL output as well as plain JSON."""
+
+    def test_reads_jsonl_gz_input(self, tmp_path):
+        import json
+        from personalize_and_upload import personalize_leads
+        from state_io import write_records
+
+        input_file = str(tmp_path / "competitor_post_leads_20260101_120000.jsonl.gz")
+        output_file = str(tmp_path / "personalized.json")
+        write_records(input_file, [{"fullName": "Lead 0", "personalized_message": "Hey Lead"}])
+
+        result = personalize_leads(input_file, output_file, skip_icp_check=True, skip_validation=True)
+
+        assert [lead["fullName"] for lead in result] == ["Lead 0"]
+        with open(output_file, encoding="utf-8") as f:
+            assert json.load(f)[0]["personalized_message"] == "Hey Lead"
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the keyed profile store that backs the profile cache.
+
+Run tests: pytest tests/test_profile_store.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+@pytest.fixture
+def sample_profile():
+    return {
+        "fullName": "Jane Doe",
+        "headline": "CEO at Acme",
+        "linkedinUrl": "https://www.linkedin.com/in/janedoe",
+        "addressWithCountry": "Austin, Texas, United States",
+    }
+
+
+class TestProfileStore:
+    """Per-URL get/put behaves like the old dict cache."""
+
+    def test_put_and_get(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        key = "https://www.linkedin.com/in/janedoe"
+        store[key] = sample_profile
+
+        assert key in store
+        assert store[key] == sample_profile
+        assert store.get("https://www.linkedin.com/in/missing") is None
+        assert len(store) == 1
+
+    def test_missing_key_raises(self, tmp_path):
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        with pytest.raises(KeyError):
+            store["https://www.linkedin.com/in/missing"]
+
+    def test_get_many_omits_missing(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put_many({
+            f"https://www.linkedin.com/in/user{i}": dict(sample_profile, fullName=f"User {i}")
+            for i in range(1200)
+        })
+
+        keys = [f"https://www.linkedin.com/in/user{i}" for i in range(0, 1200, 2)]
+        keys.append("https://www.linkedin.com/in/missing")
+        found = store.get_many(keys)
+
+        assert len(found) == 600
+        assert found["https://www.linkedin.com/in/user10"]["fullName"] == "User 10"
+        assert "https://www.linkedin.com/in/missing" not in found
+
+    def test_iteration_streams_all_rows(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.update({f"https://www.linkedin.com/in/user{i}": sample_profile for i in range(750)})
+
+        assert len(list(store)) == 750
+        assert all(profile == sample_profile for _, profile in store.items())
+
+    def test_persists_across_reopen(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        path = str(tmp_path / "profiles.sqlite3")
+        store = ProfileStore(path)
+        store.put("https://www.linkedin.com/in/janedoe", sample_profile)
+        store.close()
+
+        reopened = ProfileStore(path)
+        assert reopened.get("https://www.linkedin.com/in/janedoe") == sample_profile
+
+
+class TestLegacyImport:
+    """The old profile_cache.json is imported once."""
+
+    def test_imports_legacy_json_once(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        legacy_path = tmp_path / "profile_cache.json"
+        legacy_path.write_text(json.dumps({"https://www.linkedin.com/in/janedoe": sample_profile}))
+        path = str(tmp_path / "profiles.sqlite3")
+
+        store = ProfileStore(path, legacy_json_path=str(legacy_path))
+        assert store.get("https://www.linkedin.com/in/janedoe") == sample_profile
+
+        # Deleting after import must not be undone by re-importing on reopen
+        del store["https://www.linkedin.com/in/janedoe"]
+        store.close()
+        reopened = ProfileStore(path, legacy_json_path=str(legacy_path))
+        assert "https://www.linkedin.com/in/janedoe" not in reopened
+
+    def test_corrupt_legacy_json_is_skipped(self, tmp_path):
+        from profile_store import ProfileStore
+
+        legacy_path = tmp_path / "profile_cache.json"
+        legacy_path.write_text("{not json")
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"), legacy_json_path=str(legacy_path))
+        assert len(store) == 0
+
+
+class TestStaleness:
+    """Entries carry a scrape time and can be split into fresh and stale."""
+
+    def test_lookup_splits_fresh_and_stale(self, tmp_path, sample_profile):
+        import time
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put_many({"https://www.linkedin.com/in/old": sample_profile}, scraped_at=time.time() - 40 * 86400)
+        store.put_many({"https://www.linkedin.com/in/new": sample_profile})
+
+        fresh, stale = store.lookup(
+            ["https://www.linkedin.com/in/old", "https://www.linkedin.com/in/new", "https://www.linkedin.com/in/missing"],
+            max_age_seconds=30 * 86400,
+        )
+
+        assert list(fresh) == ["https://www.linkedin.com/in/new"]
+        assert list(stale) == ["https://www.linkedin.com/in/old"]
+
+    def test_no_max_age_means_nothing_stale(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put_many({"https://www.linkedin.com/in/old": sample_profile}, scraped_at=0)
+
+        fresh, stale = store.lookup(["https://www.linkedin.com/in/old"])
+        assert fresh and not stale
+
+    def test_adds_columns_to_existing_store(self, tmp_path, sample_profile):
+        import sqlite3
+        from profile_store import ProfileStore
+
+        path = str(tmp_path / "profiles.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE profiles (url TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at TEXT NOT NULL)")
+        conn.execute(
+            "INSERT INTO profiles VALUES (?, ?, ?)",
+            ("https://www.linkedin.com/in/janedoe", json.dumps(sample_profile), "2020-01-01T00:00:00.123456"),
+        )
+        conn.commit()
+        conn.close()
+
+        store = ProfileStore(path)
+        fresh, stale = store.lookup(["https://www.linkedin.com/in/janedoe"], max_age_seconds=86400)
+        assert stale["https://www.linkedin.com/in/janedoe"] == sample_profile
+
+
+class TestEviction:
+    """Least recently used rows are dropped to stay within budget."""
+
+    def test_evicts_least_recently_used(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"), max_entries=10)
+        for i in range(10):
+            store.put(f"https://www.linkedin.com/in/user{i}", sample_profile)
+        store.get("https://www.linkedin.com/in/user0")  # most recently used now
+
+        store.put("https://www.linkedin.com/in/user10", sample_profile)
+
+        assert len(store) == 9
+        assert "https://www.linkedin.com/in/user0" in store
+        assert "https://www.linkedin.com/in/user10" in store
+        assert "https://www.linkedin.com/in/user1" not in store
+
+    def test_reads_reach_disk_without_close(self, tmp_path, sample_profile):
+        import sqlite3
+        from profile_store import ProfileStore
+
+        path = str(tmp_path / "profiles.sqlite3")
+        store = ProfileStore(path)
+        store.put_many({"https://www.linkedin.com/in/old": sample_profile,
+                        "https://www.linkedin.com/in/new": sample_profile}, scraped_at=1000)
+        read_times = lambda: dict(sqlite3.connect(path).execute("SELECT url, last_accessed FROM profiles"))
+
+        # Another process sees the reads although the store was never closed
+        store.lookup(["https://www.linkedin.com/in/old"])
+        assert read_times()["https://www.linkedin.com/in/old"] > 1000
+
+        store.get("https://www.linkedin.com/in/new")
+        store.flush()  # what the atexit hook of shared stores does
+        assert read_times()["https://www.linkedin.com/in/new"] > 1000
+
+    def test_byte_budget(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        row_size = len(json.dumps(sample_profile, ensure_ascii=False))
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"), max_bytes=row_size * 20)
+        store.put_many({f"https://www.linkedin.com/in/user{i}": sample_profile for i in range(50)})
+
+        assert store.usage()["bytes"] <= row_size * 20
+
+    def test_usage_counters_track_replace_and_delete(self, tmp_path, sample_profile):
+        from profile_store import ProfileStore
+
+        path = str(tmp_path / "profiles.sqlite3")
+        store = ProfileStore(path)
+        store.put_many({f"https://www.linkedin.com/in/user{i}": sample_profile for i in range(5)})
+        store.put("https://www.linkedin.com/in/user0", {**sample_profile, "headline": "x" * 100})
+        del store["https://www.linkedin.com/in/user1"]
+
+        expected = store._conn.execute("SELECT COUNT(*), SUM(size) FROM profiles").fetchone()
+        assert store.usage() == {"entries": expected[0], "bytes": expected[1]}
+        assert ProfileStore(path).usage()["entries"] == 4
+
+    def test_usage_counters_seeded_for_existing_store(self, tmp_path, sample_profile):
+        import sqlite3
+        from profile_store import ProfileStore
+
+        path = str(tmp_path / "profiles.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE profiles (url TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at TEXT NOT NULL)")
+        conn.execute(
+            "INSERT INTO profiles VALUES (?, ?, ?)",
+            ("https://www.linkedin.com/in/janedoe", json.dumps(sample_profile), "2020-01-01T00:00:00"),
+        )
+        conn.commit()
+        conn.close()
+
+        store = ProfileStore(path)
+        assert store.usage() == {"entries": 1, "bytes": len(json.dumps(sample_profile))}
+
+
+class TestSharedNormalizer:
+    """Profiles from either actor land in the cache in the same shape."""
+
+    def test_supreme_coder_item_is_normalized(self):
+        from profile_store import normalize_profile
+
+        raw = {
+            "inputUrl": "https://www.linkedin.com/in/janedoe",
+            "firstName": "Jane",
+            "lastName": "Doe",
+            "geoLocationName": "Austin, Texas, United States",
+            "positions": [{"title": "CEO", "company": {"name": "Acme"}}],
+        }
+        profile = normalize_profile(raw)
+
+        assert profile["fullName"] == "Jane Doe"
+        assert profile["jobTitle"] == "CEO"
+        assert profile["companyName"] == "Acme"
+        assert profile["linkedinUrl"] == "https://www.linkedin.com/in/janedoe"
+
+    def test_dev_fusion_item_passes_through(self, sample_profile):
+        from profile_store import normalize_profile
+
+        raw = dict(sample_profile, experiences=[{"title": "CEO"}])
+        assert normalize_profile(raw) == raw
+
+    def test_dev_fusion_profile_url_becomes_linkedin_url(self):
+        from profile_store import normalize_profile
+
+        profile = normalize_profile({"profileUrl": "https://www.linkedin.com/in/janedoe", "fullName": "Jane Doe"})
+        assert profile["linkedinUrl"] == "https://www.linkedin.com/in/janedoe"
+
+    def test_put_scraped_is_hit_for_any_url_form(self, tmp_path):
+        from profile_store import ProfileStore, normalize_linkedin_url
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put_scraped([{
+            "inputUrl": "https://www.linkedin.com/in/JaneDoe/",
+            "firstName": "Jane",
+            "positions": [],
+        }])
+
+        key = normalize_linkedin_url("https://www.linkedin.com/in/janedoe?utm_source=x")
+        fresh, stale = store.lookup([key], max_age_seconds=86400)
+        assert fresh[key]["firstName"] == "Jane"
+
+    def test_old_schema_version_is_stale(self, tmp_path, sample_profile):
+        import profile_store
+        from profile_store import ProfileStore
+
+        store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+        store.put("https://www.linkedin.com/in/janedoe", sample_profile)
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(profile_store, "PROFILE_SCHEMA_VERSION", profile_store.PROFILE_SCHEMA_VERSION + 1)
+            fresh, stale = store.lookup(["https://www.linkedin.com/in/janedoe"])
+
+        assert not fresh
+        assert "https://www.linkedin.com/in/janedoe" in stale
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the cache-friendly prompt layout.
+
+Run tests: pytest tests/test_prompts.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+def five_line_parts(first_name, company_name):
+    from prompts import get_linkedin_5_line_prompt_parts
+    return get_linkedin_5_line_prompt_parts(first_name, company_name, "CEO", "Founder at X", "", "Glasgow")
+
+
+class TestStaticPrefix:
+    """Everything before the lead block is identical for every lead."""
+
+    def test_five_line_prefix_is_shared(self):
+        from prompts import get_linkedin_5_line_prompt
+
+        first = five_line_parts("Ann", "Acme")
+        second = five_line_parts("Bob", "Globex")
+
+        assert first[0] is second[0]
+        assert "Ann" in first[1] and "Ann" not in first[0]
+        assert first[1].startswith("Lead Information:")
+        assert get_linkedin_5_line_prompt("Ann", "Acme", "CEO", "Founder at X", "", "Glasgow") == "".join(first)
+
+    def test_buying_signal_prefix_depends_only_on_variant(self):
+        from prompts import get_linkedin_buying_signal_prompt_parts
+
+        ann = get_linkedin_buying_signal_prompt_parts("Ann", "Acme", "CEO", "SaaS", "Austin",
+                                                      post_author="Priya", post_topic="outbound")
+        bob = get_linkedin_buying_signal_prompt_parts("Bob", "Globex", "CTO", "", "Denver",
+                                                      post_author="Tomas", headline="Builds CRMs")
+        short = get_linkedin_buying_signal_prompt_parts("Ann", "Acme", "CEO", "SaaS", "Austin", skip_location=True)
+
+        assert ann[0] == bob[0]
+        assert "Priya" in ann[1] and "Priya" not in ann[0]
+        assert short[0] != ann[0]
+        assert "4-line" in short[1]
+
+    def test_gift_notes_put_instructions_before_leads(self):
+        from prompts import get_gift_signal_note_prompt_parts
+
+        prefix, block = get_gift_signal_note_prompt_parts("B2B founders", [{"fullName": "Ann"}])
+
+        assert "Max 100 characters" in prefix
+        assert "B2B founders" not in prefix and "Ann" not in prefix
+        assert block.startswith("## Prospect's ICP")
+        assert "{{" not in prefix
+
+
+class TestCachedMessages:
+    """The system message and static prefix lead the request."""
+
+    def test_messages(self):
+        from prompts import build_cached_messages, LINKEDIN_DM_SYSTEM_PROMPT
+
+        parts = five_line_parts("Ann", "Acme")
+        messages = build_cached_messages(LINKEDIN_DM_SYSTEM_PROMPT, parts)
+
+        assert messages[0] == {"role": "system", "content": LINKEDIN_DM_SYSTEM_PROMPT}
+        assert messages[1]["content"].startswith(parts[0])
+        assert messages[1]["content"].endswith(parts[1])
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for compressed, streamable .tmp state files.
+
+Run tests: pytest tests/test_state_io.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+import gzip
+from unittest.mock import patch, MagicMock
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+@pytest.fixture
+def sample_leads():
+    return [
+        {"fullName": f"Lead {i}", "linkedinUrl": f"https://www.linkedin.com/in/lead{i}", "note": "café"}
+        for i in range(50)
+    ]
+
+
+class TestStateIO:
+    """Round trips and streaming for every supported format."""
+
+    def test_gzip_jsonl_round_trip(self, tmp_path, sample_leads):
+        from state_io import write_records, read_records
+
+        path = str(tmp_path / "leads.jsonl.gz")
+        assert write_records(path, sample_leads) == 50
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert json.loads(f.readline())["fullName"] == "Lead 0"
+        assert read_records(path) == sample_leads
+
+    def test_append_adds_gzip_member(self, tmp_path, sample_leads):
+        from state_io import write_records, append_records, read_records
+
+        path = str(tmp_path / "leads.jsonl.gz")
+        write_records(path, sample_leads[:10])
+        append_records(path, sample_leads[10:])
+
+        assert read_records(path) == sample_leads
+
+    def test_iter_records_is_lazy(self, tmp_path, sample_leads):
+        from state_io import write_records, iter_records
+
+        path = str(tmp_path / "leads.jsonl.gz")
+        write_records(path, iter(sample_leads))
+
+        records = iter_records(path)
+        assert next(records)["fullName"] == "Lead 0"
+        assert next(records)["fullName"] == "Lead 1"
+
+    def test_legacy_json_array_streamed(self, tmp_path, sample_leads):
+        import state_io
+        from state_io import iter_records
+
+        path = tmp_path / "leads.json"
+        path.write_text(json.dumps(sample_leads + [123456, "x"], indent=2), encoding="utf-8")
+
+        # Tiny chunks force elements to straddle buffer boundaries
+        with patch.object(state_io, "_READ_CHUNK_CHARS", 7):
+            assert list(iter_records(str(path))) == sample_leads + [123456, "x"]
+
+    def test_legacy_json_object_is_single_record(self, tmp_path):
+        from state_io import read_records
+
+        path = tmp_path / "meta.json"
+        path.write_text(json.dumps({"a": 1}))
+
+        assert read_records(str(path)) == [{"a": 1}]
+
+    def test_torn_last_line_skipped(self, tmp_path):
+        from state_io import read_records
+
+        path = tmp_path / "leads.jsonl"
+        path.write_text('{"a": 1}\n{"a": ', encoding="utf-8")
+
+        assert read_records(str(path)) == [{"a": 1}]
+
+
+class TestBackfillStreaming:
+    """backfill_all reads every state format and sends batches as they fill."""
+
+    def test_backfill_reads_json_and_jsonl_gz(self, tmp_path, sample_leads):
+        from state_io import write_records
+        import sync_prospects_to_db
+
+        (tmp_path / "competitor_post_leads_old.json").write_text(json.dumps(sample_leads[:30]))
+        write_records(str(tmp_path / "competitor_post_leads_new.jsonl.gz"), sample_leads[20:])
+        (tmp_path / "profile_cache.json").write_text(json.dumps({"x": {}}))
+
+        response = MagicMock()
+        response.json.return_value = {"created": 1, "skipped": 0}
+        with patch("sync_prospects_to_db.requests.post", return_value=response) as mock_post:
+            result = sync_prospects_to_db.backfill_all(str(tmp_path))
+
+        sent = [p for call in mock_post.call_args_list for p in call.kwargs["json"]["prospects"]]
+        assert len(sent) == 50
+        assert result["status"] == "ok"
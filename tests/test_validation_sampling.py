@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for adaptive (sequential) validation sampling.
+
+Run tests: pytest tests/test_validation_sampling.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add execution directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'execution'))
+
+
+class TestWilsonInterval:
+    """The interval narrows with samples and stays within [0, 1]."""
+
+    def test_known_values(self):
+        from validation_sampling import wilson_interval
+
+        low, high = wilson_interval(90, 100, z=1.96)
+
+        assert low == pytest.approx(0.826, abs=0.001)
+        assert high == pytest.approx(0.945, abs=0.001)
+        assert wilson_interval(0, 0) == (0.0, 1.0)
+
+    def test_all_passes(self):
+        from validation_sampling import wilson_interval
+
+        low, high = wilson_interval(50, 50)
+
+        assert high == pytest.approx(1.0)
+        assert wilson_interval(10, 10)[0] < low < 1.0
+
+
+class TestSequentialSampler:
+    """Full -> sampling once the pass rate is stably high; escalation is final."""
+
+    def test_switches_to_sampling_after_enough_passes(self):
+        from validation_sampling import SequentialSampler
+
+        sampler = SequentialSampler(seed=1)
+        assert sampler.mode == "full"
+        for _ in range(30):
+            sampler.record(True)
+
+        assert sampler.mode == "sampling"
+        decisions = [sampler.should_validate() for _ in range(200)]
+        assert 10 < sum(decisions) < 80
+        assert sampler.skipped == 200 - sum(decisions)
+
+    def test_clustered_failures_escalate(self):
+        from validation_sampling import SequentialSampler
+
+        sampler = SequentialSampler(cluster_window=10, cluster_failures=3)
+        for _ in range(30):
+            sampler.record(True)
+
+        assert sampler.record(False) is False
+        assert sampler.record(False) is False
+        assert sampler.record(False) is True
+
+        assert sampler.mode == "escalated"
+        assert sampler.record(True) is False
+        assert all(sampler.should_validate() for _ in range(20))
+
+    def test_low_pass_rate_escalates(self):
+        from validation_sampling import SequentialSampler
+
+        sampler = SequentialSampler(cluster_failures=100)
+        escalated = [sampler.record(i % 2 == 0) for i in range(20)]
+
+        assert any(escalated)
+        assert "below" in sampler.report()["escalation_reason"]
+
+
+class TestSampleValidate:
+    """Judge calls scale with quality, not batch size."""
+
+    def test_high_pass_rate_judges_a_sample(self):
+        from validation_sampling import SequentialSampler, sample_validate
+
+        sampler = SequentialSampler(seed=3)
+        results = sample_validate(list(range(300)), lambda item: True, lambda verdict: verdict, sampler)
+
+        assert len(results) < 150
+        assert sampler.report()["skipped"] == 300 - len(results)
+        assert sampler.mode == "sampling"
+
+    def test_failures_escalate_to_full_validation(self):
+        from validation_sampling import SequentialSampler, sample_validate
+
+        # Items 250+ are bad; once the sampler sees them everything is judged
+        sampler = SequentialSampler(seed=3)
+        results = sample_validate(list(range(300)), lambda item: item < 250, lambda verdict: verdict, sampler)
+
+        assert sampler.mode == "escalated"
+        assert len(results) == 300
+        assert sampler.report()["skipped"] == 0
+
+    def test_errors_are_not_evidence(self):
+        from validation_sampling import SequentialSampler, sample_validate
+
+        sampler = SequentialSampler()
+        results = sample_validate(list(range(40)), lambda item: None, lambda verdict: verdict, sampler)
+
+        assert len(results) == 40
+        assert sampler.samples == 0
+
+    def test_seed_reproduces_the_run(self):
+        from validation_sampling import SequentialSampler, sample_validate
+
+        def run():
+            judged = []
+            sample_validate(list(range(200)), lambda item: True, lambda verdict: verdict,
+                            SequentialSampler(seed=7), workers=1,
+                            on_result=lambda item, verdict: judged.append(item))
+            return judged
+
+        assert run() == run()
+
+    def test_raising_validator_gets_error_verdict(self):
+        from validation_sampling import SequentialSampler, sample_validate
+
+        def validate(item):
+            if item == 3:
+                raise RuntimeError("judge timed out")
+            return True
+
+        sampler = SequentialSampler()
+        results = sample_validate(list(range(10)), validate, lambda verdict: verdict, sampler)
+
+        assert len(results) == 10
+        assert results[3] == {"flag": "ERROR", "error": "judge timed out"}
+        assert sampler.samples == 9